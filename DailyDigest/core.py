@@ -1,9 +1,11 @@
 import sys
 import os
 import asyncio
+import queue
+import threading
+from typing import Callable, Dict, List, Optional
 from datetime import datetime, timedelta
 from pathlib import Path
-from sqlalchemy import select, and_
 from loguru import logger
 
 # Load environment variables from .env file
@@ -14,9 +16,11 @@ load_dotenv()
 project_root = Path(__file__).resolve().parents[1]
 media_crawler_root = project_root / "MindSpider" / "DeepSentimentCrawling" / "MediaCrawler"
 
-# Add MediaCrawler to sys.path for its internal imports
-if str(media_crawler_root) not in sys.path:
-    sys.path.append(str(media_crawler_root))
+# Add MediaCrawler to sys.path for its internal imports.
+# MediaCrawler 内部使用顶层的 config / database / tools 包，需要优先于项目根目录的 config.py 解析
+if str(media_crawler_root) in sys.path:
+    sys.path.remove(str(media_crawler_root))
+sys.path.insert(0, str(media_crawler_root))
 
 # Import root config.py using importlib to avoid naming conflict
 import importlib.util
@@ -26,155 +30,84 @@ root_config = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(root_config)
 settings = root_config.settings
 
-# Import database modules
-from MindSpider.DeepSentimentCrawling.MediaCrawler.database.db_session import get_session, clear_engine_cache
-from MindSpider.DeepSentimentCrawling.MediaCrawler.database.models import WeiboNote
+# Import database modules and the Reddit crawler from MediaCrawler,
+# sharing one engine cache with the crawler's store
+from database.db_session import get_session
+from database.models import WeiboNote
+from media_platform.reddit.core import RedditCrawler, RedditCrawlConfig
 
-# Import prompt
-from DailyDigest.prompts import DAILY_DIGEST_PROMPT
+# Import the map-reduce digest pipeline
+from DailyDigest.map_reduce import DigestPipeline
 
-# Import Google Gemini SDK
-import google.generativeai as genai
+# Import column-projected queries backed by the (source_keyword, add_ts) index
+from DailyDigest.queries import count_recent_posts_stmt, fetch_rows, recent_posts_stmt, top_posts_stmt
+
+# Import LLM adapters (Gemini, or the local stub when DAILY_DIGEST_LLM=stub)
+from DailyDigest.llm import SimpleLLM, StubLLM, create_llm
+
+CRAWL_TIMEOUT = 120  # 单次爬取超时（秒）
 
-class SimpleLLM:
-    """Simple wrapper around Google Gemini API"""
-    def __init__(self):
-        # Load Google Gemini config from environment
-        api_key = os.getenv("GOOGLE_API_KEY")
-        model_name = os.getenv("GOOGLE_MODEL_NAME", "gemini-2.0-flash-exp")
-        
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY is not configured in .env file")
-        
-        # Configure Google Gemini
-        genai.configure(api_key=api_key)
-        
-        # Initialize the model
-        self.model = genai.GenerativeModel(model_name)
-        self.model_name = model_name
-        
-        logger.info(f"[SimpleLLM] Initialized Google Gemini: {model_name}")
-    
-    def chat(self, prompt: str) -> str:
-        """Simple chat interface using Google Gemini"""
-        try:
-            logger.info(f"[SimpleLLM] Sending request to {self.model_name}")
-            
-            # Generate content using Gemini
-            response = self.model.generate_content(prompt)
-            
-            # Extract text from response
-            if response and response.text:
-                logger.info(f"[SimpleLLM] Received response ({len(response.text)} chars)")
-                return response.text
-            else:
-                logger.error("[SimpleLLM] Empty response from Gemini")
-                raise ValueError("Empty response from Gemini API")
-                
-        except Exception as e:
-            logger.error(f"[SimpleLLM] Error calling Gemini API: {e}")
-            raise
 
 class DailyDigest:
-    def __init__(self):
-        self.llm = SimpleLLM()
+    def __init__(self, llm=None):
+        self.llm = llm or create_llm()
+        # 按时段分块总结并缓存块摘要，LLM 调用是异步的，多个关键词可以同时生成摘要
+        self.pipeline = DigestPipeline(summarize=self.llm.achat, model_name=self.llm.model_name)
+        # 常驻的爬虫：多次爬取复用同一个 RedditClient 连接池与限速器
+        self.crawler = RedditCrawler(session_factory=get_session)
     
-    async def crawl_reddit(self, keyword: str, max_count: int = 100):
+    async def crawl_reddit(self, keyword: str, max_count: int = 100, timeout: float = CRAWL_TIMEOUT):
         """
         爬取Reddit数据
-        使用subprocess调用MediaCrawler，避免导入冲突
+        在当前进程内调用 RedditCrawler，参数通过 RedditCrawlConfig 传入，不改写 MediaCrawler 的配置文件，
+        多个摘要可以同时爬取
         返回: (success: bool, message: str, post_count: int)
         """
+        keywords = [k.strip() for k in keyword.split(',') if k.strip()]
+        crawl_config = RedditCrawlConfig(keywords=keywords, max_notes_count=max_count)
         try:
             logger.info(f"[DailyDigest] Starting Reddit crawl for keyword: {keyword}")
-            
-            # 使用subprocess调用MediaCrawler的爬虫
-            import subprocess
-            import tempfile
-            
-            # 创建临时配置文件
-            config_content = f"""
-PLATFORM = "reddit"
-KEYWORDS = "{keyword}"
-LOGIN_TYPE = "qrcode"
-CRAWLER_TYPE = "search"
-CRAWLER_MAX_NOTES_COUNT = {max_count}
-SAVE_DATA_OPTION = "postgresql"
-"""
-            
-            # 写入临时配置
-            temp_config_path = media_crawler_root / "config" / "base_config_temp.py"
-            original_config_path = media_crawler_root / "config" / "base_config.py"
-            
-            # 备份原配置
-            import shutil
-            backup_path = media_crawler_root / "config" / "base_config_backup.py"
-            shutil.copy(original_config_path, backup_path)
-            
-            # 读取原配置并更新关键参数
-            with open(original_config_path, 'r', encoding='utf-8') as f:
-                original_content = f.read()
-            
-            # 修改配置
-            import re
-            modified_content = original_content
-            modified_content = re.sub(r'KEYWORDS = .*', f'KEYWORDS = "{keyword}"', modified_content)
-            modified_content = re.sub(r'CRAWLER_MAX_NOTES_COUNT = .*', f'CRAWLER_MAX_NOTES_COUNT = {max_count}', modified_content)
-            
-            # 写入修改后的配置
-            with open(original_config_path, 'w', encoding='utf-8') as f:
-                f.write(modified_content)
-            
-            # 运行爬虫
-            cmd = [
-                'python3',
-                str(media_crawler_root / 'main.py'),
-                '--platform', 'reddit',
-                '--lt', 'qrcode',
-                '--type', 'search',
-                '--save_data_option', 'postgresql'
-            ]
-            
-            logger.info(f"[DailyDigest] Running crawler command: {' '.join(cmd)}")
-            
-            result = subprocess.run(
-                cmd,
-                cwd=str(media_crawler_root),
-                capture_output=True,
-                text=True,
-                timeout=120  # 2分钟超时
-            )
-            
-            # 恢复原配置
-            shutil.move(backup_path, original_config_path)
-            
-            if result.returncode != 0:
-                logger.error(f"[DailyDigest] Crawler failed with code {result.returncode}")
-                logger.error(f"[DailyDigest] Stderr: {result.stderr}")
-                return False, f"爬取失败: {result.stderr[:200]}", 0
-            
-            # Check how many posts were crawled
-            posts = await self.get_recent_posts(keyword, hours=24)
-            post_count = len(posts)
-            
-            logger.info(f"[DailyDigest] Crawl completed. Found {post_count} posts for '{keyword}'")
-            
-            return True, f"成功爬取 {post_count} 条帖子", post_count
-            
-        except subprocess.TimeoutExpired:
-            logger.error(f"[DailyDigest] Crawler timeout after 120s")
-            return False, "爬取超时（超过2分钟）", 0
+            results = await asyncio.wait_for(self.crawler.crawl(crawl_config), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"[DailyDigest] Crawler timeout after {timeout}s")
+            return False, f"爬取超时（超过{timeout:.0f}秒）", 0
         except Exception as e:
             logger.error(f"[DailyDigest] Crawl failed: {e}")
             return False, f"爬取失败: {str(e)}", 0
+        
+        errors = [result["error"] for result in results.values() if not result["success"]]
+        if not results or len(errors) == len(results):
+            logger.error(f"[DailyDigest] Crawler failed: {errors}")
+            return False, f"爬取失败: {(errors[0] if errors else '没有有效的关键词')[:200]}", 0
+        
+        # Check how many posts were crawled
+        post_count = 0
+        for kw in results:
+            post_count += await self.count_recent_posts(kw, hours=24)
+        
+        logger.info(f"[DailyDigest] Crawl completed. Found {post_count} posts for '{keyword}'")
+        
+        return True, f"成功爬取 {post_count} 条帖子", post_count
+
+    async def close(self):
+        """关闭爬虫的长连接"""
+        await self.crawler.client.close_http_client()
+
+    @staticmethod
+    def _time_threshold(hours: int, since_ms: int = None) -> int:
+        # Calculate time threshold (milliseconds timestamp)
+        if since_ms is not None:
+            return since_ms
+        return int((datetime.now() - timedelta(hours=hours)).timestamp() * 1000)
 
-    async def get_recent_posts(self, keyword: str, hours: int = 24):
+    async def get_recent_posts(self, keyword: str, hours: int = 24, since_ms: int = None):
         """
         Fetch posts for the given keyword from the last N hours.
+        since_ms overrides the window start (milliseconds timestamp).
+        只返回摘要用到的列（note_id, content, liked_count, comments_count, note_url, add_ts），分批流式读取
         """
         try:
-            # Calculate time threshold (milliseconds timestamp)
-            time_threshold = int((datetime.now() - timedelta(hours=hours)).timestamp() * 1000)
+            time_threshold = self._time_threshold(hours, since_ms)
             
             async with get_session() as session:
                 if not session:
@@ -182,17 +115,8 @@ SAVE_DATA_OPTION = "postgresql"
                     return []
 
                 # Query WeiboNote (which stores Reddit data)
-                # Filter by source_keyword and add_ts (crawled time) or create_time (post time)
-                # Using add_ts is safer for "recently crawled"
-                stmt = select(WeiboNote).where(
-                    and_(
-                        WeiboNote.source_keyword == keyword,
-                        WeiboNote.add_ts >= time_threshold
-                    )
-                ).order_by(WeiboNote.add_ts.desc())
-                
-                result = await session.execute(stmt)
-                posts = result.scalars().all()
+                # Filter by source_keyword and add_ts (crawled time), served by idx_weibo_note_kw_add_ts
+                posts = await fetch_rows(session, recent_posts_stmt(WeiboNote, keyword, time_threshold))
                 
                 logger.info(f"Found {len(posts)} posts for keyword '{keyword}' in the last {hours} hours")
                 return posts
@@ -200,6 +124,32 @@ SAVE_DATA_OPTION = "postgresql"
             logger.exception(f"Error fetching posts: {e}")
             return []
 
+    async def count_recent_posts(self, keyword: str, hours: int = 24, since_ms: int = None) -> int:
+        """Count posts for the given keyword from the last N hours without loading them."""
+        try:
+            async with get_session() as session:
+                if not session:
+                    logger.error("Failed to get database session")
+                    return 0
+                stmt = count_recent_posts_stmt(WeiboNote, keyword, self._time_threshold(hours, since_ms))
+                return (await session.execute(stmt)).scalar_one()
+        except Exception as e:
+            logger.exception(f"Error counting posts: {e}")
+            return 0
+
+    async def get_top_posts(self, keyword: str, hours: int = 24, since_ms: int = None, limit: int = 5):
+        """Fetch the most liked posts for the given keyword; sorting and LIMIT run in SQL."""
+        try:
+            async with get_session() as session:
+                if not session:
+                    logger.error("Failed to get database session")
+                    return []
+                stmt = top_posts_stmt(WeiboNote, keyword, self._time_threshold(hours, since_ms), limit=limit)
+                return (await session.execute(stmt)).all()
+        except Exception as e:
+            logger.exception(f"Error fetching top posts: {e}")
+            return []
+
     def format_posts_for_llm(self, posts):
         """
         Format posts into a text string for the LLM.
@@ -209,7 +159,7 @@ SAVE_DATA_OPTION = "postgresql"
             return "No posts found."
             
         formatted_text = ""
-        for i, post in enumerate(posts[:50]): # 限制到50条帖子避免超过token限制
+        for i, post in enumerate(posts): # 调用方负责分块，避免超过token限制
             # 数据映射: 
             # content -> 标题 + 内容
             # liked_count -> 评分/点赞数
@@ -223,35 +173,34 @@ SAVE_DATA_OPTION = "postgresql"
             
         return formatted_text
 
-    async def generate_digest(self, keyword: str, hours: int = 24):
+    async def generate_digest(self, keyword: str, hours: int = 24,
+                              on_partial: Optional[Callable[[str], None]] = None):
         """
         Generate the daily digest for the keyword.
+        on_partial receives the final summary text as it streams in.
         """
-        # 1. Fetch posts
-        posts = await self.get_recent_posts(keyword, hours)
+        # 1. Fetch posts; the window starts on a bucket boundary so cached chunks stay valid as it slides
+        since_ms = self.pipeline.window_start(hours)
+        posts = await self.get_recent_posts(keyword, hours, since_ms=since_ms)
         
         if not posts:
             return {
                 "success": False,
                 "message": f"No posts found for keyword '{keyword}' in the last {hours} hours. Please run the crawler first."
             }
-            
-        # 2. Format for LLM
-        posts_text = self.format_posts_for_llm(posts)
-        
-        # 3. Construct Prompt
-        prompt = DAILY_DIGEST_PROMPT.format(keyword=keyword, hours=hours, posts_text=posts_text)
         
-        # 4. Call LLM
+        # 2. Map over time-bucketed chunks of all posts, then reduce the chunk summaries
         try:
-            logger.info(f"Generating summary for '{keyword}'...")
-            logger.info(f"Prompt length: {len(prompt)} characters")
+            logger.info(f"Generating summary for '{keyword}' over {len(posts)} posts...")
             
             import time
             start_time = time.time()
-            response_text = self.llm.chat(prompt)
+            response_text, pipeline_stats = await self.pipeline.run(
+                keyword, hours, posts, self.format_posts_for_llm, on_partial=on_partial
+            )
             end_time = time.time()
-            logger.info(f"LLM call took {end_time - start_time:.2f} seconds")
+            logger.info(f"Digest pipeline took {end_time - start_time:.2f} seconds "
+                        f"({pipeline_stats['cached_chunks']}/{pipeline_stats['chunks']} chunks cached)")
             
             # Parse JSON from the end
             import json
@@ -274,19 +223,23 @@ SAVE_DATA_OPTION = "postgresql"
             except Exception as e:
                 logger.warning(f"Failed to parse cover card JSON: {e}")
 
+            top_posts = await self.get_top_posts(keyword, hours, since_ms=since_ms)
+
             return {
                 "success": True,
                 "summary": summary,
                 "cover_card": cover_card_data,
                 "post_count": len(posts),
+                "chunk_count": pipeline_stats["chunks"],
+                "cached_chunk_count": pipeline_stats["cached_chunks"],
                 "top_posts": [
                     {
-                        "content": p.content[:100] + "...", 
+                        "content": (p.content or "")[:100] + "...", 
                         "score": p.liked_count, 
                         "comments": p.comments_count,
                         "url": p.note_url
                     } 
-                    for p in sorted(posts, key=lambda x: int(x.liked_count or 0), reverse=True)[:5]
+                    for p in top_posts
                 ]
             }
         except Exception as e:
@@ -296,25 +249,83 @@ SAVE_DATA_OPTION = "postgresql"
                 "message": f"Error generating summary: {str(e)}"
             }
 
+    async def generate_digests(self, keywords: List[str], hours: int = 24) -> Dict[str, dict]:
+        """
+        Generate digests for several keywords concurrently.
+        LLM 请求共享 self.llm 的限速器，并发数与每分钟请求数不会超过上限
+        """
+        keywords = list(dict.fromkeys(k.strip() for k in keywords if k and k.strip()))
+        results = await asyncio.gather(*(self.generate_digest(k, hours) for k in keywords))
+        return dict(zip(keywords, results))
+
 # Helper functions for synchronous execution (e.g. from Streamlit)
+class _DigestRuntime:
+    """
+    在后台线程中常驻一个事件循环和一个 DailyDigest 实例。
+    每次调用都 asyncio.run 会创建新循环，数据库引擎与 HTTP 连接池只能丢弃重建；
+    共用一个循环后它们在多次调用之间保持可用，Streamlit 的多个会话也可以同时提交任务
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._digest = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="daily-digest-loop", daemon=True).start()
+            if self._digest is None:
+                self._digest = DailyDigest()
+            return self._loop, self._digest
+
+    def run(self, make_coro, on_partial: Optional[Callable[[str], None]] = None):
+        """
+        在常驻循环中执行 make_coro(digest, emit) 并等待结果
+        协程通过 emit 发出的中间结果在调用方线程中交给 on_partial（Streamlit 只能在脚本线程中更新页面）
+        """
+        loop, digest = self._ensure_started()
+        updates = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(make_coro(digest, updates.put), loop)
+        while on_partial is not None and not future.done():
+            try:
+                latest = updates.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            # 只显示最新的一段，跳过积压的中间结果
+            while not updates.empty():
+                latest = updates.get_nowait()
+            on_partial(latest)
+        return future.result()
+
+
+_runtime = _DigestRuntime()
+
+
 def run_crawl(keyword: str, max_count: int = 100):
     """
     同步执行爬取
     返回: (success: bool, message: str, post_count: int)
     """
-    clear_engine_cache()
-    digest = DailyDigest()
-    return asyncio.run(digest.crawl_reddit(keyword, max_count))
+    return _runtime.run(lambda digest, emit: digest.crawl_reddit(keyword, max_count))
 
-def run_digest_generation(keyword: str, hours: int = 24):
+def run_digest_generation(keyword: str, hours: int = 24, on_partial: Optional[Callable[[str], None]] = None):
     """
     同步执行摘要生成
+    on_partial: 流式接收最终摘要的中间文本（在调用方线程中回调）
+    """
+    return _runtime.run(
+        lambda digest, emit: digest.generate_digest(keyword, hours, on_partial=emit if on_partial else None),
+        on_partial,
+    )
+
+def run_batch_digest_generation(keywords: List[str], hours: int = 24) -> Dict[str, dict]:
+    """
+    同步执行多个关键词的摘要生成，关键词之间并发
+    返回: {关键词: 摘要结果}
     """
-    # Clear engine cache to avoid "attached to a different loop" error
-    # because asyncio.run creates a new loop each time
-    clear_engine_cache()
-    digest = DailyDigest()
-    return asyncio.run(digest.generate_digest(keyword, hours))
+    return _runtime.run(lambda digest, emit: digest.generate_digests(keywords, hours))
 
 def run_crawl_and_digest(keyword: str, hours: int = 24, max_count: int = 100):
     """
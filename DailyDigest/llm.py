@@ -0,0 +1,235 @@
+"""
+Daily Digest LLM adapters
+
+- SimpleLLM：Google Gemini，提供同步 chat 与异步 achat（generate_content_async，支持超时与流式输出）
+- StubLLM：本地模拟模型，按设定的延迟与速度返回固定格式的摘要，用于压测与离线调试
+- 两者共用 LLMRateLimiter：限制并发数与每分钟请求数，多个关键词同时生成摘要时共享额度
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Callable, Optional
+
+from loguru import logger
+
+# 单次请求超时（秒）
+LLM_TIMEOUT = float(os.getenv("DAILY_DIGEST_LLM_TIMEOUT", "120"))
+# 同时进行的请求数与每分钟请求数上限
+LLM_MAX_CONCURRENCY = int(os.getenv("DAILY_DIGEST_LLM_CONCURRENCY", "4"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("DAILY_DIGEST_LLM_RPM", "60"))
+
+
+class LLMRateLimiter:
+    """并发数 + 请求间隔限制，用法：async with limiter: ..."""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 requests_per_minute: float = LLM_REQUESTS_PER_MINUTE):
+        self.max_concurrency = max(1, max_concurrency)
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._semaphore = None
+        self._lock = None
+        self._next_at = 0.0
+
+    def _ensure_primitives(self):
+        # 延迟到事件循环中创建，避免绑定到导入时的循环
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        self._ensure_primitives()
+        await self._semaphore.acquire()
+        try:
+            async with self._lock:
+                now = time.monotonic()
+                wait = self._next_at - now
+                self._next_at = max(now, self._next_at) + self.interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+        return False
+
+
+async def _with_timeout(coro, timeout: Optional[float], model_name: str):
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        logger.error(f"[LLM] {model_name} request timed out after {timeout}s")
+        raise TimeoutError(f"LLM request timed out after {timeout}s")
+
+
+class SimpleLLM:
+    """Simple wrapper around Google Gemini API"""
+    def __init__(self, timeout: float = LLM_TIMEOUT, rate_limiter: Optional[LLMRateLimiter] = None):
+        # Import Google Gemini SDK
+        import google.generativeai as genai
+
+        # Load Google Gemini config from environment
+        api_key = os.getenv("GOOGLE_API_KEY")
+        model_name = os.getenv("GOOGLE_MODEL_NAME", "gemini-2.0-flash-exp")
+
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY is not configured in .env file")
+
+        # Configure Google Gemini
+        genai.configure(api_key=api_key)
+
+        # Initialize the model
+        self.model = genai.GenerativeModel(model_name)
+        self.model_name = model_name
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or LLMRateLimiter()
+
+        logger.info(f"[SimpleLLM] Initialized Google Gemini: {model_name}")
+
+    def chat(self, prompt: str) -> str:
+        """Simple chat interface using Google Gemini"""
+        try:
+            logger.info(f"[SimpleLLM] Sending request to {self.model_name}")
+
+            # Generate content using Gemini
+            response = self.model.generate_content(prompt, request_options={"timeout": self.timeout})
+
+            # Extract text from response
+            if response and response.text:
+                logger.info(f"[SimpleLLM] Received response ({len(response.text)} chars)")
+                return response.text
+            else:
+                logger.error("[SimpleLLM] Empty response from Gemini")
+                raise ValueError("Empty response from Gemini API")
+
+        except Exception as e:
+            logger.error(f"[SimpleLLM] Error calling Gemini API: {e}")
+            raise
+
+    async def achat(self, prompt: str, on_chunk: Optional[Callable[[str], None]] = None,
+                    timeout: Optional[float] = None) -> str:
+        """
+        异步调用 Gemini，不阻塞事件循环
+        on_chunk 不为空时使用流式输出，每收到一段就以目前为止的完整文本回调一次
+        """
+        timeout = timeout or self.timeout
+
+        async def generate() -> str:
+            if on_chunk is None:
+                response = await self.model.generate_content_async(
+                    prompt, request_options={"timeout": timeout}
+                )
+                return response.text if response else ""
+            response = await self.model.generate_content_async(
+                prompt, stream=True, request_options={"timeout": timeout}
+            )
+            text = ""
+            async for chunk in response:
+                if chunk.text:
+                    text += chunk.text
+                    on_chunk(text)
+            return text
+
+        async with self.rate_limiter:
+            logger.info(f"[SimpleLLM] Sending async request to {self.model_name}")
+            try:
+                text = await _with_timeout(generate(), timeout, self.model_name)
+            except Exception as e:
+                logger.error(f"[SimpleLLM] Error calling Gemini API: {e}")
+                raise
+        if not text:
+            logger.error("[SimpleLLM] Empty response from Gemini")
+            raise ValueError("Empty response from Gemini API")
+        logger.info(f"[SimpleLLM] Received response ({len(text)} chars)")
+        return text
+
+
+class StubLLM:
+    """
+    本地模拟模型：不访问网络，固定延迟后按 chars_per_second 的速度"流式"返回一段摘要，
+    最终摘要末尾带有封面卡片JSON，与 Gemini 的输出格式一致
+    """
+
+    def __init__(self, latency: float = 0.5, chars_per_second: float = 2000.0, timeout: float = LLM_TIMEOUT,
+                 rate_limiter: Optional[LLMRateLimiter] = None):
+        self.model_name = "stub"
+        self.latency = latency
+        self.chars_per_second = chars_per_second
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter or LLMRateLimiter()
+        self.calls = 0
+
+    def _respond(self, prompt: str) -> str:
+        self.calls += 1
+        summary = f"## 每日情绪：中性\n\n**总结：**\n模拟摘要（输入 {len(prompt)} 字符）。\n"
+        card = {"ticker": "STUB", "sentiment_score": 5, "sentiment_label": "观望",
+                "headline": "模拟摘要", "key_factors": ["模拟", "压测", "本地"]}
+        return summary + "\n" + json.dumps(card, ensure_ascii=False)
+
+    def chat(self, prompt: str) -> str:
+        time.sleep(self.latency)
+        return self._respond(prompt)
+
+    async def achat(self, prompt: str, on_chunk: Optional[Callable[[str], None]] = None,
+                    timeout: Optional[float] = None) -> str:
+        async def generate() -> str:
+            await asyncio.sleep(self.latency)
+            text = self._respond(prompt)
+            if on_chunk is None:
+                return text
+            step = 40
+            for i in range(step, len(text) + step, step):
+                await asyncio.sleep(step / self.chars_per_second)
+                on_chunk(text[:i])
+            return text
+
+        async with self.rate_limiter:
+            return await _with_timeout(generate(), timeout or self.timeout, self.model_name)
+
+
+def create_llm():
+    """按 DAILY_DIGEST_LLM 环境变量选择模型：stub 使用本地模拟模型，否则使用 Gemini"""
+    if os.getenv("DAILY_DIGEST_LLM", "").lower() == "stub":
+        logger.info("[LLM] Using local stub model")
+        return StubLLM()
+    return SimpleLLM()
+
+
+def benchmark(keywords: int = 8, posts_per_keyword: int = 120, latency: float = 0.2) -> dict:
+    """
+    用 StubLLM 对比两种方式生成多个关键词摘要的耗时：
+    - blocking：在事件循环中直接调用同步的 chat，关键词之间实际上是串行的
+    - async：achat + 共享限速器，关键词之间并发
+    返回 {方式: 秒}
+    """
+    from types import SimpleNamespace
+
+    from DailyDigest.map_reduce import DigestPipeline, SummaryCache
+
+    now_ms = int(time.time() * 1000)
+    posts = [SimpleNamespace(note_id=i, add_ts=now_ms - (i % 4) * 3_600_000, content=f"post {i}",
+                             liked_count=i, comments_count=0) for i in range(posts_per_keyword)]
+
+    def format_posts(batch):
+        return "\n".join(p.content for p in batch)
+
+    async def blocking_summarize(prompt, on_chunk=None):
+        return stub.chat(prompt)
+
+    async def run(summarize) -> float:
+        pipeline = DigestPipeline(summarize, cache=SummaryCache(None), model_name=stub.model_name)
+        start = time.perf_counter()
+        await asyncio.gather(*(pipeline.run(f"KW{i}", 24, posts, format_posts) for i in range(keywords)))
+        return time.perf_counter() - start
+
+    stub = StubLLM(latency=latency, rate_limiter=LLMRateLimiter(max_concurrency=8, requests_per_minute=0))
+    return {"blocking": asyncio.run(run(blocking_summarize)), "async": asyncio.run(run(stub.achat))}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(", ".join(f"{name}: {seconds:.2f}s" for name, seconds in result.items()))
@@ -0,0 +1,211 @@
+"""
+Daily Digest map-reduce pipeline
+
+帖子按抓取时间 (add_ts) 分到固定的时段（默认每小时），每个时段再按数量切成若干块：
+- Map：逐块生成摘要，按 (关键词, 块内帖子ID集合) 缓存到内存与磁盘
+- Reduce：把各块摘要按时间顺序合并为最终摘要
+
+刷新同一个摘要时，只有新抓取的帖子所在的时段需要重新总结。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from DailyDigest.prompts import DIGEST_CHUNK_PROMPT, DIGEST_REDUCE_PROMPT
+
+BUCKET_SECONDS = 3600  # 时段长度
+CHUNK_MAX_POSTS = 50  # 单次Map最多包含的帖子数，避免超过token限制
+MAP_CONCURRENCY = 4  # 同时进行的Map请求数
+CACHE_DIR = Path(__file__).resolve().parent / ".digest_cache"
+CACHE_MAX_AGE_SECONDS = 7 * 24 * 3600  # 超过该时间未使用的缓存文件会被清理
+
+
+def bucket_floor(ts_ms: int, bucket_seconds: int = BUCKET_SECONDS) -> int:
+    """把毫秒时间戳对齐到所在时段的起点（毫秒）"""
+    bucket_ms = bucket_seconds * 1000
+    return int(ts_ms) // bucket_ms * bucket_ms
+
+
+@dataclass
+class PostChunk:
+    """同一时段内的一批帖子"""
+    bucket_start: int  # 毫秒
+    posts: List = field(default_factory=list)
+
+    @property
+    def post_ids(self) -> List[str]:
+        return sorted(str(p.note_id) for p in self.posts)
+
+    @property
+    def label(self) -> str:
+        return datetime.fromtimestamp(self.bucket_start / 1000).strftime("%m-%d %H:%M")
+
+
+def split_into_chunks(posts: Sequence, bucket_seconds: int = BUCKET_SECONDS,
+                      max_posts: int = CHUNK_MAX_POSTS) -> List[PostChunk]:
+    """
+    按抓取时间分时段，时段内按帖子ID排序后每 max_posts 条切成一块，保证同样的帖子总是得到同样的分块
+    返回按时间先后排列的块
+    """
+    buckets: Dict[int, List] = {}
+    for post in posts:
+        buckets.setdefault(bucket_floor(post.add_ts or 0, bucket_seconds), []).append(post)
+
+    chunks = []
+    for bucket_start in sorted(buckets):
+        bucket_posts = sorted(buckets[bucket_start], key=lambda p: str(p.note_id))
+        for i in range(0, len(bucket_posts), max_posts):
+            chunks.append(PostChunk(bucket_start=bucket_start, posts=bucket_posts[i:i + max_posts]))
+    return chunks
+
+
+def _digest_key(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    摘要缓存：进程内字典 + 每个键一个JSON文件，进程重启后仍可复用
+    cache_dir 为 None 时只使用内存
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = CACHE_DIR, max_age: int = CACHE_MAX_AGE_SECONDS):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._memory: Dict[str, str] = {}
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._prune(max_age)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _prune(self, max_age: int):
+        cutoff = time.time() - max_age
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
+
+    def get(self, key: str) -> Optional[str]:
+        if key in self._memory:
+            return self._memory[key]
+        if not self.cache_dir:
+            return None
+        try:
+            path = self._path(key)
+            summary = json.loads(path.read_text(encoding="utf-8"))["summary"]
+            os.utime(path)  # 记录最近一次使用时间，避免被清理
+        except (OSError, ValueError, KeyError):
+            return None
+        self._memory[key] = summary
+        return summary
+
+    def set(self, key: str, summary: str):
+        self._memory[key] = summary
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            tmp_path.write_text(json.dumps({"summary": summary, "created_at": time.time()}, ensure_ascii=False),
+                                encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"[DigestPipeline] Failed to write cache {path.name}: {e}")
+
+
+class DigestPipeline:
+    """时段分块的 map-reduce 摘要流程"""
+
+    def __init__(self, summarize: Callable[[str], Awaitable[str]], cache: Optional[SummaryCache] = None,
+                 model_name: str = "", bucket_seconds: int = BUCKET_SECONDS,
+                 max_posts_per_chunk: int = CHUNK_MAX_POSTS, map_concurrency: int = MAP_CONCURRENCY):
+        """
+        Args:
+            summarize: 异步调用LLM的函数，输入提示词返回文本，流式输出时额外传入 on_chunk 回调
+            cache: 摘要缓存，默认写入 DailyDigest/.digest_cache
+            model_name: 模型名称，作为缓存键的一部分，换模型后不复用旧摘要
+            bucket_seconds: 时段长度（秒）
+            max_posts_per_chunk: 单次Map最多包含的帖子数
+            map_concurrency: 同时进行的Map请求数
+        """
+        self.summarize = summarize
+        self.cache = cache if cache is not None else SummaryCache()
+        self.model_name = model_name
+        self.bucket_seconds = bucket_seconds
+        self.max_posts_per_chunk = max_posts_per_chunk
+        self.map_concurrency = map_concurrency
+
+    def window_start(self, hours: int, now_ms: Optional[int] = None) -> int:
+        """
+        时间窗口的起点对齐到时段边界，窗口滑动时最早的时段保持完整，其缓存仍然有效
+        """
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        return bucket_floor(now_ms - hours * 3600 * 1000, self.bucket_seconds)
+
+    async def run(self, keyword: str, hours: int, posts: Sequence, format_posts: Callable[[Sequence], str],
+                  on_partial: Optional[Callable[[str], None]] = None) -> Tuple[str, Dict]:
+        """
+        生成摘要
+
+        Args:
+            keyword: 关键词
+            hours: 时间窗口（小时）
+            posts: 窗口内的全部帖子
+            format_posts: 把一批帖子格式化为提示词文本的函数
+            on_partial: 流式接收Reduce输出的回调，需要 summarize 支持 on_chunk 参数
+
+        Returns:
+            (LLM最终输出, 统计信息)
+        """
+        chunks = split_into_chunks(posts, self.bucket_seconds, self.max_posts_per_chunk)
+        semaphore = asyncio.Semaphore(max(1, self.map_concurrency))
+        stats = {"chunks": len(chunks), "cached_chunks": 0, "posts": len(posts)}
+
+        async def map_chunk(chunk: PostChunk) -> Tuple[str, str]:
+            key = _digest_key("map", self.model_name, keyword, chunk.post_ids)
+            summary = self.cache.get(key)
+            if summary is not None:
+                stats["cached_chunks"] += 1
+                return key, summary
+            prompt = DIGEST_CHUNK_PROMPT.format(keyword=keyword, bucket=chunk.label,
+                                                post_count=len(chunk.posts), posts_text=format_posts(chunk.posts))
+            async with semaphore:
+                summary = (await self.summarize(prompt)).strip()
+            self.cache.set(key, summary)
+            return key, summary
+
+        mapped = await asyncio.gather(*(map_chunk(chunk) for chunk in chunks))
+        logger.info(f"[DigestPipeline] {keyword}: {stats['chunks']} chunks, "
+                    f"{stats['cached_chunks']} from cache, {len(posts)} posts")
+
+        # Reduce 的输入完全由各块摘要决定，没有新帖子时直接复用上一次的结果
+        reduce_key = _digest_key("reduce", self.model_name, keyword, hours, [key for key, _ in mapped])
+        result = self.cache.get(reduce_key)
+        stats["cached_reduce"] = result is not None
+        if result is None:
+            summaries_text = "\n\n".join(
+                f"### {chunk.label}（{len(chunk.posts)} 条帖子）\n{summary}"
+                for chunk, (_, summary) in zip(chunks, mapped)
+            )
+            prompt = DIGEST_REDUCE_PROMPT.format(keyword=keyword, hours=hours, post_count=len(posts),
+                                                 summaries_text=summaries_text)
+            if on_partial is not None:
+                result = await self.summarize(prompt, on_chunk=on_partial)
+            else:
+                result = await self.summarize(prompt)
+            self.cache.set(reduce_key, result)
+        elif on_partial is not None:
+            on_partial(result)
+        return result, stats
@@ -2,16 +2,8 @@
 Daily Digest Prompts
 """
 
-DAILY_DIGEST_PROMPT = """
-你是一位专业的社交媒体舆情分析师。你的任务是基于提供的关于关键词 "{keyword}" 的 Reddit 帖子生成"每日舆情摘要"。
-
-这些帖子来自过去 {hours} 小时。
-
-请分析以下帖子并以 Markdown 格式提供摘要。
-
-**输入数据：**
-{posts_text}
-
+# 每日摘要与汇总摘要共用的输出要求
+_DIGEST_OUTPUT_REQUIREMENTS = """
 **输出要求：**
 
 1.  **整体情绪**：（看涨/看跌/中性）并简要说明原因（1-2 句话）。
@@ -48,3 +40,40 @@ Finally, output a JSON object (and ONLY the JSON) at the very end of your respon
 
 Ensure the JSON is valid and appears at the very end of the response.
 """
+
+DAILY_DIGEST_PROMPT = """
+你是一位专业的社交媒体舆情分析师。你的任务是基于提供的关于关键词 "{keyword}" 的 Reddit 帖子生成"每日舆情摘要"。
+
+这些帖子来自过去 {hours} 小时。
+
+请分析以下帖子并以 Markdown 格式提供摘要。
+
+**输入数据：**
+{posts_text}
+""" + _DIGEST_OUTPUT_REQUIREMENTS
+
+# Map：总结一个时段内的一批帖子，结果会被缓存并在汇总时复用
+DIGEST_CHUNK_PROMPT = """
+你是一位专业的社交媒体舆情分析师。以下是关于关键词 "{keyword}" 在 {bucket} 这一时段内的 {post_count} 条 Reddit 帖子。
+
+请用中文写一段不超过 300 字的要点摘要，供之后与其他时段的摘要合并，包括：
+1.  该时段的整体情绪（看涨/看跌/中性）及原因；
+2.  主要讨论的话题；
+3.  互动最高或信息量最大的 1-3 个帖子的要点（附点赞数与评论数）。
+
+只输出摘要本身，不要使用标题，不要输出JSON，不要暴露用户ID信息。
+
+**帖子：**
+{posts_text}
+"""
+
+# Reduce：把各时段的摘要合并为最终的每日摘要
+DIGEST_REDUCE_PROMPT = """
+你是一位专业的社交媒体舆情分析师。你的任务是基于关于关键词 "{keyword}" 的 Reddit 讨论生成"每日舆情摘要"。
+
+过去 {hours} 小时内共有 {post_count} 条帖子，已按时段分别总结如下（按时间先后排列，越靠后越新）。
+请综合所有时段的摘要，注意情绪随时间的变化，并以 Markdown 格式提供摘要。
+
+**各时段摘要：**
+{summaries_text}
+""" + _DIGEST_OUTPUT_REQUIREMENTS
@@ -0,0 +1,68 @@
+"""
+Daily Digest queries
+
+按关键词读取最近抓取的帖子，条件 source_keyword = ? AND add_ts >= ? 命中
+(source_keyword, add_ts) 复合索引（见 MindSpider/schema/migrations.py）：
+- 只查询摘要需要的列，不加载完整的ORM对象
+- 结果按 yield_per 分批流式读取
+- 点赞数前N的帖子在SQL中按归一化的 like_num 排序与截取
+"""
+
+from typing import List, Sequence
+
+from sqlalchemy import and_, func, select
+
+# format_posts_for_llm、分块与 top_posts 用到的列
+POST_COLUMNS = ("note_id", "content", "liked_count", "comments_count", "note_url", "add_ts")
+YIELD_PER = 500  # 流式读取时每批的行数
+TOP_POSTS_LIMIT = 5
+
+
+def _window(model, keyword: str, since_ms: int):
+    return and_(model.source_keyword == keyword, model.add_ts >= since_ms)
+
+
+def recent_posts_stmt(model, keyword: str, since_ms: int, columns: Sequence[str] = POST_COLUMNS):
+    """时间窗口内的帖子，按抓取时间倒序"""
+    return (
+        select(*(getattr(model, name) for name in columns))
+        .where(_window(model, keyword, since_ms))
+        .order_by(model.add_ts.desc())
+    )
+
+
+def count_recent_posts_stmt(model, keyword: str, since_ms: int):
+    """时间窗口内的帖子数量，只扫描索引"""
+    return select(func.count()).select_from(model).where(_window(model, keyword, since_ms))
+
+
+def top_posts_stmt(model, keyword: str, since_ms: int, limit: int = TOP_POSTS_LIMIT,
+                   columns: Sequence[str] = POST_COLUMNS):
+    """
+    时间窗口内点赞数最多的 limit 条帖子，按整数列 like_num 排序；点赞数缺失（like_num 为 NULL）的帖子按 0 计，
+    排在有点赞数的帖子之后而不是被丢弃。
+    排序表达式是 COALESCE(like_num, 0)，索引不能提供这个顺序：(source_keyword, like_num, add_ts) 索引只用于
+    关键词与时间窗口的过滤，命中的行仍需排序，代价随窗口内的帖子数增长
+    """
+    return (
+        select(*(getattr(model, name) for name in columns))
+        .where(_window(model, keyword, since_ms))
+        .order_by(func.coalesce(model.like_num, 0).desc(), model.add_ts.desc())
+        .limit(limit)
+    )
+
+
+async def fetch_rows(session, stmt, yield_per: int = YIELD_PER) -> List:
+    """
+    分批流式执行查询，返回 Row 列表（可按属性访问列，如 row.content）
+
+    Args:
+        session: AsyncSession
+        stmt: select 语句
+        yield_per: 每批读取的行数
+    """
+    result = await session.stream(stmt.execution_options(yield_per=yield_per))
+    rows = []
+    async for partition in result.partitions():
+        rows.extend(partition)
+    return rows
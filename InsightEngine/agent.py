@@ -25,6 +25,16 @@ from .utils.config import settings, Settings
 from .utils import format_search_results_for_prompt
 
 
+# 导入报告清单工具
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from utils.report_manifest import record_report
+    REPORT_MANIFEST_AVAILABLE = True
+except ImportError:
+    REPORT_MANIFEST_AVAILABLE = False
+    logger.warning("无法导入report_manifest模块，报告将不会登记到清单")
+
 class DeepSearchAgent:
     """Deep Search Agent主类"""
     
@@ -747,6 +757,13 @@ class DeepSearchAgent:
         
         logger.info(f"报告已保存到: {filepath}")
         
+        # 登记到报告清单，ReportEngine据此判断报告是否就绪
+        if REPORT_MANIFEST_AVAILABLE:
+            try:
+                record_report("insight", self.state.query, filepath, report_content)
+            except Exception as e:
+                logger.exception(f"登记报告清单失败: {str(e)}")
+        
         # 保存状态（如果配置允许）
         if self.config.SAVE_INTERMEDIATE_STATES:
             state_filename = f"state_{query_safe}_{timestamp}.json"
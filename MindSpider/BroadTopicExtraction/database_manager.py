@@ -7,9 +7,10 @@ BroadTopicExtraction模块 - 数据库管理器
 
 import sys
 import json
+import time
 from datetime import datetime, date, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 from loguru import logger
@@ -25,6 +26,9 @@ except ImportError:
 
 from config import settings
 
+# 批量写入时每批的行数
+BATCH_SIZE = 500
+
 
 class DatabaseManager:
     """数据库管理器"""
@@ -32,6 +36,7 @@ class DatabaseManager:
     def __init__(self):
         """初始化数据库管理器"""
         self.engine: Engine = None
+        self.last_write_stats: Dict = {}
         self.connect()
 
     def connect(self):
@@ -70,11 +75,83 @@ class DatabaseManager:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
 
+    # ==================== 批量写入 ====================
+
+    def _upsert_sql(self, table: str, columns: Sequence[str], conflict_columns: Sequence[str],
+                    update_columns: Sequence[str]) -> str:
+        """
+        生成按唯一键覆盖的插入语句：MySQL 使用 ON DUPLICATE KEY UPDATE，PostgreSQL/SQLite 使用 ON CONFLICT
+
+        Args:
+            table: 表名
+            columns: 插入的列
+            conflict_columns: 唯一键列
+            update_columns: 冲突时更新的列
+
+        Returns:
+            SQL语句
+        """
+        insert_sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(':' + c for c in columns)})"
+        )
+        if self.engine.dialect.name == "mysql":
+            updates = ", ".join(f"{c} = VALUES({c})" for c in update_columns)
+            return f"{insert_sql} ON DUPLICATE KEY UPDATE {updates}"
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in update_columns)
+        return f"{insert_sql} ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET {updates}"
+
+    def _bulk_write(self, conn, sql: str, rows: List[Dict], batch_size: int = BATCH_SIZE) -> int:
+        """
+        在当前事务中分批 executemany 写入，某一批失败时回滚到该批的保存点并逐条重试，
+        只跳过真正出错的行
+
+        Args:
+            conn: 已开启事务的连接
+            sql: 写入语句
+            rows: 参数列表
+            batch_size: 每批行数
+
+        Returns:
+            写入成功的行数
+        """
+        statement = text(sql)
+        written = 0
+        for start in range(0, len(rows), batch_size):
+            chunk = rows[start:start + batch_size]
+            try:
+                with conn.begin_nested():
+                    conn.execute(statement, chunk)
+                written += len(chunk)
+                continue
+            except Exception as e:
+                logger.warning(f"批量写入失败，改为逐条写入该批 {len(chunk)} 条: {e}")
+            for row in chunk:
+                try:
+                    with conn.begin_nested():
+                        conn.execute(statement, row)
+                    written += 1
+                except Exception as e:
+                    logger.exception(f"写入单条记录失败: {e}")
+        return written
+
+    def _record_write_stats(self, table: str, rows: int, elapsed: float):
+        rows_per_sec = rows / elapsed if elapsed > 0 else 0.0
+        self.last_write_stats = {
+            "table": table,
+            "rows": rows,
+            "elapsed": round(elapsed, 3),
+            "rows_per_sec": round(rows_per_sec, 1),
+        }
+        logger.info(f"{table} 写入 {rows} 行，耗时 {elapsed:.3f} 秒（{rows_per_sec:.0f} 行/秒）")
+
     # ==================== 新闻数据操作 ====================
 
     def save_daily_news(self, news_data: List[Dict], crawl_date: date = None) -> int:
         """
         保存每日新闻数据，如果当天已有数据则覆盖
+        按 news_id 批量 upsert，并在同一事务中删除当天不再出现的旧新闻，
+        未变化的新闻不会被删除重建，关联的话题记录得以保留
 
         Args:
             news_data: 新闻数据列表
@@ -88,52 +165,47 @@ class DatabaseManager:
 
         current_timestamp = int(datetime.now().timestamp())
 
+        rows = []
+        for news_item in news_data:
+            # news_item.get('id') 已经是完整的 news_id（格式：source_item_id）
+            # 为了支持同一条新闻在不同日期出现，将 crawl_date 加入到 news_id 中
+            base_news_id = news_item.get(
+                'id') or f"{news_item.get('source', 'unknown')}_rank_{news_item.get('rank', 0)}"
+            # 将日期格式化为字符串并加入到 news_id 中，确保全局唯一性
+            news_id = f"{base_news_id}_{crawl_date.strftime('%Y%m%d')}"
+
+            title_val = (news_item.get("title", "") or "")
+            if len(title_val) > 500:
+                title_val = title_val[:500]
+            rows.append({
+                "news_id": news_id,
+                "source_platform": news_item.get("source", "unknown"),
+                "title": title_val,
+                "url": news_item.get("url", ""),
+                "crawl_date": crawl_date,
+                "rank_position": news_item.get("rank", None),
+                "add_ts": current_timestamp,
+                "last_modify_ts": current_timestamp,
+            })
+
+        sql = self._upsert_sql(
+            "daily_news",
+            ["news_id", "source_platform", "title", "url", "crawl_date", "rank_position", "add_ts", "last_modify_ts"],
+            ["news_id"],
+            ["source_platform", "title", "url", "crawl_date", "rank_position", "last_modify_ts"],
+        )
         try:
-            saved_count = 0
-            # 先独立事务执行删除，防止后续插入失败导致无法清理
+            start = time.perf_counter()
             with self.engine.begin() as conn:
-                deleted = conn.execute(text("DELETE FROM daily_news WHERE crawl_date = :d"), {"d": crawl_date}).rowcount
+                saved_count = self._bulk_write(conn, sql, rows)
+                # 覆盖模式：本次没有写入的当天旧新闻
+                deleted = conn.execute(
+                    text("DELETE FROM daily_news WHERE crawl_date = :d AND last_modify_ts < :ts"),
+                    {"d": crawl_date, "ts": current_timestamp},
+                ).rowcount
                 if deleted and deleted > 0:
-                    logger.info(f"覆盖模式：删除了当天已有的 {deleted} 条新闻记录")
-
-            # 逐条插入，单条失败不影响后续（每条独立事务）
-            for news_item in news_data:
-                try:
-                    # news_item.get('id') 已经是完整的 news_id（格式：source_item_id）
-                    # 为了支持同一条新闻在不同日期出现，将 crawl_date 加入到 news_id 中
-                    base_news_id = news_item.get(
-                        'id') or f"{news_item.get('source', 'unknown')}_rank_{news_item.get('rank', 0)}"
-                    # 将日期格式化为字符串并加入到 news_id 中，确保全局唯一性
-                    news_id = f"{base_news_id}_{crawl_date.strftime('%Y%m%d')}"
-
-                    title_val = (news_item.get("title", "") or "")
-                    if len(title_val) > 500:
-                        title_val = title_val[:500]
-                    with self.engine.begin() as conn:
-                        conn.execute(
-                            text(
-                                """
-                                INSERT INTO daily_news (
-                                    news_id, source_platform, title, url, crawl_date,
-                                    rank_position, add_ts, last_modify_ts
-                                ) VALUES (:news_id, :source_platform, :title, :url, :crawl_date, :rank_position, :add_ts, :last_modify_ts)
-                                """
-                            ),
-                            {
-                                "news_id": news_id,
-                                "source_platform": news_item.get("source", "unknown"),
-                                "title": title_val,
-                                "url": news_item.get("url", ""),
-                                "crawl_date": crawl_date,
-                                "rank_position": news_item.get("rank", None),
-                                "add_ts": current_timestamp,
-                                "last_modify_ts": current_timestamp,
-                            },
-                        )
-                    saved_count += 1
-                except Exception as e:
-                    logger.exception(f"保存单条新闻失败: {e}")
-                    continue
+                    logger.info(f"覆盖模式：删除了当天已不在榜单中的 {deleted} 条新闻记录")
+            self._record_write_stats("daily_news", saved_count, time.perf_counter() - start)
             logger.info(f"成功保存 {saved_count} 条新闻记录")
             return saved_count
         except Exception as e:
@@ -161,6 +233,32 @@ class DatabaseManager:
             rows = result.mappings().all()
         return rows
 
+    def get_recent_news_titles(self, days: int = 30, limit: int = 50000) -> List[str]:
+        """
+        获取最近几天（不含今天）的新闻标题，用于构建关键词提取的IDF语料；超过 limit 时保留最新的标题
+
+        Args:
+            days: 天数
+            limit: 最多返回的标题数量
+
+        Returns:
+            标题列表
+        """
+        try:
+            start_date = date.today() - timedelta(days=days)
+            with self.engine.connect() as conn:
+                rows = conn.execute(
+                    text(
+                        "SELECT title FROM daily_news WHERE crawl_date >= :start_date AND crawl_date < :today "
+                        "ORDER BY crawl_date DESC, add_ts DESC LIMIT :limit"
+                    ),
+                    {"start_date": start_date, "today": date.today(), "limit": limit},
+                ).all()
+            return [row[0] for row in rows]
+        except Exception as e:
+            logger.exception(f"获取历史新闻标题失败: {e}")
+            return []
+
     # ==================== 话题数据操作 ====================
 
     def save_daily_topics(self, keywords: List[str], summary: str, extract_date: date = None) -> bool:
@@ -180,34 +278,27 @@ class DatabaseManager:
 
         current_timestamp = int(datetime.now().timestamp())
 
-        try:
-            keywords_json = json.dumps(keywords, ensure_ascii=False)
-            # 为了支持外键引用，topic_id 需要全局唯一，所以将日期加入到 topic_id 中
-            topic_id = f"summary_{extract_date.strftime('%Y%m%d')}"
+        keywords_json = json.dumps(keywords, ensure_ascii=False)
+        # 为了支持外键引用，topic_id 需要全局唯一，所以将日期加入到 topic_id 中
+        topic_id = f"summary_{extract_date.strftime('%Y%m%d')}"
+        sql = self._upsert_sql(
+            "daily_topics",
+            ["extract_date", "topic_id", "topic_name", "keywords", "topic_description", "add_ts", "last_modify_ts"],
+            ["topic_id"],
+            ["keywords", "topic_description", "add_ts", "last_modify_ts", "topic_name"],
+        )
+        row = {"extract_date": extract_date, "topic_id": topic_id, "topic_name": "每日新闻分析",
+               "keywords": keywords_json, "topic_description": summary,
+               "add_ts": current_timestamp, "last_modify_ts": current_timestamp}
 
+        try:
+            start = time.perf_counter()
             with self.engine.begin() as conn:
-                check = conn.execute(
-                    text("SELECT id FROM daily_topics WHERE extract_date = :d AND topic_id = :tid"),
-                    {"d": extract_date, "tid": topic_id},
-                ).first()
-                if check:
-                    conn.execute(
-                        text(
-                            "UPDATE daily_topics SET keywords = :k, topic_description = :s, add_ts = :ts, last_modify_ts = :lmt, topic_name = :tn WHERE extract_date = :d AND topic_id = :tid"
-                        ),
-                        {"k": keywords_json, "s": summary, "ts": current_timestamp, "lmt": current_timestamp,
-                         "d": extract_date, "tid": topic_id, "tn": "每日新闻分析"},
-                    )
-                    logger.info(f"更新了 {extract_date} 的话题分析")
-                else:
-                    conn.execute(
-                        text(
-                            "INSERT INTO daily_topics (extract_date, topic_id, topic_name, keywords, topic_description, add_ts, last_modify_ts) VALUES (:d, :tid, :tn, :k, :s, :ts, :lmt)"
-                        ),
-                        {"d": extract_date, "tid": topic_id, "tn": "每日新闻分析", "k": keywords_json, "s": summary,
-                         "ts": current_timestamp, "lmt": current_timestamp},
-                    )
-                    logger.info(f"保存了 {extract_date} 的话题分析")
+                saved = self._bulk_write(conn, sql, [row])
+            if not saved:
+                return False
+            self._record_write_stats("daily_topics", saved, time.perf_counter() - start)
+            logger.info(f"保存了 {extract_date} 的话题分析")
             return True
         except Exception as e:
             logger.exception(f"保存话题分析失败: {e}")
@@ -6,7 +6,9 @@ BroadTopicExtraction模块 - 新闻获取和收集
 """
 
 import sys
+import time
 import asyncio
+import hashlib
 import httpx
 import json
 from datetime import datetime, date
@@ -42,13 +44,50 @@ SOURCE_NAMES = {
     "xueqiu": "雪球热榜"
 }
 
+# 同时请求的新闻源数量上限
+FETCH_CONCURRENCY = 6
+# 单个新闻源的总超时（秒），慢源不会拖住整个收集阶段
+SOURCE_TIMEOUT = 20.0
+# 响应缓存目录与有效期（秒）：有效期内重复运行直接使用缓存，过期后带 ETag/Last-Modified 发条件请求
+CACHE_DIR = Path(__file__).parent / ".news_cache"
+CACHE_TTL_SECONDS = 600
+
+REQUEST_HEADERS = {
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/124.0.0.0 Safari/537.36"
+    ),
+    "Referer": BASE_URL,
+    "Connection": "keep-alive",
+}
+
 class NewsCollector:
     """新闻收集器 - 整合API调用和数据库存储"""
     
-    def __init__(self):
-        """初始化新闻收集器"""
+    def __init__(self,
+                 max_concurrency: int = FETCH_CONCURRENCY,
+                 source_timeout: float = SOURCE_TIMEOUT,
+                 cache_dir: Optional[Path] = CACHE_DIR,
+                 cache_ttl: float = CACHE_TTL_SECONDS):
+        """
+        初始化新闻收集器
+
+        Args:
+            max_concurrency: 同时请求的新闻源数量上限
+            source_timeout: 单个新闻源的超时秒数
+            cache_dir: 响应缓存目录，None表示不使用缓存
+            cache_ttl: 缓存有效期秒数
+        """
         self.db_manager = DatabaseManager()
         self.supported_sources = list(SOURCE_NAMES.keys())
+        self.max_concurrency = max_concurrency
+        self.source_timeout = source_timeout
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.cache_ttl = cache_ttl
+        self._client: Optional[httpx.AsyncClient] = None
     
     def close(self):
         """关闭资源"""
@@ -69,35 +108,91 @@ class NewsCollector:
     
     # ==================== 新闻API调用 ====================
     
+    def _cache_path(self, source: str) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        digest = hashlib.md5(f"{BASE_URL}|{source}".encode("utf-8")).hexdigest()[:8]
+        return self.cache_dir / f"{source}_{digest}.json"
+    
+    def _load_cache(self, source: str) -> Optional[Dict]:
+        """读取新闻源的缓存响应"""
+        path = self._cache_path(source)
+        if not path or not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning(f"读取缓存失败 {path}: {e}")
+            return None
+    
+    def _save_cache(self, source: str, entry: Dict):
+        """写入新闻源的缓存响应，先写临时文件再替换，避免并发读到半个文件"""
+        path = self._cache_path(source)
+        if not path:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+            tmp_path.replace(path)
+        except Exception as e:
+            logger.warning(f"写入缓存失败 {path}: {e}")
+    
     async def fetch_news(self, source: str) -> dict:
-        """从指定源获取最新新闻"""
+        """从指定源获取最新新闻，优先使用有效期内的缓存，过期后发条件请求"""
         url = f"{BASE_URL}/api/s?id={source}&latest"
-        headers = {
-            "Accept": "application/json, text/plain, */*",
-            "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/124.0.0.0 Safari/537.36"
-            ),
-            "Referer": BASE_URL,
-            "Connection": "keep-alive",
-        }
+        cached = self._load_cache(source)
+        if cached and time.time() - cached.get("fetched_at", 0) < self.cache_ttl:
+            return {
+                "source": source,
+                "status": "success",
+                "data": cached["data"],
+                "cached": True,
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        headers = dict(REQUEST_HEADERS)
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
         
         try:
-            async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-                response = await client.get(url, headers=headers)
-                response.raise_for_status()
-                
-                # 解析JSON响应
-                data = response.json()
+            if self._client is not None:
+                response = await asyncio.wait_for(self._client.get(url, headers=headers), self.source_timeout)
+            else:
+                async with httpx.AsyncClient(timeout=self.source_timeout, follow_redirects=True) as client:
+                    response = await asyncio.wait_for(client.get(url, headers=headers), self.source_timeout)
+            
+            if response.status_code == 304 and cached:
+                # 内容未变化，沿用缓存并刷新有效期
+                cached["fetched_at"] = time.time()
+                self._save_cache(source, cached)
                 return {
                     "source": source,
                     "status": "success",
-                    "data": data,
+                    "data": cached["data"],
+                    "cached": True,
                     "timestamp": datetime.now().isoformat()
                 }
-        except httpx.TimeoutException:
+            response.raise_for_status()
+            
+            # 解析JSON响应
+            data = response.json()
+            self._save_cache(source, {
+                "fetched_at": time.time(),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "data": data,
+            })
+            return {
+                "source": source,
+                "status": "success",
+                "data": data,
+                "timestamp": datetime.now().isoformat()
+            }
+        except (httpx.TimeoutException, asyncio.TimeoutError):
             return {
                 "source": source,
                 "status": "timeout",
@@ -120,34 +215,41 @@ class NewsCollector:
             }
     
     async def get_popular_news(self, sources: List[str] = None) -> List[dict]:
-        """获取热门新闻"""
+        """并发获取热门新闻，所有新闻源共用一个连接池，结果按传入顺序返回"""
         if sources is None:
             sources = list(SOURCE_NAMES.keys())
         
         logger.info(f"正在获取 {len(sources)} 个新闻源的最新内容...")
         logger.info("=" * 80)
         
-        results = []
-        for source in sources:
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        
+        async def fetch_one(source: str) -> dict:
             source_name = SOURCE_NAMES.get(source, source)
-            logger.info(f"正在获取 {source_name} 的新闻...")
-            result = await self.fetch_news(source)
-            results.append(result)
+            async with semaphore:
+                logger.info(f"正在获取 {source_name} 的新闻...")
+                result = await self.fetch_news(source)
             
             if result["status"] == "success":
                 data = result["data"]
+                cached_note = "（缓存）" if result.get("cached") else ""
                 if 'items' in data and isinstance(data['items'], list):
                     count = len(data['items'])
-                    logger.info(f"✓ {source_name}: 获取成功，共 {count} 条新闻")
+                    logger.info(f"✓ {source_name}: 获取成功{cached_note}，共 {count} 条新闻")
                 else:
-                    logger.info(f"✓ {source_name}: 获取成功")
+                    logger.info(f"✓ {source_name}: 获取成功{cached_note}")
             else:
                 logger.error(f"✗ {source_name}: {result.get('error', '获取失败')}")
-            
-            # 避免请求过快
-            await asyncio.sleep(0.5)
+            return result
         
-        return results
+        limits = httpx.Limits(max_connections=max(1, self.max_concurrency),
+                              max_keepalive_connections=max(1, self.max_concurrency))
+        async with httpx.AsyncClient(timeout=self.source_timeout, follow_redirects=True, limits=limits) as client:
+            self._client = client
+            try:
+                return list(await asyncio.gather(*[fetch_one(source) for source in sources]))
+            finally:
+                self._client = None
     
     # ==================== 数据处理和存储 ====================
     
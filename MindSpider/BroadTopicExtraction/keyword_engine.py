@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BroadTopicExtraction模块 - 本地关键词提取引擎
+在调用LLM之前完成：近似重复标题聚类、jieba TF-IDF/TextRank 打分、n-gram 短语发现，
+得到排好序的候选关键词；IDF 可由历史 daily_news 标题构建
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Set, Tuple
+
+import jieba
+import jieba.analyse
+from loguru import logger
+
+# 新闻标题中常见但不适合作为搜索词的词
+STOPWORDS: Set[str] = set("""
+的 了 在 和 与 或 但 是 有 被 将 已 正在 就 都 而 及 着 也 又 这 那 你 我 他 她 它 们 个 为 对 从 把 让 给 向 于
+上 下 中 后 前 吗 呢 啊 吧 什么 怎么 如何 为何 为什么 一个 没有 还是 已经 可以 不是 可能 今天 今日 昨天 明天 今晚 昨晚
+最新 回应 网友 曝光 视频 热搜 官方 消息 发布 表示 进行 问题 时间 目前 相关 情况 事件 真的 竟然 原来 这个 那个
+自己 大家 我们 他们 多少 还有 一下 之后 之前 以来 其中 通过 成为 出现 开始 继续 宣布 称 被曝 回复
+""".split())
+
+# TextRank 保留的词性：名词、地名、人名、机构名、其他专名、动名词、英文
+TEXTRANK_POS = ('n', 'ns', 'nr', 'nt', 'nz', 'vn', 'eng')
+
+_NON_CONTENT = re.compile(r'^[\W\d_]+$')
+_CLEAN = re.compile(r'[#@【】\[\]()（）《》“”"\'|｜]')
+
+
+@dataclass
+class NewsCluster:
+    """一组近似重复的新闻标题（通常是不同平台对同一事件的报道）"""
+
+    title: str
+    titles: List[str] = field(default_factory=list)
+    sources: Set[str] = field(default_factory=set)
+    shingles: Set[str] = field(default_factory=set)
+
+    @property
+    def size(self) -> int:
+        return len(self.titles)
+
+
+@dataclass
+class KeywordCandidate:
+    """候选关键词"""
+
+    keyword: str
+    score: float
+    clusters: int
+    sources: List[str]
+
+
+def _shingles(text: str) -> Set[str]:
+    """标题的字符二元组集合，用于计算相似度"""
+    text = re.sub(r'\W', '', text.lower())
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _is_content_word(word: str) -> bool:
+    word = word.strip()
+    return len(word) >= 2 and word not in STOPWORDS and not _NON_CONTENT.match(word)
+
+
+class LocalKeywordExtractor:
+    """本地关键词提取器"""
+
+    def __init__(self, similarity_threshold: float = 0.6, min_phrase_count: int = 2,
+                 tfidf_weight: float = 0.6, max_phrase_length: int = 12):
+        """
+        初始化本地关键词提取器
+
+        Args:
+            similarity_threshold: 两个标题共有的字符二元组占较短标题的比例达到该值时视为同一事件
+            min_phrase_count: 相邻词组合至少出现在多少条标题中才作为短语
+            tfidf_weight: TF-IDF 得分的权重，其余为 TextRank 得分
+            max_phrase_length: 短语的最大字数
+        """
+        self.similarity_threshold = similarity_threshold
+        self.min_phrase_count = min_phrase_count
+        self.tfidf_weight = tfidf_weight
+        self.max_phrase_length = max_phrase_length
+        self.idf: Dict[str, float] = {}
+        self.default_idf = 0.0
+
+    # ==================== IDF ====================
+
+    def build_idf(self, titles: Iterable[str]) -> int:
+        """
+        用历史新闻标题构建语料IDF，每个标题视为一篇文档；历史中从未出现的词得到最高的IDF
+
+        Args:
+            titles: 历史新闻标题
+
+        Returns:
+            参与统计的标题数量
+        """
+        doc_freq: Counter = Counter()
+        total = 0
+        for title in titles:
+            if not title:
+                continue
+            total += 1
+            doc_freq.update({w for w in jieba.lcut(_CLEAN.sub(' ', title)) if _is_content_word(w)})
+        if not total:
+            return 0
+        self.idf = {word: math.log((total + 1) / (df + 1)) + 1 for word, df in doc_freq.items()}
+        self.default_idf = math.log(total + 1) + 1
+        logger.info(f"基于 {total} 条历史新闻标题构建IDF，共 {len(self.idf)} 个词")
+        return total
+
+    def _idf(self, word: str) -> float:
+        if self.idf:
+            return self.idf.get(word, self.default_idf)
+        # 没有历史语料时使用jieba自带的IDF表
+        tfidf = jieba.analyse.default_tfidf
+        return tfidf.idf_freq.get(word, tfidf.median_idf)
+
+    # ==================== 标题聚类 ====================
+
+    def cluster_headlines(self, news_list: List[Dict]) -> List[NewsCluster]:
+        """
+        按字符二元组的重叠系数把近似重复的标题合并为一个聚类（标题较短，重叠系数比Jaccard更能识别改写），
+        通过倒排索引只和共享二元组的聚类比较
+
+        Args:
+            news_list: 新闻列表
+
+        Returns:
+            聚类列表，按排名靠前的新闻先出现的顺序
+        """
+        clusters: List[NewsCluster] = []
+        index: Dict[str, Set[int]] = defaultdict(set)
+        ordered = sorted(news_list, key=lambda n: n.get('rank') or n.get('rank_position') or 0)
+        for news in ordered:
+            title = _CLEAN.sub(' ', str(news.get('title') or '')).strip()
+            if not title:
+                continue
+            source = news.get('source_platform', news.get('source', '未知'))
+            shingles = _shingles(title)
+
+            best, best_sim = None, 0.0
+            for cid in set().union(*(index[s] for s in shingles)) if shingles else ():
+                other = clusters[cid].shingles
+                sim = len(shingles & other) / min(len(shingles), len(other))
+                if sim > best_sim:
+                    best, best_sim = cid, sim
+
+            if best is not None and best_sim >= self.similarity_threshold:
+                cluster = clusters[best]
+            else:
+                best = len(clusters)
+                cluster = NewsCluster(title=title, shingles=shingles)
+                clusters.append(cluster)
+                for s in shingles:
+                    index[s].add(best)
+            cluster.titles.append(title)
+            cluster.sources.add(source)
+        return clusters
+
+    # ==================== 关键词打分 ====================
+
+    def extract(self, news_list: List[Dict], top_k: int = 50) -> Tuple[List[KeywordCandidate], List[NewsCluster]]:
+        """
+        提取候选关键词：近似重复的标题只计一次，被更多平台报道的事件权重更高
+
+        Args:
+            news_list: 新闻列表
+            top_k: 返回的候选数量
+
+        Returns:
+            (按得分降序的候选关键词, 新闻聚类)
+        """
+        clusters = self.cluster_headlines(news_list)
+        if not clusters:
+            return [], []
+
+        tf: Counter = Counter()
+        word_clusters: Dict[str, Set[int]] = defaultdict(set)
+        ngram_clusters: Dict[Tuple[str, ...], Set[int]] = defaultdict(set)
+        ngram_titles: Counter = Counter()
+        for cid, cluster in enumerate(clusters):
+            weight = 1 + math.log(len(cluster.sources))
+            words: Set[str] = set()
+            for title in cluster.titles:
+                tokens = [t.strip() for t in jieba.lcut(title)]
+                words.update(t for t in tokens if _is_content_word(t))
+                # 相邻的实词组合作为候选短语，如 "华为" + "发布会"
+                grams = set()
+                for n in (2, 3):
+                    for i in range(len(tokens) - n + 1):
+                        gram = tuple(tokens[i:i + n])
+                        if all(_is_content_word(t) for t in gram) and len(''.join(gram)) <= self.max_phrase_length:
+                            grams.add(gram)
+                for gram in grams:
+                    ngram_clusters[gram].add(cid)
+                    ngram_titles[gram] += 1
+            for word in words:
+                tf[word] += weight
+                word_clusters[word].add(cid)
+
+        if not tf:
+            # 标题里没有任何实词（如全是数字或符号），没有可提取的关键词
+            return [], clusters
+
+        tfidf = {word: count * self._idf(word) for word, count in tf.items()}
+        max_tfidf = max(tfidf.values())
+
+        corpus = '。'.join(cluster.title for cluster in clusters)
+        textrank = dict(jieba.analyse.textrank(corpus, topK=top_k * 3, withWeight=True, allowPOS=TEXTRANK_POS))
+
+        scores: Dict[str, float] = {}
+        members: Dict[str, Set[int]] = {}
+        for word, value in tfidf.items():
+            scores[word] = self.tfidf_weight * value / max_tfidf + (1 - self.tfidf_weight) * textrank.get(word, 0.0)
+            members[word] = word_clusters[word]
+
+        for gram, cids in ngram_clusters.items():
+            if ngram_titles[gram] < self.min_phrase_count:
+                continue
+            phrase = ''.join(gram)
+            # 短语比组成它的单词更具体，在其最高分的基础上略微加权
+            scores[phrase] = max(scores.get(phrase, 0.0), max(scores.get(t, 0.0) for t in gram) * 1.1)
+            members[phrase] = cids
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        candidates = []
+        for word, score in ranked:
+            sources = sorted(set().union(*(clusters[cid].sources for cid in members[word])))
+            candidates.append(KeywordCandidate(keyword=word, score=round(score, 4),
+                                               clusters=len(members[word]), sources=sources))
+        return candidates, clusters
+
+
+if __name__ == "__main__":
+    import time
+
+    test_news = [
+        {"title": "华为发布会今晚举行 新款手机亮相", "source": "weibo", "rank": 1},
+        {"title": "华为发布会：新款手机正式亮相", "source": "zhihu", "rank": 2},
+        {"title": "央行宣布降准0.5个百分点", "source": "cls-hot", "rank": 1},
+        {"title": "央行宣布降准 释放长期资金", "source": "wallstreetcn", "rank": 3},
+        {"title": "台风登陆广东 多地停课", "source": "toutiao", "rank": 2},
+    ]
+    extractor = LocalKeywordExtractor()
+    extractor.extract(test_news)
+    start = time.perf_counter()
+    candidates, clusters = extractor.extract(test_news, top_k=10)
+    print(f"{len(clusters)} 个聚类，耗时 {(time.perf_counter() - start) * 1000:.1f}ms")
+    for candidate in candidates:
+        print(candidate)
@@ -115,6 +115,7 @@ class BroadTopicExtraction:
             
             # 步骤2: 提取关键词和生成总结
             logger.info("【步骤2】提取关键词和生成总结...")
+            self.topic_extractor.build_corpus_idf(self.db_manager.get_recent_news_titles(days=30))
             keywords, summary = self.topic_extractor.extract_keywords_and_summary(
                 news_result['news_list'], 
                 max_keywords=max_keywords
@@ -2,14 +2,15 @@
 # -*- coding: utf-8 -*-
 """
 BroadTopicExtraction模块 - 话题提取器
-基于DeepSeek直接提取关键词和生成新闻总结
+先用本地引擎对新闻聚类并提取候选关键词，再由DeepSeek精炼关键词和生成新闻总结
 """
 
 import sys
 import json
 import re
+import time
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Iterable, List, Dict, Optional, Tuple
 from openai import OpenAI
 
 # 添加项目根目录到路径
@@ -22,6 +23,8 @@ try:
 except ImportError:
     raise ImportError("无法导入settings.py配置文件")
 
+from BroadTopicExtraction.keyword_engine import KeywordCandidate, LocalKeywordExtractor, NewsCluster
+
 class TopicExtractor:
     """话题提取器"""
 
@@ -32,6 +35,19 @@ class TopicExtractor:
             base_url=settings.MINDSPIDER_BASE_URL
         )
         self.model = settings.MINDSPIDER_MODEL_NAME
+        self.local_extractor = LocalKeywordExtractor()
+    
+    def build_corpus_idf(self, titles: Iterable[str]) -> int:
+        """
+        用历史新闻标题构建本地提取引擎的IDF表
+        
+        Args:
+            titles: 历史新闻标题
+            
+        Returns:
+            参与统计的标题数量
+        """
+        return self.local_extractor.build_idf(titles)
     
     def extract_keywords_and_summary(self, news_list: List[Dict], max_keywords: int = 100) -> Tuple[List[str], str]:
         """
@@ -47,11 +63,21 @@ class TopicExtractor:
         if not news_list:
             return [], "今日暂无热点新闻"
         
-        # 构建新闻摘要文本
-        news_text = self._build_news_summary(news_list)
+        # 本地聚类去重并提取候选关键词，LLM只需处理精简后的列表
+        candidates: List[KeywordCandidate] = []
+        try:
+            start = time.perf_counter()
+            candidates, clusters = self.local_extractor.extract(news_list, top_k=max(max_keywords * 2, 30))
+            print(f"本地提取 {len(candidates)} 个候选关键词（{len(news_list)} 条新闻合并为 {len(clusters)} 个事件），"
+                  f"耗时 {(time.perf_counter() - start) * 1000:.0f}ms")
+            news_text = self._build_cluster_summary(clusters)
+        except Exception as e:
+            print(f"本地关键词提取失败: {e}")
+            news_text = self._build_news_summary(news_list)
+        local_keywords = [c.keyword for c in candidates]
         
         # 构建提示词
-        prompt = self._build_analysis_prompt(news_text, max_keywords)
+        prompt = self._build_analysis_prompt(news_text, max_keywords, candidates)
         
         try:
             # 调用DeepSeek API
@@ -68,14 +94,16 @@ class TopicExtractor:
             # 解析返回结果
             result_text = response.choices[0].message.content
             keywords, summary = self._parse_analysis_result(result_text)
+            if not keywords:
+                keywords = local_keywords
             
             print(f"成功提取 {len(keywords)} 个关键词并生成新闻总结")
             return keywords[:max_keywords], summary
             
         except Exception as e:
             print(f"话题提取失败: {e}")
-            # 返回简单的fallback结果
-            fallback_keywords = self._extract_simple_keywords(news_list)
+            # LLM不可用时使用本地候选关键词
+            fallback_keywords = local_keywords or self._extract_simple_keywords(news_list)
             fallback_summary = f"今日共收集到 {len(news_list)} 条热点新闻，涵盖多个平台的热门话题。"
             return fallback_keywords[:max_keywords], fallback_summary
     
@@ -94,16 +122,38 @@ class TopicExtractor:
         
         return "\n".join(news_items)
     
-    def _build_analysis_prompt(self, news_text: str, max_keywords: int) -> str:
+    def _build_cluster_summary(self, clusters: List[NewsCluster]) -> str:
+        """构建聚类后的新闻摘要文本，多个平台报道的同一事件只保留一行"""
+        news_items = []
+        
+        for i, cluster in enumerate(clusters, 1):
+            title = re.sub(r'[#@]', '', cluster.title).strip()
+            sources = "/".join(sorted(cluster.sources))
+            line = f"{i}. 【{sources}】{title}"
+            if cluster.size > 1:
+                line += f"（{cluster.size}条相似报道）"
+            news_items.append(line)
+        
+        return "\n".join(news_items)
+    
+    def _build_analysis_prompt(self, news_text: str, max_keywords: int,
+                               candidates: Optional[List[KeywordCandidate]] = None) -> str:
         """构建分析提示词"""
         news_count = len(news_text.split('\n'))
         
+        candidate_text = ""
+        if candidates:
+            candidate_text = (
+                "\n本地预提取的候选关键词（按热度排序，可在此基础上合并、改写、删减或补充）：\n"
+                + "、".join(c.keyword for c in candidates) + "\n"
+            )
+        
         prompt = f"""
 请分析以下{news_count}条今日热点新闻，完成两个任务：
 
 新闻列表：
 {news_text}
-
+{candidate_text}
 任务1：提取关键词（最多{max_keywords}个）
 - 提取能代表今日热点话题的关键词
 - 关键词应该适合用于社交媒体平台搜索
@@ -8,11 +8,34 @@
 # 详细许可条款请参阅项目根目录下的LICENSE文件。
 # 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
 
+import asyncio
+import time
 from abc import ABC, abstractmethod
 from typing import Dict, Optional
 
+import httpx
 from playwright.async_api import BrowserContext, BrowserType, Playwright
 
+from tools import utils
+from tools.http_client import PooledAsyncClient
+from tools.rate_limiter import AdaptiveRateLimiter, endpoint_class, get_rate_limiter, report_response
+
+
+# 说明代理被限制或失效的响应状态码，计为代理的一次失败
+PROXY_FAILURE_STATUS = (407, 429, 461, 471, 502, 504)
+
+
+def platform_of(obj) -> str:
+    """
+    根据对象所在模块推断平台名，如 media_platform.xhs.client -> xhs
+    :param obj: 爬虫或客户端实例
+    :return:
+    """
+    parts = type(obj).__module__.split(".")
+    if len(parts) > 1 and parts[0] == "media_platform":
+        return parts[1]
+    return parts[0]
+
 
 class AbstractCrawler(ABC):
 
@@ -54,6 +77,37 @@ class AbstractCrawler(ABC):
         # 默认实现：回退到标准模式
         return await self.launch_browser(playwright.chromium, playwright_proxy, user_agent, headless)
 
+    async def close(self):
+        """
+        关闭爬虫持有的资源，默认关闭各API客户端的连接池与代理池的后台任务
+        """
+        await self.close_api_clients()
+        ip_proxy_pool = getattr(self, "ip_proxy_pool", None)
+        if ip_proxy_pool is not None:
+            await ip_proxy_pool.close()
+
+    async def close_api_clients(self):
+        """
+        关闭爬虫属性中所有API客户端的长连接
+        """
+        for value in list(vars(self).values()):
+            close_http_client = getattr(value, "close_http_client", None)
+            if close_http_client is not None:
+                await close_http_client()
+
+    def rate_limiter(self, endpoint: str = "detail") -> AdaptiveRateLimiter:
+        """
+        获取当前平台、接口类型与代理共享的自适应限速器，替代固定的 CRAWLER_MAX_SLEEP_SEC 与并发信号量
+        :param endpoint: 接口类型 search | detail | comment
+        :return:
+        """
+        account = None
+        for value in vars(self).values():
+            if isinstance(value, AbstractApiClient):
+                account = getattr(value, "proxy", None)
+                break
+        return get_rate_limiter(platform_of(self), endpoint, account)
+
 
 class AbstractLogin(ABC):
 
@@ -113,6 +167,106 @@ class AbstractApiClient(ABC):
     async def request(self, method, url, **kwargs):
         pass
 
+    def _get_http_pool(self) -> PooledAsyncClient:
+        if "_http_pool" not in self.__dict__:
+            self._http_pool = PooledAsyncClient(event_hooks={"response": [self._report_rate_limit]})
+        return self._http_pool
+
+    async def get_http_client(self):
+        """
+        获取复用的长连接客户端，self.proxy 变化后自动重建
+        直接使用返回的客户端时，代理切换会在请求进行中关闭它，平台请求应使用 send_request
+        :return: httpx.AsyncClient
+        """
+        return await self._get_http_pool().get(getattr(self, "proxy", None))
+
+    async def send_request(self, method, url, **kwargs):
+        """
+        通过复用的长连接客户端发送请求，请求期间代理切换不会关闭正在使用的客户端；
+        绑定了代理池时，把请求结果与耗时回报给代理池
+        :param method: 请求方法
+        :param url: 请求地址
+        :param kwargs: 其他传给 httpx.AsyncClient.request 的参数
+        :return: httpx.Response
+        """
+        proxy = getattr(self, "proxy", None)
+        start = time.monotonic()
+        try:
+            response = await self._get_http_pool().request(method, url, proxy=proxy, **kwargs)
+        except httpx.TransportError:
+            await self.report_proxy_result(proxy, success=False)
+            raise
+        success = response.status_code not in PROXY_FAILURE_STATUS
+        await self.report_proxy_result(proxy, success, time.monotonic() - start if success else None)
+        return response
+
+    def bind_proxy_pool(self, ip_pool):
+        """
+        绑定租出当前代理的代理池：每个请求的结果计入代理的成功率与延迟，代理被隔离后自动换用新代理
+        :param ip_pool: ProxyIpPool，未开启代理时为 None
+        """
+        self.ip_pool = ip_pool
+
+    async def report_proxy_result(self, proxy: Optional[str], success: bool, latency: Optional[float] = None):
+        """
+        把一次请求的结果回报给代理池，代理因连续失败被隔离时换用新代理
+        :param proxy: 发起请求时使用的 httpx 代理地址
+        :param success: 是否成功
+        :param latency: 请求耗时（秒）
+        """
+        ip_pool = getattr(self, "ip_pool", None)
+        if ip_pool is None or not proxy:
+            return
+        ip_pool.record_result(proxy, success, latency)
+        if not success and not ip_pool.is_usable(proxy):
+            try:
+                await self.rotate_proxy(proxy)
+            except Exception as e:
+                utils.logger.error(f"[{type(self).__name__}.report_proxy_result] rotate proxy failed, keep current: {e}")
+
+    async def rotate_proxy(self, failed_proxy: Optional[str] = None):
+        """
+        从代理池租借新代理替换当前代理并归还旧代理；并发请求同时失败时只换一次
+        :param failed_proxy: 失败的代理，已被其他请求换掉时不再重复更换
+        """
+        if "_proxy_lock" not in self.__dict__:
+            self._proxy_lock = asyncio.Lock()
+        async with self._proxy_lock:
+            old_proxy = getattr(self, "proxy", None)
+            if failed_proxy is not None and failed_proxy != old_proxy:
+                return
+            _, new_proxy = utils.format_proxy_info(await self.ip_pool.get_proxy())
+            self.update_proxy(new_proxy)
+            if old_proxy:
+                self.ip_pool.release_proxy(old_proxy, success=None)
+            utils.logger.info(f"[{type(self).__name__}.rotate_proxy] proxy rotated after repeated failures")
+
+    async def _report_rate_limit(self, response):
+        """
+        httpx 响应钩子：把每个响应的成功或风控结果反馈给对应接口的自适应限速器
+        :param response: httpx.Response
+        """
+        platform = platform_of(self)
+        limiter = get_rate_limiter(platform, endpoint_class(str(response.request.url)), getattr(self, "proxy", None))
+        await report_response(limiter, response, platform)
+
+    def update_proxy(self, proxy: Optional[str]):
+        """
+        切换代理：之后的请求使用新代理的连接池，旧连接池在其进行中的请求结束后关闭
+        :param proxy: httpx 代理地址
+        """
+        self.proxy = proxy
+
+    async def close_http_client(self):
+        """
+        关闭长连接客户端，并把租借的代理归还给代理池
+        """
+        if "_http_pool" in self.__dict__:
+            await self._http_pool.aclose()
+        ip_pool, proxy = getattr(self, "ip_pool", None), getattr(self, "proxy", None)
+        if ip_pool is not None and proxy:
+            ip_pool.release_proxy(proxy, success=None)
+
     @abstractmethod
     async def update_cookies(self, browser_context: BrowserContext):
         pass
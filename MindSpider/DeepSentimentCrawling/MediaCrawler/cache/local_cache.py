@@ -16,22 +16,41 @@
 # @Desc    : 本地缓存
 
 import asyncio
+import fnmatch
+import heapq
+import threading
 import time
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional, Tuple
 
+import config
 from cache.abs_cache import AbstractCache
 
 
 class ExpiringLocalCache(AbstractCache):
+    """
+    有容量上限的本地缓存：超过 max_size 时淘汰最久未访问的键（LRU），
+    过期时间保存在小顶堆中，每次读写时只需弹出已过期的键
+    """
 
-    def __init__(self, cron_interval: int = 10):
+    def __init__(self, cron_interval: int = 10, max_size: Optional[int] = None):
         """
         初始化本地缓存
         :param cron_interval: 定时清楚cache的时间间隔
+        :param max_size: 最多保存的键数量，默认 CACHE_MEMORY_MAX_SIZE
         :return:
         """
         self._cron_interval = cron_interval
-        self._cache_container: Dict[str, Tuple[Any, float]] = {}
+        self._max_size = max_size or config.CACHE_MEMORY_MAX_SIZE
+        # key -> (value, expire_at)，按访问顺序排列，最近访问的在末尾
+        self._cache_container: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        # (expire_at, key)，键被重新设置后旧记录留在堆中，弹出时与当前过期时间比对后忽略
+        self._expire_heap: List[Tuple[float, str]] = []
+        self._lock = threading.RLock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
         self._cron_task: Optional[asyncio.Task] = None
         # 开启定时清理任务
         self._schedule_clear()
@@ -44,22 +63,31 @@ class ExpiringLocalCache(AbstractCache):
         if self._cron_task is not None:
             self._cron_task.cancel()
 
+    def __len__(self) -> int:
+        return len(self._cache_container)
+
     def get(self, key: str) -> Optional[Any]:
         """
         从缓存中获取键的值
         :param key:
         :return:
         """
-        value, expire_time = self._cache_container.get(key, (None, 0))
-        if value is None:
-            return None
+        with self._lock:
+            value, expire_time = self._cache_container.get(key, (None, 0))
+            if value is None:
+                self._misses += 1
+                return None
 
-        # 如果键已过期，则删除键并返回None
-        if expire_time < time.time():
-            del self._cache_container[key]
-            return None
+            # 如果键已过期，则删除键并返回None
+            if expire_time < time.time():
+                del self._cache_container[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
 
-        return value
+            self._cache_container.move_to_end(key)
+            self._hits += 1
+            return value
 
     def set(self, key: str, value: Any, expire_time: int) -> None:
         """
@@ -69,45 +97,82 @@ class ExpiringLocalCache(AbstractCache):
         :param expire_time:
         :return:
         """
-        self._cache_container[key] = (value, time.time() + expire_time)
+        with self._lock:
+            expire_at = time.time() + expire_time
+            self._cache_container[key] = (value, expire_at)
+            self._cache_container.move_to_end(key)
+            heapq.heappush(self._expire_heap, (expire_at, key))
+            self._clear()
+            while len(self._cache_container) > self._max_size:
+                self._cache_container.popitem(last=False)
+                self._evictions += 1
+            # 同一批键反复设置时，堆中的过期记录会越积越多，超过键数量的两倍时重建
+            if len(self._expire_heap) > 2 * len(self._cache_container) + 64:
+                self._expire_heap = [(expire_at, k) for k, (_, expire_at) in self._cache_container.items()]
+                heapq.heapify(self._expire_heap)
+
+    def delete(self, key: str) -> None:
+        """
+        删除键
+        :param key:
+        :return:
+        """
+        with self._lock:
+            self._cache_container.pop(key, None)
 
     def keys(self, pattern: str) -> List[str]:
         """
-        获取所有符合pattern的key
+        获取所有符合pattern的key，pattern 为 glob 通配符（与 redis KEYS 一致，支持 * ? [abc]）
         :param pattern: 匹配模式
         :return:
         """
-        if pattern == '*':
-            return list(self._cache_container.keys())
-
-        # 本地缓存通配符暂时将*替换为空
-        if '*' in pattern:
-            pattern = pattern.replace('*', '')
+        with self._lock:
+            self._clear()
+            if pattern == '*':
+                return list(self._cache_container.keys())
+            return [key for key in self._cache_container.keys() if fnmatch.fnmatchcase(key, pattern)]
 
-        return [key for key in self._cache_container.keys() if pattern in key]
+    def stats(self) -> Dict[str, int]:
+        """
+        命中、未命中、容量淘汰与过期清理的次数
+        :return:
+        """
+        return {
+            "size": len(self._cache_container),
+            "max_size": self._max_size,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+        }
 
     def _schedule_clear(self):
         """
-        开启定时清理任务,
+        开启定时清理任务，只在事件循环中创建缓存时启用；
+        没有运行中的事件循环时由读写操作顺带清理过期键
         :return:
         """
 
         try:
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
         except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            return
 
         self._cron_task = loop.create_task(self._start_clear_cron())
 
     def _clear(self):
         """
-        根据过期时间清理缓存
+        根据过期时间清理缓存，只处理堆顶已过期的记录
         :return:
         """
-        for key, (value, expire_time) in self._cache_container.items():
-            if expire_time < time.time():
-                del self._cache_container[key]
+        with self._lock:
+            now = time.time()
+            while self._expire_heap and self._expire_heap[0][0] < now:
+                expire_at, key = heapq.heappop(self._expire_heap)
+                item = self._cache_container.get(key)
+                if item is not None and item[1] == expire_at:
+                    del self._cache_container[key]
+                    self._expirations += 1
 
     async def _start_clear_cron(self):
         """
@@ -126,6 +191,7 @@ if __name__ == '__main__':
     print(cache.keys("*"))
     time.sleep(4)
     print(cache.get('key'))
+    print(cache.stats())
     del cache
     time.sleep(1)
     print("done")
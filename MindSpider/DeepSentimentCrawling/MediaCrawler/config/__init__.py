@@ -10,4 +10,15 @@
 
 
 from .base_config import *
-from .db_config import *
\ No newline at end of file
+from .db_config import *
+
+
+import json as _json
+import os as _os
+
+# 由调度器为单个爬虫进程传入的配置（JSON 对象），覆盖上面的同名配置项；
+# 多个平台的爬虫进程并发运行时各自使用独立配置，无需改写共享的 base_config.py
+CONFIG_OVERRIDES_ENV = "MEDIACRAWLER_CONFIG_OVERRIDES"
+
+if _os.environ.get(CONFIG_OVERRIDES_ENV):
+    globals().update(_json.loads(_os.environ[CONFIG_OVERRIDES_ENV]))
@@ -15,6 +15,12 @@ LOGIN_TYPE = "qrcode"  # qrcode or phone or cookie
 COOKIES = ""
 CRAWLER_TYPE = "search"  # 爬取类型，search(关键词搜索) | detail(帖子详情)| creator(创作者主页数据)
 
+# 数据库批量写入：缓冲数据达到该条数时写入
+DB_BULK_BATCH_SIZE = 200
+
+# 数据库批量写入：距离上次写入超过该秒数时写入
+DB_BULK_FLUSH_INTERVAL = 2
+
 # 是否开启 IP 代理
 ENABLE_IP_PROXY = False
 
@@ -24,6 +30,25 @@ IP_PROXY_POOL_COUNT = 2
 # 代理IP提供商名称
 IP_PROXY_PROVIDER_NAME = "kuaidaili"  # kuaidaili | wandouhttp
 
+# 验证代理IP是否可用的回显地址
+IP_PROXY_VALIDATE_URL = "https://echo.apifox.cn/"
+
+# 验证代理IP的超时秒数，超时的代理视为不可用
+IP_PROXY_VALIDATE_TIMEOUT = 10
+
+# 可用代理数量降到该值及以下时在后台提前从代理商提取新IP
+IP_PROXY_PREFETCH_THRESHOLD = 1
+
+# 后台检查代理健康度（重新验证、清理过期IP、补充IP）的间隔秒数
+IP_PROXY_CHECK_INTERVAL = 60
+
+# 代理连续失败该次数后隔离，隔离时长为 IP_PROXY_QUARANTINE_SEC，多次被隔离时翻倍
+IP_PROXY_MAX_FAILURES = 3
+IP_PROXY_QUARANTINE_SEC = 300
+
+# 距离过期不足该秒数的代理不再分配
+IP_PROXY_EXPIRE_MARGIN_SEC = 30
+
 # 设置为True不会打开浏览器（无头浏览器）
 # 设置False会打开一个浏览器
 # 小红书如果一直扫码登录不通过，打开浏览器手动过一下滑动验证码
@@ -63,6 +88,21 @@ AUTO_CLOSE_BROWSER = True
 # 数据保存类型选项配置,支持五种类型：csv、db、json、sqlite、postgresql, 最好保存到DB，有排重的功能。
 SAVE_DATA_OPTION = "postgresql"  # csv or db or json or sqlite or postgresql
 
+# JSON 文件格式：jsonl（每条数据追加一行，可用 tools/async_file_writer.py 导出为旧版 JSON 数组）| json（旧版 JSON 数组，每条数据重写整个文件）
+JSON_FILE_FORMAT = "jsonl"
+
+# CSV/JSONL 文件写入：缓冲数据达到该字节数时写入磁盘
+FILE_WRITER_FLUSH_BYTES = 64 * 1024
+
+# CSV/JSONL 文件写入：距离上次写入超过该秒数时写入磁盘
+FILE_WRITER_FLUSH_INTERVAL = 2
+
+# 单个 CSV/JSONL 文件超过该大小（MB）后归档为 .partN 文件并新建文件，0 表示不轮转
+FILE_ROTATE_MAX_MB = 0
+
+# 轮转归档文件的压缩方式：gzip | zstd（需安装 zstandard）| none
+FILE_ROTATE_COMPRESSION = "gzip"
+
 # 用户浏览器缓存的浏览器文件配置
 USER_DATA_DIR = "%s_user_data_dir"  # %s will be replaced by platform name
 
@@ -88,6 +128,19 @@ CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES = 20
 # 老版本项目使用了 db, 则需参考 schema/tables.sql line 287 增加表字段
 ENABLE_GET_SUB_COMMENTS = False
 
+# 同时抓取二级评论线程的并发数，请求速率仍受自适应限速器控制
+SUB_COMMENT_CONCURRENCY = 4
+
+# 是否开启增量爬取：记录每个关键词已爬到的最新内容（水位线），再次搜索时跳过已爬内容并在整页都已爬过时停止翻页；
+# 评论从上次保存的翻页游标继续（目前支持 xhs、dy、bili）
+ENABLE_INCREMENTAL_CRAWL = True
+
+# 增量爬取状态的 SQLite 文件路径
+CRAWL_STATE_DB_PATH = "data/crawl_state.db"
+
+# 评论已全部爬完的内容，超过该小时数后重新从第一页检查新评论
+INCREMENTAL_COMMENT_RECHECK_HOURS = 24
+
 # 词云相关
 # 是否开启生成评论词云图
 ENABLE_GET_WORDCLOUD = False
@@ -107,6 +160,35 @@ FONT_PATH = "./docs/STZHONGS.TTF"
 # 爬取间隔时间
 CRAWLER_MAX_SLEEP_SEC = 2
 
+# 自适应限速：按 (平台, 接口类型 search/detail/comment, 代理) 分别限速，
+# 请求成功时速率线性增加，遇到 461/403/429 或 blocked、验证码等风控响应时速率与并发减半并暂停
+# 初始速率（次/秒），默认与固定间隔 CRAWLER_MAX_SLEEP_SEC 一致
+RATE_LIMIT_INITIAL_RATE = 1 / CRAWLER_MAX_SLEEP_SEC
+# 速率下限与上限（次/秒）
+RATE_LIMIT_MIN_RATE = 0.1
+RATE_LIMIT_MAX_RATE = 2
+# 每次请求成功增加的速率
+RATE_LIMIT_INCREASE_STEP = 0.05
+# 遇到风控时速率乘以该系数
+RATE_LIMIT_DECREASE_FACTOR = 0.5
+# 遇到风控后暂停的秒数
+RATE_LIMIT_BLOCK_COOLDOWN_SEC = 30
+# 并发数从 MAX_CONCURRENCY_NUM 开始，每连续成功该次数加一，最多到 RATE_LIMIT_MAX_CONCURRENCY
+RATE_LIMIT_CONCURRENCY_STEP = 20
+RATE_LIMIT_MAX_CONCURRENCY = 4
+
+# 是否对平台API请求启用HTTP/2（需要安装h2: pip install "httpx[http2]"，未安装时自动使用HTTP/1.1）
+ENABLE_HTTP2 = True
+
+# 每个平台客户端连接池的最大连接数
+HTTP_MAX_CONNECTIONS = 20
+
+# 连接池中保持空闲的长连接数
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10
+
+# 空闲长连接的保持时间（秒）
+HTTP_KEEPALIVE_EXPIRY = 30
+
 from .bilibili_config import *
 from .xhs_config import *
 from .dy_config import *
@@ -11,6 +11,9 @@
 # 抖音平台配置
 PUBLISH_TIME_TYPE = 0
 
+# 签名参数 msToken 从浏览器 localStorage 读取后缓存的秒数，webid 在一个会话内保持不变
+DY_MS_TOKEN_CACHE_SEC = 300
+
 # 指定DY视频URL列表 (支持多种格式)
 # 支持格式:
 # 1. 完整视频URL: "https://www.douyin.com/video/7525538910311632128"
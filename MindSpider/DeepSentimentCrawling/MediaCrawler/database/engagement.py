@@ -0,0 +1,187 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 内容表/评论表互动数据与发布时间的归一化
+#            各平台的点赞/评论/分享等计数以字符串保存（如 "1.2万"、"10w+"），发布时间有秒、毫秒、
+#            日期时间字符串等多种格式。这里统一换算为整数列 like_num / comment_num / share_num /
+#            collect_num / view_num 与毫秒时间戳 publish_ts_ms，便于在 SQL 中排序、范围过滤和建索引；
+#            publish_ts_ms 同时是按月分区的分区键（见 MindSpider/schema/partitioning.py）。
+#            写入时由 store/bulk_writer.py 同步计算，存量数据由 MindSpider/schema/migrations.py 回填。
+#            本模块不依赖 MediaCrawler 的配置，MindSpider 的迁移脚本按文件路径直接加载。
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Sequence, Set, Tuple
+
+# 归一化列 -> 各内容表中的来源列
+NUMERIC_COLUMNS = ("like_num", "comment_num", "share_num", "collect_num", "view_num")
+PUBLISH_TS_COLUMN = "publish_ts_ms"
+NORMALIZED_COLUMNS = NUMERIC_COLUMNS + (PUBLISH_TS_COLUMN,)
+
+ENGAGEMENT_SOURCES: Dict[str, Dict[str, str]] = {
+    "bilibili_video": {
+        "like_num": "liked_count",
+        "comment_num": "video_comment",
+        "share_num": "video_share_count",
+        "collect_num": "video_favorite_count",
+        "view_num": "video_play_count",
+    },
+    "douyin_aweme": {
+        "like_num": "liked_count",
+        "comment_num": "comment_count",
+        "share_num": "share_count",
+        "collect_num": "collected_count",
+    },
+    "kuaishou_video": {
+        "like_num": "liked_count",
+        "view_num": "viewd_count",
+    },
+    "weibo_note": {
+        "like_num": "liked_count",
+        "comment_num": "comments_count",
+        "share_num": "shared_count",
+    },
+    "xhs_note": {
+        "like_num": "liked_count",
+        "comment_num": "comment_count",
+        "share_num": "share_count",
+        "collect_num": "collected_count",
+    },
+    "tieba_note": {
+        "comment_num": "total_replay_num",
+    },
+    "zhihu_content": {
+        "like_num": "voteup_count",
+        "comment_num": "comment_count",
+    },
+}
+
+# 发布时间的来源列，按顺序取第一个能解析的值；评论表只归一化发布时间（用作按月分区的分区键）
+PUBLISH_TIME_SOURCES: Dict[str, Tuple[str, ...]] = {
+    "bilibili_video": ("create_time",),
+    "douyin_aweme": ("create_time",),
+    "kuaishou_video": ("create_time",),
+    "weibo_note": ("create_time", "create_date_time"),
+    "xhs_note": ("time",),
+    "tieba_note": ("publish_time",),
+    "zhihu_content": ("created_time",),
+    "bilibili_video_comment": ("create_time",),
+    "douyin_aweme_comment": ("create_time",),
+    "kuaishou_video_comment": ("create_time",),
+    "weibo_note_comment": ("create_time", "create_date_time"),
+    "xhs_note_comment": ("create_time",),
+    "tieba_comment": ("publish_time",),
+    "zhihu_comment": ("publish_time",),
+}
+
+NORMALIZED_TABLES = tuple(ENGAGEMENT_SOURCES)
+COMMENT_TABLES = tuple(table for table in PUBLISH_TIME_SOURCES if table not in ENGAGEMENT_SOURCES)
+
+_UNIT_MULTIPLIERS = {"k": 1_000, "千": 1_000, "w": 10_000, "万": 10_000, "m": 1_000_000, "亿": 100_000_000}
+_COUNT_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)\s*(k|千|w|万|m|亿)?\+?$")
+_DATETIME_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d %H:%M",
+    "%Y-%m-%d",
+    "%Y/%m/%d",
+)
+# 小于该值的数字时间戳按秒处理（1e12 毫秒约为 2001 年）
+_MS_THRESHOLD = 1_000_000_000_000
+
+
+def parse_count(value: Any) -> Optional[int]:
+    """
+    把平台返回的计数转为整数
+    :param value: 如 1234、"1234"、"1,234"、"1.2万"、"10w+"、"3.5k"
+    :return: 无法解析（空值、"-" 等）时返回 None
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip().lower().replace(",", "")
+    match = _COUNT_PATTERN.match(text)
+    if not match:
+        return None
+    number, unit = match.groups()
+    return int(float(number) * _UNIT_MULTIPLIERS.get(unit, 1))
+
+
+def parse_publish_ts_ms(value: Any) -> Optional[int]:
+    """
+    把发布时间转为毫秒时间戳
+    :param value: 秒/毫秒时间戳（数字或数字字符串）、datetime、日期时间字符串
+    :return: 无法解析时返回 None
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    if isinstance(value, (int, float)):
+        number = float(value)
+    else:
+        text = str(value).strip()
+        if not text:
+            return None
+        try:
+            number = float(text)
+        except ValueError:
+            text = text.split("+")[0].strip()
+            for fmt in _DATETIME_FORMATS:
+                try:
+                    return int(datetime.strptime(text, fmt).timestamp() * 1000)
+                except ValueError:
+                    continue
+            return None
+    if number <= 0:
+        return None
+    return int(number if number >= _MS_THRESHOLD else number * 1000)
+
+
+def source_columns(table_name: str) -> Set[str]:
+    """某张表归一化时读取的全部来源列"""
+    return set(ENGAGEMENT_SOURCES.get(table_name, {}).values()) | set(PUBLISH_TIME_SOURCES.get(table_name, ()))
+
+
+def derived_columns(table_name: str, columns: Iterable[str]) -> Set[str]:
+    """由给定来源列计算出的归一化列，用于确定更新时需要一并更新的列"""
+    columns = set(columns)
+    derived = {target for target, source in ENGAGEMENT_SOURCES.get(table_name, {}).items() if source in columns}
+    if columns & set(PUBLISH_TIME_SOURCES.get(table_name, ())):
+        derived.add(PUBLISH_TS_COLUMN)
+    return derived
+
+
+def normalized_values(table_name: str, row: Dict[str, Any]) -> Dict[str, Optional[int]]:
+    """
+    根据一行数据计算归一化列
+    只返回来源列出现在 row 中的归一化列，部分字段的更新不会把其他归一化列覆盖为空
+    :param table_name: 表名，非内容表/评论表返回空字典
+    :param row: 字段 -> 值
+    :return: 归一化列 -> 值
+    """
+    values: Dict[str, Optional[int]] = {}
+    for target, source in ENGAGEMENT_SOURCES.get(table_name, {}).items():
+        if source in row:
+            values[target] = parse_count(row[source])
+
+    time_sources: Sequence[str] = [c for c in PUBLISH_TIME_SOURCES.get(table_name, ()) if c in row]
+    if time_sources:
+        values[PUBLISH_TS_COLUMN] = None
+        for column in time_sources:
+            ts = parse_publish_ts_ms(row[column])
+            if ts is not None:
+                values[PUBLISH_TS_COLUMN] = ts
+                break
+    return values
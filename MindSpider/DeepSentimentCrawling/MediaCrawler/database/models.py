@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, Text, String, BigInteger
+from sqlalchemy import create_engine, Column, Integer, Text, String, BigInteger, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -6,6 +6,11 @@ Base = declarative_base()
 
 class BilibiliVideo(Base):
     __tablename__ = 'bilibili_video'
+    __table_args__ = (
+        Index('idx_bilibili_video_kw_add_ts', 'source_keyword', 'add_ts', mysql_length={'source_keyword': 255}),
+        Index('idx_bilibili_video_publish_ts', 'publish_ts_ms', 'like_num', 'comment_num', 'share_num', 'collect_num', 'view_num'),
+        Index('idx_bilibili_video_kw_like', 'source_keyword', 'like_num', 'add_ts', mysql_length={'source_keyword': 255}),
+    )
     id = Column(Integer, primary_key=True)
     video_id = Column(BigInteger, nullable=False, index=True, unique=True)
     video_url = Column(Text, nullable=False)
@@ -15,6 +20,13 @@ class BilibiliVideo(Base):
     liked_count = Column(Integer)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
+    # 归一化的互动数与发布时间（毫秒），由 database/engagement.py 从原始字段计算
+    like_num = Column(BigInteger)
+    comment_num = Column(BigInteger)
+    share_num = Column(BigInteger)
+    collect_num = Column(BigInteger)
+    view_num = Column(BigInteger)
+    publish_ts_ms = Column(BigInteger)
     video_type = Column(Text)
     title = Column(Text)
     desc = Column(Text)
@@ -31,6 +43,9 @@ class BilibiliVideo(Base):
 
 class BilibiliVideoComment(Base):
     __tablename__ = 'bilibili_video_comment'
+    __table_args__ = (
+        Index('idx_bilibili_video_comment_publish_ts', 'publish_ts_ms'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(255))
     nickname = Column(Text)
@@ -39,6 +54,8 @@ class BilibiliVideoComment(Base):
     avatar = Column(Text)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
+    # 归一化的发布时间（毫秒），由 database/engagement.py 从原始字段计算
+    publish_ts_ms = Column(BigInteger)
     comment_id = Column(BigInteger, index=True)
     video_id = Column(BigInteger, index=True)
     content = Column(Text)
@@ -93,6 +110,11 @@ class BilibiliUpDynamic(Base):
 
 class DouyinAweme(Base):
     __tablename__ = 'douyin_aweme'
+    __table_args__ = (
+        Index('idx_douyin_aweme_kw_add_ts', 'source_keyword', 'add_ts', mysql_length={'source_keyword': 255}),
+        Index('idx_douyin_aweme_publish_ts', 'publish_ts_ms', 'like_num', 'comment_num', 'share_num', 'collect_num', 'view_num'),
+        Index('idx_douyin_aweme_kw_like', 'source_keyword', 'like_num', 'add_ts', mysql_length={'source_keyword': 255}),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(255))
     sec_uid = Column(String(255))
@@ -104,6 +126,13 @@ class DouyinAweme(Base):
     ip_location = Column(Text)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
+    # 归一化的互动数与发布时间（毫秒），由 database/engagement.py 从原始字段计算
+    like_num = Column(BigInteger)
+    comment_num = Column(BigInteger)
+    share_num = Column(BigInteger)
+    collect_num = Column(BigInteger)
+    view_num = Column(BigInteger)
+    publish_ts_ms = Column(BigInteger)
     aweme_id = Column(BigInteger, index=True)
     aweme_type = Column(Text)
     title = Column(Text)
@@ -122,6 +151,9 @@ class DouyinAweme(Base):
 
 class DouyinAwemeComment(Base):
     __tablename__ = 'douyin_aweme_comment'
+    __table_args__ = (
+        Index('idx_douyin_aweme_comment_publish_ts', 'publish_ts_ms'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(255))
     sec_uid = Column(String(255))
@@ -133,6 +165,8 @@ class DouyinAwemeComment(Base):
     ip_location = Column(Text)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
+    # 归一化的发布时间（毫秒），由 database/engagement.py 从原始字段计算
+    publish_ts_ms = Column(BigInteger)
     comment_id = Column(BigInteger, index=True)
     aweme_id = Column(BigInteger, index=True)
     content = Column(Text)
@@ -160,12 +194,24 @@ class DyCreator(Base):
 
 class KuaishouVideo(Base):
     __tablename__ = 'kuaishou_video'
+    __table_args__ = (
+        Index('idx_kuaishou_video_kw_add_ts', 'source_keyword', 'add_ts', mysql_length={'source_keyword': 255}),
+        Index('idx_kuaishou_video_publish_ts', 'publish_ts_ms', 'like_num', 'comment_num', 'share_num', 'collect_num', 'view_num'),
+        Index('idx_kuaishou_video_kw_like', 'source_keyword', 'like_num', 'add_ts', mysql_length={'source_keyword': 255}),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(64))
     nickname = Column(Text)
     avatar = Column(Text)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
+    # 归一化的互动数与发布时间（毫秒），由 database/engagement.py 从原始字段计算
+    like_num = Column(BigInteger)
+    comment_num = Column(BigInteger)
+    share_num = Column(BigInteger)
+    collect_num = Column(BigInteger)
+    view_num = Column(BigInteger)
+    publish_ts_ms = Column(BigInteger)
     video_id = Column(String(255), index=True)
     video_type = Column(Text)
     title = Column(Text)
@@ -180,12 +226,17 @@ class KuaishouVideo(Base):
 
 class KuaishouVideoComment(Base):
     __tablename__ = 'kuaishou_video_comment'
+    __table_args__ = (
+        Index('idx_kuaishou_video_comment_publish_ts', 'publish_ts_ms'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(Text)
     nickname = Column(Text)
     avatar = Column(Text)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
+    # 归一化的发布时间（毫秒），由 database/engagement.py 从原始字段计算
+    publish_ts_ms = Column(BigInteger)
     comment_id = Column(BigInteger, index=True)
     video_id = Column(String(255), index=True)
     content = Column(Text)
@@ -194,6 +245,11 @@ class KuaishouVideoComment(Base):
 
 class WeiboNote(Base):
     __tablename__ = 'weibo_note'
+    __table_args__ = (
+        Index('idx_weibo_note_kw_add_ts', 'source_keyword', 'add_ts', mysql_length={'source_keyword': 255}),
+        Index('idx_weibo_note_publish_ts', 'publish_ts_ms', 'like_num', 'comment_num', 'share_num', 'collect_num', 'view_num'),
+        Index('idx_weibo_note_kw_like', 'source_keyword', 'like_num', 'add_ts', mysql_length={'source_keyword': 255}),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(255))
     nickname = Column(Text)
@@ -203,6 +259,13 @@ class WeiboNote(Base):
     ip_location = Column(Text, default='')
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
+    # 归一化的互动数与发布时间（毫秒），由 database/engagement.py 从原始字段计算
+    like_num = Column(BigInteger)
+    comment_num = Column(BigInteger)
+    share_num = Column(BigInteger)
+    collect_num = Column(BigInteger)
+    view_num = Column(BigInteger)
+    publish_ts_ms = Column(BigInteger)
     note_id = Column(BigInteger, index=True)
     content = Column(Text)
     create_time = Column(BigInteger, index=True)
@@ -215,6 +278,9 @@ class WeiboNote(Base):
 
 class WeiboNoteComment(Base):
     __tablename__ = 'weibo_note_comment'
+    __table_args__ = (
+        Index('idx_weibo_note_comment_publish_ts', 'publish_ts_ms'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(255))
     nickname = Column(Text)
@@ -224,6 +290,8 @@ class WeiboNoteComment(Base):
     ip_location = Column(Text, default='')
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
+    # 归一化的发布时间（毫秒），由 database/engagement.py 从原始字段计算
+    publish_ts_ms = Column(BigInteger)
     comment_id = Column(BigInteger, index=True)
     note_id = Column(BigInteger, index=True)
     content = Column(Text)
@@ -266,6 +334,11 @@ class XhsCreator(Base):
 
 class XhsNote(Base):
     __tablename__ = 'xhs_note'
+    __table_args__ = (
+        Index('idx_xhs_note_kw_add_ts', 'source_keyword', 'add_ts', mysql_length={'source_keyword': 255}),
+        Index('idx_xhs_note_publish_ts', 'publish_ts_ms', 'like_num', 'comment_num', 'share_num', 'collect_num', 'view_num'),
+        Index('idx_xhs_note_kw_like', 'source_keyword', 'like_num', 'add_ts', mysql_length={'source_keyword': 255}),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(255))
     nickname = Column(Text)
@@ -273,6 +346,13 @@ class XhsNote(Base):
     ip_location = Column(Text)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
+    # 归一化的互动数与发布时间（毫秒），由 database/engagement.py 从原始字段计算
+    like_num = Column(BigInteger)
+    comment_num = Column(BigInteger)
+    share_num = Column(BigInteger)
+    collect_num = Column(BigInteger)
+    view_num = Column(BigInteger)
+    publish_ts_ms = Column(BigInteger)
     note_id = Column(String(255), index=True)
     type = Column(Text)
     title = Column(Text)
@@ -292,6 +372,9 @@ class XhsNote(Base):
 
 class XhsNoteComment(Base):
     __tablename__ = 'xhs_note_comment'
+    __table_args__ = (
+        Index('idx_xhs_note_comment_publish_ts', 'publish_ts_ms'),
+    )
     id = Column(Integer, primary_key=True)
     user_id = Column(String(255))
     nickname = Column(Text)
@@ -299,6 +382,8 @@ class XhsNoteComment(Base):
     ip_location = Column(Text)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
+    # 归一化的发布时间（毫秒），由 database/engagement.py 从原始字段计算
+    publish_ts_ms = Column(BigInteger)
     comment_id = Column(String(255), index=True)
     create_time = Column(BigInteger, index=True)
     note_id = Column(String(255))
@@ -310,6 +395,11 @@ class XhsNoteComment(Base):
 
 class TiebaNote(Base):
     __tablename__ = 'tieba_note'
+    __table_args__ = (
+        Index('idx_tieba_note_kw_add_ts', 'source_keyword', 'add_ts', mysql_length={'source_keyword': 255}),
+        Index('idx_tieba_note_publish_ts', 'publish_ts_ms', 'like_num', 'comment_num', 'share_num', 'collect_num', 'view_num'),
+        Index('idx_tieba_note_kw_like', 'source_keyword', 'like_num', 'add_ts', mysql_length={'source_keyword': 255}),
+    )
     id = Column(Integer, primary_key=True)
     note_id = Column(String(644), index=True)
     title = Column(Text)
@@ -327,10 +417,20 @@ class TiebaNote(Base):
     ip_location = Column(Text, default='')
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
+    # 归一化的互动数与发布时间（毫秒），由 database/engagement.py 从原始字段计算
+    like_num = Column(BigInteger)
+    comment_num = Column(BigInteger)
+    share_num = Column(BigInteger)
+    collect_num = Column(BigInteger)
+    view_num = Column(BigInteger)
+    publish_ts_ms = Column(BigInteger)
     source_keyword = Column(Text, default='')
 
 class TiebaComment(Base):
     __tablename__ = 'tieba_comment'
+    __table_args__ = (
+        Index('idx_tieba_comment_publish_ts', 'publish_ts_ms'),
+    )
     id = Column(Integer, primary_key=True)
     comment_id = Column(String(255), index=True)
     parent_comment_id = Column(String(255), default='')
@@ -348,6 +448,8 @@ class TiebaComment(Base):
     note_url = Column(Text)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
+    # 归一化的发布时间（毫秒），由 database/engagement.py 从原始字段计算
+    publish_ts_ms = Column(BigInteger)
 
 class TiebaCreator(Base):
     __tablename__ = 'tieba_creator'
@@ -366,6 +468,11 @@ class TiebaCreator(Base):
 
 class ZhihuContent(Base):
     __tablename__ = 'zhihu_content'
+    __table_args__ = (
+        Index('idx_zhihu_content_kw_add_ts', 'source_keyword', 'add_ts', mysql_length={'source_keyword': 255}),
+        Index('idx_zhihu_content_publish_ts', 'publish_ts_ms', 'like_num', 'comment_num', 'share_num', 'collect_num', 'view_num'),
+        Index('idx_zhihu_content_kw_like', 'source_keyword', 'like_num', 'add_ts', mysql_length={'source_keyword': 255}),
+    )
     id = Column(Integer, primary_key=True)
     content_id = Column(String(64), index=True)
     content_type = Column(Text)
@@ -386,6 +493,13 @@ class ZhihuContent(Base):
     user_url_token = Column(Text)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
+    # 归一化的互动数与发布时间（毫秒），由 database/engagement.py 从原始字段计算
+    like_num = Column(BigInteger)
+    comment_num = Column(BigInteger)
+    share_num = Column(BigInteger)
+    collect_num = Column(BigInteger)
+    view_num = Column(BigInteger)
+    publish_ts_ms = Column(BigInteger)
 
     # persist-1<persist1@126.com>
     # 原因：修复 ORM 模型定义错误，确保与数据库表结构一致。
@@ -394,6 +508,9 @@ class ZhihuContent(Base):
 
 class ZhihuComment(Base):
     __tablename__ = 'zhihu_comment'
+    __table_args__ = (
+        Index('idx_zhihu_comment_publish_ts', 'publish_ts_ms'),
+    )
     id = Column(Integer, primary_key=True)
     comment_id = Column(String(64), index=True)
     parent_comment_id = Column(String(64))
@@ -411,6 +528,8 @@ class ZhihuComment(Base):
     user_avatar = Column(Text)
     add_ts = Column(BigInteger)
     last_modify_ts = Column(BigInteger)
+    # 归一化的发布时间（毫秒），由 database/engagement.py 从原始字段计算
+    publish_ts_ms = Column(BigInteger)
 
 class ZhihuCreator(Base):
     __tablename__ = 'zhihu_creator'
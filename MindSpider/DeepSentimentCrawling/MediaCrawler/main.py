@@ -17,7 +17,9 @@ import cmd_arg
 import config
 from database import db
 from base.base_crawler import AbstractCrawler
-from tools.async_file_writer import AsyncFileWriter
+from store.bulk_writer import close_all_writers
+from tools.async_file_writer import AsyncFileWriter, close_all_file_writers
+from tools.js_runtime import close_js_runtimes
 from var import crawler_type_var
 
 
@@ -80,7 +82,17 @@ async def main():
 
 
     crawler = CrawlerFactory.create_crawler(platform=config.PLATFORM)
-    await crawler.start()
+    try:
+        await crawler.start()
+    finally:
+        # 浏览器已随 playwright 上下文退出，这里只需关闭 API 客户端的连接池
+        await crawler.close_api_clients()
+        # 写入数据库批量写入器中剩余的数据
+        await close_all_writers()
+        # 写入 CSV/JSONL 文件缓冲区中剩余的数据并关闭文件句柄
+        await close_all_file_writers()
+        # 关闭常驻的 JS 签名 node 进程
+        close_js_runtimes()
 
     # Generate wordcloud after crawling is complete
     # Only for JSON save mode
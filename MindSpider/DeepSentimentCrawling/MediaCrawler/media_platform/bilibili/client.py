@@ -24,6 +24,8 @@ from playwright.async_api import BrowserContext, Page
 import config
 from base.base_crawler import AbstractApiClient
 from tools import utils
+from tools.comment_queue import CommentWorkQueue, save_cursor_when_done
+from tools.rate_limiter import pace
 
 from .exception import DataFetchError
 from .field import CommentOrderType, SearchOrderType
@@ -49,8 +51,7 @@ class BilibiliClient(AbstractApiClient):
         self.cookie_dict = cookie_dict
 
     async def request(self, method, url, **kwargs) -> Any:
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        response = await self.send_request(method, url, timeout=self.timeout, **kwargs)
         try:
             data: Dict = response.json()
         except json.JSONDecodeError:
@@ -203,19 +204,18 @@ class BilibiliClient(AbstractApiClient):
 
     async def get_video_media(self, url: str) -> Union[bytes, None]:
         # Follow CDN 302 redirects and treat any 2xx as success (some endpoints return 206)
-        async with httpx.AsyncClient(proxy=self.proxy, follow_redirects=True) as client:
-            try:
-                response = await client.request("GET", url, timeout=self.timeout, headers=self.headers)
-                response.raise_for_status()
-                if 200 <= response.status_code < 300:
-                    return response.content
-                utils.logger.error(
-                    f"[BilibiliClient.get_video_media] Unexpected status {response.status_code} for {url}"
-                )
-                return None
-            except httpx.HTTPError as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
-                utils.logger.error(f"[BilibiliClient.get_video_media] {exc.__class__.__name__} for {exc.request.url} - {exc}")  # 保留原始异常类型名称，以便开发者调试
-                return None
+        try:
+            response = await self.send_request("GET", url, timeout=self.timeout, headers=self.headers, follow_redirects=True)
+            response.raise_for_status()
+            if 200 <= response.status_code < 300:
+                return response.content
+            utils.logger.error(
+                f"[BilibiliClient.get_video_media] Unexpected status {response.status_code} for {url}"
+            )
+            return None
+        except httpx.HTTPError as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
+            utils.logger.error(f"[BilibiliClient.get_video_media] {exc.__class__.__name__} for {exc.request.url} - {exc}")  # 保留原始异常类型名称，以便开发者调试
+            return None
 
     async def get_video_comments(
         self,
@@ -240,6 +240,8 @@ class BilibiliClient(AbstractApiClient):
         is_fetch_sub_comments=False,
         callback: Optional[Callable] = None,
         max_count: int = 10,
+        start_cursor: int = 0,
+        cursor_callback: Optional[Callable] = None,
     ):
         """
         get video all comments include sub comments
@@ -247,63 +249,72 @@ class BilibiliClient(AbstractApiClient):
         :param crawl_interval:
         :param is_fetch_sub_comments:
         :param callback:
-        max_count: 一次笔记爬取的最大评论数量
+        max_count: 一次笔记爬取的最大评论数量；保存游标时最后一页整页处理，可能略多于该数量
+        :param start_cursor: 起始评论页游标，用于从上次爬取的位置继续
+        :param cursor_callback: 全部评论（含二级评论线程）抓取成功后回调 (下一页游标, 是否还有更多)，用于保存增量爬取进度
 
         :return:
         """
         result = []
         is_end = False
-        next_page = 0
+        next_page = start_cursor
         max_retries = 3
-        while not is_end and len(result) < max_count:
-            comments_res = None
-            for attempt in range(max_retries):
-                try:
-                    comments_res = await self.get_video_comments(video_id, CommentOrderType.DEFAULT, next_page)
-                    break  # Success
-                except DataFetchError as e:
-                    if attempt < max_retries - 1:
-                        delay = 5 * (2**attempt) + random.uniform(0, 1)
-                        utils.logger.warning(f"[BilibiliClient.get_video_all_comments] Retrying video_id {video_id} in {delay:.2f}s... (Attempt {attempt + 1}/{max_retries})")
-                        await asyncio.sleep(delay)
-                    else:
-                        utils.logger.error(f"[BilibiliClient.get_video_all_comments] Max retries reached for video_id: {video_id}. Skipping comments. Error: {e}")
-                        is_end = True
-                        break
-            if not comments_res:
-                break
-
-            cursor_info: Dict = comments_res.get("cursor")
-            if not cursor_info:
-                utils.logger.warning(f"[BilibiliClient.get_video_all_comments] Could not find 'cursor' in response for video_id: {video_id}. Skipping.")
-                break
-
-            comment_list: List[Dict] = comments_res.get("replies", [])
-
-            # 检查 is_end 和 next 是否存在
-            if "is_end" not in cursor_info or "next" not in cursor_info:
-                utils.logger.warning(f"[BilibiliClient.get_video_all_comments] 'is_end' or 'next' not in cursor for video_id: {video_id}. Assuming end of comments.")
-                is_end = True
-            else:
-                is_end = cursor_info.get("is_end")
-                next_page = cursor_info.get("next")
-
-            if not isinstance(is_end, bool):
-                utils.logger.warning(f"[BilibiliClient.get_video_all_comments] 'is_end' is not a boolean for video_id: {video_id}. Assuming end of comments.")
-                is_end = True
-            if is_fetch_sub_comments:
-                for comment in comment_list:
-                    comment_id = comment['rpid']
-                    if (comment.get("rcount", 0) > 0):
-                        {await self.get_video_all_level_two_comments(video_id, comment_id, CommentOrderType.DEFAULT, 10, crawl_interval, callback)}
-            if len(result) + len(comment_list) > max_count:
-                comment_list = comment_list[:max_count - len(result)]
-            if callback:  # 如果有回调函数，就执行回调函数
-                await callback(video_id, comment_list)
-            await asyncio.sleep(crawl_interval)
-            if not is_fetch_sub_comments:
+        progress = None
+        # 翻页的同时，二级评论线程在队列中并发抓取
+        async with CommentWorkQueue(name=f"bili:{video_id}") as queue:
+            while not is_end and len(result) < max_count:
+                comments_res = None
+                for attempt in range(max_retries):
+                    try:
+                        comments_res = await self.get_video_comments(video_id, CommentOrderType.DEFAULT, next_page)
+                        break  # Success
+                    except DataFetchError as e:
+                        if attempt < max_retries - 1:
+                            delay = 5 * (2**attempt) + random.uniform(0, 1)
+                            utils.logger.warning(f"[BilibiliClient.get_video_all_comments] Retrying video_id {video_id} in {delay:.2f}s... (Attempt {attempt + 1}/{max_retries})")
+                            await asyncio.sleep(delay)
+                        else:
+                            utils.logger.error(f"[BilibiliClient.get_video_all_comments] Max retries reached for video_id: {video_id}. Skipping comments. Error: {e}")
+                            is_end = True
+                            break
+                if not comments_res:
+                    break
+
+                cursor_info: Dict = comments_res.get("cursor")
+                if not cursor_info:
+                    utils.logger.warning(f"[BilibiliClient.get_video_all_comments] Could not find 'cursor' in response for video_id: {video_id}. Skipping.")
+                    break
+
+                comment_list: List[Dict] = comments_res.get("replies", [])
+
+                # 检查 is_end 和 next 是否存在
+                if "is_end" not in cursor_info or "next" not in cursor_info:
+                    utils.logger.warning(f"[BilibiliClient.get_video_all_comments] 'is_end' or 'next' not in cursor for video_id: {video_id}. Assuming end of comments.")
+                    is_end = True
+                else:
+                    is_end = cursor_info.get("is_end")
+                    next_page = cursor_info.get("next")
+
+                if not isinstance(is_end, bool):
+                    utils.logger.warning(f"[BilibiliClient.get_video_all_comments] 'is_end' is not a boolean for video_id: {video_id}. Assuming end of comments.")
+                    is_end = True
+                if not cursor_callback and len(result) + len(comment_list) > max_count:
+                    # 保存游标时不截断：只处理一部分的页面下次会从同一页重新开始，永远翻不过这一页
+                    comment_list = comment_list[:max_count - len(result)]
+                if callback:  # 如果有回调函数，就执行回调函数
+                    await callback(video_id, comment_list)
+                progress = (next_page, not is_end)
+                if is_fetch_sub_comments:
+                    for comment in comment_list:
+                        if comment.get("rcount", 0) > 0:
+                            await queue.submit(
+                                self.get_video_all_level_two_comments,
+                                video_id, comment['rpid'], CommentOrderType.DEFAULT, 10, crawl_interval, callback,
+                            )
+                await pace(crawl_interval)
                 result.extend(comment_list)
-                continue
+        if progress:
+            await save_cursor_when_done(queue, cursor_callback, *progress)
         return result
 
     async def get_video_all_level_two_comments(
@@ -328,11 +339,12 @@ class BilibiliClient(AbstractApiClient):
 
         pn = 1
         while True:
+            # 多个二级评论线程并发时，先取令牌再请求
+            await pace(crawl_interval)
             result = await self.get_video_level_two_comments(video_id, level_one_comment_id, pn, ps, order_mode)
             comment_list: List[Dict] = result.get("replies", [])
             if callback:  # 如果有回调函数，就执行回调函数
                 await callback(video_id, comment_list)
-            await asyncio.sleep(crawl_interval)
             if (int(result["page"]["count"]) <= pn * ps):
                 break
 
@@ -482,7 +494,7 @@ class BilibiliClient(AbstractApiClient):
                 fans_list = fans_list[:max_count - len(result)]
             if callback:  # 如果有回调函数，就执行回调函数
                 await callback(creator_info, fans_list)
-            await asyncio.sleep(crawl_interval)
+            await pace(crawl_interval)
             if not fans_list:
                 break
             result.extend(fans_list)
@@ -516,7 +528,7 @@ class BilibiliClient(AbstractApiClient):
                 followings_list = followings_list[:max_count - len(result)]
             if callback:  # 如果有回调函数，就执行回调函数
                 await callback(creator_info, followings_list)
-            await asyncio.sleep(crawl_interval)
+            await pace(crawl_interval)
             if not followings_list:
                 break
             result.extend(followings_list)
@@ -551,6 +563,6 @@ class BilibiliClient(AbstractApiClient):
                 dynamics_list = dynamics_list[:max_count - len(result)]
             if callback:
                 await callback(creator_info, dynamics_list)
-            await asyncio.sleep(crawl_interval)
+            await pace(crawl_interval)
             result.extend(dynamics_list)
         return result
@@ -36,6 +36,8 @@ from proxy.proxy_ip_pool import IpInfoModel, create_ip_pool
 from store import bilibili as bilibili_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
+from tools.crawl_state import comment_progress, keyword_watermark
+from tools.rate_limiter import AdaptiveRateLimiter
 from var import crawler_type_var, source_keyword_var
 
 from .client import BilibiliClient
@@ -59,8 +61,8 @@ class BilibiliCrawler(AbstractCrawler):
     async def start(self):
         playwright_proxy_format, httpx_proxy_format = None, None
         if config.ENABLE_IP_PROXY:
-            ip_proxy_pool = await create_ip_pool(config.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
-            ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            self.ip_proxy_pool = await create_ip_pool(config.IP_PROXY_POOL_COUNT, enable_validate_ip=True)
+            ip_proxy_info: IpInfoModel = await self.ip_proxy_pool.get_proxy()
             playwright_proxy_format, httpx_proxy_format = utils.format_proxy_info(ip_proxy_info)
 
         async with async_playwright() as playwright:
@@ -86,6 +88,8 @@ class BilibiliCrawler(AbstractCrawler):
 
             # Create a client to interact with the xiaohongshu website.
             self.bili_client = await self.create_bilibili_client(httpx_proxy_format)
+            # 每个请求的结果回报给代理池，代理被隔离时自动换用新代理
+            self.bili_client.bind_proxy_pool(getattr(self, "ip_proxy_pool", None))
             if not await self.bili_client.pong():
                 login_obj = BilibiliLogin(
                     login_type=config.LOGIN_TYPE,
@@ -180,6 +184,7 @@ class BilibiliCrawler(AbstractCrawler):
             source_keyword_var.set(keyword)
             utils.logger.info(f"[BilibiliCrawler.search_by_keywords] Current search keyword: {keyword}")
             page = 1
+            watermark = keyword_watermark("bili", keyword)
             while (page - start_page + 1) * bili_limit_count <= config.CRAWLER_MAX_NOTES_COUNT:
                 if page < start_page:
                     utils.logger.info(f"[BilibiliCrawler.search_by_keywords] Skip page: {page}")
@@ -202,7 +207,14 @@ class BilibiliCrawler(AbstractCrawler):
                     utils.logger.info(f"[BilibiliCrawler.search_by_keywords] No more videos for '{keyword}', moving to next keyword.")
                     break
 
-                semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+                # 跳过之前运行中已爬取的视频，整页都已爬取时停止翻页
+                page_video_count = len(video_list)
+                video_list = [item for item in video_list if not watermark.seen(item.get("aid"), item.get("pubdate"))]
+                if watermark.previous and page_video_count and not video_list:
+                    utils.logger.info(f"[BilibiliCrawler.search_by_keywords] Reached videos crawled before for keyword: {keyword}, stop paging")
+                    break
+
+                semaphore = self.rate_limiter("detail")
                 task_list = []
                 try:
                     task_list = [self.get_video_info_task(aid=video_item.get("aid"), bvid="", semaphore=semaphore) for video_item in video_list]
@@ -218,10 +230,12 @@ class BilibiliCrawler(AbstractCrawler):
                 page += 1
                 
                 # Sleep after page navigation
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[BilibiliCrawler.search_by_keywords] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {page-1}")
+                await self.rate_limiter("search").wait()
+                utils.logger.info(f"[BilibiliCrawler.search_by_keywords] Rate limited at {self.rate_limiter('search').current_rate:.2f} req/s after page {page-1}")
                 
                 await self.batch_get_video_comments(video_id_list)
+            watermark.commit()
+            utils.logger.info(f"[BilibiliCrawler.search_by_keywords] keyword: {keyword}, skipped {watermark.skipped} videos crawled before")
 
     async def search_by_keywords_in_time_range(self, daily_limit: bool):
         """
@@ -277,7 +291,7 @@ class BilibiliCrawler(AbstractCrawler):
                             utils.logger.info(f"[BilibiliCrawler.search] No more videos for '{keyword}' on {day.ctime()}, moving to next day.")
                             break
 
-                        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+                        semaphore = self.rate_limiter("detail")
                         task_list = [self.get_video_info_task(aid=video_item.get("aid"), bvid="", semaphore=semaphore) for video_item in video_list]
                         video_items = await asyncio.gather(*task_list)
 
@@ -299,8 +313,8 @@ class BilibiliCrawler(AbstractCrawler):
                         page += 1
                         
                         # Sleep after page navigation
-                        await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                        utils.logger.info(f"[BilibiliCrawler.search_by_keywords_in_time_range] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {page-1}")
+                        await self.rate_limiter("search").wait()
+                        utils.logger.info(f"[BilibiliCrawler.search_by_keywords_in_time_range] Rate limited at {self.rate_limiter('search').current_rate:.2f} req/s after page {page-1}")
                         
                         await self.batch_get_video_comments(video_id_list)
 
@@ -319,14 +333,14 @@ class BilibiliCrawler(AbstractCrawler):
             return
 
         utils.logger.info(f"[BilibiliCrawler.batch_get_video_comments] video ids:{video_id_list}")
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.rate_limiter("comment")
         task_list: List[Task] = []
         for video_id in video_id_list:
             task = asyncio.create_task(self.get_comments(video_id, semaphore), name=video_id)
             task_list.append(task)
         await asyncio.gather(*task_list)
 
-    async def get_comments(self, video_id: str, semaphore: asyncio.Semaphore):
+    async def get_comments(self, video_id: str, semaphore: AdaptiveRateLimiter):
         """
         get comment for video id
         :param video_id:
@@ -334,16 +348,22 @@ class BilibiliCrawler(AbstractCrawler):
         :return:
         """
         async with semaphore:
+            progress = comment_progress("bili", video_id)
+            if progress.should_skip:
+                utils.logger.info(f"[BilibiliCrawler.get_comments] Comments of video {video_id} already crawled, skip")
+                return
             try:
                 utils.logger.info(f"[BilibiliCrawler.get_comments] begin get video_id: {video_id} comments ...")
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[BilibiliCrawler.get_comments] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching comments for video {video_id}")
+                await self.rate_limiter("comment").wait()
+                utils.logger.info(f"[BilibiliCrawler.get_comments] Rate limited at {self.rate_limiter('comment').current_rate:.2f} req/s after fetching comments for video {video_id}")
                 await self.bili_client.get_video_all_comments(
                     video_id=video_id,
-                    crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
+                    crawl_interval=self.rate_limiter("comment"),
                     is_fetch_sub_comments=config.ENABLE_GET_SUB_COMMENTS,
                     callback=bilibili_store.batch_update_bilibili_video_comments,
                     max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
+                    start_cursor=progress.start_cursor(0),
+                    cursor_callback=progress.save,
                 )
 
             except DataFetchError as ex:
@@ -366,8 +386,8 @@ class BilibiliCrawler(AbstractCrawler):
             await self.get_specified_videos(video_bvids_list)
             if int(result["page"]["count"]) <= pn * ps:
                 break
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-            utils.logger.info(f"[BilibiliCrawler.get_creator_videos] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {pn}")
+            await self.rate_limiter("detail").wait()
+            utils.logger.info(f"[BilibiliCrawler.get_creator_videos] Rate limited at {self.rate_limiter('detail').current_rate:.2f} req/s after page {pn}")
             pn += 1
 
     async def get_specified_videos(self, video_url_list: List[str]):
@@ -387,7 +407,7 @@ class BilibiliCrawler(AbstractCrawler):
                 utils.logger.error(f"[BilibiliCrawler.get_specified_videos] Failed to parse video URL: {e}")
                 continue
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.rate_limiter("detail")
         task_list = [self.get_video_info_task(aid=0, bvid=video_id, semaphore=semaphore) for video_id in bvids_list]
         video_details = await asyncio.gather(*task_list)
         video_aids_list = []
@@ -402,7 +422,7 @@ class BilibiliCrawler(AbstractCrawler):
                 await self.get_bilibili_video(video_detail, semaphore)
         await self.batch_get_video_comments(video_aids_list)
 
-    async def get_video_info_task(self, aid: int, bvid: str, semaphore: asyncio.Semaphore) -> Optional[Dict]:
+    async def get_video_info_task(self, aid: int, bvid: str, semaphore: AdaptiveRateLimiter) -> Optional[Dict]:
         """
         Get video detail task
         :param aid:
@@ -415,8 +435,8 @@ class BilibiliCrawler(AbstractCrawler):
                 result = await self.bili_client.get_video_info(aid=aid, bvid=bvid)
                 
                 # Sleep after fetching video details
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[BilibiliCrawler.get_video_info_task] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching video details {bvid or aid}")
+                await self.rate_limiter("detail").wait()
+                utils.logger.info(f"[BilibiliCrawler.get_video_info_task] Rate limited at {self.rate_limiter('detail').current_rate:.2f} req/s after fetching video details {bvid or aid}")
                 
                 return result
             except DataFetchError as ex:
@@ -426,7 +446,7 @@ class BilibiliCrawler(AbstractCrawler):
                 utils.logger.error(f"[BilibiliCrawler.get_video_info_task] have not fund note detail video_id:{bvid}, err: {ex}")
                 return None
 
-    async def get_video_play_url_task(self, aid: int, cid: int, semaphore: asyncio.Semaphore) -> Union[Dict, None]:
+    async def get_video_play_url_task(self, aid: int, cid: int, semaphore: AdaptiveRateLimiter) -> Union[Dict, None]:
         """
         Get video play url
         :param aid:
@@ -538,6 +558,8 @@ class BilibiliCrawler(AbstractCrawler):
 
     async def close(self):
         """Close browser context"""
+        # 关闭API客户端复用的HTTP连接池
+        await super().close()
         try:
             # 如果使用CDP模式，需要特殊处理
             if self.cdp_manager:
@@ -551,7 +573,7 @@ class BilibiliCrawler(AbstractCrawler):
         except Exception as e:
             utils.logger.error(f"[BilibiliCrawler.close] An error occurred during close: {e}")
 
-    async def get_bilibili_video(self, video_item: Dict, semaphore: asyncio.Semaphore):
+    async def get_bilibili_video(self, video_item: Dict, semaphore: AdaptiveRateLimiter):
         """
         download bilibili video
         :param video_item:
@@ -581,8 +603,8 @@ class BilibiliCrawler(AbstractCrawler):
             return
 
         content = await self.bili_client.get_video_media(video_url)
-        await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-        utils.logger.info(f"[BilibiliCrawler.get_bilibili_video] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching video {aid}")
+        await self.rate_limiter("detail").wait()
+        utils.logger.info(f"[BilibiliCrawler.get_bilibili_video] Rate limited at {self.rate_limiter('detail').current_rate:.2f} req/s after fetching video {aid}")
         if content is None:
             return
         extension_file_name = f"video.mp4"
@@ -607,7 +629,7 @@ class BilibiliCrawler(AbstractCrawler):
 
         utils.logger.info(f"[BilibiliCrawler.get_all_creator_details] creator ids:{creator_id_list}")
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.rate_limiter("detail")
         task_list: List[Task] = []
         try:
             for creator_id in creator_id_list:
@@ -618,7 +640,7 @@ class BilibiliCrawler(AbstractCrawler):
 
         await asyncio.gather(*task_list)
 
-    async def get_creator_details(self, creator_id: int, semaphore: asyncio.Semaphore):
+    async def get_creator_details(self, creator_id: int, semaphore: AdaptiveRateLimiter):
         """
         get details for creator id
         :param creator_id:
@@ -637,7 +659,7 @@ class BilibiliCrawler(AbstractCrawler):
         await self.get_followings(creator_info, semaphore)
         await self.get_dynamics(creator_info, semaphore)
 
-    async def get_fans(self, creator_info: Dict, semaphore: asyncio.Semaphore):
+    async def get_fans(self, creator_info: Dict, semaphore: AdaptiveRateLimiter):
         """
         get fans for creator id
         :param creator_info:
@@ -650,7 +672,7 @@ class BilibiliCrawler(AbstractCrawler):
                 utils.logger.info(f"[BilibiliCrawler.get_fans] begin get creator_id: {creator_id} fans ...")
                 await self.bili_client.get_creator_all_fans(
                     creator_info=creator_info,
-                    crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
+                    crawl_interval=self.rate_limiter("detail"),
                     callback=bilibili_store.batch_update_bilibili_creator_fans,
                     max_count=config.CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES,
                 )
@@ -660,7 +682,7 @@ class BilibiliCrawler(AbstractCrawler):
             except Exception as e:
                 utils.logger.error(f"[BilibiliCrawler.get_fans] may be been blocked, err:{e}")
 
-    async def get_followings(self, creator_info: Dict, semaphore: asyncio.Semaphore):
+    async def get_followings(self, creator_info: Dict, semaphore: AdaptiveRateLimiter):
         """
         get followings for creator id
         :param creator_info:
@@ -673,7 +695,7 @@ class BilibiliCrawler(AbstractCrawler):
                 utils.logger.info(f"[BilibiliCrawler.get_followings] begin get creator_id: {creator_id} followings ...")
                 await self.bili_client.get_creator_all_followings(
                     creator_info=creator_info,
-                    crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
+                    crawl_interval=self.rate_limiter("detail"),
                     callback=bilibili_store.batch_update_bilibili_creator_followings,
                     max_count=config.CRAWLER_MAX_CONTACTS_COUNT_SINGLENOTES,
                 )
@@ -683,7 +705,7 @@ class BilibiliCrawler(AbstractCrawler):
             except Exception as e:
                 utils.logger.error(f"[BilibiliCrawler.get_followings] may be been blocked, err:{e}")
 
-    async def get_dynamics(self, creator_info: Dict, semaphore: asyncio.Semaphore):
+    async def get_dynamics(self, creator_info: Dict, semaphore: AdaptiveRateLimiter):
         """
         get dynamics for creator id
         :param creator_info:
@@ -696,7 +718,7 @@ class BilibiliCrawler(AbstractCrawler):
                 utils.logger.info(f"[BilibiliCrawler.get_dynamics] begin get creator_id: {creator_id} dynamics ...")
                 await self.bili_client.get_creator_all_dynamics(
                     creator_info=creator_info,
-                    crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
+                    crawl_interval=self.rate_limiter("detail"),
                     callback=bilibili_store.batch_update_bilibili_creator_dynamics,
                     max_count=config.CRAWLER_MAX_DYNAMICS_COUNT_SINGLENOTES,
                 )
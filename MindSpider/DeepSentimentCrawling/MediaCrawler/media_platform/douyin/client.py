@@ -11,14 +11,18 @@
 import asyncio
 import copy
 import json
+import time
 import urllib.parse
-from typing import Any, Callable, Dict, Union, Optional
+from typing import Any, Callable, Dict, List, Union, Optional
 
 import httpx
 from playwright.async_api import BrowserContext
 
+import config
 from base.base_crawler import AbstractApiClient
 from tools import utils
+from tools.comment_queue import CommentWorkQueue, run_in_queue, save_cursor_when_done
+from tools.rate_limiter import pace
 from var import request_keyword_var
 
 from .exception import *
@@ -43,6 +47,22 @@ class DouYinClient(AbstractApiClient):
         self._host = "https://www.douyin.com"
         self.playwright_page = playwright_page
         self.cookie_dict = cookie_dict
+        # 签名用的会话参数：webid 每个会话生成一次，msToken 缓存 DY_MS_TOKEN_CACHE_SEC 秒
+        self._web_id = get_web_id()
+        self._ms_token: Optional[str] = None
+        self._ms_token_at = 0.0
+
+    async def _get_ms_token(self) -> Optional[str]:
+        """
+        从浏览器 localStorage 读取 msToken 并缓存，避免每个请求都与浏览器往返一次
+        Returns:
+
+        """
+        if self._ms_token is None or time.monotonic() - self._ms_token_at >= config.DY_MS_TOKEN_CACHE_SEC:
+            local_storage: Dict = await self.playwright_page.evaluate("() => window.localStorage")  # type: ignore
+            self._ms_token = local_storage.get("xmst")
+            self._ms_token_at = time.monotonic()
+        return self._ms_token
 
     async def __process_req_params(
         self,
@@ -55,7 +75,6 @@ class DouYinClient(AbstractApiClient):
         if not params:
             return
         headers = headers or self.headers
-        local_storage: Dict = await self.playwright_page.evaluate("() => window.localStorage")  # type: ignore
         common_params = {
             "device_platform": "webapp",
             "aid": "6383",
@@ -81,8 +100,8 @@ class DouYinClient(AbstractApiClient):
             "screen_height": "1440",
             'effective_type': '4g',
             "round_trip_time": "50",
-            "webid": get_web_id(),
-            "msToken": local_storage.get("xmst"),
+            "webid": self._web_id,
+            "msToken": await self._get_ms_token(),
         }
         params.update(common_params)
         query_string = urllib.parse.urlencode(params)
@@ -95,8 +114,7 @@ class DouYinClient(AbstractApiClient):
         params["a_bogus"] = a_bogus
 
     async def request(self, method, url, **kwargs):
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        response = await self.send_request(method, url, timeout=self.timeout, **kwargs)
         try:
             if response.text == "" or response.text == "blocked":
                 utils.logger.error(f"request params incrr, response.text: {response.text}")
@@ -130,6 +148,8 @@ class DouYinClient(AbstractApiClient):
         cookie_str, cookie_dict = utils.convert_cookies(await browser_context.cookies())
         self.headers["Cookie"] = cookie_str
         self.cookie_dict = cookie_dict
+        # 登录状态变化后 msToken 也会更新，下次请求时重新读取
+        self._ms_token = None
 
     async def search_info_by_keyword(
         self,
@@ -222,6 +242,8 @@ class DouYinClient(AbstractApiClient):
         is_fetch_sub_comments=False,
         callback: Optional[Callable] = None,
         max_count: int = 10,
+        start_cursor: int = 0,
+        cursor_callback: Optional[Callable] = None,
     ):
         """
         获取帖子的所有评论，包括子评论
@@ -229,50 +251,79 @@ class DouYinClient(AbstractApiClient):
         :param crawl_interval: 抓取间隔
         :param is_fetch_sub_comments: 是否抓取子评论
         :param callback: 回调函数，用于处理抓取到的评论
-        :param max_count: 一次帖子爬取的最大评论数量
+        :param max_count: 一次帖子爬取的最大评论数量；保存游标时最后一页整页处理，可能略多于该数量
+        :param start_cursor: 起始评论游标，用于从上次爬取的位置继续
+        :param cursor_callback: 全部评论（含二级评论线程）抓取成功后回调 (下一页游标, 是否还有更多)，用于保存增量爬取进度
         :return: 评论列表
         """
         result = []
+        sub_comment_lists = []
         comments_has_more = 1
-        comments_cursor = 0
-        while comments_has_more and len(result) < max_count:
-            comments_res = await self.get_aweme_comments(aweme_id, comments_cursor)
-            comments_has_more = comments_res.get("has_more", 0)
-            comments_cursor = comments_res.get("cursor", 0)
-            comments = comments_res.get("comments", [])
-            if not comments:
-                continue
-            if len(result) + len(comments) > max_count:
-                comments = comments[:max_count - len(result)]
-            result.extend(comments)
-            if callback:  # 如果有回调函数，就执行回调函数
-                await callback(aweme_id, comments)
+        comments_cursor = start_cursor
+        progress = None
+        # 翻页的同时，二级评论线程在队列中并发抓取
+        async with CommentWorkQueue(name=f"dy:{aweme_id}") as queue:
+            while comments_has_more and len(result) < max_count:
+                comments_res = await self.get_aweme_comments(aweme_id, comments_cursor)
+                comments_has_more = comments_res.get("has_more", 0)
+                comments_cursor = comments_res.get("cursor", 0)
+                comments = comments_res.get("comments", [])
+                progress = (comments_cursor, bool(comments_has_more))
+                if not comments:
+                    continue
+                if not cursor_callback and len(result) + len(comments) > max_count:
+                    # 保存游标时不截断：只处理一部分的页面下次会从同一页重新开始，永远翻不过这一页
+                    comments = comments[:max_count - len(result)]
+                result.extend(comments)
+                if callback:  # 如果有回调函数，就执行回调函数
+                    await callback(aweme_id, comments)
+
+                if is_fetch_sub_comments:
+                    # 获取二级评论
+                    sub_comments: List[Dict] = []
+                    sub_comment_lists.append(sub_comments)
+                    parents = [comment for comment in comments if comment.get("reply_comment_total", 0) > 0]
+                    await run_in_queue(queue, self.get_sub_comment_thread, parents, aweme_id, crawl_interval, callback, sub_comments)
+                await pace(crawl_interval)
+        if progress:
+            await save_cursor_when_done(queue, cursor_callback, *progress)
+        for sub_comments in sub_comment_lists:
+            result.extend(sub_comments)
+        return result
 
-            await asyncio.sleep(crawl_interval)
-            if not is_fetch_sub_comments:
+    async def get_sub_comment_thread(
+        self,
+        comment: Dict,
+        aweme_id: str,
+        crawl_interval: float,
+        callback: Optional[Callable],
+        result: List[Dict],
+    ):
+        """
+        翻页抓取一条一级评论下的全部二级评论
+        :param comment: 一级评论
+        :param aweme_id: 帖子ID
+        :param crawl_interval: 抓取间隔或限速器
+        :param callback: 每页二级评论的回调
+        :param result: 收集二级评论的列表
+        :return:
+        """
+        comment_id = comment.get("cid")
+        sub_comments_has_more = 1
+        sub_comments_cursor = 0
+
+        while sub_comments_has_more:
+            await pace(crawl_interval)
+            sub_comments_res = await self.get_sub_comments(aweme_id, comment_id, sub_comments_cursor)
+            sub_comments_has_more = sub_comments_res.get("has_more", 0)
+            sub_comments_cursor = sub_comments_res.get("cursor", 0)
+            sub_comments = sub_comments_res.get("comments", [])
+
+            if not sub_comments:
                 continue
-            # 获取二级评论
-            for comment in comments:
-                reply_comment_total = comment.get("reply_comment_total")
-
-                if reply_comment_total > 0:
-                    comment_id = comment.get("cid")
-                    sub_comments_has_more = 1
-                    sub_comments_cursor = 0
-
-                    while sub_comments_has_more:
-                        sub_comments_res = await self.get_sub_comments(aweme_id, comment_id, sub_comments_cursor)
-                        sub_comments_has_more = sub_comments_res.get("has_more", 0)
-                        sub_comments_cursor = sub_comments_res.get("cursor", 0)
-                        sub_comments = sub_comments_res.get("comments", [])
-
-                        if not sub_comments:
-                            continue
-                        result.extend(sub_comments)
-                        if callback:  # 如果有回调函数，就执行回调函数
-                            await callback(aweme_id, sub_comments)
-                        await asyncio.sleep(crawl_interval)
-        return result
+            result.extend(sub_comments)
+            if callback:  # 如果有回调函数，就执行回调函数
+                await callback(aweme_id, sub_comments)
 
     async def get_user_info(self, sec_user_id: str):
         uri = "/aweme/v1/web/user/profile/other/"
@@ -312,18 +363,17 @@ class DouYinClient(AbstractApiClient):
         return result
 
     async def get_aweme_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            try:
-                response = await client.request("GET", url, timeout=self.timeout, follow_redirects=True)
-                response.raise_for_status()
-                if not response.reason_phrase == "OK":
-                    utils.logger.error(f"[DouYinClient.get_aweme_media] request {url} err, res:{response.text}")
-                    return None
-                else:
-                    return response.content
-            except httpx.HTTPError as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
-                utils.logger.error(f"[DouYinClient.get_aweme_media] {exc.__class__.__name__} for {exc.request.url} - {exc}")  # 保留原始异常类型名称，以便开发者调试
+        try:
+            response = await self.send_request("GET", url, timeout=self.timeout, follow_redirects=True)
+            response.raise_for_status()
+            if not response.reason_phrase == "OK":
+                utils.logger.error(f"[DouYinClient.get_aweme_media] request {url} err, res:{response.text}")
                 return None
+            else:
+                return response.content
+        except httpx.HTTPError as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
+            utils.logger.error(f"[DouYinClient.get_aweme_media] {exc.__class__.__name__} for {exc.request.url} - {exc}")  # 保留原始异常类型名称，以便开发者调试
+            return None
 
     async def resolve_short_url(self, short_url: str) -> str:
         """
@@ -333,19 +383,18 @@ class DouYinClient(AbstractApiClient):
         Returns:
             重定向后的完整URL
         """
-        async with httpx.AsyncClient(proxy=self.proxy, follow_redirects=False) as client:
-            try:
-                utils.logger.info(f"[DouYinClient.resolve_short_url] Resolving short URL: {short_url}")
-                response = await client.get(short_url, timeout=10)
-
-                # 短链接通常返回302重定向
-                if response.status_code in [301, 302, 303, 307, 308]:
-                    redirect_url = response.headers.get("Location", "")
-                    utils.logger.info(f"[DouYinClient.resolve_short_url] Resolved to: {redirect_url}")
-                    return redirect_url
-                else:
-                    utils.logger.warning(f"[DouYinClient.resolve_short_url] Unexpected status code: {response.status_code}")
-                    return ""
-            except Exception as e:
-                utils.logger.error(f"[DouYinClient.resolve_short_url] Failed to resolve short URL: {e}")
+        try:
+            utils.logger.info(f"[DouYinClient.resolve_short_url] Resolving short URL: {short_url}")
+            response = await self.send_request("GET", short_url, timeout=10)
+
+            # 短链接通常返回302重定向
+            if response.status_code in [301, 302, 303, 307, 308]:
+                redirect_url = response.headers.get("Location", "")
+                utils.logger.info(f"[DouYinClient.resolve_short_url] Resolved to: {redirect_url}")
+                return redirect_url
+            else:
+                utils.logger.warning(f"[DouYinClient.resolve_short_url] Unexpected status code: {response.status_code}")
                 return ""
+        except Exception as e:
+            utils.logger.error(f"[DouYinClient.resolve_short_url] Failed to resolve short URL: {e}")
+            return ""
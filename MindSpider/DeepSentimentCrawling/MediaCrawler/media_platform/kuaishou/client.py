@@ -21,6 +21,8 @@ from playwright.async_api import BrowserContext, Page
 import config
 from base.base_crawler import AbstractApiClient
 from tools import utils
+from tools.comment_queue import CommentWorkQueue, run_in_queue
+from tools.rate_limiter import pace
 
 from .exception import DataFetchError
 from .graphql import KuaiShouGraphQL
@@ -45,8 +47,7 @@ class KuaiShouClient(AbstractApiClient):
         self.graphql = KuaiShouGraphQL()
 
     async def request(self, method, url, **kwargs) -> Any:
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        response = await self.send_request(method, url, timeout=self.timeout, **kwargs)
         data: Dict = response.json()
         if data.get("errors"):
             raise DataFetchError(data.get("errors", "unkonw error"))
@@ -194,22 +195,26 @@ class KuaiShouClient(AbstractApiClient):
         """
 
         result = []
+        sub_comment_lists = []
         pcursor = ""
 
-        while pcursor != "no_more" and len(result) < max_count:
-            comments_res = await self.get_video_comments(photo_id, pcursor)
-            vision_commen_list = comments_res.get("visionCommentList", {})
-            pcursor = vision_commen_list.get("pcursor", "")
-            comments = vision_commen_list.get("rootComments", [])
-            if len(result) + len(comments) > max_count:
-                comments = comments[: max_count - len(result)]
-            if callback:  # 如果有回调函数，就执行回调函数
-                await callback(photo_id, comments)
-            result.extend(comments)
-            await asyncio.sleep(crawl_interval)
-            sub_comments = await self.get_comments_all_sub_comments(
-                comments, photo_id, crawl_interval, callback
-            )
+        # 翻页的同时，二级评论线程在队列中并发抓取
+        async with CommentWorkQueue(name=f"ks:{photo_id}") as queue:
+            while pcursor != "no_more" and len(result) < max_count:
+                comments_res = await self.get_video_comments(photo_id, pcursor)
+                vision_commen_list = comments_res.get("visionCommentList", {})
+                pcursor = vision_commen_list.get("pcursor", "")
+                comments = vision_commen_list.get("rootComments", [])
+                if len(result) + len(comments) > max_count:
+                    comments = comments[: max_count - len(result)]
+                if callback:  # 如果有回调函数，就执行回调函数
+                    await callback(photo_id, comments)
+                result.extend(comments)
+                sub_comment_lists.append(await self.get_comments_all_sub_comments(
+                    comments, photo_id, crawl_interval, callback, queue=queue
+                ))
+                await pace(crawl_interval)
+        for sub_comments in sub_comment_lists:
             result.extend(sub_comments)
         return result
 
@@ -219,6 +224,7 @@ class KuaiShouClient(AbstractApiClient):
         photo_id,
         crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
+        queue: Optional[CommentWorkQueue] = None,
     ) -> List[Dict]:
         """
         获取指定一级评论下的所有二级评论, 该方法会一直查找一级评论下的所有二级评论信息
@@ -227,6 +233,7 @@ class KuaiShouClient(AbstractApiClient):
             photo_id: 视频id
             crawl_interval: 爬取一次评论的延迟单位（秒）
             callback: 一次评论爬取结束后
+            queue: 外层的评论任务队列，传入时各二级评论线程提交到该队列，返回的列表在队列退出后才完整
         Returns:
 
         """
@@ -237,31 +244,55 @@ class KuaiShouClient(AbstractApiClient):
             return []
 
         result = []
-        for comment in comments:
-            sub_comments = comment.get("subComments")
-            if sub_comments and callback:
-                await callback(photo_id, sub_comments)
+        await run_in_queue(
+            queue, self.get_sub_comment_thread, comments, photo_id, crawl_interval, callback, result,
+            name="ks sub comments",
+        )
+        return result
+
+    async def get_sub_comment_thread(
+        self,
+        comment: Dict,
+        photo_id: str,
+        crawl_interval: float,
+        callback: Optional[Callable],
+        result: List[Dict],
+    ):
+        """
+        翻页抓取一条一级评论下的全部二级评论
+        Args:
+            comment: 一级评论
+            photo_id: 视频id
+            crawl_interval: 爬取一次评论的延迟单位（秒）或限速器
+            callback: 每页二级评论的回调
+            result: 收集二级评论的列表
 
-            sub_comment_pcursor = comment.get("subCommentsPcursor")
-            if sub_comment_pcursor == "no_more":
-                continue
+        Returns:
 
-            root_comment_id = comment.get("commentId")
-            sub_comment_pcursor = ""
+        """
+        sub_comments = comment.get("subComments")
+        if sub_comments and callback:
+            await callback(photo_id, sub_comments)
 
-            while sub_comment_pcursor != "no_more":
-                comments_res = await self.get_video_sub_comments(
-                    photo_id, root_comment_id, sub_comment_pcursor
-                )
-                vision_sub_comment_list = comments_res.get("visionSubCommentList", {})
-                sub_comment_pcursor = vision_sub_comment_list.get("pcursor", "no_more")
+        sub_comment_pcursor = comment.get("subCommentsPcursor")
+        if sub_comment_pcursor == "no_more":
+            return
 
-                comments = vision_sub_comment_list.get("subComments", {})
-                if callback:
-                    await callback(photo_id, comments)
-                await asyncio.sleep(crawl_interval)
-                result.extend(comments)
-        return result
+        root_comment_id = comment.get("commentId")
+        sub_comment_pcursor = ""
+
+        while sub_comment_pcursor != "no_more":
+            await pace(crawl_interval)
+            comments_res = await self.get_video_sub_comments(
+                photo_id, root_comment_id, sub_comment_pcursor
+            )
+            vision_sub_comment_list = comments_res.get("visionSubCommentList", {})
+            sub_comment_pcursor = vision_sub_comment_list.get("pcursor", "no_more")
+
+            comments = vision_sub_comment_list.get("subComments", {})
+            if callback:
+                await callback(photo_id, comments)
+            result.extend(comments)
 
     async def get_creator_info(self, user_id: str) -> Dict:
         """
@@ -308,6 +339,6 @@ class KuaiShouClient(AbstractApiClient):
 
             if callback:
                 await callback(videos)
-            await asyncio.sleep(crawl_interval)
+            await pace(crawl_interval)
             result.extend(videos)
         return result
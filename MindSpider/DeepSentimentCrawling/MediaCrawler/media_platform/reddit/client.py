@@ -1,9 +1,10 @@
 import httpx
 from typing import Dict, Optional, Any
-import asyncio
-import random
 from loguru import logger
 
+from tools.http_client import PooledAsyncClient
+from tools.rate_limiter import get_rate_limiter, report_response
+
 class RedditClient:
     def __init__(self, proxies: Optional[Dict] = None):
         self.proxies = proxies
@@ -29,56 +30,65 @@ class RedditClient:
         # Session cookies - 有助于绕过某些检测
         self.cookies = {}
         
+        # 复用同一个连接池，长连接的cookie jar也会在请求间自动保留
+        self._http_pool = PooledAsyncClient(
+            timeout=self.timeout,
+            follow_redirects=True,
+            event_hooks={"response": [self._report_rate_limit]},
+        )
+        
         logger.info("[RedditClient] 初始化完成 - 使用增强型浏览器头部（无需OAuth）")
 
+    @property
+    def rate_limiter(self):
+        return get_rate_limiter("reddit", "detail", str(self.proxies) if self.proxies else None)
+
+    async def _report_rate_limit(self, response: httpx.Response):
+        """把响应结果反馈给限速器"""
+        await report_response(self.rate_limiter, response)
+
     async def request(self, method: str, url: str, params: Optional[Dict] = None) -> Dict:
         """
         发送HTTP请求到Reddit JSON端点
         """
-        # 添加随机延迟（2-4秒），避免被识别为机器人
-        delay = random.uniform(2.0, 4.0)
-        await asyncio.sleep(delay)
+        # 按自适应限速器的节奏发送请求，遇到429等限流响应时自动降速，避免被识别为机器人
+        await self.rate_limiter.wait()
         
-        async with httpx.AsyncClient(
-            proxy=self.proxies,  # httpx使用proxy而不是proxies
-            timeout=self.timeout,
-            follow_redirects=True,
-            cookies=self.cookies  # 使用session cookies
-        ) as client:
-            try:
-                logger.info(f"[RedditClient] 请求URL: {url} | 方法: {method} | 参数: {params}")
-                response = await client.request(
-                    method=method,
-                    url=url,
-                    headers=self.headers,
-                    params=params
-                )
-                
-                # 保存cookies用于后续请求
-                if response.cookies:
-                    self.cookies.update(dict(response.cookies))
+        client = await self._http_pool.get(self.proxies)  # httpx使用proxy而不是proxies
+        try:
+            logger.info(f"[RedditClient] 请求URL: {url} | 方法: {method} | 参数: {params}")
+            response = await client.request(
+                method=method,
+                url=url,
+                headers=self.headers,
+                params=params
+            )
+            
+            # 保存cookies用于后续请求
+            if response.cookies:
+                self.cookies.update(dict(response.cookies))
+            
+            logger.info(f"[RedditClient] 响应状态: {response.status_code}")
+            
+            if response.status_code == 200:
+                logger.info(f"[RedditClient] 成功获取数据 (前200字符): {response.text[:200]}")
+                return response.json()
+            elif response.status_code == 403:
+                logger.error(f"[RedditClient] 403错误 - Reddit阻止了请求")
+                logger.error(f"[RedditClient] 响应内容: {response.text[:500]}")
+                logger.warning("[RedditClient] 建议：1) 检查是否开启VPN  2) 更换代理IP  3) 增加请求延迟")
+                raise httpx.HTTPStatusError(f"403 Forbidden", request=response.request, response=response)
+            else:
+                response.raise_for_status()
+                return response.json()
                 
-                logger.info(f"[RedditClient] 响应状态: {response.status_code}")
-                
-                if response.status_code == 200:
-                    logger.info(f"[RedditClient] 成功获取数据 (前200字符): {response.text[:200]}")
-                    return response.json()
-                elif response.status_code == 403:
-                    logger.error(f"[RedditClient] 403错误 - Reddit阻止了请求")
-                    logger.error(f"[RedditClient] 响应内容: {response.text[:500]}")
-                    logger.warning("[RedditClient] 建议：1) 检查是否开启VPN  2) 更换代理IP  3) 增加请求延迟")
-                    raise httpx.HTTPStatusError(f"403 Forbidden", request=response.request, response=response)
-                else:
-                    response.raise_for_status()
-                    return response.json()
-                    
-            except httpx.HTTPStatusError as e:
-                logger.error(f"[RedditClient] HTTP错误: {e.response.status_code}")
-                logger.error(f"[RedditClient] 响应详情: {e.response.text[:500]}")
-                raise
-            except Exception as e:
-                logger.error(f"[RedditClient] 请求失败: {e}")
-                raise
+        except httpx.HTTPStatusError as e:
+            logger.error(f"[RedditClient] HTTP错误: {e.response.status_code}")
+            logger.error(f"[RedditClient] 响应详情: {e.response.text[:500]}")
+            raise
+        except Exception as e:
+            logger.error(f"[RedditClient] 请求失败: {e}")
+            raise
 
     async def search(self, keyword: str, limit: int = 25) -> Dict:
         """
@@ -113,3 +123,7 @@ class RedditClient:
         
         logger.info(f"[RedditClient] 获取帖子评论: {clean_id}")
         return await self.request("GET", url)
+
+    async def close_http_client(self):
+        """关闭长连接客户端"""
+        await self._http_pool.aclose()
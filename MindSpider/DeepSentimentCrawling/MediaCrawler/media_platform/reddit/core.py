@@ -1,5 +1,6 @@
 import asyncio
-from typing import List, Optional, Dict
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Dict
 from datetime import datetime
 
 from base.base_crawler import AbstractCrawler
@@ -9,9 +10,26 @@ from tools.utils import utils
 from var import crawler_type_var, source_keyword_var
 import config
 
+
+@dataclass
+class RedditCrawlConfig:
+    """
+    进程内爬取参数，替代改写 base_config.py 中的 KEYWORDS / CRAWLER_MAX_NOTES_COUNT
+    """
+    keywords: List[str] = field(default_factory=list)
+    max_notes_count: int = 20
+    # 同时搜索的关键词数量，实际请求速率仍由 reddit 的限速器控制
+    max_concurrency: int = 3
+
+
 class RedditCrawler(AbstractCrawler):
-    def __init__(self):
-        self.client = RedditClient()
+    def __init__(self, client: Optional[RedditClient] = None, session_factory: Optional[Callable] = None):
+        """
+        :param client: 复用的 RedditClient，多次爬取共享连接池与 cookie
+        :param session_factory: 返回数据库会话上下文的函数，默认使用 database.db_session.get_session
+        """
+        self.client = client or RedditClient()
+        self.session_factory = session_factory
         self.platform = "reddit"
 
     async def launch_browser(self, chromium, playwright_proxy, user_agent, headless=True):
@@ -40,38 +58,69 @@ class RedditCrawler(AbstractCrawler):
         else:
             pass
 
+    async def crawl(self, crawl_config: RedditCrawlConfig) -> Dict[str, Dict]:
+        """
+        进程内并发爬取多个关键词，不读取也不改写全局配置，可在同一事件循环中被多个调用方同时使用
+        :param crawl_config: 爬取参数
+        :return: {关键词: {"success": bool, "notes_count": int, "error": Optional[str]}}
+        """
+        keywords = [k.strip() for k in crawl_config.keywords if k and k.strip()]
+        semaphore = asyncio.Semaphore(max(1, crawl_config.max_concurrency))
+
+        async def crawl_keyword(keyword: str) -> Dict:
+            async with semaphore:
+                # 每个任务运行在独立的 context 副本中，互不影响
+                source_keyword_var.set(keyword)
+                try:
+                    notes_count = await self.search_keyword(keyword, crawl_config.max_notes_count)
+                    return {"success": True, "notes_count": notes_count, "error": None}
+                except Exception as e:
+                    utils.logger.error(f"[RedditCrawler] Search failed for keyword {keyword}: {e}")
+                    return {"success": False, "notes_count": 0, "error": str(e)}
+
+        results = await asyncio.gather(*(crawl_keyword(keyword) for keyword in keywords))
+        return dict(zip(keywords, results))
+
     async def search(self):
         """
         Search Reddit and map to WeiboNote
         """
         keyword = source_keyword_var.get()
+        try:
+            await self.search_keyword(keyword, config.CRAWLER_MAX_NOTES_COUNT)
+        except Exception as e:
+            utils.logger.error(f"[RedditCrawler] Search failed: {e}")
+
+    async def search_keyword(self, keyword: str, limit: int) -> int:
+        """
+        搜索单个关键词并保存结果
+        :param keyword: 关键词
+        :param limit: 最多获取的帖子数量
+        :return: 保存的帖子数量
+        """
         utils.logger.info(f"[RedditCrawler] Starting search for keyword: {keyword}")
 
-        try:
-            # Fetch data from Reddit
-            search_data = await self.client.search(keyword, limit=config.CRAWLER_MAX_NOTES_COUNT)
-            
-            if not search_data:
-                utils.logger.error(f"[RedditCrawler] Search returned empty response for keyword: {keyword}")
-                return
+        # Fetch data from Reddit
+        search_data = await self.client.search(keyword, limit=limit)
 
-            if 'data' not in search_data or 'children' not in search_data['data']:
-                utils.logger.error(f"[RedditCrawler] Invalid response structure. Keys found: {search_data.keys()}")
-                if 'error' in search_data:
-                    utils.logger.error(f"[RedditCrawler] Reddit Error: {search_data['error']}")
-                return
+        if not search_data:
+            raise ValueError(f"Search returned empty response for keyword: {keyword}")
 
-            posts = search_data['data']['children']
-            utils.logger.info(f"[RedditCrawler] Found {len(posts)} posts for keyword: {keyword}")
+        if 'data' not in search_data or 'children' not in search_data['data']:
+            utils.logger.error(f"[RedditCrawler] Invalid response structure. Keys found: {search_data.keys()}")
+            raise ValueError(f"Reddit Error: {search_data.get('error', 'invalid response structure')}")
 
-            for post in posts:
-                post_data = post['data']
-                await self._process_post(post_data, keyword)
+        posts = search_data['data']['children']
+        utils.logger.info(f"[RedditCrawler] Found {len(posts)} posts for keyword: {keyword}")
 
-        except Exception as e:
-            utils.logger.error(f"[RedditCrawler] Search failed: {e}")
+        saved = 0
+        for post in posts:
+            post_data = post['data']
+            if await self._process_post(post_data, keyword):
+                saved += 1
+        return saved
 
-    async def _process_post(self, post_data: Dict, keyword: str):
+    async def _process_post(self, post_data: Dict, keyword: str) -> bool:
         """
         Process a single Reddit post and save as WeiboNote
         """
@@ -79,7 +128,7 @@ class RedditCrawler(AbstractCrawler):
             # 1. ID Conversion (Base36 -> Base10)
             reddit_id_str = post_data.get('id', '')
             if not reddit_id_str:
-                return
+                return False
             
             # Convert Base36 string to Base10 integer
             # Reddit IDs are like '1j2k3l', we treat them as base36 numbers
@@ -91,7 +140,7 @@ class RedditCrawler(AbstractCrawler):
                 note_id = note_id_int # Store as int for BigInteger column
             except ValueError:
                 utils.logger.error(f"[RedditCrawler] Failed to convert ID {reddit_id_str} to int")
-                return
+                return False
 
             # 2. Content Mapping
             title = post_data.get('title', '')
@@ -109,7 +158,7 @@ class RedditCrawler(AbstractCrawler):
             note.create_time = create_time
             note.create_date_time = create_date_time
             note.liked_count = str(post_data.get('ups', 0))
-            note.comment_count = str(post_data.get('num_comments', 0))
+            note.comments_count = str(post_data.get('num_comments', 0))
             note.shared_count = "0" # Reddit doesn't have exact share count in public API usually
             
             # Author info
@@ -130,9 +179,11 @@ class RedditCrawler(AbstractCrawler):
             # Save to DB
             utils.logger.info(f"[RedditCrawler] Saving post {reddit_id_str} (mapped ID: {note_id})")
             await self._save_note(note)
+            return True
 
         except Exception as e:
             utils.logger.error(f"[RedditCrawler] Error processing post: {e}")
+            return False
 
     async def _save_note(self, note: WeiboNote):
         """
@@ -149,7 +200,7 @@ class RedditCrawler(AbstractCrawler):
         
         # Let's create a helper in store/reddit.py that actually writes to weibo_note table
         from media_platform.reddit.store import update_reddit_note_as_weibo
-        await update_reddit_note_as_weibo(note)
+        await update_reddit_note_as_weibo(note, self.session_factory)
 
     async def get_specified_notes(self):
         pass
@@ -1,15 +1,28 @@
 import asyncio
+from typing import Callable, Optional
+from database.engagement import PUBLISH_TS_COLUMN, normalized_values, source_columns
 from database.models import WeiboNote, WeiboNoteComment
 from sqlalchemy import select
-from database.db_session import get_session
 from tools.utils import utils
 
-async def update_reddit_note_as_weibo(note_item: WeiboNote):
+async def update_reddit_note_as_weibo(note_item: WeiboNote, session_factory: Optional[Callable] = None):
     """
     Save Reddit note mapped as WeiboNote
+    :param session_factory: 返回数据库会话上下文的函数，默认使用 database.db_session.get_session
     """
+    if session_factory is None:
+        from database.db_session import get_session
+        session_factory = get_session
+    # 同步归一化的互动数与发布时间（like_num、publish_ts_ms 等）
+    table_name = WeiboNote.__tablename__
+    values = normalized_values(table_name, {c: getattr(note_item, c) for c in source_columns(table_name)})
+    if PUBLISH_TS_COLUMN in values and values[PUBLISH_TS_COLUMN] is None:
+        # 发布时间无法解析时不覆盖已有值，新数据按抓取时间计（publish_ts_ms 是分区键，不能为空）
+        del values[PUBLISH_TS_COLUMN]
+    for name, value in values.items():
+        setattr(note_item, name, value)
     try:
-        async with get_session() as session:
+        async with session_factory() as session:
             # Check if exists by note_id
             stmt = select(WeiboNote).where(WeiboNote.note_id == note_item.note_id)
             res = await session.execute(stmt)
@@ -21,8 +34,10 @@ async def update_reddit_note_as_weibo(note_item: WeiboNote):
                 # Update fields if necessary, for now we assume note_item has latest content
                 db_note.content = note_item.content
                 db_note.liked_count = note_item.liked_count
-                db_note.comment_count = note_item.comment_count
+                db_note.comments_count = note_item.comments_count
                 db_note.shared_count = note_item.shared_count
+                for name, value in values.items():
+                    setattr(db_note, name, value)
                 db_note.nickname = note_item.nickname
                 db_note.user_id = note_item.user_id
                 db_note.avatar = note_item.avatar
@@ -35,6 +50,8 @@ async def update_reddit_note_as_weibo(note_item: WeiboNote):
                 # Insert new note
                 note_item.add_ts = utils.get_current_timestamp()
                 note_item.last_modify_ts = utils.get_current_timestamp()
+                if note_item.publish_ts_ms is None:
+                    note_item.publish_ts_ms = note_item.add_ts
                 session.add(note_item)
                 utils.logger.info(f"[Store] Note {note_item.note_id} saved.")
             
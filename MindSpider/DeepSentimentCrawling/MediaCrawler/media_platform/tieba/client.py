@@ -10,6 +10,7 @@
 
 import asyncio
 import json
+import time
 from typing import Any, Callable, Dict, List, Optional, Union
 from urllib.parse import urlencode, quote
 
@@ -22,6 +23,7 @@ from base.base_crawler import AbstractApiClient
 from model.m_baidu_tieba import TiebaComment, TiebaCreator, TiebaNote
 from proxy.proxy_ip_pool import ProxyIpPool
 from tools import utils
+from tools.rate_limiter import get_rate_limiter, pace
 
 from .field import SearchNoteType, SearchSortType
 from .help import TieBaExtractor
@@ -80,6 +82,17 @@ class BaiduTieBaClient(AbstractApiClient):
         )
         return response
 
+    def _record_proxy_result(self, proxy: Optional[str], success: bool, latency: Optional[float] = None):
+        """
+        把一次请求的结果回报给代理池
+        Args:
+            proxy: 请求使用的代理
+            success: 是否成功
+            latency: 请求耗时（秒）
+        """
+        if self.ip_pool and proxy:
+            self.ip_pool.record_result(proxy, success, latency)
+
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
     async def request(self, method, url, return_ori_content=False, proxy=None, **kwargs) -> Union[str, Any]:
         """
@@ -96,14 +109,21 @@ class BaiduTieBaClient(AbstractApiClient):
         """
         actual_proxy = proxy if proxy else self.default_ip_proxy
 
-        # 在线程池中执行同步的requests请求
-        response = await asyncio.to_thread(
-            self._sync_request,
-            method,
-            url,
-            actual_proxy,
-            **kwargs
-        )
+        # 在线程池中执行同步的requests请求，结果与耗时计入代理池中该代理的健康分
+        start = time.monotonic()
+        try:
+            response = await asyncio.to_thread(
+                self._sync_request,
+                method,
+                url,
+                actual_proxy,
+                **kwargs
+            )
+        except requests.RequestException:
+            self._record_proxy_result(actual_proxy, False)
+            raise
+        success = response.status_code == 200 and response.text not in ("", "blocked")
+        self._record_proxy_result(actual_proxy, success, time.monotonic() - start if success else None)
 
         if response.status_code != 200:
             utils.logger.error(f"Request failed, method: {method}, url: {url}, status code: {response.status_code}")
@@ -139,6 +159,9 @@ class BaiduTieBaClient(AbstractApiClient):
             return res
         except RetryError as e:
             if self.ip_pool:
+                # 归还被封的代理（失败已逐次记录），换一个健康分最高的代理
+                if self.default_ip_proxy:
+                    self.ip_pool.release_proxy(self.default_ip_proxy, success=None)
                 proxie_model = await self.ip_pool.get_proxy()
                 _, proxy = utils.format_proxy_info(proxie_model)
                 res = await self.request(method="GET", url=f"{self._host}{final_uri}", return_ori_content=return_ori_content, proxy=proxy, **kwargs)
@@ -254,7 +277,7 @@ class BaiduTieBaClient(AbstractApiClient):
             await self.playwright_page.goto(full_url, wait_until="domcontentloaded")
 
             # 等待页面加载,使用配置文件中的延时设置
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+            await get_rate_limiter("tieba", "detail").wait()
 
             # 获取页面HTML内容
             page_content = await self.playwright_page.content()
@@ -291,7 +314,7 @@ class BaiduTieBaClient(AbstractApiClient):
             await self.playwright_page.goto(note_url, wait_until="domcontentloaded")
 
             # 等待页面加载,使用配置文件中的延时设置
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+            await get_rate_limiter("tieba", "detail").wait()
 
             # 获取页面HTML内容
             page_content = await self.playwright_page.content()
@@ -339,7 +362,7 @@ class BaiduTieBaClient(AbstractApiClient):
                 await self.playwright_page.goto(comment_url, wait_until="domcontentloaded")
 
                 # 等待页面加载,使用配置文件中的延时设置
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+                await get_rate_limiter("tieba", "comment").wait()
 
                 # 获取页面HTML内容
                 page_content = await self.playwright_page.content()
@@ -367,7 +390,7 @@ class BaiduTieBaClient(AbstractApiClient):
                     comments, crawl_interval=crawl_interval, callback=callback
                 )
 
-                await asyncio.sleep(crawl_interval)
+                await pace(crawl_interval)
                 current_page += 1
 
             except Exception as e:
@@ -425,7 +448,7 @@ class BaiduTieBaClient(AbstractApiClient):
                     await self.playwright_page.goto(sub_comment_url, wait_until="domcontentloaded")
 
                     # 等待页面加载,使用配置文件中的延时设置
-                    await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+                    await get_rate_limiter("tieba", "comment").wait()
 
                     # 获取页面HTML内容
                     page_content = await self.playwright_page.content()
@@ -446,7 +469,7 @@ class BaiduTieBaClient(AbstractApiClient):
                         await callback(parment_comment.note_id, sub_comments)
 
                     all_sub_comments.extend(sub_comments)
-                    await asyncio.sleep(crawl_interval)
+                    await pace(crawl_interval)
                     current_page += 1
 
                 except Exception as e:
@@ -482,7 +505,7 @@ class BaiduTieBaClient(AbstractApiClient):
             await self.playwright_page.goto(tieba_url, wait_until="domcontentloaded")
 
             # 等待页面加载,使用配置文件中的延时设置
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+            await get_rate_limiter("tieba", "detail").wait()
 
             # 获取页面HTML内容
             page_content = await self.playwright_page.content()
@@ -517,7 +540,7 @@ class BaiduTieBaClient(AbstractApiClient):
             await self.playwright_page.goto(creator_url, wait_until="domcontentloaded")
 
             # 等待页面加载,使用配置文件中的延时设置
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+            await get_rate_limiter("tieba", "detail").wait()
 
             # 获取页面HTML内容
             page_content = await self.playwright_page.content()
@@ -552,7 +575,7 @@ class BaiduTieBaClient(AbstractApiClient):
             await self.playwright_page.goto(creator_url, wait_until="domcontentloaded")
 
             # 等待页面加载,使用配置文件中的延时设置
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
+            await get_rate_limiter("tieba", "detail").wait()
 
             # 获取页面内容(这个接口返回JSON)
             page_content = await self.playwright_page.content()
@@ -622,7 +645,7 @@ class BaiduTieBaClient(AbstractApiClient):
             notes = await asyncio.gather(*note_detail_task)
             if callback:
                 await callback(notes)
-            await asyncio.sleep(crawl_interval)
+            await pace(crawl_interval)
             result.extend(notes)
             page_number += 1
             total_get_count += page_per_count
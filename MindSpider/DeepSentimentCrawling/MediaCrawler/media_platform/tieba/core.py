@@ -29,6 +29,7 @@ from proxy.proxy_ip_pool import IpInfoModel, ProxyIpPool, create_ip_pool
 from store import tieba as tieba_store
 from tools import utils
 from tools.cdp_browser import CDPBrowserManager
+from tools.rate_limiter import AdaptiveRateLimiter
 from var import crawler_type_var, source_keyword_var
 
 from .client import BaiduTieBaClient
@@ -60,10 +61,10 @@ class TieBaCrawler(AbstractCrawler):
             utils.logger.info(
                 "[BaiduTieBaCrawler.start] Begin create ip proxy pool ..."
             )
-            ip_proxy_pool = await create_ip_pool(
+            self.ip_proxy_pool = await create_ip_pool(
                 config.IP_PROXY_POOL_COUNT, enable_validate_ip=True
             )
-            ip_proxy_info: IpInfoModel = await ip_proxy_pool.get_proxy()
+            ip_proxy_info: IpInfoModel = await self.ip_proxy_pool.get_proxy()
             playwright_proxy_format, httpx_proxy_format = utils.format_proxy_info(ip_proxy_info)
             utils.logger.info(
                 f"[BaiduTieBaCrawler.start] Init default ip proxy, value: {httpx_proxy_format}"
@@ -101,7 +102,7 @@ class TieBaCrawler(AbstractCrawler):
             # Create a client to interact with the baidutieba website.
             self.tieba_client = await self.create_tieba_client(
                 httpx_proxy_format,
-                ip_proxy_pool if config.ENABLE_IP_PROXY else None
+                self.ip_proxy_pool if config.ENABLE_IP_PROXY else None
             )
 
             # Check login status and perform login if necessary
@@ -184,8 +185,8 @@ class TieBaCrawler(AbstractCrawler):
                     )
                     
                     # Sleep after page navigation
-                    await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                    utils.logger.info(f"[TieBaCrawler.search] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after page {page}")
+                    await self.rate_limiter("search").wait()
+                    utils.logger.info(f"[TieBaCrawler.search] Rate limited at {self.rate_limiter('search').current_rate:.2f} req/s after page {page}")
                     
                     page += 1
                 except Exception as ex:
@@ -226,8 +227,8 @@ class TieBaCrawler(AbstractCrawler):
                 await self.get_specified_notes([note.note_id for note in note_list])
                 
                 # Sleep after processing notes
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[TieBaCrawler.get_specified_tieba_notes] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after processing notes from page {page_number}")
+                await self.rate_limiter("detail").wait()
+                utils.logger.info(f"[TieBaCrawler.get_specified_tieba_notes] Rate limited at {self.rate_limiter('detail').current_rate:.2f} req/s after processing notes from page {page_number}")
                 
                 page_number += tieba_limit_count
 
@@ -242,7 +243,7 @@ class TieBaCrawler(AbstractCrawler):
         Returns:
 
         """
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.rate_limiter("detail")
         task_list = [
             self.get_note_detail_async_task(note_id=note_id, semaphore=semaphore)
             for note_id in note_id_list
@@ -256,7 +257,7 @@ class TieBaCrawler(AbstractCrawler):
         await self.batch_get_note_comments(note_details_model)
 
     async def get_note_detail_async_task(
-        self, note_id: str, semaphore: asyncio.Semaphore
+        self, note_id: str, semaphore: AdaptiveRateLimiter
     ) -> Optional[TiebaNote]:
         """
         Get note detail
@@ -275,8 +276,8 @@ class TieBaCrawler(AbstractCrawler):
                 note_detail: TiebaNote = await self.tieba_client.get_note_by_id(note_id)
                 
                 # Sleep after fetching note details
-                await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-                utils.logger.info(f"[TieBaCrawler.get_note_detail_async_task] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds after fetching note details {note_id}")
+                await self.rate_limiter("detail").wait()
+                utils.logger.info(f"[TieBaCrawler.get_note_detail_async_task] Rate limited at {self.rate_limiter('detail').current_rate:.2f} req/s after fetching note details {note_id}")
                 
                 if not note_detail:
                     utils.logger.error(
@@ -307,7 +308,7 @@ class TieBaCrawler(AbstractCrawler):
         if not config.ENABLE_GET_COMMENTS:
             return
 
-        semaphore = asyncio.Semaphore(config.MAX_CONCURRENCY_NUM)
+        semaphore = self.rate_limiter("comment")
         task_list: List[Task] = []
         for note_detail in note_detail_list:
             task = asyncio.create_task(
@@ -318,7 +319,7 @@ class TieBaCrawler(AbstractCrawler):
         await asyncio.gather(*task_list)
 
     async def get_comments_async_task(
-        self, note_detail: TiebaNote, semaphore: asyncio.Semaphore
+        self, note_detail: TiebaNote, semaphore: AdaptiveRateLimiter
     ):
         """
         Get comments async task
@@ -335,12 +336,12 @@ class TieBaCrawler(AbstractCrawler):
             )
             
             # Sleep before fetching comments
-            await asyncio.sleep(config.CRAWLER_MAX_SLEEP_SEC)
-            utils.logger.info(f"[TieBaCrawler.get_comments_async_task] Sleeping for {config.CRAWLER_MAX_SLEEP_SEC} seconds before fetching comments for note {note_detail.note_id}")
+            await self.rate_limiter("comment").wait()
+            utils.logger.info(f"[TieBaCrawler.get_comments_async_task] Rate limited at {self.rate_limiter('comment').current_rate:.2f} req/s before fetching comments for note {note_detail.note_id}")
             
             await self.tieba_client.get_note_all_comments(
                 note_detail=note_detail,
-                crawl_interval=config.CRAWLER_MAX_SLEEP_SEC,
+                crawl_interval=self.rate_limiter("comment"),
                 callback=tieba_store.batch_update_tieba_note_comments,
                 max_count=config.CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES,
             )
@@ -662,6 +663,8 @@ class TieBaCrawler(AbstractCrawler):
         Returns:
 
         """
+        # 关闭API客户端复用的HTTP连接池
+        await super().close()
         # 如果使用CDP模式，需要特殊处理
         if self.cdp_manager:
             await self.cdp_manager.cleanup()
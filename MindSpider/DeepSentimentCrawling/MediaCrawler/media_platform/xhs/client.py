@@ -21,6 +21,8 @@ from tenacity import retry, stop_after_attempt, wait_fixed
 import config
 from base.base_crawler import AbstractApiClient
 from tools import utils
+from tools.comment_queue import CommentWorkQueue, run_in_queue, save_cursor_when_done
+from tools.rate_limiter import pace
 
 
 from .exception import DataFetchError, IPBlockError
@@ -96,8 +98,7 @@ class XiaoHongShuClient(AbstractApiClient):
         """
         # return response.text
         return_response = kwargs.pop("return_response", False)
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        response = await self.send_request(method, url, timeout=self.timeout, **kwargs)
 
         if response.status_code == 471 or response.status_code == 461:
             # someday someone maybe will bypass captcha
@@ -113,6 +114,8 @@ class XiaoHongShuClient(AbstractApiClient):
         if data["success"]:
             return data.get("data", data.get("success", {}))
         elif data["code"] == self.IP_ERROR_CODE:
+            # IP 被限制时响应状态码仍为 200，需要单独计为代理的失败
+            await self.report_proxy_result(getattr(self, "proxy", None), success=False)
             raise IPBlockError(self.IP_ERROR_STR)
         else:
             raise DataFetchError(data.get("msg", None))
@@ -156,24 +159,23 @@ class XiaoHongShuClient(AbstractApiClient):
         )
 
     async def get_note_media(self, url: str) -> Union[bytes, None]:
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            try:
-                response = await client.request("GET", url, timeout=self.timeout)
-                response.raise_for_status()
-                if not response.reason_phrase == "OK":
-                    utils.logger.error(
-                        f"[XiaoHongShuClient.get_note_media] request {url} err, res:{response.text}"
-                    )
-                    return None
-                else:
-                    return response.content
-            except (
-                httpx.HTTPError
-            ) as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
+        try:
+            response = await self.send_request("GET", url, timeout=self.timeout)
+            response.raise_for_status()
+            if not response.reason_phrase == "OK":
                 utils.logger.error(
-                    f"[XiaoHongShuClient.get_aweme_media] {exc.__class__.__name__} for {exc.request.url} - {exc}"
-                )  # 保留原始异常类型名称，以便开发者调试
+                    f"[XiaoHongShuClient.get_note_media] request {url} err, res:{response.text}"
+                )
                 return None
+            else:
+                return response.content
+        except (
+            httpx.HTTPError
+        ) as exc:  # some wrong when call httpx.request method, such as connection error, client error, server error or response status code is not 2xx
+            utils.logger.error(
+                f"[XiaoHongShuClient.get_aweme_media] {exc.__class__.__name__} for {exc.request.url} - {exc}"
+            )  # 保留原始异常类型名称，以便开发者调试
+            return None
 
     async def pong(self) -> bool:
         """
@@ -342,6 +344,8 @@ class XiaoHongShuClient(AbstractApiClient):
         crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
         max_count: int = 10,
+        start_cursor: str = "",
+        cursor_callback: Optional[Callable] = None,
     ) -> List[Dict]:
         """
         获取指定笔记下的所有一级评论，该方法会一直查找一个帖子下的所有评论信息
@@ -350,37 +354,49 @@ class XiaoHongShuClient(AbstractApiClient):
             xsec_token: 验证token
             crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后
-            max_count: 一次笔记爬取的最大评论数量
+            max_count: 一次笔记爬取的最大评论数量；保存游标时最后一页整页处理，可能略多于该数量
+            start_cursor: 起始评论游标，用于从上次爬取的位置继续
+            cursor_callback: 全部评论（含二级评论线程）抓取成功后回调 (下一页游标, 是否还有更多)，用于保存增量爬取进度
         Returns:
 
         """
         result = []
+        sub_comment_lists = []
         comments_has_more = True
-        comments_cursor = ""
-        while comments_has_more and len(result) < max_count:
-            comments_res = await self.get_note_comments(
-                note_id=note_id, xsec_token=xsec_token, cursor=comments_cursor
-            )
-            comments_has_more = comments_res.get("has_more", False)
-            comments_cursor = comments_res.get("cursor", "")
-            if "comments" not in comments_res:
-                utils.logger.info(
-                    f"[XiaoHongShuClient.get_note_all_comments] No 'comments' key found in response: {comments_res}"
+        comments_cursor = start_cursor
+        progress = None
+        # 翻页的同时，二级评论线程在队列中并发抓取
+        async with CommentWorkQueue(name=f"xhs:{note_id}") as queue:
+            while comments_has_more and len(result) < max_count:
+                comments_res = await self.get_note_comments(
+                    note_id=note_id, xsec_token=xsec_token, cursor=comments_cursor
                 )
-                break
-            comments = comments_res["comments"]
-            if len(result) + len(comments) > max_count:
-                comments = comments[: max_count - len(result)]
-            if callback:
-                await callback(note_id, comments)
-            await asyncio.sleep(crawl_interval)
-            result.extend(comments)
-            sub_comments = await self.get_comments_all_sub_comments(
-                comments=comments,
-                xsec_token=xsec_token,
-                crawl_interval=crawl_interval,
-                callback=callback,
-            )
+                comments_has_more = comments_res.get("has_more", False)
+                comments_cursor = comments_res.get("cursor", "")
+                if "comments" not in comments_res:
+                    utils.logger.info(
+                        f"[XiaoHongShuClient.get_note_all_comments] No 'comments' key found in response: {comments_res}"
+                    )
+                    break
+                comments = comments_res["comments"]
+                if not cursor_callback and len(result) + len(comments) > max_count:
+                    # 保存游标时不截断：只处理一部分的页面下次会从同一页重新开始，永远翻不过这一页
+                    comments = comments[: max_count - len(result)]
+                if callback:
+                    await callback(note_id, comments)
+                progress = (comments_cursor, comments_has_more)
+                result.extend(comments)
+                sub_comment_lists.append(await self.get_comments_all_sub_comments(
+                    comments=comments,
+                    xsec_token=xsec_token,
+                    crawl_interval=crawl_interval,
+                    callback=callback,
+                    queue=queue,
+                ))
+                await pace(crawl_interval)
+        if progress:
+            await save_cursor_when_done(queue, cursor_callback, *progress)
+        for sub_comments in sub_comment_lists:
             result.extend(sub_comments)
         return result
 
@@ -390,6 +406,7 @@ class XiaoHongShuClient(AbstractApiClient):
         xsec_token: str,
         crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
+        queue: Optional[CommentWorkQueue] = None,
     ) -> List[Dict]:
         """
         获取指定一级评论下的所有二级评论, 该方法会一直查找一级评论下的所有二级评论信息
@@ -398,6 +415,7 @@ class XiaoHongShuClient(AbstractApiClient):
             xsec_token: 验证token
             crawl_interval: 爬取一次评论的延迟单位（秒）
             callback: 一次评论爬取结束后
+            queue: 外层的评论任务队列，传入时各二级评论线程提交到该队列，返回的列表在队列退出后才完整
 
         Returns:
 
@@ -409,47 +427,68 @@ class XiaoHongShuClient(AbstractApiClient):
             return []
 
         result = []
-        for comment in comments:
-            note_id = comment.get("note_id")
-            sub_comments = comment.get("sub_comments")
-            if sub_comments and callback:
-                await callback(note_id, sub_comments)
-
-            sub_comment_has_more = comment.get("sub_comment_has_more")
-            if not sub_comment_has_more:
-                continue
-
-            root_comment_id = comment.get("id")
-            sub_comment_cursor = comment.get("sub_comment_cursor")
-
-            while sub_comment_has_more:
-                comments_res = await self.get_note_sub_comments(
-                    note_id=note_id,
-                    root_comment_id=root_comment_id,
-                    xsec_token=xsec_token,
-                    num=10,
-                    cursor=sub_comment_cursor,
-                )
-
-                if comments_res is None:
-                    utils.logger.info(
-                        f"[XiaoHongShuClient.get_comments_all_sub_comments] No response found for note_id: {note_id}"
-                    )
-                    continue
-                sub_comment_has_more = comments_res.get("has_more", False)
-                sub_comment_cursor = comments_res.get("cursor", "")
-                if "comments" not in comments_res:
-                    utils.logger.info(
-                        f"[XiaoHongShuClient.get_comments_all_sub_comments] No 'comments' key found in response: {comments_res}"
-                    )
-                    break
-                comments = comments_res["comments"]
-                if callback:
-                    await callback(note_id, comments)
-                await asyncio.sleep(crawl_interval)
-                result.extend(comments)
+        await run_in_queue(
+            queue, self.get_sub_comment_thread, comments, xsec_token, crawl_interval, callback, result,
+            name="xhs sub comments",
+        )
         return result
 
+    async def get_sub_comment_thread(
+        self,
+        comment: Dict,
+        xsec_token: str,
+        crawl_interval: float,
+        callback: Optional[Callable],
+        result: List[Dict],
+    ):
+        """
+        翻页抓取一条一级评论下的全部二级评论
+        Args:
+            comment: 一级评论
+            xsec_token: 验证token
+            crawl_interval: 爬取一次评论的延迟单位（秒）或限速器
+            callback: 每页二级评论的回调
+            result: 收集二级评论的列表
+
+        Returns:
+
+        """
+        note_id = comment.get("note_id")
+        sub_comments = comment.get("sub_comments")
+        if sub_comments and callback:
+            await callback(note_id, sub_comments)
+
+        sub_comment_has_more = comment.get("sub_comment_has_more")
+        root_comment_id = comment.get("id")
+        sub_comment_cursor = comment.get("sub_comment_cursor")
+
+        while sub_comment_has_more:
+            await pace(crawl_interval)
+            comments_res = await self.get_note_sub_comments(
+                note_id=note_id,
+                root_comment_id=root_comment_id,
+                xsec_token=xsec_token,
+                num=10,
+                cursor=sub_comment_cursor,
+            )
+
+            if comments_res is None:
+                utils.logger.info(
+                    f"[XiaoHongShuClient.get_comments_all_sub_comments] No response found for note_id: {note_id}"
+                )
+                break
+            sub_comment_has_more = comments_res.get("has_more", False)
+            sub_comment_cursor = comments_res.get("cursor", "")
+            if "comments" not in comments_res:
+                utils.logger.info(
+                    f"[XiaoHongShuClient.get_comments_all_sub_comments] No 'comments' key found in response: {comments_res}"
+                )
+                break
+            comments = comments_res["comments"]
+            if callback:
+                await callback(note_id, comments)
+            result.extend(comments)
+
     async def get_creator_info(
         self, user_id: str, xsec_token: str = "", xsec_source: str = ""
     ) -> Dict:
@@ -549,7 +588,7 @@ class XiaoHongShuClient(AbstractApiClient):
                 await callback(notes_to_add)
 
             result.extend(notes_to_add)
-            await asyncio.sleep(crawl_interval)
+            await pace(crawl_interval)
 
         utils.logger.info(
             f"[XiaoHongShuClient.get_all_notes_by_creator] Finished getting notes for user {user_id}, total: {len(result)}"
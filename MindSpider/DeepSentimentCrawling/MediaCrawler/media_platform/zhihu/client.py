@@ -24,10 +24,12 @@ from base.base_crawler import AbstractApiClient
 from constant import zhihu as zhihu_constant
 from model.m_zhihu import ZhihuComment, ZhihuContent, ZhihuCreator
 from tools import utils
+from tools.comment_queue import CommentWorkQueue, run_in_queue
+from tools.rate_limiter import pace
 
 from .exception import DataFetchError, ForbiddenError
 from .field import SearchSort, SearchTime, SearchType
-from .help import ZhihuExtractor, sign
+from .help import ZhihuExtractor, async_sign
 
 
 class ZhiHuClient(AbstractApiClient):
@@ -58,7 +60,7 @@ class ZhiHuClient(AbstractApiClient):
         d_c0 = self.cookie_dict.get("d_c0")
         if not d_c0:
             raise Exception("d_c0 not found in cookies")
-        sign_res = sign(url, self.default_headers["cookie"])
+        sign_res = await async_sign(url, self.default_headers["cookie"])
         headers = self.default_headers.copy()
         headers['x-zst-81'] = sign_res["x-zst-81"]
         headers['x-zse-96'] = sign_res["x-zse-96"]
@@ -79,8 +81,7 @@ class ZhiHuClient(AbstractApiClient):
         # return response.text
         return_response = kwargs.pop('return_response', False)
 
-        async with httpx.AsyncClient(proxy=self.proxy) as client:
-            response = await client.request(method, url, timeout=self.timeout, **kwargs)
+        response = await self.send_request(method, url, timeout=self.timeout, **kwargs)
 
         if response.status_code != 200:
             utils.logger.error(f"[ZhiHuClient.request] Requset Url: {url}, Request error: {response.text}")
@@ -281,24 +282,26 @@ class ZhiHuClient(AbstractApiClient):
         is_end: bool = False
         offset: str = ""
         limit: int = 10
-        while not is_end:
-            root_comment_res = await self.get_root_comments(content.content_id, content.content_type, offset, limit)
-            if not root_comment_res:
-                break
-            paging_info = root_comment_res.get("paging", {})
-            is_end = paging_info.get("is_end")
-            offset = self._extractor.extract_offset(paging_info)
-            comments = self._extractor.extract_comments(content, root_comment_res.get("data"))
+        # 翻页的同时，子评论线程在队列中并发抓取
+        async with CommentWorkQueue(name=f"zhihu:{content.content_id}") as queue:
+            while not is_end:
+                root_comment_res = await self.get_root_comments(content.content_id, content.content_type, offset, limit)
+                if not root_comment_res:
+                    break
+                paging_info = root_comment_res.get("paging", {})
+                is_end = paging_info.get("is_end")
+                offset = self._extractor.extract_offset(paging_info)
+                comments = self._extractor.extract_comments(content, root_comment_res.get("data"))
 
-            if not comments:
-                break
+                if not comments:
+                    break
 
-            if callback:
-                await callback(comments)
+                if callback:
+                    await callback(comments)
 
-            result.extend(comments)
-            await self.get_comments_all_sub_comments(content, comments, crawl_interval=crawl_interval, callback=callback)
-            await asyncio.sleep(crawl_interval)
+                result.extend(comments)
+                await self.get_comments_all_sub_comments(content, comments, crawl_interval=crawl_interval, callback=callback, queue=queue)
+                await pace(crawl_interval)
         return result
 
     async def get_comments_all_sub_comments(
@@ -307,6 +310,7 @@ class ZhiHuClient(AbstractApiClient):
         comments: List[ZhihuComment],
         crawl_interval: float = 1.0,
         callback: Optional[Callable] = None,
+        queue: Optional[CommentWorkQueue] = None,
     ) -> List[ZhihuComment]:
         """
         获取指定评论下的所有子评论
@@ -315,6 +319,7 @@ class ZhiHuClient(AbstractApiClient):
             comments: 评论列表
             crawl_interval: 爬取一次笔记的延迟单位（秒）
             callback: 一次笔记爬取结束后
+            queue: 外层的评论任务队列，传入时各子评论线程提交到该队列，返回的列表在队列退出后才完整
 
         Returns:
 
@@ -323,31 +328,53 @@ class ZhiHuClient(AbstractApiClient):
             return []
 
         all_sub_comments: List[ZhihuComment] = []
-        for parment_comment in comments:
-            if parment_comment.sub_comment_count == 0:
-                continue
+        parents = [comment for comment in comments if comment.sub_comment_count != 0]
+        await run_in_queue(
+            queue, self.get_sub_comment_thread, parents, content, crawl_interval, callback, all_sub_comments,
+            name="zhihu sub comments",
+        )
+        return all_sub_comments
 
-            is_end: bool = False
-            offset: str = ""
-            limit: int = 10
-            while not is_end:
-                child_comment_res = await self.get_child_comments(parment_comment.comment_id, offset, limit)
-                if not child_comment_res:
-                    break
-                paging_info = child_comment_res.get("paging", {})
-                is_end = paging_info.get("is_end")
-                offset = self._extractor.extract_offset(paging_info)
-                sub_comments = self._extractor.extract_comments(content, child_comment_res.get("data"))
+    async def get_sub_comment_thread(
+        self,
+        parment_comment: ZhihuComment,
+        content: ZhihuContent,
+        crawl_interval: float,
+        callback: Optional[Callable],
+        result: List[ZhihuComment],
+    ):
+        """
+        翻页抓取一条评论下的全部子评论
+        Args:
+            parment_comment: 父评论
+            content: 内容详情对象(问题｜文章｜视频)
+            crawl_interval: 爬取一次笔记的延迟单位（秒）或限速器
+            callback: 每页子评论的回调
+            result: 收集子评论的列表
 
-                if not sub_comments:
-                    break
+        Returns:
 
-                if callback:
-                    await callback(sub_comments)
+        """
+        is_end: bool = False
+        offset: str = ""
+        limit: int = 10
+        while not is_end:
+            await pace(crawl_interval)
+            child_comment_res = await self.get_child_comments(parment_comment.comment_id, offset, limit)
+            if not child_comment_res:
+                break
+            paging_info = child_comment_res.get("paging", {})
+            is_end = paging_info.get("is_end")
+            offset = self._extractor.extract_offset(paging_info)
+            sub_comments = self._extractor.extract_comments(content, child_comment_res.get("data"))
 
-                all_sub_comments.extend(sub_comments)
-                await asyncio.sleep(crawl_interval)
-        return all_sub_comments
+            if not sub_comments:
+                break
+
+            if callback:
+                await callback(sub_comments)
+
+            result.extend(sub_comments)
 
     async def get_creator_info(self, url_token: str) -> Optional[ZhihuCreator]:
         """
@@ -452,7 +479,7 @@ class ZhiHuClient(AbstractApiClient):
                 await callback(contents)
             all_contents.extend(contents)
             offset += limit
-            await asyncio.sleep(crawl_interval)
+            await pace(crawl_interval)
         return all_contents
 
     async def get_all_articles_by_creator(
@@ -486,7 +513,7 @@ class ZhiHuClient(AbstractApiClient):
                 await callback(contents)
             all_contents.extend(contents)
             offset += limit
-            await asyncio.sleep(crawl_interval)
+            await pace(crawl_interval)
         return all_contents
 
     async def get_all_videos_by_creator(
@@ -520,7 +547,7 @@ class ZhiHuClient(AbstractApiClient):
                 await callback(contents)
             all_contents.extend(contents)
             offset += limit
-            await asyncio.sleep(crawl_interval)
+            await pace(crawl_interval)
         return all_contents
 
     async def get_answer_info(
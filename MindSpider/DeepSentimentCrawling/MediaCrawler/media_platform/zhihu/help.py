@@ -14,15 +14,13 @@ import json
 from typing import Dict, List, Optional
 from urllib.parse import parse_qs, urlparse
 
-import execjs
 from parsel import Selector
 
 from constant import zhihu as zhihu_constant
 from model.m_zhihu import ZhihuComment, ZhihuContent, ZhihuCreator
 from tools import utils
 from tools.crawler_util import extract_text_from_html
-
-ZHIHU_SGIN_JS = None
+from tools.js_runtime import get_js_runtime
 
 
 def sign(url: str, cookies: str) -> Dict:
@@ -35,12 +33,21 @@ def sign(url: str, cookies: str) -> Dict:
     Returns:
 
     """
-    global ZHIHU_SGIN_JS
-    if not ZHIHU_SGIN_JS:
-        with open("libs/zhihu.js", mode="r", encoding="utf-8-sig") as f:
-            ZHIHU_SGIN_JS = execjs.compile(f.read())
+    # 签名脚本常驻在 node 进程中，只编译一次
+    return get_js_runtime("libs/zhihu.js").call("get_sign", url, cookies)
+
+
+async def async_sign(url: str, cookies: str) -> Dict:
+    """
+    异步的 zhihu 签名，在线程池中等待 node 进程返回，不阻塞事件循环
+    Args:
+        url: request url with query string
+        cookies: request cookies with d_c0 key
 
-    return ZHIHU_SGIN_JS.call("get_sign", url, cookies)
+    Returns:
+
+    """
+    return await get_js_runtime("libs/zhihu.js").acall("get_sign", url, cookies)
 
 
 class ZhihuExtractor:
@@ -12,8 +12,12 @@
 # @Author  : relakkes@gmail.com
 # @Time    : 2023/12/2 13:45
 # @Desc    : ip代理池实现
-import random
-from typing import Dict, List
+#            每个代理记录成功率、延迟与过期时间，按健康分租借（get_proxy）与归还（release_proxy）；
+#            后台并发验证代理、清理过期IP，并在可用代理不足前提前从代理商补充，连续失败的IP会被隔离
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
 
 import httpx
 from tenacity import retry, stop_after_attempt, wait_fixed
@@ -24,36 +28,135 @@ from proxy.providers import (
     new_wandou_http_proxy,
 )
 from tools import utils
+from tools.http_client import create_async_client
 
 from .base_proxy import ProxyProvider
 from .types import IpInfoModel, ProviderNameEnum
 
+# 延迟的指数滑动平均系数
+_LATENCY_ALPHA = 0.3
+
+
+def proxy_key(proxy: Union[IpInfoModel, str]) -> str:
+    """
+    代理的唯一标识 ip:port，支持 IpInfoModel 或 httpx 代理地址
+    :param proxy:
+    :return:
+    """
+    if isinstance(proxy, IpInfoModel):
+        return f"{proxy.ip}:{proxy.port}"
+    url = httpx.URL(proxy)
+    return f"{url.host}:{url.port}"
+
+
+@dataclass
+class ProxyHealth:
+    """单个代理的健康状态"""
+
+    proxy: IpInfoModel
+    expire_at: Optional[float] = None
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    latency: Optional[float] = None
+    valid: Optional[bool] = None  # None 表示尚未验证
+    checked_at: float = 0.0
+    leased: bool = False
+    quarantined_until: float = 0.0
+    quarantine_count: int = 0
+
+    @property
+    def score(self) -> float:
+        """健康分：平滑后的成功率除以延迟，越高越好"""
+        success_rate = (self.successes + 1) / (self.successes + self.failures + 2)
+        latency = self.latency if self.latency is not None else 1.0
+        return success_rate / (1 + latency)
+
+    def is_expired(self, now: float) -> bool:
+        return self.expire_at is not None and self.expire_at - now < config.IP_PROXY_EXPIRE_MARGIN_SEC
+
+    def is_quarantined(self, now: float) -> bool:
+        return self.quarantined_until > now
+
+    def record(self, success: bool, latency: Optional[float] = None):
+        """记录一次使用或验证的结果"""
+        if latency is not None:
+            self.latency = latency if self.latency is None else (
+                _LATENCY_ALPHA * latency + (1 - _LATENCY_ALPHA) * self.latency
+            )
+        if success:
+            self.successes += 1
+            self.consecutive_failures = 0
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= config.IP_PROXY_MAX_FAILURES:
+            self.quarantine()
+
+    def quarantine(self):
+        """隔离代理，多次被隔离时隔离时间翻倍；隔离结束后需重新验证"""
+        self.quarantined_until = time.time() + config.IP_PROXY_QUARANTINE_SEC * (2 ** self.quarantine_count)
+        self.quarantine_count += 1
+        self.consecutive_failures = 0
+        self.valid = None
+        utils.logger.warning(
+            f"[ProxyIpPool] quarantine proxy {proxy_key(self.proxy)} until "
+            f"{time.strftime('%H:%M:%S', time.localtime(self.quarantined_until))}"
+        )
+
 
 class ProxyIpPool:
 
     def __init__(
-        self, ip_pool_count: int, enable_validate_ip: bool, ip_provider: ProxyProvider
+        self, ip_pool_count: int, enable_validate_ip: bool, ip_provider: ProxyProvider,
+        valid_ip_url: Optional[str] = None,
     ) -> None:
         """
 
         Args:
-            ip_pool_count:
-            enable_validate_ip:
-            ip_provider:
+            ip_pool_count: 每次从代理商提取的IP数量
+            enable_validate_ip: 是否验证IP可用后才分配
+            ip_provider: 代理商
+            valid_ip_url: 验证 IP 是否有效的地址，默认 IP_PROXY_VALIDATE_URL
         """
-        self.valid_ip_url = "https://echo.apifox.cn/"  # 验证 IP 是否有效的地址
+        self.valid_ip_url = valid_ip_url or config.IP_PROXY_VALIDATE_URL
         self.ip_pool_count = ip_pool_count
         self.enable_validate_ip = enable_validate_ip
-        self.proxy_list: List[IpInfoModel] = []
         self.ip_provider: ProxyProvider = ip_provider
+        self.proxies: Dict[str, ProxyHealth] = {}
+        self._load_lock = asyncio.Lock()
+        self._prefetch_task: Optional[asyncio.Task] = None
+        self._maintain_task: Optional[asyncio.Task] = None
+
+    @property
+    def proxy_list(self) -> List[IpInfoModel]:
+        """当前可分配的代理"""
+        return [health.proxy for health in self._available()]
 
     async def load_proxies(self) -> None:
         """
-        加载IP代理
+        从代理商提取IP加入代理池，开启验证时并发验证新加入的IP
         Returns:
 
         """
-        self.proxy_list = await self.ip_provider.get_proxy(self.ip_pool_count)
+        async with self._load_lock:
+            fetched = await self.ip_provider.get_proxy(self.ip_pool_count)
+            now = time.time()
+            new_proxies: List[ProxyHealth] = []
+            for proxy in fetched:
+                key = proxy_key(proxy)
+                if key in self.proxies:
+                    continue
+                expire_at = None
+                if proxy.expired_time_ts:
+                    # 部分代理商返回剩余秒数，部分返回过期的时间戳
+                    expire_at = proxy.expired_time_ts if proxy.expired_time_ts > 10 ** 9 else now + proxy.expired_time_ts
+                health = ProxyHealth(proxy=proxy, expire_at=expire_at)
+                self.proxies[key] = health
+                new_proxies.append(health)
+            utils.logger.info(f"[ProxyIpPool.load_proxies] load {len(new_proxies)} new proxies, pool size {len(self.proxies)}")
+        if self.enable_validate_ip:
+            await self.validate_proxies(new_proxies)
 
     async def _is_valid_proxy(self, proxy: IpInfoModel) -> bool:
         """
@@ -64,51 +167,168 @@ class ProxyIpPool:
         utils.logger.info(
             f"[ProxyIpPool._is_valid_proxy] testing {proxy.ip} is it valid "
         )
+        _, proxy_url = utils.format_proxy_info(proxy)
         try:
-            # httpx 0.28.1 需要直接传入代理URL字符串，而不是字典
-            if proxy.user and proxy.password:
-                proxy_url = f"http://{proxy.user}:{proxy.password}@{proxy.ip}:{proxy.port}"
-            else:
-                proxy_url = f"http://{proxy.ip}:{proxy.port}"
-            
-            async with httpx.AsyncClient(proxy=proxy_url) as client:
+            # 每个待验证代理各自建立连接，验证完即关闭
+            async with create_async_client(proxy=proxy_url, timeout=config.IP_PROXY_VALIDATE_TIMEOUT) as client:
                 response = await client.get(self.valid_ip_url)
-            if response.status_code == 200:
-                return True
-            else:
-                return False
+            return response.status_code == 200
         except Exception as e:
             utils.logger.info(
                 f"[ProxyIpPool._is_valid_proxy] testing {proxy.ip} err: {e}"
             )
-            raise e
+            return False
+
+    async def validate_proxies(self, proxies: List[ProxyHealth]) -> None:
+        """
+        并发验证代理，记录验证结果与延迟
+        :param proxies:
+        :return:
+        """
+
+        async def validate(health: ProxyHealth):
+            start = time.monotonic()
+            valid = await self._is_valid_proxy(health.proxy)
+            health.valid = valid
+            health.checked_at = time.time()
+            health.record(valid, time.monotonic() - start if valid else None)
+
+        await asyncio.gather(*[validate(health) for health in proxies])
+
+    def _available(self) -> List[ProxyHealth]:
+        """未被租借、未隔离、未过期且（开启验证时）验证通过的代理"""
+        now = time.time()
+        return [
+            health for health in self.proxies.values()
+            if not health.leased
+            and not health.is_quarantined(now)
+            and not health.is_expired(now)
+            and (health.valid or (not self.enable_validate_ip and health.valid is None))
+        ]
+
+    def _drop_expired(self):
+        now = time.time()
+        for key, health in list(self.proxies.items()):
+            if health.is_expired(now) and not health.leased:
+                del self.proxies[key]
 
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
     async def get_proxy(self) -> IpInfoModel:
         """
-        从代理池中随机提取一个代理IP
+        租借健康分最高的可用代理，使用结束后调用 release_proxy 归还
         :return:
         """
-        if len(self.proxy_list) == 0:
+        self._drop_expired()
+        available = self._available()
+        if not available:
             await self._reload_proxies()
-
-        proxy = random.choice(self.proxy_list)
-        self.proxy_list.remove(proxy)  # 取出来一个IP就应该移出掉
-        if self.enable_validate_ip:
-            if not await self._is_valid_proxy(proxy):
+            available = self._available()
+            if not available:
                 raise Exception(
-                    "[ProxyIpPool.get_proxy] current ip invalid and again get it"
+                    "[ProxyIpPool.get_proxy] no healthy proxy available and again get it"
                 )
-        return proxy
+
+        best = max(available, key=lambda health: health.score)
+        best.leased = True
+        if len(available) - 1 <= config.IP_PROXY_PREFETCH_THRESHOLD:
+            self._schedule_prefetch()
+        return best.proxy
+
+    def release_proxy(self, proxy: Union[IpInfoModel, str], success: Optional[bool] = True,
+                      latency: Optional[float] = None):
+        """
+        归还租借的代理，并记录这段时间的使用结果
+        :param proxy: IpInfoModel 或 httpx 代理地址
+        :param success: 是否可用，失败次数过多的代理会被隔离；None 表示结果已经逐个请求记录过，只归还
+        :param latency: 请求耗时（秒）
+        :return:
+        """
+        health = self.proxies.get(proxy_key(proxy))
+        if health is None:
+            return
+        health.leased = False
+        if success is not None:
+            health.record(success, latency)
+
+    def record_result(self, proxy: Union[IpInfoModel, str], success: bool, latency: Optional[float] = None):
+        """
+        记录租借中的代理一次真实请求的结果，不归还代理
+        :param proxy: IpInfoModel 或 httpx 代理地址
+        :param success: 请求是否成功
+        :param latency: 请求耗时（秒），失败时为 None
+        :return:
+        """
+        health = self.proxies.get(proxy_key(proxy))
+        if health is not None:
+            health.record(success, latency)
+
+    def is_usable(self, proxy: Union[IpInfoModel, str]) -> bool:
+        """代理是否仍可继续使用：未被隔离、未过期且仍在池中"""
+        health = self.proxies.get(proxy_key(proxy))
+        now = time.time()
+        return health is not None and not health.is_quarantined(now) and not health.is_expired(now)
+
+    def _schedule_prefetch(self):
+        """可用代理不足时在后台从代理商补充"""
+        if self._prefetch_task is None or self._prefetch_task.done():
+            self._prefetch_task = asyncio.create_task(self._prefetch())
+
+    async def _prefetch(self):
+        try:
+            await self.load_proxies()
+        except Exception as e:
+            utils.logger.error(f"[ProxyIpPool._prefetch] prefetch proxies error: {e}")
 
     async def _reload_proxies(self):
         """
         # 重新加载代理池
         :return:
         """
-        self.proxy_list = []
+        self._drop_expired()
         await self.load_proxies()
 
+    async def maintain(self) -> None:
+        """
+        检查一次代理池：清理过期IP，重新验证隔离结束或长时间未检查的空闲代理，可用代理不足时补充
+        :return:
+        """
+        self._drop_expired()
+        if self.enable_validate_ip:
+            now = time.time()
+            stale = [
+                health for health in self.proxies.values()
+                if not health.leased and not health.is_quarantined(now)
+                and (health.valid is None or now - health.checked_at >= config.IP_PROXY_CHECK_INTERVAL)
+            ]
+            await self.validate_proxies(stale)
+        if len(self._available()) <= config.IP_PROXY_PREFETCH_THRESHOLD:
+            await self._prefetch()
+
+    def start(self) -> None:
+        """启动后台健康检查"""
+        if self._maintain_task is None or self._maintain_task.done():
+            self._maintain_task = asyncio.create_task(self._maintain_loop())
+
+    async def _maintain_loop(self):
+        while True:
+            await asyncio.sleep(config.IP_PROXY_CHECK_INTERVAL)
+            try:
+                await self.maintain()
+            except Exception as e:
+                utils.logger.error(f"[ProxyIpPool._maintain_loop] maintain proxy pool error: {e}")
+
+    async def close(self) -> None:
+        """停止后台任务"""
+        for task in (self._maintain_task, self._prefetch_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._maintain_task = None
+        self._prefetch_task = None
+
 
 IpProxyProvider: Dict[str, ProxyProvider] = {
     ProviderNameEnum.KUAI_DAILI_PROVIDER.value: new_kuai_daili_proxy(),
@@ -129,6 +349,7 @@ async def create_ip_pool(ip_pool_count: int, enable_validate_ip: bool) -> ProxyI
         ip_provider=IpProxyProvider.get(config.IP_PROXY_PROVIDER_NAME),
     )
     await pool.load_proxies()
+    pool.start()
     return pool
 
 
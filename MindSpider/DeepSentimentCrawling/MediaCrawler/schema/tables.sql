@@ -462,6 +462,34 @@ alter table weibo_note add column `source_keyword` varchar(255) default '' comme
 alter table xhs_note add column `source_keyword` varchar(255) default '' comment '搜索来源关键字';
 alter table tieba_note add column `source_keyword` varchar(255) default '' comment '搜索来源关键字';
 
+-- 按关键词查询最近抓取的内容
+create index `idx_bilibili_video_kw_add_ts` on bilibili_video (`source_keyword`, `add_ts`);
+create index `idx_douyin_aweme_kw_add_ts` on douyin_aweme (`source_keyword`, `add_ts`);
+create index `idx_kuaishou_video_kw_add_ts` on kuaishou_video (`source_keyword`, `add_ts`);
+create index `idx_weibo_note_kw_add_ts` on weibo_note (`source_keyword`, `add_ts`);
+create index `idx_xhs_note_kw_add_ts` on xhs_note (`source_keyword`, `add_ts`);
+create index `idx_tieba_note_kw_add_ts` on tieba_note (`source_keyword`, `add_ts`);
+
+-- 归一化的互动数与毫秒发布时间（由 database/engagement.py 计算），以及对应的覆盖索引
+alter table bilibili_video add column `like_num` bigint default null comment '点赞数', add column `comment_num` bigint default null comment '评论数', add column `share_num` bigint default null comment '分享数', add column `collect_num` bigint default null comment '收藏数', add column `view_num` bigint default null comment '播放/浏览数', add column `publish_ts_ms` bigint default null comment '发布时间戳（毫秒）';
+alter table douyin_aweme add column `like_num` bigint default null comment '点赞数', add column `comment_num` bigint default null comment '评论数', add column `share_num` bigint default null comment '分享数', add column `collect_num` bigint default null comment '收藏数', add column `view_num` bigint default null comment '播放/浏览数', add column `publish_ts_ms` bigint default null comment '发布时间戳（毫秒）';
+alter table kuaishou_video add column `like_num` bigint default null comment '点赞数', add column `comment_num` bigint default null comment '评论数', add column `share_num` bigint default null comment '分享数', add column `collect_num` bigint default null comment '收藏数', add column `view_num` bigint default null comment '播放/浏览数', add column `publish_ts_ms` bigint default null comment '发布时间戳（毫秒）';
+alter table weibo_note add column `like_num` bigint default null comment '点赞数', add column `comment_num` bigint default null comment '评论数', add column `share_num` bigint default null comment '分享数', add column `collect_num` bigint default null comment '收藏数', add column `view_num` bigint default null comment '播放/浏览数', add column `publish_ts_ms` bigint default null comment '发布时间戳（毫秒）';
+alter table xhs_note add column `like_num` bigint default null comment '点赞数', add column `comment_num` bigint default null comment '评论数', add column `share_num` bigint default null comment '分享数', add column `collect_num` bigint default null comment '收藏数', add column `view_num` bigint default null comment '播放/浏览数', add column `publish_ts_ms` bigint default null comment '发布时间戳（毫秒）';
+alter table tieba_note add column `like_num` bigint default null comment '点赞数', add column `comment_num` bigint default null comment '评论数', add column `share_num` bigint default null comment '分享数', add column `collect_num` bigint default null comment '收藏数', add column `view_num` bigint default null comment '播放/浏览数', add column `publish_ts_ms` bigint default null comment '发布时间戳（毫秒）';
+create index `idx_bilibili_video_publish_ts` on bilibili_video (`publish_ts_ms`, `like_num`, `comment_num`, `share_num`, `collect_num`, `view_num`);
+create index `idx_bilibili_video_kw_like` on bilibili_video (`source_keyword`, `like_num`, `add_ts`);
+create index `idx_douyin_aweme_publish_ts` on douyin_aweme (`publish_ts_ms`, `like_num`, `comment_num`, `share_num`, `collect_num`, `view_num`);
+create index `idx_douyin_aweme_kw_like` on douyin_aweme (`source_keyword`, `like_num`, `add_ts`);
+create index `idx_kuaishou_video_publish_ts` on kuaishou_video (`publish_ts_ms`, `like_num`, `comment_num`, `share_num`, `collect_num`, `view_num`);
+create index `idx_kuaishou_video_kw_like` on kuaishou_video (`source_keyword`, `like_num`, `add_ts`);
+create index `idx_weibo_note_publish_ts` on weibo_note (`publish_ts_ms`, `like_num`, `comment_num`, `share_num`, `collect_num`, `view_num`);
+create index `idx_weibo_note_kw_like` on weibo_note (`source_keyword`, `like_num`, `add_ts`);
+create index `idx_xhs_note_publish_ts` on xhs_note (`publish_ts_ms`, `like_num`, `comment_num`, `share_num`, `collect_num`, `view_num`);
+create index `idx_xhs_note_kw_like` on xhs_note (`source_keyword`, `like_num`, `add_ts`);
+create index `idx_tieba_note_publish_ts` on tieba_note (`publish_ts_ms`, `like_num`, `comment_num`, `share_num`, `collect_num`, `view_num`);
+create index `idx_tieba_note_kw_like` on tieba_note (`source_keyword`, `like_num`, `add_ts`);
+
 
 DROP TABLE IF EXISTS `weibo_creator`;
 CREATE TABLE `weibo_creator`
@@ -526,9 +554,18 @@ CREATE TABLE `zhihu_content` (
     `user_url_token` varchar(255) NOT NULL COMMENT '用户url_token',
     `add_ts` bigint NOT NULL COMMENT '记录添加时间戳',
     `last_modify_ts` bigint NOT NULL COMMENT '记录最后修改时间戳',
+    `like_num` bigint DEFAULT NULL COMMENT '点赞数',
+    `comment_num` bigint DEFAULT NULL COMMENT '评论数',
+    `share_num` bigint DEFAULT NULL COMMENT '分享数',
+    `collect_num` bigint DEFAULT NULL COMMENT '收藏数',
+    `view_num` bigint DEFAULT NULL COMMENT '播放/浏览数',
+    `publish_ts_ms` bigint DEFAULT NULL COMMENT '发布时间戳（毫秒）',
     PRIMARY KEY (`id`),
     KEY `idx_zhihu_content_content_id` (`content_id`),
-    KEY `idx_zhihu_content_created_time` (`created_time`)
+    KEY `idx_zhihu_content_created_time` (`created_time`),
+    KEY `idx_zhihu_content_kw_add_ts` (`source_keyword`, `add_ts`),
+    KEY `idx_zhihu_content_publish_ts` (`publish_ts_ms`, `like_num`, `comment_num`, `share_num`, `collect_num`, `view_num`),
+    KEY `idx_zhihu_content_kw_like` (`source_keyword`, `like_num`, `add_ts`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci COMMENT='知乎内容（回答、文章、视频）';
 
 
@@ -588,3 +625,19 @@ alter table douyin_aweme_comment add column `like_count` varchar(255) NOT NULL D
 alter table xhs_note add column xsec_token varchar(50) default null comment '签名算法';
 alter table douyin_aweme_comment add column `pictures` varchar(500) NOT NULL DEFAULT '' COMMENT '评论图片列表';
 alter table bilibili_video_comment add column `like_count` varchar(255) NOT NULL DEFAULT '0' COMMENT '点赞数';
+
+-- 评论表的归一化发布时间（毫秒），按月分区的分区键
+alter table bilibili_video_comment add column `publish_ts_ms` bigint default null comment '发布时间戳（毫秒）';
+create index `idx_bilibili_video_comment_publish_ts` on bilibili_video_comment (`publish_ts_ms`);
+alter table douyin_aweme_comment add column `publish_ts_ms` bigint default null comment '发布时间戳（毫秒）';
+create index `idx_douyin_aweme_comment_publish_ts` on douyin_aweme_comment (`publish_ts_ms`);
+alter table kuaishou_video_comment add column `publish_ts_ms` bigint default null comment '发布时间戳（毫秒）';
+create index `idx_kuaishou_video_comment_publish_ts` on kuaishou_video_comment (`publish_ts_ms`);
+alter table weibo_note_comment add column `publish_ts_ms` bigint default null comment '发布时间戳（毫秒）';
+create index `idx_weibo_note_comment_publish_ts` on weibo_note_comment (`publish_ts_ms`);
+alter table xhs_note_comment add column `publish_ts_ms` bigint default null comment '发布时间戳（毫秒）';
+create index `idx_xhs_note_comment_publish_ts` on xhs_note_comment (`publish_ts_ms`);
+alter table tieba_comment add column `publish_ts_ms` bigint default null comment '发布时间戳（毫秒）';
+create index `idx_tieba_comment_publish_ts` on tieba_comment (`publish_ts_ms`);
+alter table zhihu_comment add column `publish_ts_ms` bigint default null comment '发布时间戳（毫秒）';
+create index `idx_zhihu_comment_publish_ts` on zhihu_comment (`publish_ts_ms`);
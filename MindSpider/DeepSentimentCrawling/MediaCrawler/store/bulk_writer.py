@@ -0,0 +1,426 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 数据库批量写入，各平台 DB 存储共用
+#            按表缓冲待写入的数据，数量或时间达到阈值时一次性批量插入/更新
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import UniqueConstraint, and_, bindparam, insert, inspect, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+import config
+from database.db_session import get_async_engine
+from database.engagement import PUBLISH_TS_COLUMN, derived_columns, normalized_values
+from tools import utils
+
+# 单条 SQL 中 IN 查询与多值插入的最大行数
+_SQL_CHUNK_SIZE = 500
+
+
+class BulkUpsertWriter:
+    """
+    单表的缓冲写入器：同一业务主键的数据在缓冲区中合并，flush 时批量 upsert
+
+    表上存在业务主键的唯一约束时使用数据库原生 upsert
+    （SQLite/PostgreSQL 的 ON CONFLICT DO UPDATE，MySQL 的 ON DUPLICATE KEY UPDATE）；
+    否则先批量查询已存在的主键，再分别批量插入与批量更新，两种方式都在一个事务中完成。
+    """
+
+    def __init__(
+        self,
+        model,
+        key_columns: Union[str, Sequence[str]],
+        batch_size: int = 200,
+        flush_interval: float = 2.0,
+        update_columns: Optional[Sequence[str]] = None,
+        insert_filter: Optional[Callable[[Dict], bool]] = None,
+        engine: Optional[AsyncEngine] = None,
+    ):
+        """
+        Args:
+            model: ORM 模型类
+            key_columns: 业务主键字段，如 note_id；联合主键传入字段列表
+            batch_size: 缓冲数据达到该条数时立即写入
+            flush_interval: 距离上次写入超过该秒数时写入
+            update_columns: 已存在的数据只更新这些字段，默认更新传入的全部字段
+            insert_filter: 新数据需满足该条件才插入（已存在的数据不受影响）
+            engine: 数据库引擎，默认使用当前配置的引擎
+        """
+        self.model = model
+        self.table = model.__table__
+        self.key_columns: Tuple[str, ...] = (key_columns,) if isinstance(key_columns, str) else tuple(key_columns)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.insert_filter = insert_filter
+        self._engine = engine
+        self._columns = {column.name for column in self.table.columns if not column.primary_key}
+        self.update_columns = None
+        if update_columns is not None:
+            # 归一化列（like_num、publish_ts_ms 等）跟随其来源列一起更新
+            self.update_columns = set(update_columns) | derived_columns(self.table.name, update_columns)
+        self._buffer: Dict[Tuple, Dict] = {}
+        self._lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._last_flush = time.monotonic()
+        self._db_unique_key: Optional[bool] = None
+        # 统计信息
+        self.rows_written = 0
+        self.flush_count = 0
+        self.flush_seconds = 0.0
+
+    @property
+    def pending(self) -> int:
+        """缓冲区中待写入的条数"""
+        return len(self._buffer)
+
+    async def add(self, item: Dict):
+        """
+        添加一条数据
+        Args:
+            item: 数据字典，非表字段会被忽略，归一化列（like_num、publish_ts_ms 等）由来源字段自动计算
+
+        Returns:
+
+        """
+        row = {key: value for key, value in item.items() if key in self._columns}
+        row.update({
+            name: value for name, value in normalized_values(self.table.name, row).items() if name in self._columns
+        })
+        if PUBLISH_TS_COLUMN in row and row[PUBLISH_TS_COLUMN] is None:
+            # 发布时间无法解析时按抓取时间计，publish_ts_ms 是分区键，不能为空
+            row[PUBLISH_TS_COLUMN] = row.get("add_ts") or utils.get_current_timestamp()
+        key = self._row_key(row)
+        if any(value is None for value in key):
+            utils.logger.warning(f"[BulkUpsertWriter.add] {self.table.name} item missing key {self.key_columns}, skip")
+            return
+        self._buffer[key] = {**self._buffer.get(key, {}), **row}
+        self._ensure_flush_task()
+
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush()
+
+    async def add_many(self, items: List[Dict]):
+        """
+        批量添加数据
+        Args:
+            items: 数据字典列表
+
+        Returns:
+
+        """
+        for item in items:
+            await self.add(item)
+
+    async def flush(self) -> int:
+        """
+        立即写入缓冲区中的全部数据
+        Returns:
+            写入的条数
+        """
+        async with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._buffer:
+                return 0
+            buffer, self._buffer = self._buffer, {}
+            rows = list(buffer.values())
+            start = time.perf_counter()
+            try:
+                await self._write(rows)
+            except Exception:
+                # 写入失败时放回缓冲区，等待下一次写入，期间新到的同主键数据优先
+                for key, row in buffer.items():
+                    self._buffer[key] = {**row, **self._buffer.get(key, {})}
+                raise
+            self.flush_seconds += time.perf_counter() - start
+            self.rows_written += len(rows)
+            self.flush_count += 1
+            return len(rows)
+
+    async def close(self):
+        """
+        停止定时写入并写入剩余数据
+        Returns:
+
+        """
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._flush_task = None
+        await self.flush()
+
+    def _ensure_flush_task(self):
+        """缓冲区有数据但迟迟达不到批量大小时，由后台任务按时间写入"""
+        if self._flush_task and not self._flush_task.done():
+            return
+        self._flush_task = asyncio.get_running_loop().create_task(self._flush_periodically())
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if not self._buffer:
+                continue
+            try:
+                await self.flush()
+            except Exception as e:
+                utils.logger.error(f"[BulkUpsertWriter._flush_periodically] flush {self.table.name} error: {e}")
+
+    def _row_key(self, row: Dict) -> Tuple:
+        """取出业务主键，并按字段类型转换（例如字符串形式的数字 ID 转为整数）"""
+        key = []
+        for name in self.key_columns:
+            value = row.get(name)
+            if value is not None:
+                try:
+                    python_type = self.table.c[name].type.python_type
+                    if not isinstance(value, python_type):
+                        value = python_type(value)
+                        row[name] = value
+                except (NotImplementedError, TypeError, ValueError):
+                    pass
+            key.append(value)
+        return tuple(key)
+
+    async def _db_has_unique_key(self, conn) -> bool:
+        """
+        数据库中的表是否真的存在该唯一约束（只检查一次）
+        按月分区后唯一约束必须包含分区键，原有的业务主键唯一索引会被改为普通索引
+        """
+        if self._db_unique_key is None:
+            key_set = set(self.key_columns)
+
+            def check(sync_conn) -> bool:
+                inspector = inspect(sync_conn)
+                unique_sets = [set(c["column_names"]) for c in inspector.get_unique_constraints(self.table.name)]
+                unique_sets += [set(i["column_names"]) for i in inspector.get_indexes(self.table.name) if i["unique"]]
+                unique_sets.append(set(inspector.get_pk_constraint(self.table.name)["constrained_columns"]))
+                return key_set in unique_sets
+
+            self._db_unique_key = await conn.run_sync(check)
+        return self._db_unique_key
+
+    def _has_unique_key(self) -> bool:
+        """表上是否存在与业务主键完全一致的唯一约束"""
+        key_set = set(self.key_columns)
+        if len(self.key_columns) == 1 and self.table.c[self.key_columns[0]].unique:
+            return True
+        for index in self.table.indexes:
+            if index.unique and {column.name for column in index.columns} == key_set:
+                return True
+        for constraint in self.table.constraints:
+            if isinstance(constraint, UniqueConstraint) and {c.name for c in constraint.columns} == key_set:
+                return True
+        return False
+
+    def _set_columns(self, row: Dict) -> List[str]:
+        """已存在的数据需要更新的字段"""
+        return [
+            name for name in row
+            if name not in self.key_columns and name != "add_ts"
+            and (self.update_columns is None or name in self.update_columns or name == "last_modify_ts")
+        ]
+
+    async def _write(self, rows: List[Dict]):
+        now = utils.get_current_timestamp()
+        for row in rows:
+            if "last_modify_ts" in self._columns:
+                row["last_modify_ts"] = now
+
+        engine = self._engine or get_async_engine()
+        async with engine.begin() as conn:
+            dialect = conn.dialect.name
+            if (self.insert_filter is None and self._has_unique_key() and dialect in ("sqlite", "postgresql", "mysql")
+                    and await self._db_has_unique_key(conn)):
+                await self._native_upsert(conn, dialect, rows, now)
+            else:
+                await self._select_then_write(conn, rows, now)
+
+    async def _native_upsert(self, conn, dialect: str, rows: List[Dict], now: int):
+        for row in rows:
+            if "add_ts" in self._columns:
+                row.setdefault("add_ts", now)
+        for group in _group_by_columns(rows):
+            set_columns = self._set_columns(group[0])
+            for chunk in _chunks(group, _SQL_CHUNK_SIZE):
+                if dialect == "mysql":
+                    from sqlalchemy.dialects.mysql import insert as dialect_insert
+                    stmt = dialect_insert(self.table).values(chunk)
+                    if set_columns:
+                        stmt = stmt.on_duplicate_key_update({name: stmt.inserted[name] for name in set_columns})
+                else:
+                    if dialect == "postgresql":
+                        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+                    else:
+                        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+                    stmt = dialect_insert(self.table).values(chunk)
+                    if set_columns:
+                        stmt = stmt.on_conflict_do_update(
+                            index_elements=list(self.key_columns),
+                            set_={name: stmt.excluded[name] for name in set_columns},
+                        )
+                    else:
+                        stmt = stmt.on_conflict_do_nothing(index_elements=list(self.key_columns))
+                await conn.execute(stmt)
+
+    async def _select_then_write(self, conn, rows: List[Dict], now: int):
+        key_columns = [self.table.c[name] for name in self.key_columns]
+        keys = [self._row_key(row) for row in rows]
+
+        existing = set()
+        for chunk in _chunks(keys, _SQL_CHUNK_SIZE):
+            if len(key_columns) == 1:
+                stmt = select(key_columns[0]).where(key_columns[0].in_([key[0] for key in chunk]))
+            else:
+                stmt = select(*key_columns).where(tuple_(*key_columns).in_(chunk))
+            result = await conn.execute(stmt)
+            existing.update(tuple(record) for record in result)
+
+        inserts, updates = [], []
+        for key, row in zip(keys, rows):
+            if key in existing:
+                updates.append(row)
+            elif self.insert_filter is None or self.insert_filter(row):
+                if "add_ts" in self._columns:
+                    row.setdefault("add_ts", now)
+                inserts.append(row)
+
+        for group in _group_by_columns(inserts):
+            await conn.execute(insert(self.table), group)
+
+        update_rows = []
+        for row in updates:
+            set_columns = self._set_columns(row)
+            if set_columns:
+                params = {name: row[name] for name in set_columns}
+                params.update({f"_key_{name}": row[name] for name in self.key_columns})
+                update_rows.append(params)
+        where = and_(*[self.table.c[name] == bindparam(f"_key_{name}") for name in self.key_columns])
+        for group in _group_by_columns(update_rows):
+            await conn.execute(update(self.table).where(where), group)
+
+
+def _group_by_columns(rows: List[Dict]) -> List[List[Dict]]:
+    """executemany 要求每行字段一致，按字段集合分组"""
+    groups: Dict[Tuple, List[Dict]] = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row.keys())), []).append(row)
+    return list(groups.values())
+
+
+def _chunks(items: List[Any], size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+_writers: Dict[str, BulkUpsertWriter] = {}
+
+
+def get_bulk_writer(model, key_columns: Union[str, Sequence[str]], **kwargs) -> BulkUpsertWriter:
+    """
+    获取某张表共享的批量写入器，同一张表只创建一个
+    Args:
+        model: ORM 模型类
+        key_columns: 业务主键字段
+        **kwargs: 创建写入器时的其他参数
+
+    Returns:
+
+    """
+    table_name = model.__tablename__
+    writer = _writers.get(table_name)
+    if writer is None:
+        kwargs.setdefault("batch_size", config.DB_BULK_BATCH_SIZE)
+        kwargs.setdefault("flush_interval", config.DB_BULK_FLUSH_INTERVAL)
+        writer = BulkUpsertWriter(model, key_columns, **kwargs)
+        _writers[table_name] = writer
+    return writer
+
+
+async def flush_all_writers():
+    """写入所有写入器缓冲区中的数据"""
+    for writer in list(_writers.values()):
+        await writer.flush()
+
+
+async def close_all_writers():
+    """爬虫结束时调用：写入剩余数据并释放全部写入器"""
+    writers = list(_writers.values())
+    _writers.clear()
+    for writer in writers:
+        await writer.close()
+        if writer.rows_written:
+            utils.logger.info(
+                f"[close_all_writers] {writer.table.name}: {writer.rows_written} rows in "
+                f"{writer.flush_count} batches, {writer.flush_seconds:.2f}s"
+            )
+
+
+async def benchmark(rows: int = 2000, batch_size: int = 200) -> Dict[str, float]:
+    """
+    写入性能基准：在临时 SQLite 库上比较逐行查询+提交与批量写入每秒可写入的行数
+    Args:
+        rows: 评论条数
+        batch_size: 批量写入的批大小
+
+    Returns:
+        {"row_by_row": 行/秒, "bulk": 行/秒}
+    """
+    import os
+    import tempfile
+
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from database.models import Base, WeiboNoteComment
+
+    comments = [
+        {"comment_id": i, "note_id": i // 20, "content": f"comment {i}", "comment_like_count": "1"}
+        for i in range(rows)
+    ]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp_dir, 'benchmark.db')}")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+
+            # 旧方式：每条评论一次查询 + 一次提交
+            session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+            start = time.perf_counter()
+            for item in comments:
+                async with session_factory() as session:
+                    result = await session.execute(
+                        select(WeiboNoteComment).where(WeiboNoteComment.comment_id == item["comment_id"]))
+                    if result.scalar_one_or_none() is None:
+                        session.add(WeiboNoteComment(**item))
+                    await session.commit()
+            row_by_row = time.perf_counter() - start
+
+            async with engine.begin() as conn:
+                await conn.execute(WeiboNoteComment.__table__.delete())
+
+            writer = BulkUpsertWriter(WeiboNoteComment, "comment_id", batch_size=batch_size, engine=engine)
+            start = time.perf_counter()
+            await writer.add_many(comments)
+            await writer.close()
+            bulk = time.perf_counter() - start
+        finally:
+            await engine.dispose()
+    return {"row_by_row": rows / row_by_row, "bulk": rows / bulk}
+
+
+if __name__ == "__main__":
+    # python -m store.bulk_writer [rows]
+    import sys
+
+    result = asyncio.run(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
+    for name, rate in result.items():
+        print(f"{name:<12}{rate:>10.0f} rows/s")
@@ -0,0 +1,133 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : JSONL/CSV 追加写入测试，吞吐对比见 python -m tools.async_file_writer --benchmark
+import csv
+import glob
+import json
+import os
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import config
+from tools.async_file_writer import (AsyncFileWriter, _FileSink, close_all_file_writers, export_json_array,
+                                     iter_jsonl_items)
+
+
+class TestAsyncFileWriter(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp_dir.name)
+        self.patches = [
+            patch.object(config, "ENABLE_GET_WORDCLOUD", False),
+            patch.object(config, "JSON_FILE_FORMAT", "jsonl"),
+            patch.object(config, "FILE_WRITER_FLUSH_BYTES", 64 * 1024),
+            patch.object(config, "FILE_WRITER_FLUSH_INTERVAL", 60),
+            patch.object(config, "FILE_ROTATE_MAX_MB", 0),
+        ]
+        for p in self.patches:
+            p.start()
+
+    async def asyncTearDown(self):
+        await close_all_file_writers()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    async def test_jsonl_shared_handle_and_export(self):
+        # 两个存储实例写同一文件，共用一个句柄
+        first = AsyncFileWriter(platform="xhs", crawler_type="search")
+        second = AsyncFileWriter(platform="xhs", crawler_type="search")
+        await first.write_single_item_to_json({"note_id": "1", "content": "你好"}, "contents")
+        await second.write_single_item_to_json({"note_id": "2", "content": "world"}, "contents")
+        self.assertEqual(glob.glob("data/xhs/jsonl/*.jsonl"), [first._get_file_path("jsonl", "contents")])
+
+        json_path = await first.export_legacy_json("contents")
+        with open(json_path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), [{"note_id": "1", "content": "你好"}, {"note_id": "2", "content": "world"}])
+        self.assertIsNone(await first.export_legacy_json("comments"))
+
+    async def test_csv_header_written_once(self):
+        writer = AsyncFileWriter(platform="dy", crawler_type="search")
+        for i in range(3):
+            await writer.write_to_csv({"aweme_id": i, "title": f"t{i}"}, "contents")
+        await close_all_file_writers()
+        # 新一轮运行追加到同一文件：沿用已有表头
+        writer = AsyncFileWriter(platform="dy", crawler_type="search")
+        await writer.write_to_csv({"title": "t3", "aweme_id": 3, "extra": "x"}, "contents")
+        await close_all_file_writers()
+
+        with open(writer._get_file_path("csv", "contents"), encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows, [["aweme_id", "title"], ["0", "t0"], ["1", "t1"], ["2", "t2"], ["3", "t3"]])
+
+    async def test_buffered_until_flush_threshold(self):
+        writer = AsyncFileWriter(platform="wb", crawler_type="search")
+        with patch.object(config, "FILE_WRITER_FLUSH_BYTES", 200):
+            path = writer._get_file_path("jsonl", "comments")
+            await writer.write_to_jsonl({"comment_id": 0}, "comments")
+            self.assertEqual(os.path.getsize(path), 0)
+            for i in range(1, 20):
+                await writer.write_to_jsonl({"comment_id": i}, "comments")
+            self.assertGreater(os.path.getsize(path), 0)
+        await close_all_file_writers()
+        self.assertEqual([item["comment_id"] for item in iter_jsonl_items(path)], list(range(20)))
+
+    async def test_rotation_with_gzip(self):
+        writer = AsyncFileWriter(platform="bili", crawler_type="search")
+        path = writer._get_file_path("jsonl", "comments")
+        with patch.object(config, "FILE_WRITER_FLUSH_BYTES", 0), \
+                patch.object(config, "FILE_ROTATE_MAX_MB", 1 / 1024), \
+                patch.object(config, "FILE_ROTATE_COMPRESSION", "gzip"):
+            for i in range(100):
+                await writer.write_to_jsonl({"comment_id": i, "content": "x" * 20}, "comments")
+        await close_all_file_writers()
+
+        parts = glob.glob("data/bili/jsonl/*.part*.jsonl.gz")
+        self.assertGreater(len(parts), 1)
+        with open(export_json_array(path), encoding="utf-8") as f:
+            self.assertEqual([item["comment_id"] for item in json.load(f)], list(range(100)))
+
+    async def test_jsonl_appends_in_few_writes(self):
+        items = [{"comment_id": i, "content": f"comment {i}" * 5, "like_count": i} for i in range(500)]
+        writes = []
+        write_sync = _FileSink._write_sync
+
+        def record(sink, data):
+            writes.append(len(data))
+            write_sync(sink, data)
+
+        # 旧版 JSON 数组每条数据都读出整个文件再重写；JSONL 不读文件，缓冲满 64KB 或关闭时才写一次
+        writer = AsyncFileWriter(platform="ks", crawler_type="search")
+        with patch.object(_FileSink, "_write_sync", autospec=True, side_effect=record), \
+                patch("tools.async_file_writer.aiofiles.open") as aio_open:
+            for item in items:
+                await writer.write_single_item_to_json(item, "comments")
+            await close_all_file_writers()
+        aio_open.assert_not_called()
+
+        path = writer._get_file_path("jsonl", "comments")
+        self.assertEqual([item["comment_id"] for item in iter_jsonl_items(path)], list(range(500)))
+        self.assertLessEqual(len(writes), os.path.getsize(path) // config.FILE_WRITER_FLUSH_BYTES + 1)
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(sum(writes), len(f.read()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 数据库批量写入测试，吞吐对比见 python -m store.bulk_writer
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from sqlalchemy import event, func, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from database.models import Base, BilibiliContactInfo, BilibiliVideo, DouyinAweme, WeiboNote, WeiboNoteComment, XhsNote
+from store.bulk_writer import BulkUpsertWriter
+
+
+class TestBulkUpsertWriter(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(self.tmp_dir.name, 'test.db')}")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    async def fetch_all(self, model):
+        async with self.engine.connect() as conn:
+            return (await conn.execute(select(model).order_by(model.id))).all()
+
+    async def test_insert_then_update(self):
+        writer = BulkUpsertWriter(WeiboNote, "note_id", batch_size=100, engine=self.engine)
+        for i in range(3):
+            await writer.add({"note_id": str(i), "content": f"note {i}", "liked_count": "0", "unknown_field": 1})
+        self.assertEqual(await writer.flush(), 3)
+
+        rows = await self.fetch_all(WeiboNote)
+        self.assertEqual([row.note_id for row in rows], [0, 1, 2])
+        add_ts = rows[1].add_ts
+
+        # 同一主键：字符串与整数视为同一条，缓冲区内合并后只写一次
+        await writer.add({"note_id": 1, "liked_count": "5"})
+        await writer.add({"note_id": "1", "liked_count": "8"})
+        self.assertEqual(writer.pending, 1)
+        await writer.close()
+
+        rows = await self.fetch_all(WeiboNote)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1].liked_count, "8")
+        self.assertEqual(rows[1].content, "note 1")
+        self.assertEqual(rows[1].add_ts, add_ts)
+
+    async def test_native_upsert_on_unique_key(self):
+        writer = BulkUpsertWriter(BilibiliVideo, "video_id", engine=self.engine)
+        self.assertTrue(writer._has_unique_key())
+        await writer.add_many([
+            {"video_id": 1, "title": "a", "video_url": "u1"},
+            {"video_id": 2, "title": "b", "video_url": "u2"},
+        ])
+        await writer.flush()
+        await writer.add({"video_id": "2", "title": "b2", "video_url": "u2"})
+        await writer.close()
+
+        rows = await self.fetch_all(BilibiliVideo)
+        self.assertEqual([(row.video_id, row.title) for row in rows], [(1, "a"), (2, "b2")])
+
+    async def test_composite_key_and_insert_filter(self):
+        contacts = BulkUpsertWriter(BilibiliContactInfo, ("up_id", "fan_id"), engine=self.engine)
+        await contacts.add_many([
+            {"up_id": 1, "fan_id": 2, "fan_name": "x"},
+            {"up_id": 1, "fan_id": 3, "fan_name": "y"},
+        ])
+        await contacts.flush()
+        await contacts.add({"up_id": "1", "fan_id": "3", "fan_name": "z"})
+        await contacts.close()
+        rows = await self.fetch_all(BilibiliContactInfo)
+        self.assertEqual([row.fan_name for row in rows], ["x", "z"])
+
+        awemes = BulkUpsertWriter(DouyinAweme, "aweme_id", insert_filter=lambda row: bool(row.get("title")),
+                                  engine=self.engine)
+        await awemes.add_many([{"aweme_id": 1, "title": "t"}, {"aweme_id": 2, "title": ""}])
+        await awemes.close()
+        rows = await self.fetch_all(DouyinAweme)
+        self.assertEqual([row.aweme_id for row in rows], [1])
+
+    async def test_normalized_columns_follow_source_fields(self):
+        writer = BulkUpsertWriter(XhsNote, "note_id", update_columns=["liked_count"], engine=self.engine)
+        await writer.add({"note_id": "n1", "liked_count": "1.2万", "comment_count": "35",
+                          "collected_count": "", "time": 1_700_000_000_000})
+        await writer.flush()
+        # 只更新点赞数：like_num 随之更新，其他归一化列保持不变
+        await writer.add({"note_id": "n1", "liked_count": "2万", "comment_count": "99"})
+        await writer.close()
+
+        row = (await self.fetch_all(XhsNote))[0]
+        self.assertEqual((row.like_num, row.comment_num, row.collect_num), (20000, 35, None))
+        self.assertEqual(row.publish_ts_ms, 1_700_000_000_000)
+
+    async def test_partitioned_table_without_unique_index(self):
+        # 按月分区后业务主键上的唯一索引被改为普通索引，不能再依赖 ON CONFLICT
+        async with self.engine.begin() as conn:
+            await conn.execute(text("DROP INDEX ix_bilibili_video_video_id"))
+            await conn.execute(text("CREATE INDEX ix_bilibili_video_video_id ON bilibili_video (video_id)"))
+
+        writer = BulkUpsertWriter(BilibiliVideo, "video_id", engine=self.engine)
+        start = int(time.time() * 1000)
+        await writer.add({"video_id": 1, "title": "a", "video_url": "u1", "create_time": "未知"})
+        await writer.flush()
+        await writer.add({"video_id": "1", "title": "b", "video_url": "u1"})
+        await writer.close()
+        self.assertFalse(writer._db_unique_key)
+
+        rows = await self.fetch_all(BilibiliVideo)
+        self.assertEqual([(row.video_id, row.title) for row in rows], [(1, "b")])
+        # 发布时间无法解析时按抓取时间计，分区键不为空
+        self.assertGreaterEqual(rows[0].publish_ts_ms, start)
+
+    async def test_flush_on_size_and_interval(self):
+        writer = BulkUpsertWriter(WeiboNoteComment, "comment_id", batch_size=5, flush_interval=0.2,
+                                  engine=self.engine)
+        for i in range(5):
+            await writer.add({"comment_id": i, "note_id": 1})
+        self.assertEqual(writer.pending, 0)
+        self.assertEqual(writer.flush_count, 1)
+
+        await writer.add({"comment_id": 100, "note_id": 1})
+        self.assertEqual(writer.pending, 1)
+        await asyncio.sleep(0.5)
+        self.assertEqual(writer.pending, 0)
+        await writer.close()
+        self.assertEqual(len(await self.fetch_all(WeiboNoteComment)), 6)
+
+    async def test_batches_use_few_round_trips(self):
+        notes, comments_per_note = 100, 20
+        comments = [
+            {"comment_id": note * 1000 + i, "note_id": note, "content": f"comment {i}", "comment_like_count": "1"}
+            for note in range(notes) for i in range(comments_per_note)
+        ]
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(self.engine.sync_engine, "before_cursor_execute", record)
+        try:
+            writer = BulkUpsertWriter(WeiboNoteComment, "comment_id", batch_size=200, flush_interval=60,
+                                      engine=self.engine)
+            await writer.add_many(comments)
+            await writer.close()
+        finally:
+            event.remove(self.engine.sync_engine, "before_cursor_execute", record)
+
+        async with self.engine.connect() as conn:
+            count = (await conn.execute(select(func.count()).select_from(WeiboNoteComment))).scalar()
+        self.assertEqual(count, notes * comments_per_note)
+        # 逐行写入每条评论一次查询 + 一次插入；批量写入每批只有一次 IN 查询与一次 executemany 插入
+        self.assertEqual(writer.flush_count, len(comments) // 200)
+        self.assertLessEqual(len(statements), 2 * writer.flush_count + 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 评论任务队列测试：二级评论线程按配置的并发数同时抓取，耗时对比见 python -m tools.comment_queue
+import asyncio
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import config
+from media_platform.xhs.client import XiaoHongShuClient
+from tools.comment_queue import CommentWorkQueue
+
+# 模拟一次接口请求的耗时
+REQUEST_LATENCY = 0.05
+
+
+class FakeXhsClient(XiaoHongShuClient):
+    """2 页一级评论，每页 5 条，每条一级评论下有 2 页二级评论"""
+
+    def __init__(self):
+        self.received = []
+        self.active = 0
+        self.peak = 0
+
+    async def get_note_comments(self, note_id, xsec_token, cursor=""):
+        await asyncio.sleep(REQUEST_LATENCY)
+        page = int(cursor or 0)
+        comments = [
+            {"id": f"{page}-{i}", "note_id": note_id, "sub_comment_has_more": True, "sub_comment_cursor": ""}
+            for i in range(5)
+        ]
+        return {"comments": comments, "cursor": str(page + 1), "has_more": page == 0}
+
+    async def get_note_sub_comments(self, note_id, root_comment_id, xsec_token, num=10, cursor=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(REQUEST_LATENCY)
+        finally:
+            self.active -= 1
+        if root_comment_id == "1-4":
+            raise ValueError("sub comment request failed")
+        page = int(cursor or 0)
+        return {
+            "comments": [{"id": f"{root_comment_id}-sub-{page}"}],
+            "cursor": str(page + 1),
+            "has_more": page == 0,
+        }
+
+    async def callback(self, note_id, comments):
+        self.received.extend(comment["id"] for comment in comments)
+
+
+class TestCommentWorkQueue(IsolatedAsyncioTestCase):
+
+    async def crawl(self, concurrency):
+        client = FakeXhsClient()
+        with patch.object(config, "ENABLE_GET_SUB_COMMENTS", True), \
+                patch.object(config, "SUB_COMMENT_CONCURRENCY", concurrency):
+            result = await client.get_note_all_comments(
+                "note1", "token", crawl_interval=0, callback=client.callback, max_count=100,
+            )
+            return client.peak, result, client.received
+
+    async def test_sub_comment_threads_run_concurrently(self):
+        serial_peak, serial_result, _ = await self.crawl(1)
+        peak, result, received = await self.crawl(5)
+
+        # 10 条一级评论 + 9 个成功线程各 2 条二级评论，失败的线程不影响其他线程
+        self.assertEqual(len(result), 10 + 18)
+        self.assertEqual(sorted(c["id"] for c in result), sorted(c["id"] for c in serial_result))
+        self.assertEqual(sorted(received), sorted(c["id"] for c in result))
+        # 同时进行中的二级评论请求数等于配置的并发数
+        self.assertEqual(serial_peak, 1)
+        self.assertEqual(peak, 5)
+
+    async def test_queue_bounds_concurrency(self):
+        active = peak = 0
+
+        async def task(_):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        async with CommentWorkQueue(concurrency=3, max_pending=2) as queue:
+            for i in range(20):
+                await queue.submit(task, i)
+        self.assertEqual(peak, 3)
+        self.assertEqual(queue.completed, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 增量爬取状态测试
+import os
+import tempfile
+import time
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from media_platform.xhs.client import XiaoHongShuClient
+from tools.comment_queue import run_in_queue
+from tools.crawl_state import CommentProgress, CrawlStateStore, KeywordWatermark
+
+
+class FakeXhsClient(XiaoHongShuClient):
+    """按游标返回固定评论页的小红书客户端"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested_cursors = []
+
+    async def get_note_comments(self, note_id, xsec_token, cursor=""):
+        self.requested_cursors.append(cursor)
+        index = int(cursor or 0)
+        return {
+            "comments": [{"id": f"{index}-{i}"} for i in range(self.pages[index])],
+            "cursor": str(index + 1),
+            "has_more": index + 1 < len(self.pages),
+        }
+
+    async def get_comments_all_sub_comments(self, comments, xsec_token, crawl_interval=1.0, callback=None, queue=None):
+        return []
+
+
+class FailingSubCommentClient(FakeXhsClient):
+    """二级评论线程在队列中失败"""
+
+    async def get_comments_all_sub_comments(self, comments, xsec_token, crawl_interval=1.0, callback=None, queue=None):
+        async def fail(comment):
+            raise ValueError("sub comment request failed")
+
+        await run_in_queue(queue, fail, comments[:1])
+        return []
+
+
+class TestCrawlState(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = CrawlStateStore(os.path.join(self.tmp_dir.name, "state", "crawl_state.db"))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def test_keyword_watermark(self):
+        first_run = KeywordWatermark(self.store, "dy", "科技")
+        self.assertIsNone(first_run.previous)
+        self.assertFalse(first_run.seen("a", 1_700_000_000))
+        self.assertFalse(first_run.seen("b", 1_700_000_100_000))  # 毫秒时间戳
+        first_run.commit()
+
+        second_run = KeywordWatermark(self.store, "dy", "科技")
+        self.assertEqual((second_run.previous.newest_ts, second_run.previous.newest_id), (1_700_000_100, "b"))
+        self.assertFalse(second_run.seen("c", 1_700_000_200))
+        self.assertTrue(second_run.seen("a", 1_700_000_000))
+        self.assertTrue(second_run.seen("b", None))
+        self.assertEqual(second_run.skipped, 2)
+        second_run.commit()
+
+        # 水位线只前进不后退
+        stale = KeywordWatermark(self.store, "dy", "科技")
+        stale.seen("old", 1_600_000_000)
+        stale.commit()
+        self.assertEqual(self.store.get_watermark("dy", "科技").newest_id, "c")
+        self.assertIsNone(self.store.get_watermark("xhs", "科技"))
+
+    async def test_comment_cursor_resume(self):
+        client = FakeXhsClient(pages=[30, 10, 10, 10])
+
+        # 第一页的评论数超过 max_count：整页处理，下次从第二页继续，而不是每次重读第一页
+        progress = CommentProgress(self.store, "xhs", "note1")
+        comments = await client.get_note_all_comments(
+            "note1", "token", crawl_interval=0, max_count=20,
+            start_cursor=progress.start_cursor(""), cursor_callback=progress.save,
+        )
+        self.assertEqual(len(comments), 30)
+        saved = self.store.get_comment_cursor("xhs", "note1")
+        self.assertEqual((saved.cursor, saved.finished), ("1", False))
+
+        client.requested_cursors.clear()
+        progress = CommentProgress(self.store, "xhs", "note1")
+        self.assertFalse(progress.should_skip)
+        await client.get_note_all_comments(
+            "note1", "token", crawl_interval=0, max_count=100,
+            start_cursor=progress.start_cursor(""), cursor_callback=progress.save,
+        )
+        self.assertEqual(client.requested_cursors, ["1", "2", "3"])
+        self.assertTrue(self.store.get_comment_cursor("xhs", "note1").finished)
+
+        # 已爬完的评论在复查间隔内跳过，超过间隔后从第一页重新检查
+        progress = CommentProgress(self.store, "xhs", "note1")
+        self.assertTrue(progress.should_skip)
+        progress.saved.updated_at = int(time.time()) - 7 * 24 * 3600
+        self.assertFalse(progress.should_skip)
+        self.assertEqual(progress.start_cursor(0), 0)
+
+    async def test_failed_sub_comment_thread_keeps_cursor(self):
+        self.store.save_comment_cursor("xhs", "note1", "1", finished=False)
+        client = FailingSubCommentClient(pages=[10, 10, 10])
+
+        progress = CommentProgress(self.store, "xhs", "note1")
+        await client.get_note_all_comments(
+            "note1", "token", crawl_interval=0, max_count=100,
+            start_cursor=progress.start_cursor(""), cursor_callback=progress.save,
+        )
+        # 二级评论线程失败：保留上次的游标，不标记为已爬完，下次重新抓取
+        self.assertEqual(client.requested_cursors, ["1", "2"])
+        saved = self.store.get_comment_cursor("xhs", "note1")
+        self.assertEqual((saved.cursor, saved.finished), ("1", False))
+        self.assertFalse(CommentProgress(self.store, "xhs", "note1").should_skip)
+
+    def test_disabled_store(self):
+        watermark = KeywordWatermark(None, "xhs", "科技")
+        self.assertFalse(watermark.seen("a", 1))
+        watermark.commit()
+        progress = CommentProgress(None, "xhs", "note1")
+        self.assertFalse(progress.should_skip)
+        self.assertEqual(progress.start_cursor(""), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 互动数与发布时间归一化测试
+import unittest
+from datetime import datetime
+
+from database.engagement import derived_columns, normalized_values, parse_count, parse_publish_ts_ms
+
+
+class TestEngagement(unittest.TestCase):
+
+    def test_parse_count(self):
+        cases = {
+            "1234": 1234, 56: 56, "1,234": 1234, "1.2万": 12000, "10w+": 100000,
+            "3.5k": 3500, "2亿": 200000000, "": None, "-": None, None: None,
+        }
+        for value, expected in cases.items():
+            self.assertEqual(parse_count(value), expected, value)
+
+    def test_parse_publish_ts_ms(self):
+        local = int(datetime(2025, 1, 2, 3, 4, 5).timestamp() * 1000)
+        self.assertEqual(parse_publish_ts_ms(1_700_000_000), 1_700_000_000_000)
+        self.assertEqual(parse_publish_ts_ms(1_700_000_000_000), 1_700_000_000_000)
+        self.assertEqual(parse_publish_ts_ms("1700000000"), 1_700_000_000_000)
+        self.assertEqual(parse_publish_ts_ms("2025-01-02 03:04:05"), local)
+        self.assertEqual(parse_publish_ts_ms("2025-01-02 03:04:05+08:00"), local)
+        self.assertIsNone(parse_publish_ts_ms("昨天"))
+        self.assertIsNone(parse_publish_ts_ms(0))
+
+    def test_normalized_values_only_for_present_fields(self):
+        values = normalized_values("weibo_note", {"liked_count": "8", "create_time": None,
+                                                  "create_date_time": "2025-01-02 03:04:05"})
+        self.assertEqual(values["like_num"], 8)
+        self.assertEqual(values["publish_ts_ms"], parse_publish_ts_ms("2025-01-02 03:04:05"))
+        self.assertNotIn("comment_num", values)
+        self.assertEqual(normalized_values("weibo_note_comment", {"liked_count": "8"}), {})
+        self.assertEqual(derived_columns("zhihu_content", ["voteup_count", "created_time"]),
+                         {"like_num", "publish_ts_ms"})
+
+
+if __name__ == "__main__":
+    unittest.main()
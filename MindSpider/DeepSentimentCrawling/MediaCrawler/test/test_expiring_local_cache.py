@@ -42,6 +42,35 @@ class TestExpiringLocalCache(unittest.TestCase):
         time.sleep(12)
         self.assertIsNone(self.cache.get('key'))
 
+    def test_lru_eviction(self):
+        cache = ExpiringLocalCache(max_size=2)
+        cache.set('a', 1, 10)
+        cache.set('b', 2, 10)
+        # 访问 a 后 b 成为最久未使用的键
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3, 10)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.keys('*'), ['a', 'c'])
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_keys_glob_pattern(self):
+        for key in ['kuaidaili_1.1.1.1', 'kuaidaili_2.2.2.2', 'wandou_1.1.1.1', 'kuaidaili']:
+            self.cache.set(key, 'ip', 10)
+        self.assertEqual(sorted(self.cache.keys('kuaidaili_*')), ['kuaidaili_1.1.1.1', 'kuaidaili_2.2.2.2'])
+        self.assertEqual(self.cache.keys('*_1.1.1.?'), ['kuaidaili_1.1.1.1', 'wandou_1.1.1.1'])
+        self.assertEqual(self.cache.keys('wandou'), [])
+
+    def test_expired_keys_purged_on_write(self):
+        self.cache.set('short', 'value', 0)
+        self.cache.set('long', 'value', 10)
+        # 重新设置后旧的过期记录不会误删新值
+        self.cache.set('long', 'value2', 10)
+        self.cache.set('other', 'value', 10)
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get('long'), 'value2')
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['expirations']), (1, 1))
+
     def tearDown(self):
         del self.cache
 
@@ -0,0 +1,132 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 长连接客户端测试，以本地 HTTP 服务模拟评论翻页请求
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import IsolatedAsyncioTestCase
+
+import httpx
+
+from base.base_crawler import AbstractApiClient
+from tools.http_client import PooledAsyncClient
+
+
+class CommentPageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_GET(self):
+        if self.path.startswith("/slow"):
+            time.sleep(0.3)
+        body = json.dumps({"code": 0, "data": {"comments": [], "cursor": self.path}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeApiClient(AbstractApiClient):
+    def __init__(self, proxy=None):
+        self.proxy = proxy
+
+    async def request(self, method, url, **kwargs):
+        return (await self.send_request(method, url, **kwargs)).json()
+
+    async def update_cookies(self, browser_context):
+        pass
+
+
+class TestPooledAsyncClient(IsolatedAsyncioTestCase):
+    PAGES = 100
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), CommentPageHandler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    async def test_comment_pagination_reuses_connection(self):
+        # 旧方式：每页评论新建一个客户端，每页一个 TCP 连接
+        CommentPageHandler.connections = 0
+        for page in range(self.PAGES):
+            async with httpx.AsyncClient() as client:
+                await client.get(f"{self.base_url}/comments?cursor={page}")
+        self.assertEqual(CommentPageHandler.connections, self.PAGES)
+
+        # 新方式：平台客户端复用一个长连接客户端
+        CommentPageHandler.connections = 0
+        api_client = FakeApiClient()
+        for page in range(self.PAGES):
+            await api_client.request("GET", f"{self.base_url}/comments?cursor={page}")
+        await api_client.close_http_client()
+        self.assertEqual(CommentPageHandler.connections, 1)
+
+    async def test_rebuild_on_proxy_change(self):
+        pool = PooledAsyncClient()
+        first = await pool.get(None)
+        self.assertIs(await pool.get(None), first)
+
+        second = await pool.get("http://127.0.0.1:1")
+        self.assertIsNot(second, first)
+        self.assertTrue(first.is_closed)
+
+        await pool.aclose()
+        self.assertTrue(second.is_closed)
+
+    async def test_proxy_change_waits_for_in_flight_requests(self):
+        api_client = FakeApiClient()
+        old_client = await api_client.get_http_client()
+        slow = asyncio.create_task(api_client.request("GET", f"{self.base_url}/slow"))
+        await asyncio.sleep(0.1)
+
+        # 请求进行中切换代理：新请求使用新客户端，旧客户端不被立即关闭
+        api_client.update_proxy("http://127.0.0.1:1")
+        new_client = await api_client.get_http_client()
+        self.assertIsNot(new_client, old_client)
+        self.assertFalse(old_client.is_closed)
+
+        self.assertEqual((await slow)["code"], 0)
+        self.assertTrue(old_client.is_closed)
+        await api_client.close_http_client()
+        self.assertTrue(new_client.is_closed)
+
+    async def test_api_client_update_proxy(self):
+        api_client = FakeApiClient()
+        first = await api_client.get_http_client()
+        api_client.update_proxy("http://127.0.0.1:1")
+        second = await api_client.get_http_client()
+        self.assertIsNot(second, first)
+        await api_client.close_http_client()
+        self.assertTrue(second.is_closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 常驻 JS 签名运行时测试，需要本机安装 node
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from tools.js_runtime import JsRuntimeError, PersistentJsRuntime
+
+SCRIPT = """
+const crypto = require('crypto');
+var loaded = (typeof loaded === 'undefined' ? 0 : loaded) + 1;
+function md5(s) { return crypto.createHash('md5').update(s).digest('hex'); }
+function load_count() { return loaded; }
+function fail() { throw new Error('bad sign'); }
+function hang() { while (true) {} }
+"""
+
+
+@unittest.skipUnless(shutil.which("node"), "node is not installed")
+class TestPersistentJsRuntime(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        fd, self.script_path = tempfile.mkstemp(suffix=".js")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(SCRIPT)
+        self.runtime = PersistentJsRuntime(self.script_path)
+
+    def tearDown(self):
+        self.runtime.close()
+        os.remove(self.script_path)
+
+    async def test_compiled_once_and_batched(self):
+        self.assertEqual(self.runtime.call("md5", "abc"), "900150983cd24fb0d6963f7d28e17f72")
+        results = await asyncio.gather(*[self.runtime.acall("md5", str(i)) for i in range(50)])
+        self.assertEqual(len(set(results)), 50)
+        # 脚本只加载一次，50 个并发签名合并为一次往返
+        self.assertEqual(self.runtime.call("load_count"), 1)
+        self.assertEqual(self.runtime.stats()["batches"], 3)
+        self.assertEqual(self.runtime.stats()["calls"], 52)
+
+    async def test_errors_and_restart(self):
+        results = await asyncio.gather(
+            self.runtime.acall("md5", "a"), self.runtime.acall("fail"), return_exceptions=True
+        )
+        self.assertEqual(results[0], "0cc175b9c0f1b6a831c399e269772661")
+        self.assertIsInstance(results[1], JsRuntimeError)
+
+        # node 进程意外退出后，下一次调用自动重启
+        self.runtime._proc.kill()
+        self.runtime._proc.wait()
+        self.assertEqual(self.runtime.call("md5", "a"), "0cc175b9c0f1b6a831c399e269772661")
+
+    async def test_hung_call_times_out_without_blocking_loop(self):
+        runtime = PersistentJsRuntime(self.script_path, timeout=0.5)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker_task = asyncio.create_task(ticker())
+        try:
+            with self.assertRaises(JsRuntimeError):
+                await runtime.acall("hang")
+            # 等待签名期间事件循环仍在调度其他任务
+            self.assertGreater(ticks, 10)
+            # 超时的进程被杀掉，下一次调用重新启动
+            self.assertEqual(await runtime.acall("md5", "a"), "0cc175b9c0f1b6a831c399e269772661")
+        finally:
+            ticker_task.cancel()
+            runtime.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
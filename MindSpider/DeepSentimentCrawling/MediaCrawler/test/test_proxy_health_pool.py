@@ -0,0 +1,264 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 健康分代理池测试：本地假代理商 + 本地转发代理 + 本地回显服务，不访问外网
+import asyncio
+import json
+import threading
+import time
+import unittest
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import httpx
+from tenacity import stop_after_attempt
+
+import config
+from media_platform.xhs.client import XiaoHongShuClient
+from media_platform.xhs.exception import IPBlockError
+from proxy.base_proxy import ProxyProvider
+from proxy.proxy_ip_pool import ProxyIpPool, proxy_key
+from proxy.types import IpInfoModel
+from tools import utils
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """回显服务，代替 IP_PROXY_VALIDATE_URL"""
+
+    def do_GET(self):
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ForwardProxyHandler(BaseHTTPRequestHandler):
+    """最简单的 HTTP 转发代理：延迟 delay 秒后把绝对地址的 GET 请求转发出去；status 不为空时直接返回该状态码"""
+    delay = 0.0
+    status: Optional[int] = None
+    requests = 0
+    # 转发时不读取环境变量中的代理
+    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+    def do_GET(self):
+        type(self).requests += 1
+        time.sleep(self.delay)
+        if self.status is not None:
+            self.send_error(self.status)
+            return
+        with self.opener.open(self.path, timeout=5) as upstream:
+            body = upstream.read()
+            self.send_response(upstream.status)
+            self.send_header("Content-Type", upstream.headers.get("Content-Type", ""))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeProvider(ProxyProvider):
+    """按顺序分配本地代理端口，分配完后不再返回新IP"""
+
+    def __init__(self, ports: List[int]):
+        self.ports = list(ports)
+        self.calls = 0
+
+    async def get_proxy(self, num: int) -> List[IpInfoModel]:
+        self.calls += 1
+        ports, self.ports = self.ports[:num], self.ports[num:]
+        return [IpInfoModel(ip="127.0.0.1", port=port, user="", password="", expired_time_ts=600) for port in ports]
+
+
+class TestProxyHealthPool(IsolatedAsyncioTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.servers = []
+        cls.echo_url = f"http://127.0.0.1:{cls.start_server(EchoHandler)}/"
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in cls.servers:
+            server.shutdown()
+            server.server_close()
+
+    @classmethod
+    def start_server(cls, handler) -> int:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        cls.servers.append(server)
+        return server.server_address[1]
+
+    def start_proxy(self, delay: float = 0.0, status: Optional[int] = None) -> int:
+        handler = type("ProxyHandler", (ForwardProxyHandler,), {"delay": delay, "status": status, "requests": 0})
+        port = self.start_server(handler)
+        self.proxy_handlers[port] = handler
+        return port
+
+    def proxy_requests(self) -> int:
+        return sum(handler.requests for handler in self.proxy_handlers.values())
+
+    def new_pool(self, ip_pool_count: int, enable_validate_ip: bool, provider: ProxyProvider) -> ProxyIpPool:
+        return ProxyIpPool(ip_pool_count, enable_validate_ip, provider, valid_ip_url=self.echo_url)
+
+    def setUp(self):
+        self.proxy_handlers = {}
+        self.patches = [
+            patch.object(config, "IP_PROXY_PREFETCH_THRESHOLD", 1),
+            patch.object(config, "IP_PROXY_MAX_FAILURES", 2),
+            patch.object(config, "IP_PROXY_QUARANTINE_SEC", 60),
+            patch.object(config, "IP_PROXY_EXPIRE_MARGIN_SEC", 30),
+            patch.object(config, "IP_PROXY_VALIDATE_TIMEOUT", 2),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    async def test_validate_through_real_proxy(self):
+        healthy, slow, bad = self.start_proxy(), self.start_proxy(delay=1), self.start_proxy(status=502)
+        pool = self.new_pool(3, True, FakeProvider([]))
+        proxies = {port: IpInfoModel(ip="127.0.0.1", port=port, user="", password="", expired_time_ts=600)
+                   for port in (healthy, slow, bad)}
+
+        # 验证请求经本地代理转发到回显服务：正常转发、超时、代理返回错误状态码
+        self.assertTrue(await pool._is_valid_proxy(proxies[healthy]))
+        with patch.object(config, "IP_PROXY_VALIDATE_TIMEOUT", 0.3):
+            self.assertFalse(await pool._is_valid_proxy(proxies[slow]))
+        self.assertFalse(await pool._is_valid_proxy(proxies[bad]))
+        self.assertEqual([self.proxy_handlers[port].requests for port in (healthy, slow, bad)], [1, 1, 1])
+        await pool.close()
+
+    async def test_concurrent_validation_and_best_score(self):
+        ports = [self.start_proxy(0.4), self.start_proxy(0.1), self.start_proxy(0.4, status=502), self.start_proxy(0.4)]
+        pool = self.new_pool(4, True, FakeProvider(ports))
+        start = time.monotonic()
+        await pool.load_proxies()
+        # 4 个代理并发验证，耗时接近最慢的一个（逐个验证至少 1.3 秒）
+        self.assertLess(time.monotonic() - start, 1.0)
+
+        proxy = await pool.get_proxy()
+        self.assertEqual(proxy.port, ports[1])
+        self.assertNotIn(ports[2], [p.port for p in pool.proxy_list])
+        self.assertNotIn(ports[1], [p.port for p in pool.proxy_list])
+
+        # 归还后可以再次租借，好代理不会用一次就丢弃
+        pool.release_proxy(proxy, success=True, latency=0.05)
+        self.assertEqual((await pool.get_proxy()).port, ports[1])
+        await pool.close()
+
+    async def test_quarantine_and_prefetch(self):
+        provider = FakeProvider([self.start_proxy() for _ in range(4)])
+        pool = self.new_pool(2, True, provider)
+        await pool.load_proxies()
+
+        first = await pool.get_proxy()
+        # 只剩 1 个可用代理时在后台补充
+        await asyncio.sleep(0.05)
+        self.assertEqual(provider.calls, 2)
+        self.assertEqual(len(pool.proxies), 4)
+
+        # 连续失败达到阈值后隔离，httpx 代理地址也能归还
+        pool.release_proxy(first, success=False)
+        self.assertIn(first.port, [p.port for p in pool.proxy_list])
+        await pool.get_proxy()
+        pool.release_proxy(f"http://{first.ip}:{first.port}", success=False)
+        health = pool.proxies[proxy_key(first)]
+        self.assertTrue(health.is_quarantined(time.time()))
+        self.assertNotIn(first.port, [p.port for p in pool.proxy_list])
+
+        # 隔离结束后由后台检查重新验证
+        health.quarantined_until = 0
+        await pool.maintain()
+        self.assertIn(first.port, [p.port for p in pool.proxy_list])
+        await pool.close()
+
+    async def test_expired_proxies_dropped_and_reloaded(self):
+        provider = FakeProvider([self.start_proxy() for _ in range(2)])
+        pool = self.new_pool(1, False, provider)
+        await pool.load_proxies()
+        # 不验证时直接分配，且不会发起验证请求
+        proxy = await pool.get_proxy()
+        self.assertEqual(self.proxy_requests(), 0)
+        pool.release_proxy(proxy)
+
+        pool.proxies[proxy_key(proxy)].expire_at = time.time() + 10
+        new_proxy = await pool.get_proxy()
+        self.assertNotEqual(new_proxy.port, proxy.port)
+        self.assertNotIn(proxy_key(proxy), pool.proxies)
+        await pool.close()
+
+    async def test_platform_requests_feed_scores_and_rotate(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/ok":
+                return httpx.Response(200, json={"success": True, "data": {}})
+            if request.url.path == "/ip-blocked":
+                return httpx.Response(200, json={"success": False, "code": 300012})
+            return httpx.Response(461, headers={"Verifytype": "1", "Verifyuuid": "x"}, json={})
+
+        pool = self.new_pool(2, False, FakeProvider([self.start_proxy() for _ in range(4)]))
+        await pool.load_proxies()
+        leased = await pool.get_proxy()
+        _, proxy = utils.format_proxy_info(leased)
+        client = XiaoHongShuClient(proxy=proxy, headers={}, playwright_page=None, cookie_dict={})
+        client.bind_proxy_pool(pool)
+
+        async def mock_transport():
+            # 以本地 MockTransport 代替真实代理与平台接口
+            http_client = await client.get_http_client()
+            http_client._mounts = {}
+            http_client._transport = httpx.MockTransport(handler)
+
+        # 每次只请求一次，不走 request 的重试
+        request = XiaoHongShuClient.request.retry_with(stop=stop_after_attempt(1))
+        await mock_transport()
+        health = pool.proxies[proxy_key(leased)]
+        await request(client, "GET", "https://edith.xiaohongshu.com/ok")
+        self.assertEqual((health.successes, health.failures), (1, 0))
+        self.assertIsNotNone(health.latency)
+        score = health.score
+
+        # 平台返回 IP 被限制（状态码 200）与风控状态码都计为代理失败，健康分下降
+        with self.assertRaises(Exception) as ctx:
+            await request(client, "GET", "https://edith.xiaohongshu.com/ip-blocked")
+        self.assertIsInstance(ctx.exception.last_attempt.exception(), IPBlockError)
+        self.assertEqual(health.failures, 1)
+        self.assertLess(health.score, score)
+        self.assertEqual(client.proxy, proxy)
+
+        # 连续失败达到阈值：代理被隔离并归还，客户端换用新代理
+        with self.assertRaises(Exception):
+            await request(client, "GET", "https://edith.xiaohongshu.com/captcha")
+        self.assertTrue(health.is_quarantined(time.time()))
+        self.assertFalse(health.leased)
+        self.assertNotEqual(client.proxy, proxy)
+        self.assertTrue(pool.proxies[proxy_key(client.proxy)].leased)
+
+        await client.close_http_client()
+        self.assertFalse(pool.proxies[proxy_key(client.proxy)].leased)
+        await pool.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
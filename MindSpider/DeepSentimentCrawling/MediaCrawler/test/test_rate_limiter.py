@@ -0,0 +1,149 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 自适应限速器测试
+import asyncio
+import time
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+import httpx
+
+from media_platform.xhs.client import XiaoHongShuClient
+from tools import rate_limiter
+from media_platform.xhs.exception import IPBlockError
+from tools.rate_limiter import (AdaptiveRateLimiter, endpoint_class, get_rate_limiter, is_block_error,
+                                is_block_response)
+
+
+class TestAdaptiveRateLimiter(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        rate_limiter._limiters.clear()
+
+    def test_aimd_ramp_and_backoff(self):
+        limiter = AdaptiveRateLimiter("test", rate=0.5, min_rate=0.1, max_rate=1.0, increase_step=0.1,
+                                      decrease_factor=0.5, max_concurrency=4, block_cooldown=0)
+        for _ in range(3):
+            limiter.record_success()
+        self.assertAlmostEqual(limiter.current_rate, 0.8)
+        for _ in range(10):
+            limiter.record_success()
+        self.assertEqual(limiter.current_rate, 1.0)
+
+        limiter.record_block("HTTP 461")
+        self.assertEqual(limiter.current_rate, 0.5)
+        for _ in range(5):
+            limiter.record_block("HTTP 461")
+        self.assertEqual(limiter.current_rate, 0.1)
+        self.assertEqual(limiter.concurrency, 1)
+        self.assertEqual(limiter.stats()["blocks"], 6)
+
+    async def test_token_pacing_and_cooldown(self):
+        limiter = AdaptiveRateLimiter("test", rate=20, max_rate=20, block_cooldown=0.2)
+        start = time.monotonic()
+        for _ in range(5):
+            await limiter.wait()
+        # 第一个令牌立即可用，之后每个间隔 1/20 秒
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+        limiter.record_block("blocked")
+        start = time.monotonic()
+        await limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+    async def test_concurrency_slots(self):
+        limiter = AdaptiveRateLimiter("test", max_concurrency=2)
+        limiter._concurrency = 2
+        active = peak = 0
+
+        async def task():
+            nonlocal active, peak
+            async with limiter:
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*[task() for _ in range(6)])
+        self.assertEqual(peak, 2)
+
+        # 代码块中抛出风控异常时自动降速
+        with self.assertRaises(IPBlockError):
+            async with limiter:
+                raise IPBlockError("账号被封")
+        self.assertEqual(limiter.blocks, 1)
+        self.assertEqual(limiter.concurrency, 1)
+
+    async def test_response_hook_feedback(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/api/sns/web/v2/comment/page":
+                return httpx.Response(461, json={"code": 300012, "msg": "blocked"})
+            return httpx.Response(200, json={"success": True, "data": {}})
+
+        client = XiaoHongShuClient(headers={}, playwright_page=None, cookie_dict={})
+        http_client = await client.get_http_client()
+        http_client._transport = httpx.MockTransport(handler)
+        await http_client.get("https://edith.xiaohongshu.com/api/sns/web/v1/search/notes")
+        await http_client.get("https://edith.xiaohongshu.com/api/sns/web/v2/comment/page")
+        await client.close_http_client()
+
+        search = get_rate_limiter("xhs", "search")
+        comment = get_rate_limiter("xhs", "comment")
+        self.assertEqual((search.successes, search.blocks), (1, 0))
+        self.assertEqual((comment.successes, comment.blocks), (0, 1))
+
+    async def test_block_words_in_user_content_are_not_blocks(self):
+        comments = {"code": 0, "success": True, "data": {"comments": [
+            {"content": "这个号发帖太频繁了，是不是被封了"},
+            {"content": "登录一直要输验证码，风控好严"},
+        ]}}
+        note = {"code": 0, "success": True, "data": {"items": [{"title": "How to get unblocked"}]}}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if "comment" in request.url.path:
+                return httpx.Response(200, json=comments)
+            if request.url.path.endswith("/feed"):
+                return httpx.Response(200, json={"code": 300013, "success": False, "msg": "访问频次异常"})
+            return httpx.Response(200, json=note)
+
+        client = XiaoHongShuClient(headers={}, playwright_page=None, cookie_dict={})
+        http_client = await client.get_http_client()
+        http_client._transport = httpx.MockTransport(handler)
+        with patch.object(AdaptiveRateLimiter, "record_block", autospec=True) as record_block:
+            await http_client.get("https://edith.xiaohongshu.com/api/sns/web/v2/comment/page")
+            await http_client.get("https://edith.xiaohongshu.com/api/sns/web/v1/search/notes")
+            record_block.assert_not_called()
+            # 外层错误码表示风控时才降速
+            await http_client.get("https://edith.xiaohongshu.com/api/sns/web/v1/feed")
+            record_block.assert_called_once()
+        await client.close_http_client()
+
+    def test_block_detection(self):
+        self.assertTrue(is_block_response(461))
+        self.assertTrue(is_block_response(200, "blocked"))
+        self.assertTrue(is_block_response(200, '{"code": -412, "message": "请求被拦截"}', "bilibili"))
+        self.assertTrue(is_block_response(200, '{"error": {"code": 40362}}', "zhihu"))
+        self.assertFalse(is_block_response(200, '{"code": 0, "data": {"title": "操作太频繁 blocked"}}', "bilibili"))
+        self.assertFalse(is_block_response(200, '{"msg": "操作太频繁，请稍后再试"}'))
+        self.assertFalse(is_block_response(200, '{"status_code": 0}', "douyin"))
+        self.assertFalse(is_block_error(Exception("Request failed, url: /search?keyword=blocked")))
+        self.assertTrue(is_block_error(IPBlockError("x")))
+        self.assertFalse(is_block_error(ValueError("bad json")))
+        self.assertEqual(endpoint_class("https://api.bilibili.com/x/v2/reply/wbi/main"), "comment")
+        self.assertEqual(endpoint_class("https://www.douyin.com/aweme/v1/web/general/search/single/"), "search")
+        self.assertEqual(endpoint_class("https://weibo.com/ajax/statuses/show"), "detail")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : Reddit 进程内爬取接口测试
+import asyncio
+import time
+import unittest
+from contextlib import asynccontextmanager
+from unittest import IsolatedAsyncioTestCase
+
+import config
+from media_platform.reddit.core import RedditCrawler, RedditCrawlConfig
+
+
+class FakeRedditClient:
+    """每个关键词返回 limit 条帖子，keyword 为 "blocked" 时模拟被拒绝"""
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.calls = []
+
+    async def search(self, keyword: str, limit: int = 25):
+        self.calls.append((keyword, limit))
+        await asyncio.sleep(self.delay)
+        if keyword == "blocked":
+            raise RuntimeError("403 Forbidden")
+        children = [
+            {"data": {"id": f"{keyword.lower()}{i}", "title": f"{keyword} {i}", "selftext": "",
+                      "created_utc": 1600000000, "ups": i, "num_comments": 0, "author": "u",
+                      "permalink": f"/r/test/{i}"}}
+            for i in range(limit)
+        ]
+        return {"data": {"children": children}}
+
+
+class FakeSession:
+    def __init__(self, saved):
+        self.saved = saved
+
+    async def execute(self, stmt):
+        class Result:
+            def scalar_one_or_none(self):
+                return None
+        return Result()
+
+    def add(self, note):
+        self.saved.append(note)
+
+    async def commit(self):
+        pass
+
+
+class TestRedditCrawl(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.saved = []
+
+        @asynccontextmanager
+        async def session_factory():
+            yield FakeSession(self.saved)
+
+        self.client = FakeRedditClient()
+        self.crawler = RedditCrawler(client=self.client, session_factory=session_factory)
+
+    async def test_keywords_crawled_concurrently_with_explicit_config(self):
+        original_keywords = config.KEYWORDS
+        start = time.monotonic()
+        results = await self.crawler.crawl(
+            RedditCrawlConfig(keywords=["TSLA", "NVDA", " ", "AAPL"], max_notes_count=3, max_concurrency=3)
+        )
+        elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(list(results), ["TSLA", "NVDA", "AAPL"])
+        self.assertTrue(all(r["success"] and r["notes_count"] == 3 for r in results.values()))
+        self.assertEqual({n.source_keyword for n in self.saved}, {"TSLA", "NVDA", "AAPL"})
+        self.assertEqual(self.client.calls[0], ("TSLA", 3))
+        # 不读写全局配置
+        self.assertEqual(config.KEYWORDS, original_keywords)
+
+    async def test_failed_keyword_does_not_affect_others(self):
+        results = await asyncio.gather(
+            self.crawler.crawl(RedditCrawlConfig(keywords=["blocked", "TSLA"], max_notes_count=2)),
+            self.crawler.crawl(RedditCrawlConfig(keywords=["NVDA"], max_notes_count=1)),
+        )
+        self.assertFalse(results[0]["blocked"]["success"])
+        self.assertIn("403", results[0]["blocked"]["error"])
+        self.assertEqual(results[0]["TSLA"]["notes_count"], 2)
+        self.assertEqual(results[1]["NVDA"]["notes_count"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
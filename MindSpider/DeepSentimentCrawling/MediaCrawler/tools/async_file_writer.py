@@ -1,20 +1,110 @@
+import argparse
 import asyncio
 import csv
+import glob
+import gzip
+import io
 import json
 import os
 import pathlib
-from typing import Dict, List
+import re
+import time
+from typing import Dict, Iterator, List, Optional
+
 import aiofiles
 import config
 from tools.utils import utils
-from tools.words import AsyncWordCloudGenerator
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class _FileSink:
+    """
+    A persistent append handle for one output file, with an in-memory write buffer.
+    Shared by every AsyncFileWriter writing the same (platform, item_type, date) file.
+    """
+
+    def __init__(self, path: str, file_type: str):
+        self.path = path
+        self.file_type = file_type
+        self.flush_bytes = config.FILE_WRITER_FLUSH_BYTES
+        self.flush_interval = config.FILE_WRITER_FLUSH_INTERVAL
+        self.rotate_bytes = int(config.FILE_ROTATE_MAX_MB * 1024 * 1024)
+        self.compression = config.FILE_ROTATE_COMPRESSION
+        self.lock = asyncio.Lock()
+        self.fieldnames: Optional[List[str]] = None
+        self._buffer: List[str] = []
+        self._buffered_bytes = 0
+        self._last_flush = time.monotonic()
+        if file_type == "csv":
+            self.fieldnames = _read_csv_header(path)
+            self._fh = open(path, "a", newline="", encoding="utf-8-sig")
+        else:
+            self._fh = open(path, "a", encoding="utf-8")
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def write(self, text: str) -> bool:
+        """Buffer text, return True when the buffer should be flushed"""
+        self._buffer.append(text)
+        self._buffered_bytes += len(text)
+        return (
+            self._buffered_bytes >= self.flush_bytes
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    async def flush(self):
+        async with self.lock:
+            self._last_flush = time.monotonic()
+            if not self._buffer:
+                return
+            data, self._buffer, self._buffered_bytes = "".join(self._buffer), [], 0
+            await asyncio.to_thread(self._write_sync, data)
+
+    async def close(self):
+        await self.flush()
+        async with self.lock:
+            self._fh.close()
+
+    def _write_sync(self, data: str):
+        if self.file_type == "csv" and self._fh.tell() == 0 and self.fieldnames:
+            data = _format_csv_header(self.fieldnames) + data
+        self._fh.write(data)
+        self._fh.flush()
+        if self.rotate_bytes and self._fh.tell() >= self.rotate_bytes:
+            self._rotate_sync()
+
+    def _rotate_sync(self):
+        """Move the full file to the next numbered part, compress it and start a new file"""
+        self._fh.close()
+        part_path = _next_part_path(self.path)
+        os.replace(self.path, part_path)
+        self._fh = open(self.path, "a", newline="" if self.file_type == "csv" else None,
+                        encoding="utf-8-sig" if self.file_type == "csv" else "utf-8")
+        compressed = _compress_file(part_path, self.compression)
+        utils.logger.info(f"[AsyncFileWriter] rotated {self.path} -> {compressed}")
+
+
+_sinks: Dict[str, _FileSink] = {}
+_sinks_lock: Optional[asyncio.Lock] = None
+_flush_task: Optional[asyncio.Task] = None
+
 
 class AsyncFileWriter:
     def __init__(self, platform: str, crawler_type: str):
         self.lock = asyncio.Lock()
         self.platform = platform
         self.crawler_type = crawler_type
-        self.wordcloud_generator = AsyncWordCloudGenerator() if config.ENABLE_GET_WORDCLOUD else None
+        self.wordcloud_generator = None
+        if config.ENABLE_GET_WORDCLOUD:
+            # the wordcloud dependencies (matplotlib, wordcloud) are only needed when it is enabled
+            from tools.words import AsyncWordCloudGenerator
+            self.wordcloud_generator = AsyncWordCloudGenerator()
 
     def _get_file_path(self, file_type: str, item_type: str) -> str:
         base_path = f"data/{self.platform}/{file_type}"
@@ -22,17 +112,40 @@ class AsyncFileWriter:
         file_name = f"{self.crawler_type}_{item_type}_{utils.get_current_date()}.{file_type}"
         return f"{base_path}/{file_name}"
 
+    async def _get_sink(self, file_type: str, item_type: str) -> _FileSink:
+        global _sinks_lock
+        if _sinks_lock is None:
+            _sinks_lock = asyncio.Lock()
+        file_path = self._get_file_path(file_type, item_type)
+        sink = _sinks.get(file_path)
+        if sink is not None:
+            return sink
+        async with _sinks_lock:
+            sink = _sinks.get(file_path)
+            if sink is None:
+                # the date rolled over: release the handle of yesterday's file
+                prefix = file_path.rsplit("_", 1)[0]
+                for path in [p for p in _sinks if p.rsplit("_", 1)[0] == prefix]:
+                    await _sinks.pop(path).close()
+                sink = _FileSink(file_path, file_type)
+                _sinks[file_path] = sink
+                _ensure_flush_task()
+        return sink
+
     async def write_to_csv(self, item: Dict, item_type: str):
-        file_path = self._get_file_path('csv', item_type)
-        async with self.lock:
-            file_exists = os.path.exists(file_path)
-            async with aiofiles.open(file_path, 'a', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=item.keys())
-                if not file_exists or await f.tell() == 0:
-                    await writer.writeheader()
-                await writer.writerow(item)
+        sink = await self._get_sink('csv', item_type)
+        if sink.fieldnames is None:
+            sink.fieldnames = list(item.keys())
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=sink.fieldnames, extrasaction="ignore").writerow(item)
+        if sink.write(buffer.getvalue()):
+            await sink.flush()
 
     async def write_single_item_to_json(self, item: Dict, item_type: str):
+        if config.JSON_FILE_FORMAT == "jsonl":
+            await self.write_to_jsonl(item, item_type)
+            return
+
         file_path = self._get_file_path('json', item_type)
         async with self.lock:
             existing_data = []
@@ -46,12 +159,47 @@ class AsyncFileWriter:
                             existing_data = [existing_data]
                     except json.JSONDecodeError:
                         existing_data = []
-            
+
             existing_data.append(item)
 
             async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
                 await f.write(json.dumps(existing_data, ensure_ascii=False, indent=4))
 
+    async def write_to_jsonl(self, item: Dict, item_type: str):
+        """
+        Append one item as a JSON line, the file is never re-read
+        """
+        sink = await self._get_sink('jsonl', item_type)
+        if sink.write(json.dumps(item, ensure_ascii=False) + "\n"):
+            await sink.flush()
+
+    async def export_legacy_json(self, item_type: str) -> Optional[str]:
+        """
+        Export today's JSON Lines file (including rotated parts) as the legacy JSON array file
+        :return: path of the exported .json file, None if there is no data
+        """
+        jsonl_path = self._get_file_path('jsonl', item_type)
+        await flush_all_file_writers()
+        if not _jsonl_part_paths(jsonl_path):
+            return None
+        json_path = self._get_file_path('json', item_type)
+        return await asyncio.to_thread(export_json_array, jsonl_path, json_path)
+
+    async def _read_items(self, item_type: str) -> List[Dict]:
+        if config.JSON_FILE_FORMAT == "jsonl":
+            await flush_all_file_writers()
+            return await asyncio.to_thread(lambda: list(iter_jsonl_items(self._get_file_path('jsonl', item_type))))
+
+        file_path = self._get_file_path('json', item_type)
+        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+            return []
+        async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
+            content = await f.read()
+        if not content:
+            return []
+        data = json.loads(content)
+        return data if isinstance(data, list) else [data]
+
     async def generate_wordcloud_from_comments(self):
         """
         Generate wordcloud from comments data
@@ -64,22 +212,12 @@ class AsyncFileWriter:
             return
 
         try:
-            # Read comments from JSON file
-            comments_file_path = self._get_file_path('json', 'comments')
-            if not os.path.exists(comments_file_path) or os.path.getsize(comments_file_path) == 0:
-                utils.logger.info(f"[AsyncFileWriter.generate_wordcloud_from_comments] No comments file found at {comments_file_path}")
+            # Read comments from the JSON / JSON Lines file
+            comments_data = await self._read_items('comments')
+            if not comments_data:
+                utils.logger.info(f"[AsyncFileWriter.generate_wordcloud_from_comments] No comments found")
                 return
 
-            async with aiofiles.open(comments_file_path, 'r', encoding='utf-8') as f:
-                content = await f.read()
-                if not content:
-                    utils.logger.info(f"[AsyncFileWriter.generate_wordcloud_from_comments] Comments file is empty")
-                    return
-
-                comments_data = json.loads(content)
-                if not isinstance(comments_data, list):
-                    comments_data = [comments_data]
-
             # Filter comments data to only include 'content' field
             # Handle different comment data structures across platforms
             filtered_data = []
@@ -104,4 +242,189 @@ class AsyncFileWriter:
             utils.logger.info(f"[AsyncFileWriter.generate_wordcloud_from_comments] Wordcloud generated successfully at {words_file_prefix}")
 
         except Exception as e:
-            utils.logger.error(f"[AsyncFileWriter.generate_wordcloud_from_comments] Error generating wordcloud: {e}")
\ No newline at end of file
+            utils.logger.error(f"[AsyncFileWriter.generate_wordcloud_from_comments] Error generating wordcloud: {e}")
+
+
+def _ensure_flush_task():
+    """Flush buffers that stay below the size threshold once FILE_WRITER_FLUSH_INTERVAL has passed"""
+    global _flush_task
+    if _flush_task and not _flush_task.done():
+        return
+    _flush_task = asyncio.get_running_loop().create_task(_flush_periodically())
+
+
+async def _flush_periodically():
+    while True:
+        await asyncio.sleep(config.FILE_WRITER_FLUSH_INTERVAL)
+        for sink in list(_sinks.values()):
+            if not sink.pending:
+                continue
+            try:
+                await sink.flush()
+            except Exception as e:
+                utils.logger.error(f"[AsyncFileWriter._flush_periodically] flush {sink.path} error: {e}")
+
+
+async def flush_all_file_writers():
+    """Write every buffered line to disk"""
+    for sink in list(_sinks.values()):
+        await sink.flush()
+
+
+async def close_all_file_writers():
+    """Called when crawling finishes: flush the buffers and close all file handles"""
+    global _flush_task
+    if _flush_task and not _flush_task.done():
+        _flush_task.cancel()
+    _flush_task = None
+    sinks = list(_sinks.values())
+    _sinks.clear()
+    for sink in sinks:
+        await sink.close()
+
+
+def _read_csv_header(path: str) -> Optional[List[str]]:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f), None)
+
+
+def _format_csv_header(fieldnames: List[str]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(fieldnames)
+    return buffer.getvalue()
+
+
+def _part_number(path: str) -> int:
+    match = re.search(r"\.part(\d+)\.", os.path.basename(path))
+    return int(match.group(1)) if match else 0
+
+
+def _next_part_path(path: str) -> str:
+    stem, ext = os.path.splitext(path)
+    numbers = [_part_number(p) for p in glob.glob(f"{glob.escape(stem)}.part*{ext}*")]
+    return f"{stem}.part{max(numbers, default=0) + 1}{ext}"
+
+
+def _compress_file(path: str, compression: str) -> str:
+    """Compress a rotated part in place, return the final path"""
+    if compression == "zstd" and zstandard is None:
+        utils.logger.warning("[AsyncFileWriter] zstandard is not installed, fall back to gzip")
+        compression = "gzip"
+    if compression == "gzip":
+        target = f"{path}.gz"
+        with open(path, "rb") as src, gzip.open(target, "wb") as dst:
+            while chunk := src.read(1024 * 1024):
+                dst.write(chunk)
+    elif compression == "zstd":
+        target = f"{path}.zst"
+        with open(path, "rb") as src, open(target, "wb") as dst:
+            zstandard.ZstdCompressor().copy_stream(src, dst)
+    else:
+        return path
+    os.remove(path)
+    return target
+
+
+def _jsonl_part_paths(jsonl_path: str) -> List[str]:
+    """Rotated parts in order, followed by the current file"""
+    stem, ext = os.path.splitext(jsonl_path)
+    parts = sorted(glob.glob(f"{glob.escape(stem)}.part*{ext}*"), key=_part_number)
+    if os.path.exists(jsonl_path):
+        parts.append(jsonl_path)
+    return parts
+
+
+def _open_text(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {path}")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True),
+                                encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_jsonl_items(jsonl_path: str) -> Iterator[Dict]:
+    """
+    Iterate the items of a JSON Lines file and its rotated (compressed) parts
+    A truncated last line, e.g. after the crawler was killed, is skipped
+    """
+    for path in _jsonl_part_paths(jsonl_path):
+        with _open_text(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    utils.logger.warning(f"[AsyncFileWriter.iter_jsonl_items] skip broken line in {path}")
+
+
+def export_json_array(jsonl_path: str, json_path: Optional[str] = None) -> str:
+    """
+    Convert a JSON Lines file into the legacy JSON array format (indent=4)
+    :param jsonl_path: path of the .jsonl file
+    :param json_path: output path, defaults to data/{platform}/json/ with the same file name
+    :return: output path
+    """
+    if json_path is None:
+        directory, file_name = os.path.split(jsonl_path)
+        json_dir = os.path.join(os.path.dirname(directory), "json")
+        pathlib.Path(json_dir).mkdir(parents=True, exist_ok=True)
+        json_path = os.path.join(json_dir, os.path.splitext(file_name)[0] + ".json")
+
+    with open(json_path, "w", encoding="utf-8") as f:
+        count = 0
+        f.write("[")
+        for item in iter_jsonl_items(jsonl_path):
+            f.write(",\n    " if count else "\n    ")
+            f.write(json.dumps(item, ensure_ascii=False, indent=4).replace("\n", "\n    "))
+            count += 1
+        f.write("\n]" if count else "]")
+    return json_path
+
+
+async def benchmark(items: int = 500) -> Dict[str, float]:
+    """
+    Write throughput of the legacy JSON array (read-modify-write per item) vs JSON Lines,
+    in a temporary working directory. Returns items/s for each format.
+    """
+    import tempfile
+
+    rows = [{"comment_id": i, "content": f"comment {i}" * 5, "like_count": i} for i in range(items)]
+    saved = config.JSON_FILE_FORMAT, config.ENABLE_GET_WORDCLOUD
+    cwd = os.getcwd()
+    result = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        config.ENABLE_GET_WORDCLOUD = False
+        try:
+            for file_format in ("json", "jsonl"):
+                config.JSON_FILE_FORMAT = file_format
+                writer = AsyncFileWriter(platform="benchmark", crawler_type="search")
+                start = time.perf_counter()
+                for row in rows:
+                    await writer.write_single_item_to_json(row, "comments")
+                await close_all_file_writers()
+                result[file_format] = items / (time.perf_counter() - start)
+        finally:
+            config.JSON_FILE_FORMAT, config.ENABLE_GET_WORDCLOUD = saved
+            os.chdir(cwd)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export JSON Lines output as the legacy JSON array format")
+    parser.add_argument("jsonl_files", nargs="*", help="data/{platform}/jsonl/*.jsonl")
+    parser.add_argument("--benchmark", type=int, metavar="ITEMS",
+                        help="compare JSON array and JSON Lines write throughput instead of exporting")
+    args = parser.parse_args()
+    if args.benchmark:
+        for name, rate in asyncio.run(benchmark(args.benchmark)).items():
+            print(f"{name:<8}{rate:>10.0f} items/s")
+    for jsonl_file in args.jsonl_files:
+        print(export_json_array(jsonl_file))
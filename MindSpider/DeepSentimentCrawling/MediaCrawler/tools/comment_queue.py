@@ -0,0 +1,175 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 评论抓取任务队列：一级评论翻页的同时，把每条一级评论下的二级评论线程作为任务提交，
+#            由固定数量的 worker 并发执行；请求速率仍由各任务中 pace(crawl_interval) 使用的平台限速器控制，
+#            抓到的评论通过回调立即写入存储
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional
+
+import config
+
+from . import utils
+
+
+class CommentWorkQueue:
+    """
+    有界的异步任务队列
+
+    async with CommentWorkQueue() as queue:
+        await queue.submit(fetch_thread, comment)
+    退出 async with 时等待所有任务完成。队列已满时 submit 会等待，避免一次性创建过多任务。
+    任务中不要再调用 submit，否则队列满时会互相等待。
+    单个任务失败不影响其他任务，异常收集在 errors 中，由调用方决定是否保存进度。
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, max_pending: Optional[int] = None, name: str = ""):
+        """
+        Args:
+            concurrency: 并发 worker 数，默认 SUB_COMMENT_CONCURRENCY
+            max_pending: 排队任务上限，默认 worker 数的 4 倍
+            name: 队列名称，用于日志
+        """
+        self.concurrency = max(1, concurrency or config.SUB_COMMENT_CONCURRENCY)
+        self.name = name
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending or self.concurrency * 4)
+        self._workers: List[asyncio.Task] = []
+        self.completed = 0
+        self.errors: List[BaseException] = []
+
+    @property
+    def failed(self) -> int:
+        """失败的任务数"""
+        return len(self.errors)
+
+    async def __aenter__(self):
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc is None:
+                await self._queue.join()
+        finally:
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+        return False
+
+    async def submit(self, func: Callable[..., Awaitable], *args, **kwargs):
+        """
+        提交一个任务，队列已满时等待
+        Args:
+            func: 异步函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+
+        """
+        await self._queue.put((func, args, kwargs))
+
+    async def _worker(self):
+        while True:
+            func, args, kwargs = await self._queue.get()
+            try:
+                await func(*args, **kwargs)
+                self.completed += 1
+            except Exception as e:
+                # 单个评论线程失败不影响其他线程，异常留给调用方判断
+                self.errors.append(e)
+                utils.logger.error(f"[CommentWorkQueue] {self.name} task {getattr(func, '__name__', func)} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+async def save_cursor_when_done(queue: CommentWorkQueue, cursor_callback: Optional[Callable[..., Awaitable]],
+                                cursor: Any, has_more: bool) -> bool:
+    """
+    在队列退出（所有二级评论线程结束）后保存评论翻页游标；有线程失败时不保存，
+    下次从上次保存的游标重新抓取，避免把缺少二级评论的内容标记为已爬完
+    Args:
+        queue: 已退出的评论任务队列
+        cursor_callback: 保存游标的回调 (下一页游标, 是否还有更多)
+        cursor: 下一页游标
+        has_more: 是否还有更多评论
+
+    Returns:
+        是否保存了游标
+    """
+    if cursor_callback is None:
+        return False
+    if queue.errors:
+        utils.logger.warning(
+            f"[CommentWorkQueue] {queue.name}: {queue.failed} comment threads failed, keep previous cursor"
+        )
+        return False
+    await cursor_callback(cursor, has_more)
+    return True
+
+
+async def run_in_queue(queue: Optional[CommentWorkQueue], func: Callable[..., Awaitable], items: list, *args, name: str = ""):
+    """
+    对每个 item 执行 func(item, *args)：传入已打开的队列时提交后立即返回（结果在队列退出前完成），
+    否则新建一个队列并等待全部完成
+    Args:
+        queue: 外层已打开的队列，None 时新建
+        func: 异步函数
+        items: 任务参数列表
+        *args: 其他参数
+        name: 新建队列的名称
+
+    Returns:
+
+    """
+    if queue is not None:
+        for item in items:
+            await queue.submit(func, item, *args)
+        return
+    async with CommentWorkQueue(name=name) as own_queue:
+        for item in items:
+            await own_queue.submit(func, item, *args)
+
+
+async def benchmark(threads: int = 10, pages: int = 2, latency: float = 0.05, concurrency: int = 5) -> dict:
+    """
+    二级评论抓取耗时基准：每个线程按页串行请求，比较逐个线程抓取与队列并发抓取的总耗时
+    Args:
+        threads: 二级评论线程数
+        pages: 每个线程的页数
+        latency: 模拟的单次请求耗时（秒）
+        concurrency: 队列并发数
+
+    Returns:
+        {"serial": 秒, "queue": 秒}
+    """
+    import time
+
+    async def fetch_thread(_):
+        for _ in range(pages):
+            await asyncio.sleep(latency)
+
+    result = {}
+    for name, workers in (("serial", 1), ("queue", concurrency)):
+        start = time.perf_counter()
+        async with CommentWorkQueue(concurrency=workers, name=name) as queue:
+            for thread in range(threads):
+                await queue.submit(fetch_thread, thread)
+        result[name] = time.perf_counter() - start
+    return result
+
+
+if __name__ == "__main__":
+    # python -m tools.comment_queue
+    for name, seconds in asyncio.run(benchmark()).items():
+        print(f"{name:<8}{seconds:>8.2f}s")
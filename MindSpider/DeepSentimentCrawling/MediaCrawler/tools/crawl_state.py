@@ -0,0 +1,245 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 增量爬取状态：每个 (平台, 关键词) 已见过的最新内容水位线，以及每条内容的评论翻页游标
+#            状态保存在本地 SQLite 文件中，与数据保存方式（csv/json/db）无关
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+import config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS keyword_watermark (
+    platform TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    newest_ts INTEGER NOT NULL,
+    newest_id TEXT NOT NULL,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (platform, keyword)
+);
+CREATE TABLE IF NOT EXISTS comment_cursor (
+    platform TEXT NOT NULL,
+    note_id TEXT NOT NULL,
+    cursor TEXT NOT NULL,
+    finished INTEGER NOT NULL DEFAULT 0,
+    updated_at INTEGER NOT NULL,
+    PRIMARY KEY (platform, note_id)
+);
+"""
+
+
+@dataclass
+class Watermark:
+    newest_ts: int
+    newest_id: str
+
+
+@dataclass
+class CommentCursor:
+    cursor: str
+    finished: bool
+    updated_at: int
+
+
+def to_seconds(ts: Any) -> Optional[int]:
+    """平台返回的时间戳有秒和毫秒两种，统一转换为秒"""
+    try:
+        ts = int(ts)
+    except (TypeError, ValueError):
+        return None
+    return ts // 1000 if ts > 10 ** 11 else ts
+
+
+class CrawlStateStore:
+    """增量爬取状态的 SQLite 存储，读写都是本地小事务，直接在事件循环中同步执行"""
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: SQLite 文件路径
+        """
+        if db_path != ":memory:":
+            pathlib.Path(os.path.dirname(os.path.abspath(db_path))).mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def get_watermark(self, platform: str, keyword: str) -> Optional[Watermark]:
+        row = self._conn.execute(
+            "SELECT newest_ts, newest_id FROM keyword_watermark WHERE platform = ? AND keyword = ?",
+            (platform, keyword),
+        ).fetchone()
+        return Watermark(newest_ts=row[0], newest_id=row[1]) if row else None
+
+    def update_watermark(self, platform: str, keyword: str, newest_ts: int, newest_id: str):
+        """
+        更新水位线，只会向前推进
+        Args:
+            platform: 平台
+            keyword: 搜索关键词
+            newest_ts: 本次见到的最新内容发布时间（秒）
+            newest_id: 该内容的 ID
+
+        Returns:
+
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO keyword_watermark (platform, keyword, newest_ts, newest_id, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (platform, keyword) DO UPDATE SET
+                    newest_ts = excluded.newest_ts,
+                    newest_id = excluded.newest_id,
+                    updated_at = excluded.updated_at
+                WHERE excluded.newest_ts > keyword_watermark.newest_ts
+                """,
+                (platform, keyword, newest_ts, str(newest_id), int(time.time())),
+            )
+
+    def get_comment_cursor(self, platform: str, note_id: str) -> Optional[CommentCursor]:
+        row = self._conn.execute(
+            "SELECT cursor, finished, updated_at FROM comment_cursor WHERE platform = ? AND note_id = ?",
+            (platform, str(note_id)),
+        ).fetchone()
+        return CommentCursor(cursor=row[0], finished=bool(row[1]), updated_at=row[2]) if row else None
+
+    def save_comment_cursor(self, platform: str, note_id: str, cursor: Any, finished: bool):
+        """
+        保存评论翻页游标
+        Args:
+            platform: 平台
+            note_id: 内容 ID
+            cursor: 下一页评论的游标
+            finished: 评论是否已经全部爬完
+
+        Returns:
+
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO comment_cursor (platform, note_id, cursor, finished, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (platform, note_id) DO UPDATE SET
+                    cursor = excluded.cursor,
+                    finished = excluded.finished,
+                    updated_at = excluded.updated_at
+                """,
+                (platform, str(note_id), "" if cursor is None else str(cursor), int(finished), int(time.time())),
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+class KeywordWatermark:
+    """
+    一次关键词搜索的增量判断：发布时间不晚于上次水位线（或就是水位线那条）的内容视为已爬取
+
+    搜索结果不一定按时间排序，因此单条已见内容只跳过；整页都是已见内容时才停止翻页。
+    """
+
+    def __init__(self, store: Optional[CrawlStateStore], platform: str, keyword: str):
+        self.store = store
+        self.platform = platform
+        self.keyword = keyword
+        self.previous = store.get_watermark(platform, keyword) if store else None
+        self.skipped = 0
+        self._newest: Optional[Tuple[int, str]] = None
+
+    def seen(self, content_id: Any, publish_ts: Any) -> bool:
+        """
+        记录一条搜索到的内容，并判断是否已在之前的运行中爬取过
+        Args:
+            content_id: 内容 ID
+            publish_ts: 发布时间戳（秒或毫秒）
+
+        Returns:
+            是否已爬取过
+        """
+        ts = to_seconds(publish_ts)
+        if ts is not None and (self._newest is None or ts > self._newest[0]):
+            self._newest = (ts, str(content_id))
+        if self.previous is None:
+            return False
+        is_seen = str(content_id) == self.previous.newest_id or (ts is not None and ts <= self.previous.newest_ts)
+        if is_seen:
+            self.skipped += 1
+        return is_seen
+
+    def commit(self):
+        """关键词搜索结束后保存新的水位线"""
+        if self.store and self._newest:
+            self.store.update_watermark(self.platform, self.keyword, *self._newest)
+
+
+class CommentProgress:
+    """单条内容的评论增量爬取：从上次保存的游标继续，并在每页之后保存游标"""
+
+    def __init__(self, store: Optional[CrawlStateStore], platform: str, note_id: Any):
+        self.store = store
+        self.platform = platform
+        self.note_id = str(note_id)
+        self.saved = store.get_comment_cursor(platform, self.note_id) if store else None
+
+    @property
+    def should_skip(self) -> bool:
+        """评论已爬完，且距离上次爬取未超过 INCREMENTAL_COMMENT_RECHECK_HOURS"""
+        if not self.saved or not self.saved.finished:
+            return False
+        return time.time() - self.saved.updated_at < config.INCREMENTAL_COMMENT_RECHECK_HOURS * 3600
+
+    def start_cursor(self, default: Any = ""):
+        """
+        本次评论翻页的起始游标：未爬完时从上次的游标继续，已爬完但需要复查时从头开始
+        Args:
+            default: 平台首页游标的默认值
+
+        Returns:
+
+        """
+        if not self.saved or self.saved.finished or self.saved.cursor == "":
+            return default
+        return type(default)(self.saved.cursor) if default is not None else self.saved.cursor
+
+    async def save(self, cursor: Any, has_more: bool):
+        """供平台客户端在每页评论处理完后回调"""
+        if self.store:
+            self.store.save_comment_cursor(self.platform, self.note_id, cursor, finished=not has_more)
+
+
+_store: Optional[CrawlStateStore] = None
+
+
+def get_crawl_state_store() -> Optional[CrawlStateStore]:
+    """未开启增量爬取时返回 None"""
+    global _store
+    if not config.ENABLE_INCREMENTAL_CRAWL:
+        return None
+    if _store is None:
+        _store = CrawlStateStore(config.CRAWL_STATE_DB_PATH)
+    return _store
+
+
+def keyword_watermark(platform: str, keyword: str) -> KeywordWatermark:
+    return KeywordWatermark(get_crawl_state_store(), platform, keyword)
+
+
+def comment_progress(platform: str, note_id: Any) -> CommentProgress:
+    return CommentProgress(get_crawl_state_store(), platform, note_id)
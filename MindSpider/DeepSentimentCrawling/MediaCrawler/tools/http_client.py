@@ -0,0 +1,158 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 平台客户端复用的长连接 httpx 客户端
+
+import asyncio
+import importlib.util
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+import httpx
+
+import config
+
+from . import utils
+
+# 未安装 h2 时 httpx 无法启用 HTTP/2
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def create_async_client(proxy: Optional[str] = None, **kwargs) -> httpx.AsyncClient:
+    """
+    创建带连接池的 httpx.AsyncClient
+    :param proxy: 代理地址
+    :param kwargs: 其他传给 httpx.AsyncClient 的参数
+    :return:
+    """
+    limits = httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    )
+    kwargs.setdefault("limits", limits)
+    kwargs.setdefault("http2", config.ENABLE_HTTP2 and HTTP2_AVAILABLE)
+    return httpx.AsyncClient(proxy=proxy, **kwargs)
+
+
+class PooledAsyncClient:
+    """
+    持有一个长连接客户端，所有请求复用同一个连接池；代理变化时换上新客户端，
+    旧客户端等其上进行中的请求（通过 lease / request 发起的）全部结束后再关闭
+    """
+
+    def __init__(self, **client_kwargs):
+        self._client_kwargs = client_kwargs
+        self._client: Optional[httpx.AsyncClient] = None
+        self._proxy: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._in_flight: Dict[httpx.AsyncClient, int] = {}
+        self._retired: Set[httpx.AsyncClient] = set()
+
+    async def get(self, proxy: Optional[str] = None) -> httpx.AsyncClient:
+        """
+        获取客户端
+        :param proxy: 当前使用的代理，与已有客户端的代理不同时重建客户端
+        :return:
+        """
+        client = self._client
+        if client is not None and not client.is_closed and proxy == self._proxy:
+            return client
+        async with self._lock:
+            if self._client is not None and (self._client.is_closed or proxy != self._proxy):
+                utils.logger.info(f"[PooledAsyncClient.get] proxy changed, rebuild http client")
+                await self._retire(self._client)
+                self._client = None
+            if self._client is None:
+                self._client = create_async_client(proxy=proxy, **self._client_kwargs)
+                self._proxy = proxy
+            return self._client
+
+    @asynccontextmanager
+    async def lease(self, proxy: Optional[str] = None) -> AsyncIterator[httpx.AsyncClient]:
+        """
+        在请求期间占用客户端，代理切换时被换下的客户端要等占用全部结束才关闭
+        :param proxy: 当前使用的代理
+        :return:
+        """
+        client = await self.get(proxy)
+        self._in_flight[client] = self._in_flight.get(client, 0) + 1
+        try:
+            yield client
+        finally:
+            self._in_flight[client] -= 1
+            if not self._in_flight[client]:
+                del self._in_flight[client]
+                if client in self._retired:
+                    self._retired.discard(client)
+                    await client.aclose()
+
+    async def request(self, method: str, url: str, proxy: Optional[str] = None, **kwargs) -> httpx.Response:
+        """
+        用当前代理对应的客户端发送请求（响应体已读取完毕）
+        :param method: 请求方法
+        :param url: 请求地址
+        :param proxy: 当前使用的代理
+        :param kwargs: 其他传给 httpx.AsyncClient.request 的参数
+        :return:
+        """
+        async with self.lease(proxy) as client:
+            return await client.request(method, url, **kwargs)
+
+    async def _retire(self, client: httpx.AsyncClient):
+        """换下旧客户端：没有进行中的请求时立即关闭，否则由最后一个请求结束时关闭"""
+        if self._in_flight.get(client):
+            self._retired.add(client)
+        else:
+            await client.aclose()
+
+    async def aclose(self):
+        """关闭客户端及其连接池，包括等待关闭的旧客户端"""
+        async with self._lock:
+            if self._client is not None:
+                await self._client.aclose()
+                self._client = None
+            for client in list(self._retired):
+                await client.aclose()
+            self._retired.clear()
+
+
+async def benchmark(url: str, requests: int = 50) -> Dict[str, float]:
+    """
+    对比每次请求新建客户端与复用长连接客户端的耗时
+    :param url: 请求地址
+    :param requests: 请求次数
+    :return: {方式: 每次请求的毫秒数}
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for _ in range(requests):
+        async with create_async_client() as client:
+            await client.get(url)
+    per_request = (loop.time() - start) / requests * 1000
+
+    pool = PooledAsyncClient()
+    start = loop.time()
+    for _ in range(requests):
+        await pool.request("GET", url)
+    pooled = (loop.time() - start) / requests * 1000
+    await pool.aclose()
+    return {"per-request client": per_request, "pooled client": pooled}
+
+
+if __name__ == "__main__":
+    # python -m tools.http_client https://www.baidu.com 50
+    import sys
+
+    result = asyncio.run(benchmark(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 50))
+    for name, cost in result.items():
+        print(f"{name:<20}{cost:>10.2f} ms/request")
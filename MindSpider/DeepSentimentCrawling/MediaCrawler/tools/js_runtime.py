@@ -0,0 +1,314 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 常驻的 JS 签名运行时：每个签名脚本只编译一次，保存在一个长期运行的 node 进程中，
+#            通过 stdin/stdout 按行收发 JSON 调用签名函数；同一事件循环轮次内的异步签名请求合并为一批，
+#            在线程池中发送并等待结果，不阻塞事件循环；单批超时后杀掉 node 进程，下一次调用时重新启动。
+#            execjs 每次 call 都会新起一个 node 进程并重新编译整个脚本，签名量大时开销明显
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import execjs
+
+# 单批调用的超时时间（秒）
+CALL_TIMEOUT = 10
+
+# node 端桥接脚本：加载签名脚本后，每行读入一批 [函数名, 参数列表]，按行输出一批 [是否成功, 结果或错误]
+_BRIDGE_JS = r"""
+const fs = require('fs');
+const vm = require('vm');
+const readline = require('readline');
+global.require = require;
+console.log = console.error;
+const scriptPath = process.argv[process.argv.length - 1];
+vm.runInThisContext(fs.readFileSync(scriptPath, 'utf8').replace(/^\uFEFF/, ''), {filename: scriptPath});
+const rl = readline.createInterface({input: process.stdin, terminal: false});
+rl.on('line', (line) => {
+  const out = JSON.parse(line).map(([fn, args]) => {
+    try {
+      return [true, global[fn](...args)];
+    } catch (e) {
+      return [false, String((e && e.stack) || e)];
+    }
+  });
+  process.stdout.write(JSON.stringify(out) + '\n');
+});
+"""
+
+
+class JsRuntimeError(Exception):
+    """签名脚本执行失败或 node 进程异常退出"""
+
+
+class PersistentJsRuntime:
+    """
+    常驻的 JS 运行时，同步调用 call / call_many，异步调用 acall
+    找不到 node 时回退到 execjs（脚本仍只编译一次，但每次调用的开销与原来相同）
+    """
+
+    def __init__(self, script_path: str, node_path: Optional[str] = None, timeout: float = CALL_TIMEOUT):
+        """
+        Args:
+            script_path: 签名脚本路径，如 libs/zhihu.js
+            node_path: node 可执行文件路径，默认从 PATH 中查找
+            timeout: 单批调用的超时时间（秒），超时后重启 node 进程
+        """
+        self.script_path = os.path.abspath(script_path)
+        self.node_path = node_path or shutil.which("node")
+        self.timeout = timeout
+        self._proc: Optional[subprocess.Popen] = None
+        self._fallback = None
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, list, asyncio.Future]] = []
+        self._flush_tasks = set()
+        self.calls = 0
+        self.batches = 0
+        self.total_time = 0.0
+
+    def _ensure_started(self):
+        if self._fallback is not None or (self._proc is not None and self._proc.poll() is None):
+            return
+        if not self.node_path:
+            with open(self.script_path, mode="r", encoding="utf-8-sig") as f:
+                self._fallback = execjs.compile(f.read())
+            return
+        # 进程意外退出时重新启动
+        if self._proc is not None:
+            self._discard()
+        self._proc = subprocess.Popen(
+            [self.node_path, "-e", _BRIDGE_JS, self.script_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            encoding="utf-8",
+            bufsize=1,
+        )
+
+    def _call_batch(self, calls: Sequence[Tuple[str, Sequence]]) -> List[Tuple[bool, Any]]:
+        """
+        发送一批调用并等待结果
+        :param calls: [(函数名, 参数列表)]
+        :return: [(是否成功, 结果或错误信息)]
+        """
+        with self._lock:
+            self._ensure_started()
+            # 启动进程与编译脚本只发生一次，不计入调用耗时
+            start = time.perf_counter()
+            if self._fallback is not None:
+                results = []
+                for fn, args in calls:
+                    try:
+                        results.append((True, self._fallback.call(fn, *args)))
+                    except Exception as e:
+                        results.append((False, str(e)))
+            else:
+                # 管道读取无法设置超时：到时由计时器杀掉进程，readline 随之返回空行
+                proc = self._proc
+                timer = threading.Timer(self.timeout, self._kill, args=(proc,))
+                timer.start()
+                try:
+                    proc.stdin.write(json.dumps([[fn, list(args)] for fn, args in calls], ensure_ascii=False) + "\n")
+                    proc.stdin.flush()
+                    line = proc.stdout.readline()
+                except (BrokenPipeError, OSError, ValueError) as e:
+                    self._discard()
+                    raise JsRuntimeError(f"js runtime {self.script_path} pipe error: {e}")
+                finally:
+                    timer.cancel()
+                if not line:
+                    # 进程已退出或被杀掉，丢弃后下一次调用重新启动
+                    returncode = self._discard()
+                    if time.perf_counter() - start >= self.timeout:
+                        raise JsRuntimeError(f"js runtime {self.script_path} timed out after {self.timeout}s, restart on next call")
+                    raise JsRuntimeError(f"js runtime {self.script_path} exited with code {returncode}")
+                results = [tuple(item) for item in json.loads(line)]
+            self.calls += len(calls)
+            self.batches += 1
+            self.total_time += time.perf_counter() - start
+        return results
+
+    def call(self, fn: str, *args) -> Any:
+        """
+        同步调用签名函数
+        :param fn: 脚本中的全局函数名
+        :param args: 参数，需可 JSON 序列化
+        :return:
+        """
+        return self.call_many([(fn, args)])[0]
+
+    def call_many(self, calls: Sequence[Tuple[str, Sequence]]) -> List[Any]:
+        """
+        一次往返执行多个调用，任一调用失败时抛出 JsRuntimeError
+        :param calls: [(函数名, 参数列表)]
+        :return: 各调用的结果
+        """
+        values = []
+        for ok, value in self._call_batch(calls):
+            if not ok:
+                raise JsRuntimeError(value)
+            values.append(value)
+        return values
+
+    async def acall(self, fn: str, *args) -> Any:
+        """
+        异步调用签名函数，同一事件循环轮次内的多个调用合并为一次往返，在线程池中等待结果
+        :param fn: 脚本中的全局函数名
+        :param args: 参数，需可 JSON 序列化
+        :return:
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((fn, list(args), future))
+        if len(self._pending) == 1:
+            loop.call_soon(self._schedule_flush)
+        return await future
+
+    def _schedule_flush(self):
+        task = asyncio.ensure_future(self._flush_pending())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush_pending(self):
+        pending, self._pending = self._pending, []
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                None, self._call_batch, [(fn, args) for fn, args, _ in pending]
+            )
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), (ok, value) in zip(pending, results):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(JsRuntimeError(value))
+
+    def stats(self) -> Dict:
+        """调用次数、批次数与平均每次调用的耗时（毫秒）"""
+        return {
+            "script": os.path.basename(self.script_path),
+            "calls": self.calls,
+            "batches": self.batches,
+            "avg_call_ms": round(self.total_time / self.calls * 1000, 3) if self.calls else 0.0,
+        }
+
+    @staticmethod
+    def _kill(proc: subprocess.Popen):
+        """杀掉超时的 node 进程，不等待锁（锁由卡住的调用持有）"""
+        try:
+            proc.kill()
+        except OSError:
+            pass
+
+    def _discard(self) -> Optional[int]:
+        """杀掉并回收当前 node 进程，关闭管道，需在持有锁时调用"""
+        proc, self._proc = self._proc, None
+        self._kill(proc)
+        for pipe in (proc.stdin, proc.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        return proc.wait()
+
+    def close(self):
+        """关闭 node 进程"""
+        with self._lock:
+            if self._proc is not None:
+                if self._proc.poll() is None:
+                    self._proc.stdin.close()
+                    try:
+                        self._proc.wait(timeout=5)
+                    except subprocess.TimeoutExpired:
+                        self._proc.kill()
+                else:
+                    try:
+                        self._proc.stdin.close()
+                    except OSError:
+                        pass
+                self._proc.stdout.close()
+                self._proc = None
+            self._fallback = None
+
+
+_runtimes: Dict[str, PersistentJsRuntime] = {}
+
+
+def get_js_runtime(script_path: str) -> PersistentJsRuntime:
+    """
+    获取签名脚本对应的常驻运行时，同一脚本在进程内只启动一次
+    :param script_path: 签名脚本路径
+    :return:
+    """
+    key = os.path.abspath(script_path)
+    if key not in _runtimes:
+        _runtimes[key] = PersistentJsRuntime(key)
+    return _runtimes[key]
+
+
+def close_js_runtimes():
+    """关闭所有常驻运行时"""
+    for runtime in _runtimes.values():
+        runtime.close()
+    _runtimes.clear()
+
+
+def benchmark(script_path: str, fn: str, args: Sequence, n: int = 200) -> Dict[str, float]:
+    """
+    签名性能基准：比较 execjs 与常驻运行时每秒可完成的签名次数
+    :param script_path: 签名脚本路径
+    :param fn: 签名函数名
+    :param args: 签名参数
+    :param n: 常驻运行时的调用次数，execjs 调用 n // 10 次
+    :return: {"execjs": 次/秒, "persistent": 次/秒, "persistent_batched": 次/秒}
+    """
+    with open(script_path, mode="r", encoding="utf-8-sig") as f:
+        ctx = execjs.compile(f.read())
+    execjs_n = max(1, n // 10)
+    start = time.perf_counter()
+    for _ in range(execjs_n):
+        ctx.call(fn, *args)
+    execjs_rate = execjs_n / (time.perf_counter() - start)
+
+    runtime = PersistentJsRuntime(script_path)
+    try:
+        runtime.call(fn, *args)  # 启动进程与编译脚本不计入
+        start = time.perf_counter()
+        for _ in range(n):
+            runtime.call(fn, *args)
+        persistent_rate = n / (time.perf_counter() - start)
+
+        async def run_batched():
+            await asyncio.gather(*[runtime.acall(fn, *args) for _ in range(n)])
+
+        start = time.perf_counter()
+        asyncio.run(run_batched())
+        batched_rate = n / (time.perf_counter() - start)
+    finally:
+        runtime.close()
+    return {"execjs": execjs_rate, "persistent": persistent_rate, "persistent_batched": batched_rate}
+
+
+if __name__ == "__main__":
+    # python -m tools.js_runtime
+    result = benchmark("libs/zhihu.js", "get_sign", ["/api/v4/search_v3?q=test", "d_c0=AAAA1234567890|1700000000"])
+    for name, rate in result.items():
+        print(f"{name:<20}{rate:>10.1f} sign/s")
@@ -0,0 +1,285 @@
+# 声明：本代码仅供学习和研究目的使用。使用者应遵守以下原则：
+# 1. 不得用于任何商业用途。
+# 2. 使用时应遵守目标平台的使用条款和robots.txt规则。
+# 3. 不得进行大规模爬取或对平台造成运营干扰。
+# 4. 应合理控制请求频率，避免给目标平台带来不必要的负担。
+# 5. 不得用于任何非法或不当的用途。
+#
+# 详细许可条款请参阅项目根目录下的LICENSE文件。
+# 使用本代码即表示您同意遵守上述原则和LICENSE中的所有条款。
+
+
+# -*- coding: utf-8 -*-
+# @Desc    : 自适应限速器，替代固定的 CRAWLER_MAX_SLEEP_SEC 间隔与 MAX_CONCURRENCY_NUM 信号量
+#            按 (平台, 接口类型, 账号/代理) 区分，令牌桶控制请求速率，
+#            速率与并发数按 AIMD 调整：请求成功时线性增加，遇到风控（461/403/429 或平台的风控错误码）时减半并暂停一段时间
+import asyncio
+import json
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+import httpx
+
+import config
+
+from . import utils
+
+# 视为被风控/限流的 HTTP 状态码
+BLOCK_STATUS_CODES = {403, 429, 461, 471}
+
+# 各平台响应外层的错误码字段路径与表示风控/限流的错误码
+# 只检查这些字段，不在响应内容中匹配文字：评论、标题、搜索关键词里同样会出现“频繁”“验证码”“blocked”等词
+BLOCK_ERROR_CODES: Dict[str, Tuple[Tuple[str, ...], frozenset]] = {
+    "xhs": (("code",), frozenset({300012, 300013, 461})),
+    "bilibili": (("code",), frozenset({-352, -412, -799})),
+    "douyin": (("status_code",), frozenset({2154})),
+    "zhihu": (("error", "code"), frozenset({40362})),
+}
+
+# 被风控时整个响应内容只有这个词（抖音、贴吧）
+BLOCKED_BODY = "blocked"
+
+# 只检查较小的文本/JSON 响应内容，避免读取媒体文件
+_MAX_INSPECT_BYTES = 256 * 1024
+
+
+class AdaptiveRateLimiter:
+    """
+    令牌桶 + AIMD 的自适应限速器
+
+    - await limiter.wait()：取一个令牌，替代原来的固定 sleep
+    - async with limiter：占用一个并发名额，替代原来的 asyncio.Semaphore，
+      代码块中抛出风控类异常时自动降速
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        max_rate: Optional[float] = None,
+        increase_step: Optional[float] = None,
+        decrease_factor: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        block_cooldown: Optional[float] = None,
+    ):
+        """
+        Args:
+            name: 限速器名称，用于日志
+            rate: 初始速率（次/秒），默认 RATE_LIMIT_INITIAL_RATE
+            min_rate: 最低速率
+            max_rate: 最高速率
+            increase_step: 每次请求成功增加的速率
+            decrease_factor: 遇到风控时速率乘以该系数
+            max_concurrency: 最大并发数
+            block_cooldown: 遇到风控后暂停的秒数
+        """
+        self.name = name
+        self.min_rate = min_rate if min_rate is not None else config.RATE_LIMIT_MIN_RATE
+        self.max_rate = max_rate if max_rate is not None else config.RATE_LIMIT_MAX_RATE
+        self.increase_step = increase_step if increase_step is not None else config.RATE_LIMIT_INCREASE_STEP
+        self.decrease_factor = decrease_factor if decrease_factor is not None else config.RATE_LIMIT_DECREASE_FACTOR
+        self.max_concurrency = max(1, max_concurrency or config.RATE_LIMIT_MAX_CONCURRENCY)
+        self.block_cooldown = block_cooldown if block_cooldown is not None else config.RATE_LIMIT_BLOCK_COOLDOWN_SEC
+        initial_rate = rate if rate is not None else config.RATE_LIMIT_INITIAL_RATE
+        self._rate = min(self.max_rate, max(self.min_rate, initial_rate))
+        self._concurrency = min(self.max_concurrency, max(1, config.MAX_CONCURRENCY_NUM))
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._active = 0
+        self._lock = asyncio.Lock()
+        self._slot_condition = asyncio.Condition()
+        # 统计信息
+        self.successes = 0
+        self.blocks = 0
+
+    @property
+    def current_rate(self) -> float:
+        """当前速率（次/秒）"""
+        return self._rate
+
+    @property
+    def concurrency(self) -> int:
+        """当前允许的并发数"""
+        return self._concurrency
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "rate": round(self._rate, 3),
+            "concurrency": self._concurrency,
+            "active": self._active,
+            "successes": self.successes,
+            "blocks": self.blocks,
+            "blocked_for": round(max(0.0, self._blocked_until - time.monotonic()), 1),
+        }
+
+    async def wait(self):
+        """取一个令牌，令牌不足或处于风控暂停期时等待"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+    def record_success(self):
+        """请求成功：速率线性增加，每连续成功 RATE_LIMIT_CONCURRENCY_STEP 次并发数加一"""
+        self._refill(time.monotonic())
+        self._rate = min(self.max_rate, self._rate + self.increase_step)
+        self.successes += 1
+        if self.successes % config.RATE_LIMIT_CONCURRENCY_STEP == 0 and self._concurrency < self.max_concurrency:
+            self._concurrency += 1
+
+    def record_block(self, reason: str = ""):
+        """遇到风控：速率与并发数减半，并暂停 block_cooldown 秒"""
+        now = time.monotonic()
+        self._refill(now)
+        self._rate = max(self.min_rate, self._rate * self.decrease_factor)
+        self._concurrency = max(1, self._concurrency // 2)
+        self._blocked_until = max(self._blocked_until, now + self.block_cooldown)
+        self._tokens = 0.0
+        self.blocks += 1
+        utils.logger.warning(
+            f"[AdaptiveRateLimiter] {self.name} blocked ({reason[:100]}), "
+            f"rate -> {self._rate:.2f} req/s, concurrency -> {self._concurrency}, pause {self.block_cooldown}s"
+        )
+
+    def _refill(self, now: float):
+        self._tokens = min(1.0, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    async def __aenter__(self):
+        async with self._slot_condition:
+            await self._slot_condition.wait_for(lambda: self._active < self._concurrency)
+            self._active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._slot_condition:
+            self._active -= 1
+            self._slot_condition.notify_all()
+        if exc is not None and is_block_error(exc):
+            self.record_block(str(exc))
+        return False
+
+
+def is_block_error(exc: BaseException) -> bool:
+    """异常是否表示被风控：风控异常类型（如 IPBlockError）或携带风控状态码的 HTTP 异常"""
+    if "block" in type(exc).__name__.lower():
+        return True
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None) in BLOCK_STATUS_CODES
+
+
+def is_block_response(status_code: int, text: str = "", platform: Optional[str] = None) -> bool:
+    """
+    响应是否表示被风控：HTTP 状态码，或平台响应外层的风控错误码
+    Args:
+        status_code: HTTP 状态码
+        text: 响应内容
+        platform: 平台名，如 xhs、bilibili，决定检查哪个错误码字段
+
+    Returns:
+
+    """
+    if status_code in BLOCK_STATUS_CODES:
+        return True
+    if text.strip() == BLOCKED_BODY:
+        return True
+    if platform not in BLOCK_ERROR_CODES or not text:
+        return False
+    path, codes = BLOCK_ERROR_CODES[platform]
+    try:
+        value: Any = json.loads(text)
+    except ValueError:
+        return False
+    for field in path:
+        if not isinstance(value, dict):
+            return False
+        value = value.get(field)
+    try:
+        return int(value) in codes
+    except (TypeError, ValueError):
+        return False
+
+
+def endpoint_class(url: str) -> str:
+    """按请求路径粗分接口类型：search | comment | detail"""
+    path = httpx.URL(url).path.lower()
+    if "comment" in path or "reply" in path:
+        return "comment"
+    if "search" in path:
+        return "search"
+    return "detail"
+
+
+_limiters: Dict[Tuple[str, str, str], AdaptiveRateLimiter] = {}
+
+
+def get_rate_limiter(platform: str, endpoint: str = "detail", account: Optional[str] = None) -> AdaptiveRateLimiter:
+    """
+    获取共享的限速器，同一 (平台, 接口类型, 账号/代理) 只创建一个
+    Args:
+        platform: 平台
+        endpoint: 接口类型 search | detail | comment
+        account: 账号或代理标识，未使用代理时为 None
+
+    Returns:
+
+    """
+    key = (platform, endpoint, account or "direct")
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = AdaptiveRateLimiter(name="/".join(key))
+        _limiters[key] = limiter
+    return limiter
+
+
+def all_rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """所有限速器的当前速率与统计"""
+    return {limiter.name: limiter.stats() for limiter in _limiters.values()}
+
+
+async def pace(interval: Union[float, AdaptiveRateLimiter]):
+    """
+    平台客户端翻页之间的等待：传入限速器时按限速器节奏，传入数字时按固定秒数
+    Args:
+        interval: 限速器或固定间隔秒数
+
+    Returns:
+
+    """
+    if isinstance(interval, AdaptiveRateLimiter):
+        await interval.wait()
+    elif interval:
+        await asyncio.sleep(interval)
+
+
+async def report_response(limiter: AdaptiveRateLimiter, response: httpx.Response, platform: Optional[str] = None):
+    """
+    根据响应状态码与平台错误码反馈给限速器，作为 httpx 的 response 事件钩子使用
+    Args:
+        limiter: 限速器
+        response: httpx.Response
+        platform: 平台名，用于识别响应外层的风控错误码
+
+    Returns:
+
+    """
+    text = ""
+    content_type = response.headers.get("content-type", "")
+    content_length = int(response.headers.get("content-length") or 0)
+    if ("json" in content_type or "text" in content_type) and content_length <= _MAX_INSPECT_BYTES:
+        await response.aread()
+        text = response.text[:_MAX_INSPECT_BYTES]
+    if is_block_response(response.status_code, text, platform):
+        limiter.record_block(f"HTTP {response.status_code} {response.request.url.path}")
+    elif response.status_code < 400:
+        limiter.record_success()
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 """
 DeepSentimentCrawling模块 - 关键词管理器
-从BroadTopicExtraction模块获取关键词并分配给不同平台进行爬取
+从BroadTopicExtraction模块获取关键词，由关键词调度器按新颖度、热度与历史产出分配给不同平台进行爬取
 """
 
 import sys
@@ -10,7 +10,6 @@ import json
 from datetime import date, timedelta, datetime
 from pathlib import Path
 from typing import List, Dict, Optional
-import random
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 
@@ -26,6 +25,8 @@ except ImportError:
 from config import settings
 from loguru import logger
 
+from keyword_scheduler import KeywordScheduler, KeywordSignal
+
 class KeywordManager:
     """关键词管理器"""
     
@@ -33,6 +34,7 @@ class KeywordManager:
         """初始化关键词管理器"""
         self.engine: Engine = None
         self.connect()
+        self.scheduler = KeywordScheduler(self.engine)
     
     def connect(self):
         """连接数据库"""
@@ -80,28 +82,21 @@ class KeywordManager:
             keywords = topics_data['keywords']
             logger.info(f"成功获取 {target_date} 的 {len(keywords)} 个关键词")
             
-            # 如果关键词太多，随机选择指定数量
+            # 如果关键词太多，按新颖度与热度选择指定数量
             if len(keywords) > max_keywords:
-                keywords = random.sample(keywords, max_keywords)
-                logger.info(f"随机选择了 {max_keywords} 个关键词")
+                keywords = self._rank_keywords(keywords, target_date)[:max_keywords]
+                logger.info(f"按新颖度与热度选择了 {max_keywords} 个关键词")
             
             return keywords
         
         # 如果没有当天的关键词，尝试获取最近几天的
         logger.info(f"{target_date} 没有关键词数据，尝试获取最近的关键词...")
-        recent_topics = self.get_recent_topics(days=7)
-        
-        if recent_topics:
-            # 合并最近几天的关键词
-            all_keywords = []
-            for topic in recent_topics:
-                if topic.get('keywords'):
-                    all_keywords.extend(topic['keywords'])
-            
-            # 去重并限制数量
-            unique_keywords = list(set(all_keywords))
-            if len(unique_keywords) > max_keywords:
-                unique_keywords = random.sample(unique_keywords, max_keywords)
+        signals = self.scheduler.keyword_signals(target_date, days=7)
+        
+        if signals:
+            # 合并最近几天的关键词，越新、排名越靠前的越优先
+            signals.sort(key=lambda s: s.relevance, reverse=True)
+            unique_keywords = [s.keyword for s in signals[:max_keywords]]
             
             logger.info(f"从最近7天的数据中获取到 {len(unique_keywords)} 个关键词")
             return unique_keywords
@@ -110,6 +105,59 @@ class KeywordManager:
         logger.info("没有找到任何关键词数据，使用默认关键词")
         return self._get_default_keywords()
     
+    def _rank_keywords(self, keywords: List[str], target_date: date) -> List[str]:
+        """按新颖度与热度排序关键词，没有历史信号的关键词保持原有顺序排在后面"""
+        relevance = {s.keyword: s.relevance for s in self.scheduler.keyword_signals(target_date)}
+        return sorted(keywords, key=lambda k: relevance.get(k, 0.0), reverse=True)
+    
+    def schedule_keywords(self, platforms: List[str], target_date: date = None,
+                          max_keywords_per_platform: int = 50) -> Dict[str, List[str]]:
+        """
+        为各平台分配关键词：优先选择新出现、排名靠前、历史上每次请求产出新内容多且近期未爬过的关键词，
+        产出高的平台可以分到更多关键词
+        
+        Args:
+            platforms: 平台列表
+            target_date: 目标日期，默认为今天
+            max_keywords_per_platform: 每个平台的平均关键词数量
+        
+        Returns:
+            {平台: 关键词列表}
+        """
+        if not target_date:
+            target_date = date.today()
+        
+        plan = self.scheduler.plan(platforms, target_date, max_keywords_per_platform)
+        if not any(plan.values()):
+            keywords = self.get_latest_keywords(target_date, max_keywords_per_platform)
+            return {platform: list(keywords) for platform in platforms}
+        return {platform: [item.keyword for item in items] for platform, items in plan.items()}
+    
+    def record_crawl_plan(self, plan: Dict[str, List[str]], target_date: date = None) -> Dict[str, str]:
+        """
+        记录本次各平台的爬取关键词，供之后统计关键词产出
+        
+        Args:
+            plan: {平台: 关键词列表}
+            target_date: 目标日期，默认为今天
+        
+        Returns:
+            {平台: task_id}
+        """
+        return self.scheduler.record_plan(plan, target_date or date.today())
+    
+    def record_crawl_results(self, task_ids: Dict[str, str], platform_results: Dict[str, Dict]):
+        """
+        记录各平台的爬取结果
+        
+        Args:
+            task_ids: {平台: task_id}
+            platform_results: {平台: 爬取结果}
+        """
+        for platform, task_id in task_ids.items():
+            if platform in platform_results:
+                self.scheduler.record_result(task_id, platform_results[platform])
+    
     def get_daily_topics(self, extract_date: date = None) -> Optional[Dict]:
         """
         获取每日话题分析
@@ -213,7 +261,7 @@ class KeywordManager:
     def get_keywords_for_platform(self, platform: str, target_date: date = None, 
                                 max_keywords: int = 50) -> List[str]:
         """
-        为特定平台获取关键词（现在所有平台使用相同关键词）
+        为特定平台获取关键词，按该平台的历史产出调度
         
         Args:
             platform: 平台名称
@@ -221,57 +269,29 @@ class KeywordManager:
             max_keywords: 最大关键词数量
         
         Returns:
-            关键词列表（与其他平台相同）
+            关键词列表
         """
-        keywords = self.get_latest_keywords(target_date, max_keywords)
+        keywords = self.schedule_keywords([platform], target_date, max_keywords)[platform][:max_keywords]
         
-        logger.info(f"为平台 {platform} 准备了 {len(keywords)} 个关键词（与其他平台相同）")
+        logger.info(f"为平台 {platform} 准备了 {len(keywords)} 个关键词")
         return keywords
     
     def _filter_keywords_by_platform(self, keywords: List[str], platform: str) -> List[str]:
         """
-        根据平台特性过滤关键词
+        根据关键词在该平台的历史产出排序关键词
         
         Args:
             keywords: 原始关键词列表
             platform: 平台名称
         
         Returns:
-            过滤后的关键词列表
+            排序后的关键词列表
         """
-        # 平台特性关键词映射（可以根据需要调整）
-        platform_preferences = {
-            'xhs': ['美妆', '时尚', '生活', '美食', '旅游', '购物', '健康', '养生'],
-            'dy': ['娱乐', '音乐', '舞蹈', '搞笑', '美食', '生活', '科技', '教育'],
-            'ks': ['生活', '搞笑', '农村', '美食', '手工', '音乐', '娱乐'],
-            'bili': ['科技', '游戏', '动漫', '学习', '编程', '数码', '科普'],
-            'wb': ['热点', '新闻', '娱乐', '明星', '社会', '时事', '科技'],
-            'tieba': ['游戏', '动漫', '学习', '生活', '兴趣', '讨论'],
-            'zhihu': ['知识', '学习', '科技', '职场', '投资', '教育', '思考']
-        }
-        
-        # 如果平台有特定偏好，优先选择相关关键词
-        preferred_keywords = platform_preferences.get(platform, [])
-        
-        if preferred_keywords:
-            # 先选择平台偏好的关键词
-            filtered = []
-            remaining = []
-            
-            for keyword in keywords:
-                if any(pref in keyword for pref in preferred_keywords):
-                    filtered.append(keyword)
-                else:
-                    remaining.append(keyword)
-            
-            # 如果偏好关键词不够，补充其他关键词
-            if len(filtered) < len(keywords) // 2:
-                filtered.extend(remaining[:len(keywords) - len(filtered)])
-            
-            return filtered
-        
-        # 如果没有特定偏好，返回原关键词
-        return keywords
+        target_date = date.today()
+        known = {s.keyword: s for s in self.scheduler.keyword_signals(target_date)}
+        signals = [known.get(k) or KeywordSignal(keyword=k, novelty=1.0, trend=0.0) for k in keywords]
+        yields = self.scheduler.load_yields([platform], target_date)[platform]
+        return [item.keyword for item in self.scheduler.score(signals, platform, yields)]
     
     def get_crawling_summary(self, target_date: date = None) -> Dict:
         """
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DeepSentimentCrawling模块 - 关键词调度器
+为每个 (关键词, 平台) 估计一次爬取能带来多少新内容，按新颖度、热度、历史产出与距上次爬取的时间打分，
+在各平台之间分配爬取预算
+
+历史数据来源：
+- daily_topics：关键词出现的日期与排名（新颖度、热度）
+- crawling_tasks：每次调度给各平台的关键词（请求次数、上次爬取时间）
+- MediaCrawler 内容表与评论表：按 source_keyword 统计新增的内容与评论（产出）
+"""
+
+import hashlib
+import json
+import math
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# 平台 -> (内容表, 评论表, 关联字段)
+PLATFORM_TABLES: Dict[str, Tuple[str, str, str]] = {
+    'xhs': ('xhs_note', 'xhs_note_comment', 'note_id'),
+    'dy': ('douyin_aweme', 'douyin_aweme_comment', 'aweme_id'),
+    'ks': ('kuaishou_video', 'kuaishou_video_comment', 'video_id'),
+    'bili': ('bilibili_video', 'bilibili_video_comment', 'video_id'),
+    'wb': ('weibo_note', 'weibo_note_comment', 'note_id'),
+    'tieba': ('tieba_note', 'tieba_comment', 'note_id'),
+    'zhihu': ('zhihu_content', 'zhihu_comment', 'content_id'),
+}
+
+
+@dataclass
+class KeywordSignal:
+    """关键词在最近话题中的表现"""
+
+    keyword: str
+    novelty: float
+    trend: float
+
+    @property
+    def relevance(self) -> float:
+        return 0.5 * self.novelty + 0.5 * self.trend
+
+
+@dataclass
+class KeywordYield:
+    """某个关键词在某个平台上的历史爬取情况"""
+
+    requests: int = 0
+    items: int = 0
+    last_crawled_ts: Optional[int] = None  # 毫秒
+
+
+@dataclass
+class ScheduledKeyword:
+    """调度结果中的一项"""
+
+    keyword: str
+    platform: str
+    value: float
+    expected_yield: float
+    relevance: float
+    recency: float
+
+
+class KeywordScheduler:
+    """关键词调度器"""
+
+    def __init__(self, engine: Engine, lookback_days: int = 14, cooldown_hours: float = 12.0,
+                 prior_requests: float = 2.0):
+        """
+        初始化关键词调度器
+
+        Args:
+            engine: 数据库引擎
+            lookback_days: 统计历史的天数
+            cooldown_hours: 关键词在同一平台爬取后多久恢复全部优先级
+            prior_requests: 产出估计的先验强度，历史请求少的关键词更接近平台平均产出
+        """
+        self.engine = engine
+        self.lookback_days = lookback_days
+        self.cooldown_hours = cooldown_hours
+        self.prior_requests = prior_requests
+
+    # ==================== 关键词信号 ====================
+
+    def keyword_signals(self, target_date: date, days: Optional[int] = None) -> List[KeywordSignal]:
+        """
+        根据最近的话题计算关键词的新颖度与热度，按最近一次出现的顺序返回
+
+        新颖度：出现过的天数越多越低，只出现过一天为1
+        热度：最近一次出现时的排名越靠前越高，每早一天减半
+
+        Args:
+            target_date: 目标日期
+            days: 统计的天数，默认 lookback_days
+
+        Returns:
+            关键词信号列表
+        """
+        start_date = target_date - timedelta(days=days or self.lookback_days)
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.execute(
+                    text(
+                        "SELECT extract_date, keywords FROM daily_topics "
+                        "WHERE extract_date >= :start_date AND extract_date <= :target_date "
+                        "ORDER BY extract_date DESC"
+                    ),
+                    {"start_date": start_date, "target_date": target_date},
+                ).all()
+        except Exception as e:
+            logger.exception(f"获取话题历史失败: {e}")
+            return []
+
+        trend: Dict[str, float] = {}
+        days_seen: Dict[str, int] = {}
+        order: List[str] = []
+        for extract_date, keywords_json in rows:
+            if isinstance(extract_date, str):
+                extract_date = date.fromisoformat(extract_date)
+            keywords = json.loads(keywords_json) if keywords_json else []
+            age = max(0, (target_date - extract_date).days)
+            seen_today = set()
+            for i, keyword in enumerate(keywords):
+                keyword = str(keyword).strip()
+                if not keyword or keyword in seen_today:
+                    continue
+                seen_today.add(keyword)
+                days_seen[keyword] = days_seen.get(keyword, 0) + 1
+                if keyword not in trend:
+                    order.append(keyword)
+                    trend[keyword] = (1 - i / len(keywords)) * 0.5 ** age
+        return [KeywordSignal(keyword=k, novelty=1 / days_seen[k], trend=trend[k]) for k in order]
+
+    # ==================== 历史产出 ====================
+
+    def load_yields(self, platforms: List[str], target_date: date) -> Dict[str, Dict[str, KeywordYield]]:
+        """
+        统计每个平台上各关键词的请求次数、新增内容与评论数、上次爬取时间
+
+        Args:
+            platforms: 平台列表
+            target_date: 目标日期
+
+        Returns:
+            {平台: {关键词: KeywordYield}}
+        """
+        start_date = target_date - timedelta(days=self.lookback_days)
+        since_ms = int(time.mktime(start_date.timetuple()) * 1000)
+        yields: Dict[str, Dict[str, KeywordYield]] = {platform: {} for platform in platforms}
+
+        try:
+            with self.engine.connect() as conn:
+                tasks = conn.execute(
+                    text(
+                        "SELECT platform, search_keywords, start_time, add_ts FROM crawling_tasks "
+                        "WHERE scheduled_date >= :start_date"
+                    ),
+                    {"start_date": start_date},
+                ).all()
+        except Exception as e:
+            logger.warning(f"获取爬取任务历史失败，按无历史处理: {e}")
+            tasks = []
+        for platform, keywords_json, start_time, add_ts in tasks:
+            if platform not in yields:
+                continue
+            crawled_ts = start_time or add_ts
+            for keyword in json.loads(keywords_json or "[]"):
+                stats = yields[platform].setdefault(keyword, KeywordYield())
+                stats.requests += 1
+                if crawled_ts and (stats.last_crawled_ts is None or crawled_ts > stats.last_crawled_ts):
+                    stats.last_crawled_ts = crawled_ts
+
+        for platform in platforms:
+            if platform not in PLATFORM_TABLES:
+                continue
+            content_table, comment_table, id_column = PLATFORM_TABLES[platform]
+            queries = [
+                f"SELECT source_keyword, COUNT(*), MAX(add_ts) FROM {content_table} "
+                f"WHERE add_ts >= :since GROUP BY source_keyword",
+                f"SELECT n.source_keyword, COUNT(*), MAX(c.add_ts) FROM {comment_table} c "
+                f"JOIN {content_table} n ON c.{id_column} = n.{id_column} "
+                f"WHERE c.add_ts >= :since GROUP BY n.source_keyword",
+            ]
+            try:
+                with self.engine.connect() as conn:
+                    for query in queries:
+                        for keyword, count, last_ts in conn.execute(text(query), {"since": since_ms}).all():
+                            if not keyword:
+                                continue
+                            stats = yields[platform].setdefault(keyword, KeywordYield())
+                            stats.items += count
+                            if stats.last_crawled_ts is None and last_ts:
+                                stats.last_crawled_ts = last_ts
+            except Exception as e:
+                logger.warning(f"统计 {platform} 平台关键词产出失败: {e}")
+        return yields
+
+    def _expected_yield(self, stats: Optional[KeywordYield], platform_mean: float) -> float:
+        """每次请求的期望新增内容数，以平台平均产出为先验"""
+        requests = stats.requests if stats else 0
+        items = stats.items if stats else 0
+        # 内容表中有数据但没有调度记录（如手动指定关键词爬取）时至少算一次请求
+        requests = max(requests, 1 if items else 0)
+        return (items + self.prior_requests * platform_mean) / (requests + self.prior_requests)
+
+    def _recency(self, stats: Optional[KeywordYield], now_ms: int) -> float:
+        """距上次爬取越近，能抓到的新内容越少"""
+        if not stats or not stats.last_crawled_ts:
+            return 1.0
+        hours = max(0.0, (now_ms - stats.last_crawled_ts) / 3_600_000)
+        return min(1.0, 0.1 + hours / self.cooldown_hours)
+
+    # ==================== 调度 ====================
+
+    def score(self, signals: List[KeywordSignal], platform: str, yields: Dict[str, KeywordYield],
+              now_ms: Optional[int] = None) -> List[ScheduledKeyword]:
+        """
+        为一个平台的候选关键词打分：价值 = 相关度 × (1 + ln(1 + 期望产出)) × 时间衰减
+
+        Args:
+            signals: 关键词信号
+            platform: 平台
+            yields: 该平台的历史产出
+            now_ms: 当前时间（毫秒）
+
+        Returns:
+            按价值降序的调度项
+        """
+        now_ms = now_ms or int(time.time() * 1000)
+        total_requests = sum(max(s.requests, 1 if s.items else 0) for s in yields.values())
+        total_items = sum(s.items for s in yields.values())
+        platform_mean = total_items / total_requests if total_requests else 0.0
+
+        scored = []
+        for signal in signals:
+            stats = yields.get(signal.keyword)
+            expected = self._expected_yield(stats, platform_mean)
+            recency = self._recency(stats, now_ms)
+            value = signal.relevance * (1 + math.log1p(expected)) * recency
+            scored.append(ScheduledKeyword(keyword=signal.keyword, platform=platform, value=value,
+                                           expected_yield=expected, relevance=signal.relevance,
+                                           recency=recency))
+        scored.sort(key=lambda item: item.value, reverse=True)
+        return scored
+
+    def plan(self, platforms: List[str], target_date: date, max_keywords_per_platform: int,
+             total_budget: Optional[int] = None, signals: Optional[List[KeywordSignal]] = None
+             ) -> Dict[str, List[ScheduledKeyword]]:
+        """
+        在各平台之间分配爬取预算：每个平台至少分到 max_keywords_per_platform 的四分之一，
+        剩余预算按价值从高到低分给所有 (关键词, 平台) 组合，单平台最多 2 倍 max_keywords_per_platform
+
+        Args:
+            platforms: 平台列表
+            target_date: 目标日期
+            max_keywords_per_platform: 每个平台的平均关键词数量
+            total_budget: 总请求数（关键词 × 平台），默认 max_keywords_per_platform × 平台数
+            signals: 关键词信号，默认从最近的话题计算
+
+        Returns:
+            {平台: 按价值降序的调度项}
+        """
+        if signals is None:
+            signals = self.keyword_signals(target_date)
+        if not signals or not platforms:
+            return {platform: [] for platform in platforms}
+
+        total_budget = total_budget or max_keywords_per_platform * len(platforms)
+        min_per_platform = max(1, max_keywords_per_platform // 4)
+        max_per_platform = max_keywords_per_platform * 2
+
+        yields = self.load_yields(platforms, target_date)
+        ranked = {platform: self.score(signals, platform, yields[platform]) for platform in platforms}
+
+        plan: Dict[str, List[ScheduledKeyword]] = {platform: [] for platform in platforms}
+        for platform in platforms:
+            plan[platform] = ranked[platform][:min_per_platform]
+        used = sum(len(items) for items in plan.values())
+
+        pool = sorted(
+            (item for platform in platforms for item in ranked[platform][min_per_platform:max_per_platform]),
+            key=lambda item: item.value, reverse=True,
+        )
+        for item in pool:
+            if used >= total_budget:
+                break
+            plan[item.platform].append(item)
+            used += 1
+
+        for platform, items in plan.items():
+            if items:
+                avg_yield = sum(i.expected_yield for i in items) / len(items)
+                logger.info(f"{platform}: 分配 {len(items)} 个关键词，预计每次请求新增 {avg_yield:.1f} 条内容")
+        return plan
+
+    # ==================== 调度记录 ====================
+
+    def record_plan(self, plan: Dict[str, List[str]], target_date: date, topic_id: Optional[str] = None) -> Dict[str, str]:
+        """
+        把各平台的关键词写入 crawling_tasks，作为之后统计请求次数与上次爬取时间的依据
+
+        Args:
+            plan: {平台: 关键词列表}
+            target_date: 目标日期
+            topic_id: 关联的话题ID，默认为当天的总结话题
+
+        Returns:
+            {平台: task_id}
+        """
+        topic_id = topic_id or f"summary_{target_date.strftime('%Y%m%d')}"
+        now_ms = int(time.time() * 1000)
+        task_ids = {}
+        for platform, keywords in plan.items():
+            if not keywords:
+                continue
+            digest = hashlib.md5(json.dumps(keywords, ensure_ascii=False).encode("utf-8")).hexdigest()[:8]
+            task_id = f"{platform}_{target_date.strftime('%Y%m%d')}_{now_ms}_{digest}"
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        text(
+                            "INSERT INTO crawling_tasks (task_id, topic_id, platform, search_keywords, task_status, "
+                            "start_time, scheduled_date, add_ts, last_modify_ts) VALUES (:task_id, :topic_id, "
+                            ":platform, :keywords, 'running', :now, :scheduled_date, :now, :now)"
+                        ),
+                        {"task_id": task_id, "topic_id": topic_id, "platform": platform,
+                         "keywords": json.dumps(keywords, ensure_ascii=False), "now": now_ms,
+                         "scheduled_date": target_date},
+                    )
+                task_ids[platform] = task_id
+            except Exception as e:
+                logger.warning(f"记录 {platform} 平台爬取任务失败: {e}")
+        return task_ids
+
+    def record_result(self, task_id: str, result: Dict):
+        """
+        爬取结束后更新任务状态与爬取数量
+
+        Args:
+            task_id: 任务ID
+            result: 平台爬取结果
+        """
+        now_ms = int(time.time() * 1000)
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(
+                    text(
+                        "UPDATE crawling_tasks SET task_status = :status, end_time = :now, total_crawled = :total, "
+                        "success_count = :notes, error_count = :errors, error_message = :error, "
+                        "last_modify_ts = :now WHERE task_id = :task_id"
+                    ),
+                    {"status": "completed" if result.get("success") else "failed", "now": now_ms,
+                     "total": result.get("notes_count", 0) + result.get("comments_count", 0),
+                     "notes": result.get("notes_count", 0), "errors": result.get("errors_count", 0),
+                     "error": result.get("error"), "task_id": task_id},
+                )
+        except Exception as e:
+            logger.warning(f"更新爬取任务 {task_id} 失败: {e}")
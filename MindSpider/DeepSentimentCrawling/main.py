@@ -21,10 +21,17 @@ from platform_crawler import PlatformCrawler
 class DeepSentimentCrawling:
     """深度情感爬取主工作流程"""
     
-    def __init__(self):
-        """初始化深度情感爬取"""
+    def __init__(self, max_workers: int = 3, crawl_timeout: int = 3600, max_retries: int = 1):
+        """
+        初始化深度情感爬取
+        
+        Args:
+            max_workers: 多平台爬取时同时运行的平台数
+            crawl_timeout: 单个平台爬取的超时时间（秒）
+            max_retries: 单个平台爬取失败后的重试次数
+        """
         self.keyword_manager = KeywordManager()
-        self.platform_crawler = PlatformCrawler()
+        self.platform_crawler = PlatformCrawler(max_workers, crawl_timeout, max_retries)
         self.supported_platforms = ['xhs', 'dy', 'ks', 'bili', 'wb', 'tieba', 'zhihu', 'reddit']
     
     def run_daily_crawling(self, target_date: date = None, platforms: List[str] = None, 
@@ -66,22 +73,29 @@ class DeepSentimentCrawling:
         print(f"\n📝 获取关键词...")
         if keywords:
             print(f"   使用指定关键词: {keywords}")
+            platform_keywords = {platform: list(keywords) for platform in platforms}
         else:
-            keywords = self.keyword_manager.get_latest_keywords(target_date, max_keywords_per_platform)
+            # 按新颖度、热度与各平台的历史产出分配关键词
+            platform_keywords = self.keyword_manager.schedule_keywords(
+                platforms, target_date, max_keywords_per_platform
+            )
         
-        if not keywords:
+        total_tasks = sum(len(v) for v in platform_keywords.values())
+        if not total_tasks:
             print("⚠️ 没有找到关键词，无法进行爬取")
             return {"success": False, "error": "没有关键词"}
         
-        print(f"   获取到 {len(keywords)} 个关键词")
-        print(f"   将在 {len(platforms)} 个平台上爬取每个关键词")
-        print(f"   总爬取任务: {len(keywords)} × {len(platforms)} = {len(keywords) * len(platforms)}")
+        for platform, platform_kws in platform_keywords.items():
+            print(f"   {platform}: {len(platform_kws)} 个关键词")
+        print(f"   总爬取任务: {total_tasks}")
         
-        # 3. 执行全平台关键词爬取
+        # 3. 执行全平台关键词爬取，记录调度结果供之后统计关键词产出
         print(f"\n🔄 开始全平台关键词爬取...")
+        task_ids = self.keyword_manager.record_crawl_plan(platform_keywords, target_date)
         crawl_results = self.platform_crawler.run_multi_platform_crawl_by_keywords(
-            keywords, platforms, login_type, max_notes_per_platform
+            platform_keywords, platforms, login_type, max_notes_per_platform
         )
+        self.keyword_manager.record_crawl_results(task_ids, crawl_results["platform_results"])
         
         # 4. 生成最终报告
         final_report = {
@@ -140,9 +154,11 @@ class DeepSentimentCrawling:
         print(f"📝 准备爬取 {len(keywords)} 个关键词")
         
         # 执行爬取
+        task_ids = self.keyword_manager.record_crawl_plan({platform: keywords}, target_date)
         result = self.platform_crawler.run_crawler(
             platform, keywords, login_type, max_notes
         )
+        self.keyword_manager.record_crawl_results(task_ids, {platform: result})
         
         return result
     
@@ -216,6 +232,12 @@ def main():
                        help="每个平台最大爬取内容数量 (默认: 50)")
     parser.add_argument("--login-type", type=str, choices=['qrcode', 'phone', 'cookie'], 
                        default='qrcode', help="登录方式 (默认: qrcode)")
+    parser.add_argument("--workers", type=int, default=3,
+                       help="多平台爬取时同时运行的平台数 (默认: 3)")
+    parser.add_argument("--timeout", type=int, default=3600,
+                       help="单个平台爬取的超时时间，单位秒 (默认: 3600)")
+    parser.add_argument("--retries", type=int, default=1,
+                       help="单个平台爬取失败或超时后的重试次数 (默认: 1)")
     
     # 功能参数
     parser.add_argument("--list-topics", action="store_true", help="列出最近的话题数据")
@@ -235,7 +257,7 @@ def main():
             return
     
     # 创建爬取实例
-    crawler = DeepSentimentCrawling()
+    crawler = DeepSentimentCrawling(args.workers, args.timeout, args.retries)
     
     try:
         # 显示指南
@@ -6,12 +6,15 @@ DeepSentimentCrawling模块 - 平台爬虫管理器
 """
 
 import os
+import re
 import sys
 import subprocess
-import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 import json
 from loguru import logger
 
@@ -24,14 +27,31 @@ try:
 except ImportError:
     raise ImportError("无法导入config.py配置文件")
 
+# MediaCrawler 从该环境变量读取单次运行的配置，见 MediaCrawler/config/__init__.py
+MEDIACRAWLER_CONFIG_ENV = "MEDIACRAWLER_CONFIG_OVERRIDES"
+
 class PlatformCrawler:
     """平台爬虫管理器"""
     
-    def __init__(self):
-        """初始化平台爬虫管理器"""
+    def __init__(self, max_workers: int = 3, timeout: int = 3600,
+                 max_retries: int = 1, retry_delay: int = 30):
+        """
+        初始化平台爬虫管理器
+        
+        Args:
+            max_workers: 多平台爬取时同时运行的爬虫进程数
+            timeout: 单个平台单次爬取的超时时间（秒）
+            max_retries: 爬取失败或超时后的重试次数
+            retry_delay: 重试前的等待时间（秒），随重试次数递增
+        """
         self.mediacrawler_path = Path(__file__).parent / "MediaCrawler"
         self.supported_platforms = ['xhs', 'dy', 'ks', 'bili', 'wb', 'tieba', 'zhihu', 'reddit']
         self.crawl_stats = {}
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._stats_lock = threading.Lock()
         
         # 确保MediaCrawler目录存在
         if not self.mediacrawler_path.exists():
@@ -154,69 +174,39 @@ postgresql_db_config = {{
             logger.exception(f"配置MediaCrawler数据库失败: {e}")
             return False
     
-    def create_base_config(self, platform: str, keywords: List[str], 
-                          crawler_type: str = "search", max_notes: int = 50) -> bool:
+    def build_crawler_config(self, platform: str, keywords: List[str],
+                             crawler_type: str = "search", max_notes: int = 50,
+                             run_index: int = 0) -> Dict:
         """
-        创建MediaCrawler的基础配置
+        生成单次爬取的MediaCrawler配置，通过环境变量传给爬虫子进程，
+        多个平台并发爬取时互不影响，不再改写共享的base_config.py
         
         Args:
             platform: 平台名称
             keywords: 关键词列表
             crawler_type: 爬取类型
             max_notes: 最大爬取数量
+            run_index: 并发运行的序号，用于错开各进程的CDP调试端口
         
         Returns:
-            是否配置成功
+            覆盖base_config的配置项
         """
-        try:
-            # 判断数据库类型，确定 SAVE_DATA_OPTION
-            db_dialect = (config.settings.DB_DIALECT or "mysql").lower()
-            is_postgresql = db_dialect in ("postgresql", "postgres")
-            save_data_option = "postgresql" if is_postgresql else "db"
-            
-            base_config_path = self.mediacrawler_path / "config" / "base_config.py"
-            
-            # 将关键词列表转换为逗号分隔的字符串
-            keywords_str = ",".join(keywords)
-            
-            # 读取原始配置文件
-            with open(base_config_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 修改关键配置项
-            lines = content.split('\n')
-            new_lines = []
-            
-            for line in lines:
-                if line.startswith('PLATFORM = '):
-                    new_lines.append(f'PLATFORM = "{platform}"  # 平台，xhs | dy | ks | bili | wb | tieba | zhihu | reddit')
-                elif line.startswith('KEYWORDS = '):
-                    new_lines.append(f'KEYWORDS = "{keywords_str}"  # 关键词搜索配置，以英文逗号分隔')
-                elif line.startswith('CRAWLER_TYPE = '):
-                    new_lines.append(f'CRAWLER_TYPE = "{crawler_type}"  # 爬取类型，search(关键词搜索) | detail(帖子详情)| creator(创作者主页数据)')
-                elif line.startswith('SAVE_DATA_OPTION = '):
-                    new_lines.append(f'SAVE_DATA_OPTION = "{save_data_option}"  # csv or db or json or sqlite or postgresql')
-                elif line.startswith('CRAWLER_MAX_NOTES_COUNT = '):
-                    new_lines.append(f'CRAWLER_MAX_NOTES_COUNT = {max_notes}')
-                elif line.startswith('ENABLE_GET_COMMENTS = '):
-                    new_lines.append('ENABLE_GET_COMMENTS = True')
-                elif line.startswith('CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES = '):
-                    new_lines.append('CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES = 20')
-                elif line.startswith('HEADLESS = '):
-                    new_lines.append('HEADLESS = True')  # 使用无头模式
-                else:
-                    new_lines.append(line)
-            
-            # 写入新配置
-            with open(base_config_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(new_lines))
-            
-            logger.info(f"已配置 {platform} 平台，爬取类型: {crawler_type}，关键词数量: {len(keywords)}，最大爬取数量: {max_notes}，保存数据方式: {save_data_option}")
-            return True
-            
-        except Exception as e:
-            logger.exception(f"创建基础配置失败: {e}")
-            return False
+        return {
+            "PLATFORM": platform,
+            "KEYWORDS": ",".join(keywords),
+            "CRAWLER_TYPE": crawler_type,
+            "SAVE_DATA_OPTION": self._get_save_data_option(),
+            "CRAWLER_MAX_NOTES_COUNT": max_notes,
+            "ENABLE_GET_COMMENTS": True,
+            "CRAWLER_MAX_COMMENTS_COUNT_SINGLENOTES": 20,
+            "HEADLESS": True,  # 使用无头模式
+            "CDP_DEBUG_PORT": 9222 + run_index * 10,
+        }
+    
+    def _get_save_data_option(self) -> str:
+        """判断数据库类型，确定 SAVE_DATA_OPTION"""
+        db_dialect = (config.settings.DB_DIALECT or "mysql").lower()
+        return "postgresql" if db_dialect in ("postgresql", "postgres") else "db"
     
     def run_crawler(self, platform: str, keywords: List[str], 
                    login_type: str = "qrcode", max_notes: int = 50) -> Dict:
@@ -238,77 +228,140 @@ postgresql_db_config = {{
         if not keywords:
             raise ValueError("关键词列表不能为空")
         
+        # 配置数据库
+        if not self.configure_mediacrawler_db():
+            return {"success": False, "error": "数据库配置失败", "platform": platform}
+        
+        return self._run_with_retry(platform, keywords, login_type, max_notes)
+    
+    def _run_with_retry(self, platform: str, keywords: List[str], login_type: str,
+                        max_notes: int, run_index: int = 0) -> Dict:
+        """运行爬虫子进程，失败或超时后按重试策略重新运行"""
+        for attempt in range(1, self.max_retries + 2):
+            result = self._run_crawler_process(platform, keywords, login_type, max_notes, run_index)
+            result["attempts"] = attempt
+            if result.get("success") or attempt > self.max_retries:
+                break
+            delay = self.retry_delay * attempt
+            logger.warning(f"⚠️ {platform} 第{attempt}次爬取失败: {result.get('error', '未知错误')}，{delay}秒后重试")
+            time.sleep(delay)
+        
+        # 保存统计信息
+        with self._stats_lock:
+            self.crawl_stats[platform] = result
+        return result
+    
+    def _run_crawler_process(self, platform: str, keywords: List[str], login_type: str,
+                             max_notes: int, run_index: int = 0) -> Dict:
+        """运行一次MediaCrawler子进程，实时转发并解析输出，超时后终止进程"""
         start_message = f"\n开始爬取平台: {platform}"
         start_message += f"\n关键词: {keywords[:5]}{'...' if len(keywords) > 5 else ''} (共{len(keywords)}个)"
         logger.info(start_message)
         
+        run_config = self.build_crawler_config(platform, keywords, "search", max_notes, run_index)
+        logger.info(f"已配置 {platform} 平台，关键词数量: {len(keywords)}，最大爬取数量: {max_notes}，"
+                    f"保存数据方式: {run_config['SAVE_DATA_OPTION']}")
+        
+        # 构建命令
+        cmd = [
+            sys.executable, "main.py",
+            "--platform", platform,
+            "--lt", login_type,
+            "--type", "search",
+            "--keywords", run_config["KEYWORDS"],
+            "--save_data_option", run_config["SAVE_DATA_OPTION"]
+        ]
+        env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+        env[MEDIACRAWLER_CONFIG_ENV] = json.dumps(run_config, ensure_ascii=False)
+        
+        logger.info(f"执行命令: {' '.join(cmd)}")
+        
         start_time = datetime.now()
+        output_stats = {
+            "notes_count": 0,
+            "comments_count": 0,
+            "errors_count": 0,
+            "login_required": False
+        }
+        timed_out = threading.Event()
         
         try:
-            # 配置数据库
-            if not self.configure_mediacrawler_db():
-                return {"success": False, "error": "数据库配置失败"}
-            
-            # 创建基础配置
-            if not self.create_base_config(platform, keywords, "search", max_notes):
-                return {"success": False, "error": "基础配置创建失败"}
-            
-            # 判断数据库类型，确定 save_data_option
-            db_dialect = (config.settings.DB_DIALECT or "mysql").lower()
-            is_postgresql = db_dialect in ("postgresql", "postgres")
-            save_data_option = "postgresql" if is_postgresql else "db"
-            
-            # 构建命令
-            cmd = [
-                sys.executable, "main.py",
-                "--platform", platform,
-                "--lt", login_type,
-                "--type", "search",
-                "--save_data_option", save_data_option
-            ]
-            
-            logger.info(f"执行命令: {' '.join(cmd)}")
-            
             # 切换到MediaCrawler目录并执行
-            result = subprocess.run(
+            process = subprocess.Popen(
                 cmd,
                 cwd=self.mediacrawler_path,
-                timeout=3600  # 60分钟超时
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                bufsize=1
             )
-            
-            end_time = datetime.now()
-            duration = (end_time - start_time).total_seconds()
-            
-            # 创建统计信息
-            crawl_stats = {
-                "platform": platform,
-                "keywords_count": len(keywords),
-                "duration_seconds": duration,
-                "start_time": start_time.isoformat(),
-                "end_time": end_time.isoformat(),
-                "return_code": result.returncode,
-                "success": result.returncode == 0,
-                "notes_count": 0,
-                "comments_count": 0,
-                "errors_count": 0
-            }
-            
-            # 保存统计信息
-            self.crawl_stats[platform] = crawl_stats
-            
-            if result.returncode == 0:
-                logger.info(f"✅ {platform} 爬取完成，耗时: {duration:.1f}秒")
-            else:
-                logger.error(f"❌ {platform} 爬取失败，返回码: {result.returncode}")
-            
-            return crawl_stats
-            
-        except subprocess.TimeoutExpired:
-            logger.exception(f"❌ {platform} 爬取超时")
-            return {"success": False, "error": "爬取超时", "platform": platform}
         except Exception as e:
             logger.exception(f"❌ {platform} 爬取异常: {e}")
             return {"success": False, "error": str(e), "platform": platform}
+        
+        def kill_on_timeout():
+            timed_out.set()
+            process.kill()
+        
+        timer = threading.Timer(self.timeout, kill_on_timeout)
+        timer.daemon = True
+        timer.start()
+        try:
+            for line in process.stdout:
+                line = line.rstrip()
+                if line:
+                    logger.info(f"[{platform}] {line}")
+                    self._parse_output_line(line, output_stats)
+            return_code = process.wait()
+        finally:
+            timer.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+        
+        end_time = datetime.now()
+        duration = (end_time - start_time).total_seconds()
+        
+        # 创建统计信息
+        crawl_stats = {
+            "platform": platform,
+            "keywords_count": len(keywords),
+            "duration_seconds": duration,
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+            "return_code": return_code,
+            "success": return_code == 0 and not timed_out.is_set(),
+            **output_stats
+        }
+        
+        if timed_out.is_set():
+            crawl_stats["error"] = "爬取超时"
+            logger.error(f"❌ {platform} 爬取超时（{self.timeout}秒）")
+        elif return_code == 0:
+            logger.info(f"✅ {platform} 爬取完成，耗时: {duration:.1f}秒")
+        else:
+            crawl_stats["error"] = f"返回码: {return_code}"
+            logger.error(f"❌ {platform} 爬取失败，返回码: {return_code}")
+        
+        return crawl_stats
+    
+    def _parse_output_line(self, line: str, stats: Dict):
+        """解析爬虫的一行输出，累计统计信息"""
+        notes_match = re.search(r'(\d+)\s*条(?:笔记|内容)', line)
+        comments_match = re.search(r'(\d+)\s*条评论', line)
+        if notes_match:
+            stats["notes_count"] = int(notes_match.group(1))
+        elif comments_match:
+            stats["comments_count"] = int(comments_match.group(1))
+        elif "登录" in line or "扫码" in line:
+            stats["login_required"] = True
+        
+        if "error" in line.lower() or "异常" in line:
+            stats["errors_count"] += 1
     
     def _parse_crawl_output(self, output_lines: List[str], error_lines: List[str]) -> Dict:
         """解析爬取输出，提取统计信息"""
@@ -318,43 +371,18 @@ postgresql_db_config = {{
             "errors_count": 0,
             "login_required": False
         }
-        
-        # 解析输出行
-        for line in output_lines:
-            if "条笔记" in line or "条内容" in line:
-                try:
-                    # 提取数字
-                    import re
-                    numbers = re.findall(r'\d+', line)
-                    if numbers:
-                        stats["notes_count"] = int(numbers[0])
-                except:
-                    pass
-            elif "条评论" in line:
-                try:
-                    import re
-                    numbers = re.findall(r'\d+', line)
-                    if numbers:
-                        stats["comments_count"] = int(numbers[0])
-                except:
-                    pass
-            elif "登录" in line or "扫码" in line:
-                stats["login_required"] = True
-        
-        # 解析错误行
-        for line in error_lines:
-            if "error" in line.lower() or "异常" in line:
-                stats["errors_count"] += 1
-        
+        for line in list(output_lines) + list(error_lines):
+            self._parse_output_line(line, stats)
         return stats
     
-    def run_multi_platform_crawl_by_keywords(self, keywords: List[str], platforms: List[str],
-                                            login_type: str = "qrcode", max_notes_per_keyword: int = 50) -> Dict:
+    def run_multi_platform_crawl_by_keywords(self, keywords: Union[List[str], Dict[str, List[str]]],
+                                            platforms: List[str], login_type: str = "qrcode",
+                                            max_notes_per_keyword: int = 50) -> Dict:
         """
-        基于关键词的多平台爬取 - 每个关键词在所有平台上都进行爬取
+        基于关键词的多平台爬取，各平台的爬虫进程并发运行
         
         Args:
-            keywords: 关键词列表
+            keywords: 关键词列表（每个关键词在所有平台上爬取），或 {平台: 关键词列表}（由关键词调度器为各平台分配）
             platforms: 平台列表
             login_type: 登录方式
             max_notes_per_keyword: 每个关键词在每个平台的最大爬取数量
@@ -362,24 +390,32 @@ postgresql_db_config = {{
         Returns:
             总体爬取统计
         """
+        if isinstance(keywords, dict):
+            platform_keywords = {platform: list(keywords.get(platform, [])) for platform in platforms}
+        else:
+            platform_keywords = {platform: list(keywords) for platform in platforms}
+        all_keywords = list(dict.fromkeys(k for platform in platforms for k in platform_keywords[platform]))
+        total_tasks = sum(len(platform_keywords[platform]) for platform in platforms)
         
         start_message = f"\n🚀 开始全平台关键词爬取"
-        start_message += f"\n   关键词数量: {len(keywords)}"
+        start_message += f"\n   关键词数量: {len(all_keywords)}"
         start_message += f"\n   平台数量: {len(platforms)}"
+        start_message += f"\n   并发数: {min(self.max_workers, len(platforms))}"
         start_message += f"\n   登录方式: {login_type}"
         start_message += f"\n   每个关键词在每个平台的最大爬取数量: {max_notes_per_keyword}"
-        start_message += f"\n   总爬取任务: {len(keywords)} × {len(platforms)} = {len(keywords) * len(platforms)}"
+        start_message += f"\n   总爬取任务: {total_tasks}"
         logger.info(start_message)
         
         total_stats = {
-            "total_keywords": len(keywords),
+            "total_keywords": len(all_keywords),
             "total_platforms": len(platforms),
-            "total_tasks": len(keywords) * len(platforms),
+            "total_tasks": total_tasks,
             "successful_tasks": 0,
             "failed_tasks": 0,
             "total_notes": 0,
             "total_comments": 0,
             "keyword_results": {},
+            "platform_results": {},
             "platform_summary": {}
         }
         
@@ -392,78 +428,80 @@ postgresql_db_config = {{
                 "total_comments": 0
             }
         
-        # 对每个平台一次性爬取所有关键词
-        for platform in platforms:
-            logger.info(f"\n📝 在 {platform} 平台爬取所有关键词")
-            logger.info(f"   关键词: {', '.join(keywords[:5])}{'...' if len(keywords) > 5 else ''}")
-            
-            try:
-                # 一次性传递所有关键词给平台
-                result = self.run_crawler(platform, keywords, login_type, max_notes_per_keyword)
-                
-                if result.get("success"):
-                    total_stats["successful_tasks"] += len(keywords)
-                    total_stats["platform_summary"][platform]["successful_keywords"] = len(keywords)
-                    
-                    notes_count = result.get("notes_count", 0)
-                    comments_count = result.get("comments_count", 0)
-                    
-                    total_stats["total_notes"] += notes_count
-                    total_stats["total_comments"] += comments_count
-                    total_stats["platform_summary"][platform]["total_notes"] = notes_count
-                    total_stats["platform_summary"][platform]["total_comments"] = comments_count
-                    
-                    # 为每个关键词记录结果
-                    for keyword in keywords:
-                        if keyword not in total_stats["keyword_results"]:
-                            total_stats["keyword_results"][keyword] = {}
-                        total_stats["keyword_results"][keyword][platform] = result
-                    
-                    logger.info(f"   ✅ 成功: {notes_count} 条内容, {comments_count} 条评论")
-                else:
-                    total_stats["failed_tasks"] += len(keywords)
-                    total_stats["platform_summary"][platform]["failed_keywords"] = len(keywords)
-                    
-                    # 为每个关键词记录失败结果
-                    for keyword in keywords:
-                        if keyword not in total_stats["keyword_results"]:
-                            total_stats["keyword_results"][keyword] = {}
-                        total_stats["keyword_results"][keyword][platform] = result
-                    
-                    logger.error(f"   ❌ 失败: {result.get('error', '未知错误')}")
+        # 数据库配置对所有平台相同，启动爬虫前写入一次
+        db_configured = self.configure_mediacrawler_db()
+        
+        # 每个平台一个爬虫进程，一次性爬取所有关键词
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(platforms)))) as executor:
+            futures = {}
+            for index, platform in enumerate(platforms):
+                keywords = platform_keywords[platform]
+                if not keywords:
+                    continue
+                if not db_configured:
+                    self._merge_platform_result(total_stats, platform, keywords,
+                                                {"success": False, "error": "数据库配置失败", "platform": platform})
+                    continue
+                logger.info(f"\n📝 在 {platform} 平台爬取 {len(keywords)} 个关键词")
+                logger.info(f"   关键词: {', '.join(keywords[:5])}{'...' if len(keywords) > 5 else ''}")
+                future = executor.submit(self._run_with_retry, platform, keywords, login_type,
+                                         max_notes_per_keyword, index)
+                futures[future] = platform
             
-            except Exception as e:
-                total_stats["failed_tasks"] += len(keywords)
-                total_stats["platform_summary"][platform]["failed_keywords"] = len(keywords)
-                error_result = {"success": False, "error": str(e)}
-                
-                # 为每个关键词记录异常结果
-                for keyword in keywords:
-                    if keyword not in total_stats["keyword_results"]:
-                        total_stats["keyword_results"][keyword] = {}
-                    total_stats["keyword_results"][keyword][platform] = error_result
-                
-                logger.error(f"   ❌ 异常: {e}")
+            for future in as_completed(futures):
+                platform = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"   ❌ {platform} 异常: {e}")
+                    result = {"success": False, "error": str(e), "platform": platform}
+                self._merge_platform_result(total_stats, platform, platform_keywords[platform], result)
         
         # 打印详细统计
         finish_message = f"\n📊 全平台关键词爬取完成!"
         finish_message += f"\n   总任务: {total_stats['total_tasks']}"
         finish_message += f"\n   成功: {total_stats['successful_tasks']}"
         finish_message += f"\n   失败: {total_stats['failed_tasks']}"
-        finish_message += f"\n   成功率: {total_stats['successful_tasks']/total_stats['total_tasks']*100:.1f}%"
+        finish_message += f"\n   成功率: {total_stats['successful_tasks']/max(1, total_stats['total_tasks'])*100:.1f}%"
         finish_message += f"\n   总内容: {total_stats['total_notes']} 条"
         finish_message += f"\n   总评论: {total_stats['total_comments']} 条"
         logger.info(finish_message)
         
         platform_summary_message = f"\n� 各平台统计:"
         for platform, stats in total_stats["platform_summary"].items():
-            success_rate = stats["successful_keywords"] / len(keywords) * 100 if keywords else 0
-            platform_summary_message += f"\n   {platform}: {stats['successful_keywords']}/{len(keywords)} 关键词成功 ({success_rate:.1f}%), "
+            keywords_count = len(platform_keywords[platform])
+            success_rate = stats["successful_keywords"] / keywords_count * 100 if keywords_count else 0
+            platform_summary_message += f"\n   {platform}: {stats['successful_keywords']}/{keywords_count} 关键词成功 ({success_rate:.1f}%), "
             platform_summary_message += f"{stats['total_notes']} 条内容"
         logger.info(platform_summary_message)
         
         return total_stats
     
+    def _merge_platform_result(self, total_stats: Dict, platform: str, keywords: List[str], result: Dict):
+        """将单个平台的爬取结果汇总到总体统计"""
+        total_stats["platform_results"][platform] = result
+        # 为每个关键词记录结果
+        for keyword in keywords:
+            total_stats["keyword_results"].setdefault(keyword, {})[platform] = result
+        
+        if result.get("success"):
+            notes_count = result.get("notes_count", 0)
+            comments_count = result.get("comments_count", 0)
+            
+            total_stats["successful_tasks"] += len(keywords)
+            total_stats["total_notes"] += notes_count
+            total_stats["total_comments"] += comments_count
+            total_stats["platform_summary"][platform]["successful_keywords"] = len(keywords)
+            total_stats["platform_summary"][platform]["total_notes"] = notes_count
+            total_stats["platform_summary"][platform]["total_comments"] = comments_count
+            
+            logger.info(f"   ✅ {platform} 成功: {notes_count} 条内容, {comments_count} 条评论")
+        else:
+            total_stats["failed_tasks"] += len(keywords)
+            total_stats["platform_summary"][platform]["failed_keywords"] = len(keywords)
+            
+            logger.error(f"   ❌ {platform} 失败: {result.get('error', '未知错误')}")
+    
     def get_crawl_statistics(self) -> Dict:
         """获取爬取统计信息"""
         return {
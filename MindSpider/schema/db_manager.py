@@ -7,7 +7,7 @@ MindSpider AI爬虫项目 - 数据库管理工具
 
 import os
 import sys
-from sqlalchemy import create_engine, text, inspect
+from sqlalchemy import bindparam, create_engine, text, inspect
 from sqlalchemy.engine import Engine
 import argparse
 from pathlib import Path
@@ -225,41 +225,88 @@ class DatabaseManager:
                 data_recent_message += "\n"
         logger.info(data_recent_message)
     
-    def cleanup_old_data(self, days=90, dry_run=True):
-        """清理旧数据"""
+    def cleanup_old_data(self, days=90, dry_run=True, batch_size=5000):
+        """
+        清理旧数据
+        - daily_news / daily_topics / crawling_tasks 按主键分批删除，每批单独提交，避免长事务和大范围锁表
+        - 不涉及内容表/评论表：分区的保留期单独由 --archive 指定（见 archive_partitions）
+        """
         cleanup_message = ""
         cleanup_message += "\n" + "=" * 60
         cleanup_message += f"清理{days}天前的数据 ({'预览模式' if dry_run else '执行模式'})"
         cleanup_message += "=" * 60
+        cleanup_message += "\n"
         
         cutoff_date = datetime.now() - timedelta(days=days)
         
         # 检查要删除的数据
-        cleanup_queries = [
-            ("daily_news", f"SELECT COUNT(*) FROM daily_news WHERE crawl_date < '{cutoff_date.date()}'"),
-            ("daily_topics", f"SELECT COUNT(*) FROM daily_topics WHERE extract_date < '{cutoff_date.date()}'"),
-            ("crawling_tasks", f"SELECT COUNT(*) FROM crawling_tasks WHERE scheduled_date < '{cutoff_date.date()}'")
+        cleanup_conditions = [
+            ("daily_news", "crawl_date < :cutoff"),
+            ("daily_topics", "extract_date < :cutoff"),
+            ("crawling_tasks", "scheduled_date < :cutoff"),
         ]
+        params = {"cutoff": cutoff_date.date()}
         
-        with self.engine.begin() as conn:
-            for table, query in cleanup_queries:
-                count = conn.execute(text(query)).scalar_one()
-                if count > 0:
-                    cleanup_message += f"  {table}: {count} 条记录将被删除"
-                    cleanup_message += "\n"
-                    if not dry_run:
-                        delete_query = query.replace("SELECT COUNT(*)", "DELETE")
-                        conn.execute(text(delete_query))
-                        cleanup_message += f"    已删除 {count} 条记录"
-                        cleanup_message += "\n"
-                else:
-                    cleanup_message += f"  {table}: 无需清理"
-                    cleanup_message += "\n"
+        for table, condition in cleanup_conditions:
+            with self.engine.connect() as conn:
+                count = conn.execute(text(f"SELECT COUNT(*) FROM {table} WHERE {condition}"), params).scalar_one()
+            if count == 0:
+                cleanup_message += f"  {table}: 无需清理"
+                cleanup_message += "\n"
+                continue
+            cleanup_message += f"  {table}: {count} 条记录将被删除"
+            cleanup_message += "\n"
+            if not dry_run:
+                deleted = self._delete_in_batches(table, condition, params, batch_size)
+                cleanup_message += f"    已删除 {deleted} 条记录"
+                cleanup_message += "\n"
         
         if dry_run:
             cleanup_message += "\n这是预览模式，没有实际删除数据。使用 --execute 参数执行实际清理。"
             cleanup_message += "\n"
         logger.info(cleanup_message)
+    
+    def _delete_in_batches(self, table, condition, params, batch_size):
+        """先取一批主键再按主键删除，MySQL 与 PostgreSQL 通用"""
+        deleted = 0
+        while True:
+            with self.engine.begin() as conn:
+                ids = conn.execute(
+                    text(f"SELECT id FROM {table} WHERE {condition} ORDER BY id LIMIT :batch_size"),
+                    {**params, "batch_size": batch_size},
+                ).scalars().all()
+                if not ids:
+                    return deleted
+                conn.execute(
+                    text(f"DELETE FROM {table} WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+                    {"ids": ids},
+                )
+            deleted += len(ids)
+    
+    def partition_tables(self):
+        """把内容表/评论表转换为按月分区，已分区的表补建未来的分区"""
+        from partitioning import PartitionManager
+        
+        results = PartitionManager(self.engine).partition_all()
+        partition_message = "\n" + "=" * 60 + "\n按月分区\n" + "=" * 60 + "\n"
+        for table, state in results.items():
+            partition_message += f"  {table}: {state}\n"
+        logger.info(partition_message)
+    
+    def archive_partitions(self, months=12, dry_run=True):
+        """归档并删除 months 个月以前的内容表/评论表分区，并补建未来的分区"""
+        from partitioning import PartitionManager, add_months, month_start
+        
+        cutoff = add_months(month_start(datetime.now().date()), -months)
+        archived = PartitionManager(self.engine).archive_expired(cutoff, dry_run=dry_run)
+        archive_message = "\n" + "=" * 60 + f"\n归档{cutoff}以前的分区 ({'预览模式' if dry_run else '执行模式'})\n" + "=" * 60 + "\n"
+        for table, partitions in archived.items():
+            archive_message += f"  {table}: {', '.join(partitions)}\n"
+        if not archived:
+            archive_message += "  没有需要归档的分区\n"
+        if dry_run:
+            archive_message += "\n这是预览模式，没有实际归档数据。使用 --execute 参数执行实际归档。\n"
+        logger.info(archive_message)
 
 def main():
     parser = argparse.ArgumentParser(description="MindSpider数据库管理工具")
@@ -267,12 +314,14 @@ def main():
     parser.add_argument("--stats", action="store_true", help="显示数据统计")
     parser.add_argument("--recent", type=int, default=7, help="显示最近N天的数据 (默认7天)")
     parser.add_argument("--cleanup", type=int, help="清理N天前的数据")
-    parser.add_argument("--execute", action="store_true", help="执行实际清理操作")
+    parser.add_argument("--execute", action="store_true", help="执行实际清理/归档操作")
+    parser.add_argument("--partition", action="store_true", help="把内容表/评论表转换为按月分区并预建未来的分区")
+    parser.add_argument("--archive", type=int, help="归档并删除N个月以前的内容表/评论表分区（Parquet）")
     
     args = parser.parse_args()
     
     # 如果没有参数，显示所有信息
-    if not any([args.tables, args.stats, args.recent != 7, args.cleanup]):
+    if not any([args.tables, args.stats, args.recent != 7, args.cleanup, args.partition, args.archive]):
         args.tables = True
         args.stats = True
     
@@ -285,11 +334,17 @@ def main():
         if args.stats:
             db_manager.show_statistics()
         
-        if args.recent != 7 or not any([args.tables, args.stats, args.cleanup]):
+        if args.recent != 7 or not any([args.tables, args.stats, args.cleanup, args.partition, args.archive]):
             db_manager.show_recent_data(args.recent)
         
         if args.cleanup:
             db_manager.cleanup_old_data(args.cleanup, dry_run=not args.execute)
+        
+        if args.partition:
+            db_manager.partition_tables()
+        
+        if args.archive:
+            db_manager.archive_partitions(args.archive, dry_run=not args.execute)
     
     finally:
         db_manager.close()
@@ -20,6 +20,7 @@ from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy import text
 
 from models_sa import Base
+from migrations import run_migrations
 
 # 导入 models_bigdata 以确保所有表类被注册到 Base.metadata
 # models_bigdata 现在也使用 models_sa 的 Base，所以所有表都在同一个 metadata 中
@@ -106,6 +107,10 @@ async def main() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+    # 给已有的表补充索引/字段（按版本号执行，已执行过的会跳过；迁移自行分批提交）
+    async with engine.connect() as conn:
+        await conn.run_sync(run_migrations)
+
     # 保持原有视图创建和释放逻辑
     dialect_name = engine.url.get_backend_name()
     await _create_views_if_needed(dialect_name)
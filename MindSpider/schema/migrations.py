@@ -0,0 +1,268 @@
+"""
+MindSpider 数据库版本化迁移
+
+create_all 只会创建缺失的表，不会给已有的表补充索引或字段。这里按版本号顺序执行迁移，
+已执行的版本记录在 schema_migrations 表中，重复运行是安全的。
+
+新增迁移：在 MIGRATIONS 末尾追加 Migration(下一个版本号, 名称, upgrade 函数)，
+upgrade 接收同步的 Connection；异步引擎通过 conn.run_sync(run_migrations) 调用。
+迁移会自行提交（回填每批一个短事务，全部完成后才记录版本号），调用方需传入 engine.connect()
+得到的连接，而不是 engine.begin() 开启的事务。
+
+命令行：python migrations.py 执行迁移，python migrations.py --status 查看执行状态
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from loguru import logger
+from sqlalchemy import BigInteger, Text, bindparam, inspect, text
+from sqlalchemy.engine import Connection
+
+# 互动数/发布时间的归一化规则与 MediaCrawler 写入时共用同一份实现；
+# 按文件路径加载，避免把 MediaCrawler 根目录（其中的 config 包）加入 sys.path
+_engagement_path = (
+    Path(__file__).resolve().parent.parent / "DeepSentimentCrawling" / "MediaCrawler" / "database" / "engagement.py"
+)
+_spec = importlib.util.spec_from_file_location("mediacrawler_engagement", _engagement_path)
+engagement = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(engagement)
+
+SCHEMA_MIGRATIONS_TABLE = "schema_migrations"
+BACKFILL_BATCH_SIZE = 1000  # 回填时每批读取/更新的行数
+
+# MediaCrawler 各平台的内容表（带 source_keyword / add_ts）
+NOTE_TABLES = [
+    "bilibili_video",
+    "douyin_aweme",
+    "kuaishou_video",
+    "weibo_note",
+    "xhs_note",
+    "tieba_note",
+    "zhihu_content",
+]
+
+# MySQL 不能直接索引 TEXT 列，需要指定前缀长度
+MYSQL_TEXT_PREFIX_LENGTH = 255
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+def create_index(conn: Connection, table: str, name: str, columns: Sequence[str]) -> bool:
+    """
+    创建索引；表不存在或同名索引已存在时跳过
+
+    Returns:
+        是否新建了索引
+    """
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return False
+    if name in {index["name"] for index in inspector.get_indexes(table)}:
+        return False
+
+    if conn.dialect.name == "mysql":
+        text_columns = {c["name"] for c in inspector.get_columns(table) if isinstance(c["type"], Text)}
+        column_sql = ", ".join(
+            f"`{c}`({MYSQL_TEXT_PREFIX_LENGTH})" if c in text_columns else f"`{c}`" for c in columns
+        )
+        conn.execute(text(f"CREATE INDEX `{name}` ON `{table}` ({column_sql})"))
+    else:
+        column_sql = ", ".join(f'"{c}"' for c in columns)
+        conn.execute(text(f'CREATE INDEX "{name}" ON "{table}" ({column_sql})'))
+    logger.info(f"[migrations] 创建索引 {table}.{name} ({', '.join(columns)})")
+    return True
+
+
+def add_column(conn: Connection, table: str, name: str, column_type=BigInteger()) -> bool:
+    """
+    添加可为空的列；表不存在或列已存在时跳过
+
+    Returns:
+        是否新增了列
+    """
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return False
+    if name in {column["name"] for column in inspector.get_columns(table)}:
+        return False
+    preparer = conn.dialect.identifier_preparer
+    type_sql = column_type.compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {preparer.quote(table)} ADD COLUMN {preparer.quote(name)} {type_sql} NULL"))
+    logger.info(f"[migrations] 添加字段 {table}.{name} {type_sql}")
+    return True
+
+
+def backfill_normalized_columns(conn: Connection, table: str, batch_size: Optional[int] = None) -> int:
+    """
+    按主键分批读取原始字段，计算归一化列（like_num、publish_ts_ms 等）后批量更新。
+    每批更新后立即提交，避免长事务锁表；只处理归一化列全部为空的行，中断后重新执行会从未回填的行继续
+
+    Args:
+        conn: 同步连接（由本函数提交，不能处于 engine.begin() 中）
+        table: 内容表名
+        batch_size: 每批行数，默认 BACKFILL_BATCH_SIZE
+
+    Returns:
+        更新的行数
+    """
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return 0
+    existing = {column["name"] for column in inspector.get_columns(table)}
+    sources = sorted(engagement.source_columns(table) & existing)
+    targets = [name for name in engagement.NORMALIZED_COLUMNS if name in existing]
+    if not sources or not targets:
+        return 0
+
+    preparer = conn.dialect.identifier_preparer
+    quoted_table = preparer.quote(table)
+    pending = " AND ".join(f"{preparer.quote(c)} IS NULL" for c in targets)
+    select_sql = text(
+        f"SELECT id, {', '.join(preparer.quote(c) for c in sources)} FROM {quoted_table} "
+        f"WHERE id > :last_id AND {pending} ORDER BY id LIMIT :batch_size"
+    )
+    update_sql = text(
+        f"UPDATE {quoted_table} SET {', '.join(f'{preparer.quote(c)} = :{c}' for c in targets)} WHERE id = :row_id"
+    ).bindparams(*(bindparam(c, type_=BigInteger()) for c in targets))
+
+    batch_size = batch_size or BACKFILL_BATCH_SIZE
+    last_id, updated = 0, 0
+    while True:
+        rows = conn.execute(select_sql, {"last_id": last_id, "batch_size": batch_size}).mappings().all()
+        if not rows:
+            break
+        params = []
+        for row in rows:
+            values = engagement.normalized_values(table, row)
+            params.append({"row_id": row["id"], **{c: values.get(c) for c in targets}})
+        conn.execute(update_sql, params)
+        conn.commit()
+        updated += len(params)
+        last_id = rows[-1]["id"]
+    if updated:
+        logger.info(f"[migrations] 回填 {table} 归一化字段 {updated} 行")
+    return updated
+
+
+def _add_note_keyword_add_ts_index(conn: Connection):
+    """按关键词查询最近抓取的内容：WHERE source_keyword = ? AND add_ts >= ? ORDER BY add_ts"""
+    for table in NOTE_TABLES:
+        create_index(conn, table, f"idx_{table}_kw_add_ts", ["source_keyword", "add_ts"])
+
+
+def _add_normalized_engagement_columns(conn: Connection):
+    """
+    整数互动列与统一的毫秒发布时间，回填存量数据后建立覆盖索引：
+    - (publish_ts_ms, like_num, comment_num, share_num, collect_num, view_num)：按发布时间范围计算热度
+    - (source_keyword, like_num, add_ts)：按关键词取点赞最多的内容
+    """
+    for table in NOTE_TABLES:
+        for name in engagement.NORMALIZED_COLUMNS:
+            add_column(conn, table, name)
+        backfill_normalized_columns(conn, table)
+        create_index(conn, table, f"idx_{table}_publish_ts", ["publish_ts_ms", *engagement.NUMERIC_COLUMNS])
+        create_index(conn, table, f"idx_{table}_kw_like", ["source_keyword", "like_num", "add_ts"])
+
+
+def _add_comment_publish_ts(conn: Connection):
+    """评论表的毫秒发布时间：按时间范围查询评论，也是按月分区的分区键"""
+    for table in engagement.COMMENT_TABLES:
+        add_column(conn, table, engagement.PUBLISH_TS_COLUMN)
+        backfill_normalized_columns(conn, table)
+        create_index(conn, table, f"idx_{table}_publish_ts", [engagement.PUBLISH_TS_COLUMN])
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "note_source_keyword_add_ts_index", _add_note_keyword_add_ts_index),
+    Migration(2, "note_normalized_engagement_columns", _add_normalized_engagement_columns),
+    Migration(3, "comment_publish_ts", _add_comment_publish_ts),
+]
+
+
+def _ensure_migrations_table(conn: Connection):
+    if inspect(conn).has_table(SCHEMA_MIGRATIONS_TABLE):
+        return
+    conn.execute(text(
+        f"CREATE TABLE {SCHEMA_MIGRATIONS_TABLE} ("
+        "version INTEGER NOT NULL PRIMARY KEY, "
+        "name VARCHAR(128) NOT NULL, "
+        "applied_at BIGINT NOT NULL)"
+    ))
+
+
+def applied_versions(conn: Connection) -> Dict[int, str]:
+    """已执行的迁移 {版本号: 名称}"""
+    _ensure_migrations_table(conn)
+    rows = conn.execute(text(f"SELECT version, name FROM {SCHEMA_MIGRATIONS_TABLE}")).all()
+    return {version: name for version, name in rows}
+
+
+def run_migrations(conn: Connection, migrations: Sequence[Migration] = None) -> List[int]:
+    """
+    依次执行尚未执行的迁移；每个迁移完成（回填的最后一批已提交）后记录版本号并提交，
+    中途失败的迁移不会被记录，下次重新执行
+
+    Args:
+        conn: engine.connect() 得到的同步连接（异步引擎使用 await conn.run_sync(run_migrations)）
+        migrations: 迁移列表，默认 MIGRATIONS
+
+    Returns:
+        本次执行的版本号
+    """
+    migrations = sorted(migrations if migrations is not None else MIGRATIONS, key=lambda m: m.version)
+    done = applied_versions(conn)
+    conn.commit()
+    executed = []
+    for migration in migrations:
+        if migration.version in done:
+            continue
+        logger.info(f"[migrations] 执行迁移 {migration.version}: {migration.name}")
+        migration.upgrade(conn)
+        conn.execute(
+            text(f"INSERT INTO {SCHEMA_MIGRATIONS_TABLE} (version, name, applied_at) VALUES (:v, :n, :t)"),
+            {"v": migration.version, "n": migration.name, "t": int(time.time() * 1000)},
+        )
+        conn.commit()
+        executed.append(migration.version)
+    if not executed:
+        logger.info("[migrations] 数据库已是最新版本")
+    return executed
+
+
+async def _main(status_only: bool = False):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from init_database import _build_database_url
+
+    engine = create_async_engine(_build_database_url(), pool_pre_ping=True)
+    try:
+        async with engine.connect() as conn:
+            if status_only:
+                done = await conn.run_sync(applied_versions)
+                for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+                    state = "已执行" if migration.version in done else "待执行"
+                    logger.info(f"[migrations] {migration.version}: {migration.name} ({state})")
+            else:
+                await conn.run_sync(run_migrations)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="执行 MindSpider 数据库迁移")
+    parser.add_argument("--status", action="store_true", help="只查看各迁移的执行状态")
+    asyncio.run(_main(parser.parse_args().status))
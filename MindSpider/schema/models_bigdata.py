@@ -10,13 +10,18 @@
 """
 
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import Integer, String, BigInteger, Text, ForeignKey
+from sqlalchemy import Integer, String, BigInteger, Text, ForeignKey, Index
 
 # 使用 models_sa 中的 Base，确保所有表在同一个 metadata 中，外键引用可以正常工作
 from models_sa import Base
 
 class BilibiliVideo(Base):
     __tablename__ = "bilibili_video"
+    __table_args__ = (
+        Index("idx_bilibili_video_kw_add_ts", "source_keyword", "add_ts", mysql_length={"source_keyword": 255}),
+        Index("idx_bilibili_video_publish_ts", "publish_ts_ms", "like_num", "comment_num", "share_num", "collect_num", "view_num"),
+        Index("idx_bilibili_video_kw_like", "source_keyword", "like_num", "add_ts", mysql_length={"source_keyword": 255}),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     video_id: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True, unique=True)
     video_url: Mapped[str] = mapped_column(Text, nullable=False)
@@ -26,6 +31,13 @@ class BilibiliVideo(Base):
     liked_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
     add_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # 归一化的互动数与发布时间（毫秒），见 MediaCrawler/database/engagement.py
+    like_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    comment_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    share_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    collect_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    view_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    publish_ts_ms: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     video_type: Mapped[str | None] = mapped_column(Text, nullable=True)
     title: Mapped[str | None] = mapped_column(Text, nullable=True)
     desc: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -44,6 +56,9 @@ class BilibiliVideo(Base):
 
 class BilibiliVideoComment(Base):
     __tablename__ = "bilibili_video_comment"
+    __table_args__ = (
+        Index("idx_bilibili_video_comment_publish_ts", "publish_ts_ms"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
     nickname: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -52,6 +67,8 @@ class BilibiliVideoComment(Base):
     avatar: Mapped[str | None] = mapped_column(Text, nullable=True)
     add_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # 归一化的发布时间（毫秒），见 MediaCrawler/database/engagement.py
+    publish_ts_ms: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     comment_id: Mapped[int | None] = mapped_column(BigInteger, index=True, nullable=True)
     video_id: Mapped[int | None] = mapped_column(BigInteger, index=True, nullable=True)
     content: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -110,6 +127,11 @@ class BilibiliUpDynamic(Base):
 
 class DouyinAweme(Base):
     __tablename__ = "douyin_aweme"
+    __table_args__ = (
+        Index("idx_douyin_aweme_kw_add_ts", "source_keyword", "add_ts", mysql_length={"source_keyword": 255}),
+        Index("idx_douyin_aweme_publish_ts", "publish_ts_ms", "like_num", "comment_num", "share_num", "collect_num", "view_num"),
+        Index("idx_douyin_aweme_kw_like", "source_keyword", "like_num", "add_ts", mysql_length={"source_keyword": 255}),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
     sec_uid: Mapped[str | None] = mapped_column(String(255), nullable=True)
@@ -121,6 +143,13 @@ class DouyinAweme(Base):
     ip_location: Mapped[str | None] = mapped_column(Text, nullable=True)
     add_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # 归一化的互动数与发布时间（毫秒），见 MediaCrawler/database/engagement.py
+    like_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    comment_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    share_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    collect_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    view_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    publish_ts_ms: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     aweme_id: Mapped[int | None] = mapped_column(BigInteger, index=True, nullable=True)
     aweme_type: Mapped[str | None] = mapped_column(Text, nullable=True)
     title: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -141,6 +170,9 @@ class DouyinAweme(Base):
 
 class DouyinAwemeComment(Base):
     __tablename__ = "douyin_aweme_comment"
+    __table_args__ = (
+        Index("idx_douyin_aweme_comment_publish_ts", "publish_ts_ms"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
     sec_uid: Mapped[str | None] = mapped_column(String(255), nullable=True)
@@ -152,6 +184,8 @@ class DouyinAwemeComment(Base):
     ip_location: Mapped[str | None] = mapped_column(Text, nullable=True)
     add_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # 归一化的发布时间（毫秒），见 MediaCrawler/database/engagement.py
+    publish_ts_ms: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     comment_id: Mapped[int | None] = mapped_column(BigInteger, index=True, nullable=True)
     aweme_id: Mapped[int | None] = mapped_column(BigInteger, index=True, nullable=True)
     content: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -181,12 +215,24 @@ class DyCreator(Base):
 
 class KuaishouVideo(Base):
     __tablename__ = "kuaishou_video"
+    __table_args__ = (
+        Index("idx_kuaishou_video_kw_add_ts", "source_keyword", "add_ts", mysql_length={"source_keyword": 255}),
+        Index("idx_kuaishou_video_publish_ts", "publish_ts_ms", "like_num", "comment_num", "share_num", "collect_num", "view_num"),
+        Index("idx_kuaishou_video_kw_like", "source_keyword", "like_num", "add_ts", mysql_length={"source_keyword": 255}),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
     nickname: Mapped[str | None] = mapped_column(Text, nullable=True)
     avatar: Mapped[str | None] = mapped_column(Text, nullable=True)
     add_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # 归一化的互动数与发布时间（毫秒），见 MediaCrawler/database/engagement.py
+    like_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    comment_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    share_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    collect_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    view_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    publish_ts_ms: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     video_id: Mapped[str | None] = mapped_column(String(255), index=True, nullable=True)
     video_type: Mapped[str | None] = mapped_column(Text, nullable=True)
     title: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -203,12 +249,17 @@ class KuaishouVideo(Base):
 
 class KuaishouVideoComment(Base):
     __tablename__ = "kuaishou_video_comment"
+    __table_args__ = (
+        Index("idx_kuaishou_video_comment_publish_ts", "publish_ts_ms"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[str | None] = mapped_column(Text, nullable=True)
     nickname: Mapped[str | None] = mapped_column(Text, nullable=True)
     avatar: Mapped[str | None] = mapped_column(Text, nullable=True)
     add_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # 归一化的发布时间（毫秒），见 MediaCrawler/database/engagement.py
+    publish_ts_ms: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     comment_id: Mapped[int | None] = mapped_column(BigInteger, index=True, nullable=True)
     video_id: Mapped[str | None] = mapped_column(String(255), index=True, nullable=True)
     content: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -217,6 +268,11 @@ class KuaishouVideoComment(Base):
 
 class WeiboNote(Base):
     __tablename__ = "weibo_note"
+    __table_args__ = (
+        Index("idx_weibo_note_kw_add_ts", "source_keyword", "add_ts", mysql_length={"source_keyword": 255}),
+        Index("idx_weibo_note_publish_ts", "publish_ts_ms", "like_num", "comment_num", "share_num", "collect_num", "view_num"),
+        Index("idx_weibo_note_kw_like", "source_keyword", "like_num", "add_ts", mysql_length={"source_keyword": 255}),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
     nickname: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -226,6 +282,13 @@ class WeiboNote(Base):
     ip_location: Mapped[str | None] = mapped_column(Text, default='', nullable=True)
     add_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # 归一化的互动数与发布时间（毫秒），见 MediaCrawler/database/engagement.py
+    like_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    comment_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    share_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    collect_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    view_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    publish_ts_ms: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     note_id: Mapped[int | None] = mapped_column(BigInteger, index=True, nullable=True)
     content: Mapped[str | None] = mapped_column(Text, nullable=True)
     create_time: Mapped[int | None] = mapped_column(BigInteger, index=True, nullable=True)
@@ -240,6 +303,9 @@ class WeiboNote(Base):
 
 class WeiboNoteComment(Base):
     __tablename__ = "weibo_note_comment"
+    __table_args__ = (
+        Index("idx_weibo_note_comment_publish_ts", "publish_ts_ms"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
     nickname: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -249,6 +315,8 @@ class WeiboNoteComment(Base):
     ip_location: Mapped[str | None] = mapped_column(Text, default='', nullable=True)
     add_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # 归一化的发布时间（毫秒），见 MediaCrawler/database/engagement.py
+    publish_ts_ms: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     comment_id: Mapped[int | None] = mapped_column(BigInteger, index=True, nullable=True)
     note_id: Mapped[int | None] = mapped_column(BigInteger, index=True, nullable=True)
     content: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -294,6 +362,11 @@ class XhsCreator(Base):
 
 class XhsNote(Base):
     __tablename__ = "xhs_note"
+    __table_args__ = (
+        Index("idx_xhs_note_kw_add_ts", "source_keyword", "add_ts", mysql_length={"source_keyword": 255}),
+        Index("idx_xhs_note_publish_ts", "publish_ts_ms", "like_num", "comment_num", "share_num", "collect_num", "view_num"),
+        Index("idx_xhs_note_kw_like", "source_keyword", "like_num", "add_ts", mysql_length={"source_keyword": 255}),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
     nickname: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -301,6 +374,13 @@ class XhsNote(Base):
     ip_location: Mapped[str | None] = mapped_column(Text, nullable=True)
     add_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # 归一化的互动数与发布时间（毫秒），见 MediaCrawler/database/engagement.py
+    like_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    comment_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    share_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    collect_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    view_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    publish_ts_ms: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     note_id: Mapped[str | None] = mapped_column(String(255), index=True, nullable=True)
     type: Mapped[str | None] = mapped_column(Text, nullable=True)
     title: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -323,6 +403,9 @@ class XhsNote(Base):
 
 class XhsNoteComment(Base):
     __tablename__ = "xhs_note_comment"
+    __table_args__ = (
+        Index("idx_xhs_note_comment_publish_ts", "publish_ts_ms"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
     nickname: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -330,6 +413,8 @@ class XhsNoteComment(Base):
     ip_location: Mapped[str | None] = mapped_column(Text, nullable=True)
     add_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # 归一化的发布时间（毫秒），见 MediaCrawler/database/engagement.py
+    publish_ts_ms: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     comment_id: Mapped[str | None] = mapped_column(String(255), index=True, nullable=True)
     create_time: Mapped[int | None] = mapped_column(BigInteger, index=True, nullable=True)
     note_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
@@ -341,6 +426,11 @@ class XhsNoteComment(Base):
 
 class TiebaNote(Base):
     __tablename__ = "tieba_note"
+    __table_args__ = (
+        Index("idx_tieba_note_kw_add_ts", "source_keyword", "add_ts", mysql_length={"source_keyword": 255}),
+        Index("idx_tieba_note_publish_ts", "publish_ts_ms", "like_num", "comment_num", "share_num", "collect_num", "view_num"),
+        Index("idx_tieba_note_kw_like", "source_keyword", "like_num", "add_ts", mysql_length={"source_keyword": 255}),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     note_id: Mapped[str | None] = mapped_column(String(644), index=True, nullable=True)
     title: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -358,12 +448,22 @@ class TiebaNote(Base):
     ip_location: Mapped[str | None] = mapped_column(Text, default='', nullable=True)
     add_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # 归一化的互动数与发布时间（毫秒），见 MediaCrawler/database/engagement.py
+    like_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    comment_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    share_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    collect_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    view_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    publish_ts_ms: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     source_keyword: Mapped[str | None] = mapped_column(Text, default='', nullable=True)
     topic_id: Mapped[str | None] = mapped_column(String(64), ForeignKey("daily_topics.topic_id", ondelete="SET NULL"), nullable=True)
     crawling_task_id: Mapped[str | None] = mapped_column(String(64), ForeignKey("crawling_tasks.task_id", ondelete="SET NULL"), nullable=True)
 
 class TiebaComment(Base):
     __tablename__ = "tieba_comment"
+    __table_args__ = (
+        Index("idx_tieba_comment_publish_ts", "publish_ts_ms"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     comment_id: Mapped[str | None] = mapped_column(String(255), index=True, nullable=True)
     parent_comment_id: Mapped[str | None] = mapped_column(String(255), default='', nullable=True)
@@ -381,6 +481,8 @@ class TiebaComment(Base):
     note_url: Mapped[str | None] = mapped_column(Text, nullable=True)
     add_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # 归一化的发布时间（毫秒），见 MediaCrawler/database/engagement.py
+    publish_ts_ms: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
 
 
 class TiebaCreator(Base):
@@ -401,6 +503,11 @@ class TiebaCreator(Base):
 
 class ZhihuContent(Base):
     __tablename__ = "zhihu_content"
+    __table_args__ = (
+        Index("idx_zhihu_content_kw_add_ts", "source_keyword", "add_ts", mysql_length={"source_keyword": 255}),
+        Index("idx_zhihu_content_publish_ts", "publish_ts_ms", "like_num", "comment_num", "share_num", "collect_num", "view_num"),
+        Index("idx_zhihu_content_kw_like", "source_keyword", "like_num", "add_ts", mysql_length={"source_keyword": 255}),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     content_id: Mapped[str | None] = mapped_column(String(64), index=True, nullable=True)
     content_type: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -421,11 +528,21 @@ class ZhihuContent(Base):
     user_url_token: Mapped[str | None] = mapped_column(Text, nullable=True)
     add_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # 归一化的互动数与发布时间（毫秒），见 MediaCrawler/database/engagement.py
+    like_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    comment_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    share_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    collect_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    view_num: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    publish_ts_ms: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     topic_id: Mapped[str | None] = mapped_column(String(64), ForeignKey("daily_topics.topic_id", ondelete="SET NULL"), nullable=True)
     crawling_task_id: Mapped[str | None] = mapped_column(String(64), ForeignKey("crawling_tasks.task_id", ondelete="SET NULL"), nullable=True)
 
 class ZhihuComment(Base):
     __tablename__ = "zhihu_comment"
+    __table_args__ = (
+        Index("idx_zhihu_comment_publish_ts", "publish_ts_ms"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     comment_id: Mapped[str | None] = mapped_column(String(64), index=True, nullable=True)
     parent_comment_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
@@ -443,6 +560,8 @@ class ZhihuComment(Base):
     user_avatar: Mapped[str | None] = mapped_column(Text, nullable=True)
     add_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     last_modify_ts: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # 归一化的发布时间（毫秒），见 MediaCrawler/database/engagement.py
+    publish_ts_ms: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
 
 
 class ZhihuCreator(Base):
@@ -0,0 +1,516 @@
+"""
+MindSpider 内容表/评论表按月分区与归档
+
+分区键为归一化的发布时间 publish_ts_ms（毫秒，见 MediaCrawler/database/engagement.py，
+由迁移 2/3 添加并回填），按自然月做 RANGE 分区：
+- MySQL：p_old（更早的数据）、pYYYYMM、p_max（MAXVALUE）；主键改为 (id, publish_ts_ms)，
+  不包含分区键的唯一索引改为普通索引，外键删除（MySQL 分区表不支持外键）
+- PostgreSQL：新建分区表 <table> 并迁入原表数据，子表 <table>_p_old、<table>_pYYYYMM、<table>_p_default，
+  主键同样为 (id, publish_ts_ms)
+
+按时间范围查询时只要 WHERE 条件包含 publish_ts_ms，数据库会自动裁剪无关分区。
+保留期之外的分区先从表中移出（PostgreSQL DETACH，MySQL EXCHANGE 到暂存表），写成压缩的 Parquet 文件并核对行数后再删除。
+
+转换是一次性的重操作，不在 init_database 中自动执行：
+    python db_manager.py --partition            # 转换为分区表并预建分区
+    python db_manager.py --archive 12 --execute  # 归档并删除 12 个月以前的分区
+--archive --execute 时同时补建未来几个月的分区，定期运行即可；--cleanup 不会归档或删除分区。
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Numeric, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from migrations import NOTE_TABLES, create_index, engagement
+
+PARTITION_KEY = engagement.PUBLISH_TS_COLUMN
+PARTITIONED_TABLES = NOTE_TABLES + list(engagement.COMMENT_TABLES)
+
+MONTHS_AHEAD = 3  # 预先建好未来几个月的分区
+MAX_HISTORY_MONTHS = 24  # 转换时最多为过去多少个月单独建分区，更早的数据放入 p_old
+ARCHIVE_DIR = Path(__file__).resolve().parent.parent / "archive"
+ARCHIVE_BATCH_SIZE = 5000  # 归档时每批读取并写入 Parquet 的行数
+
+# 当前时间的毫秒时间戳：分区键缺失时按抓取时间计，与批量写入器的回退一致，避免落入 p_old 后被归档
+NOW_MS_SQL = {
+    "mysql": "(UNIX_TIMESTAMP() * 1000)",
+    "postgresql": "(EXTRACT(EPOCH FROM now()) * 1000)::bigint",
+}
+
+OLD_PARTITION = "p_old"
+MAX_PARTITION = "p_max"
+DEFAULT_PARTITION = "p_default"
+
+
+# --- 月份与分区边界 ---
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_ts_ms(month: date) -> int:
+    """月初（本地时间 0 点）的毫秒时间戳，与 publish_ts_ms 的换算方式一致"""
+    return int(datetime(month.year, month.month, 1).timestamp() * 1000)
+
+
+def month_range(first: date, last: date) -> List[date]:
+    """first 到 last（含）之间的每个月初"""
+    months, month = [], month_start(first)
+    while month <= month_start(last):
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+
+@dataclass(frozen=True)
+class Partition:
+    """一个已存在的分区；upper_ms 为 None 表示 MAXVALUE / DEFAULT 分区"""
+    name: str
+    upper_ms: Optional[int]
+    rows: Optional[int] = None
+
+    @property
+    def month(self) -> Optional[date]:
+        match = re.search(r"p(\d{4})(\d{2})$", self.name)
+        return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def plan_months(min_ts_ms: Optional[int], today: date, months_ahead: int = MONTHS_AHEAD,
+                max_history_months: int = MAX_HISTORY_MONTHS) -> List[date]:
+    """
+    转换时单独建分区的月份：从最早数据所在月（最多往前 max_history_months 个月）到未来 months_ahead 个月
+
+    Args:
+        min_ts_ms: 表中最早的 publish_ts_ms，空表为 None
+        today: 当前日期
+    """
+    this_month = month_start(today)
+    first = this_month
+    if min_ts_ms:
+        first = max(month_start(datetime.fromtimestamp(min_ts_ms / 1000).date()),
+                    add_months(this_month, -max_history_months))
+        first = min(first, this_month)
+    return month_range(first, add_months(this_month, months_ahead))
+
+
+# --- DDL ---
+
+def _q(conn: Connection, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+def mysql_partition_clause(months: Sequence[date]) -> str:
+    """ALTER TABLE ... PARTITION BY RANGE 子句：p_old + 每月一个分区 + p_max"""
+    parts = [f"PARTITION {OLD_PARTITION} VALUES LESS THAN ({month_ts_ms(months[0])})"]
+    parts += [f"PARTITION {partition_name(m)} VALUES LESS THAN ({month_ts_ms(add_months(m, 1))})" for m in months]
+    parts.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+    return f"PARTITION BY RANGE ({PARTITION_KEY}) (\n    " + ",\n    ".join(parts) + "\n)"
+
+
+def postgres_partition_ddl(table: str, month: date) -> str:
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{table}_{partition_name(month)}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ({month_ts_ms(month)}) TO ({month_ts_ms(add_months(month, 1))})"
+    )
+
+
+class PartitionManager:
+    """内容表/评论表的按月分区：转换、预建分区、归档过期分区"""
+
+    def __init__(self, engine: Engine, archive_dir: Path = ARCHIVE_DIR, tables: Sequence[str] = None):
+        """
+        Args:
+            engine: 同步引擎（MySQL 或 PostgreSQL）
+            archive_dir: Parquet 归档目录，按表名分子目录
+            tables: 需要分区的表，默认全部内容表与评论表
+        """
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.archive_dir = Path(archive_dir)
+        self.tables = list(tables) if tables is not None else PARTITIONED_TABLES
+        if self.dialect not in ("mysql", "postgresql"):
+            raise ValueError(f"按月分区只支持 MySQL 与 PostgreSQL，当前为 {self.dialect}")
+
+    # --- 查询分区 ---
+
+    def list_partitions(self, conn: Connection, table: str) -> List[Partition]:
+        """按边界从小到大返回已存在的分区，未分区的表返回空列表"""
+        if self.dialect == "mysql":
+            rows = conn.execute(text(
+                "SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+                "ORDER BY PARTITION_ORDINAL_POSITION"
+            ), {"table": table}).all()
+            return [Partition(name, None if desc == "MAXVALUE" else int(desc), rows) for name, desc, rows in rows]
+
+        rows = conn.execute(text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table"
+        ), {"table": table}).all()
+        partitions = []
+        for name, bound, rows_estimate in rows:
+            match = re.search(r"TO \('?(-?\d+)'?\)", bound or "")
+            partitions.append(Partition(name, int(match.group(1)) if match else None, rows_estimate))
+        return sorted(partitions, key=lambda p: (p.upper_ms is None, p.upper_ms or 0))
+
+    def is_partitioned(self, conn: Connection, table: str) -> bool:
+        return bool(self.list_partitions(conn, table))
+
+    # --- 转换 ---
+
+    def partition_all(self, today: Optional[date] = None) -> Dict[str, str]:
+        """
+        把尚未分区的表转换为按月分区，已分区的表补建未来的分区
+
+        Returns:
+            {表名: converted / extended / skipped}
+        """
+        today = today or date.today()
+        results = {}
+        for table in self.tables:
+            with self.engine.begin() as conn:
+                inspector = inspect(conn)
+                if not inspector.has_table(table):
+                    results[table] = "skipped"
+                    continue
+                if PARTITION_KEY not in {c["name"] for c in inspector.get_columns(table)}:
+                    logger.warning(f"[partitioning] {table} 缺少 {PARTITION_KEY}，请先执行 migrations.py")
+                    results[table] = "skipped"
+                    continue
+                if self.is_partitioned(conn, table):
+                    self.ensure_future_partitions(conn, table, today)
+                    results[table] = "extended"
+                    continue
+                self._fill_missing_keys(conn, table)
+                min_ts = conn.execute(text(f"SELECT MIN({PARTITION_KEY}) FROM {_q(conn, table)}")).scalar()
+                months = plan_months(min_ts, today)
+                if self.dialect == "mysql":
+                    self._convert_mysql(conn, table, months)
+                else:
+                    self._convert_postgres(conn, table, months)
+                results[table] = "converted"
+                logger.info(f"[partitioning] {table} 已按月分区（{partition_name(months[0])} ~ {partition_name(months[-1])}）")
+        return results
+
+    def _fill_missing_keys(self, conn: Connection, table: str):
+        """分区键不能为空：发布时间缺失的行按抓取时间计，抓取时间也缺失时按当前时间计"""
+        quoted = _q(conn, table)
+        conn.execute(text(
+            f"UPDATE {quoted} SET {PARTITION_KEY} = COALESCE(NULLIF(add_ts, 0), {NOW_MS_SQL[self.dialect]}) "
+            f"WHERE {PARTITION_KEY} IS NULL"
+        ))
+
+    def _convert_mysql(self, conn: Connection, table: str, months: Sequence[date]):
+        inspector = inspect(conn)
+        quoted = _q(conn, table)
+        # MySQL 分区表不支持外键
+        for fk in inspector.get_foreign_keys(table):
+            conn.execute(text(f"ALTER TABLE {quoted} DROP FOREIGN KEY {_q(conn, fk['name'])}"))
+            logger.warning(f"[partitioning] {table}: 删除外键 {fk['name']}（MySQL 分区表不支持外键）")
+        # 唯一索引必须包含分区键，否则改为普通索引
+        for index in inspector.get_indexes(table):
+            if index["unique"] and PARTITION_KEY not in index["column_names"]:
+                conn.execute(text(f"ALTER TABLE {quoted} DROP INDEX {_q(conn, index['name'])}"))
+                create_index(conn, table, index["name"], index["column_names"])
+                logger.warning(f"[partitioning] {table}: 唯一索引 {index['name']} 改为普通索引")
+        # 表达式默认值需要 MySQL 8.0.13 及以上
+        conn.execute(text(f"ALTER TABLE {quoted} MODIFY {PARTITION_KEY} BIGINT NOT NULL DEFAULT {NOW_MS_SQL['mysql']}"))
+        conn.execute(text(f"ALTER TABLE {quoted} DROP PRIMARY KEY, ADD PRIMARY KEY (id, {PARTITION_KEY})"))
+        conn.execute(text(f"ALTER TABLE {quoted} {mysql_partition_clause(months)}"))
+
+    def _convert_postgres(self, conn: Connection, table: str, months: Sequence[date]):
+        inspector = inspect(conn)
+        indexes = [i for i in inspector.get_indexes(table) if i["name"]]
+        foreign_keys = inspector.get_foreign_keys(table)
+        old = f"{table}_unpartitioned"
+        quoted, quoted_old = _q(conn, table), _q(conn, old)
+
+        conn.execute(text(f"ALTER TABLE {quoted} RENAME TO {quoted_old}"))
+        conn.execute(text(
+            f"CREATE TABLE {quoted} (LIKE {quoted_old} INCLUDING DEFAULTS) PARTITION BY RANGE ({PARTITION_KEY})"
+        ))
+        conn.execute(text(
+            f"ALTER TABLE {quoted} ALTER COLUMN {PARTITION_KEY} SET DEFAULT {NOW_MS_SQL['postgresql']}, "
+            f"ALTER COLUMN {PARTITION_KEY} SET NOT NULL, ADD PRIMARY KEY (id, {PARTITION_KEY})"
+        ))
+        conn.execute(text(
+            f'CREATE TABLE {_q(conn, f"{table}_{OLD_PARTITION}")} PARTITION OF {quoted} '
+            f"FOR VALUES FROM (MINVALUE) TO ({month_ts_ms(months[0])})"
+        ))
+        for month in months:
+            conn.execute(text(postgres_partition_ddl(table, month)))
+        conn.execute(text(f'CREATE TABLE {_q(conn, f"{table}_{DEFAULT_PARTITION}")} PARTITION OF {quoted} DEFAULT'))
+
+        conn.execute(text(f"INSERT INTO {quoted} SELECT * FROM {quoted_old}"))
+        # 自增序列归属新表，删除旧表时不会被一并删除
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": old}).scalar()
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {quoted}.id"))
+        conn.execute(text(f"DROP TABLE {quoted_old}"))
+
+        for index in indexes:
+            columns = ", ".join(_q(conn, c) for c in index["column_names"] if c)
+            unique = index["unique"] and PARTITION_KEY in index["column_names"]
+            if index["unique"] and not unique:
+                logger.warning(f"[partitioning] {table}: 唯一索引 {index['name']} 改为普通索引")
+            conn.execute(text(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {_q(conn, index['name'])} ON {quoted} ({columns})"
+            ))
+        for fk in foreign_keys:
+            ondelete = (fk.get("options") or {}).get("ondelete")
+            conn.execute(text(
+                f"ALTER TABLE {quoted} ADD FOREIGN KEY ({', '.join(_q(conn, c) for c in fk['constrained_columns'])}) "
+                f"REFERENCES {_q(conn, fk['referred_table'])} ({', '.join(_q(conn, c) for c in fk['referred_columns'])})"
+                + (f" ON DELETE {ondelete}" if ondelete else "")
+            ))
+
+    def ensure_future_partitions(self, conn: Connection, table: str, today: Optional[date] = None,
+                                 months_ahead: int = MONTHS_AHEAD) -> List[str]:
+        """
+        补建到未来 months_ahead 个月为止缺少的月分区
+
+        Returns:
+            新建的分区名
+        """
+        today = today or date.today()
+        partitions = self.list_partitions(conn, table)
+        existing = {p.month for p in partitions if p.month}
+        last = max(existing) if existing else add_months(month_start(today), -1)
+        missing = [m for m in month_range(add_months(last, 1), add_months(month_start(today), months_ahead))]
+        quoted = _q(conn, table)
+        for month in missing:
+            upper = month_ts_ms(add_months(month, 1))
+            if self.dialect == "mysql":
+                # 从 p_max 中拆出新的月分区，p_max 中已有的数据会被移入对应分区
+                conn.execute(text(
+                    f"ALTER TABLE {quoted} REORGANIZE PARTITION {MAX_PARTITION} INTO ("
+                    f"PARTITION {partition_name(month)} VALUES LESS THAN ({upper}), "
+                    f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE)"
+                ))
+            else:
+                # 默认分区中落在该月的数据需要先移出，才能创建对应的月分区
+                default = _q(conn, f"{table}_{DEFAULT_PARTITION}")
+                where = f"{PARTITION_KEY} >= {month_ts_ms(month)} AND {PARTITION_KEY} < {upper}"
+                conn.execute(text(f"CREATE TEMP TABLE _moved_rows ON COMMIT DROP AS SELECT * FROM {default} WHERE {where}"))
+                conn.execute(text(f"DELETE FROM {default} WHERE {where}"))
+                conn.execute(text(postgres_partition_ddl(table, month)))
+                conn.execute(text(f"INSERT INTO {quoted} SELECT * FROM _moved_rows"))
+                conn.execute(text("DROP TABLE _moved_rows"))
+            logger.info(f"[partitioning] {table}: 新建分区 {partition_name(month)}")
+        return [partition_name(m) for m in missing]
+
+    # --- 归档 ---
+
+    def expired_partitions(self, conn: Connection, table: str, cutoff: date) -> List[Partition]:
+        """上界不晚于 cutoff 所在月初的分区（即整个分区都早于保留期）"""
+        cutoff_ms = month_ts_ms(month_start(cutoff))
+        return [p for p in self.list_partitions(conn, table) if p.upper_ms is not None and p.upper_ms <= cutoff_ms]
+
+    def archive_expired(self, cutoff: date, dry_run: bool = True, today: Optional[date] = None) -> Dict[str, List[str]]:
+        """
+        整个分区都早于 cutoff 所在月的分区写入 Parquet 后从表中删除；
+        执行时同时为每张分区表补建到未来 MONTHS_AHEAD 个月的分区，定期运行的清理任务即可保证新数据不落入 p_max
+
+        Args:
+            cutoff: 保留期的起点，跨越 cutoff 的分区保留
+            dry_run: 只列出将被归档的分区，不补建分区
+            today: 当前日期，用于补建分区
+
+        Returns:
+            {表名: [已归档（或将被归档）的分区名]}
+        """
+        results = {}
+        for table in self.tables:
+            with self.engine.begin() as conn:
+                if not inspect(conn).has_table(table) or not self.is_partitioned(conn, table):
+                    continue
+                if not dry_run:
+                    self.ensure_future_partitions(conn, table, today)
+            with self.engine.connect() as conn:
+                expired = self.expired_partitions(conn, table, cutoff)
+            if not expired:
+                continue
+            results[table] = [p.name for p in expired]
+            for partition in expired:
+                if dry_run:
+                    logger.info(f"[partitioning] {table}.{partition.name} 将被归档（约 {partition.rows} 行）")
+                    continue
+                path = self.archive_partition(table, partition)
+                logger.info(f"[partitioning] {table}.{partition.name} 已归档到 {path} 并删除")
+        return results
+
+    def archive_partition(self, table: str, partition: Partition) -> Path:
+        """
+        导出一个分区到 <archive_dir>/<table>/<table>_<分区>.parquet 后删除
+        先把分区移出在线表（PostgreSQL DETACH，MySQL EXCHANGE 到空的暂存表），再从移出的表计数、导出并核对，
+        这之后补抓到的该月份数据不会在导出与删除之间被一并删掉；导出失败或行数不一致时放回原表
+        """
+        # PostgreSQL 的分区是独立命名的子表（<table>_pYYYYMM），文件名统一为 <table>_pYYYYMM
+        suffix = partition.name[len(table) + 1:] if self.dialect == "postgresql" else partition.name
+        path = self.archive_dir / table / f"{table}_{suffix}.parquet"
+
+        if self.dialect == "mysql":
+            detached, bound = self._exchange_out_mysql(table, partition), None
+        else:
+            detached, bound = self._detach_postgres(table, partition)
+        try:
+            with self.engine.connect() as conn:
+                source = _q(conn, detached)
+                expected = conn.execute(text(f"SELECT COUNT(*) FROM {source}")).scalar_one()
+                columns = inspect(conn).get_columns(table)
+                written = write_parquet(path, columns, self._iter_batches(conn, source))
+            if written != expected:
+                raise RuntimeError(f"{table}.{partition.name} 归档行数不一致：{written} != {expected}")
+        except Exception:
+            logger.error(f"[partitioning] {table}.{partition.name} 归档失败，放回原表")
+            if self.dialect == "mysql":
+                self._exchange_back_mysql(table, partition, detached)
+            else:
+                self._attach_postgres(table, partition, bound)
+            raise
+
+        if self.dialect == "mysql":
+            self._drop_exchanged_mysql(table, partition, detached)
+        else:
+            with self.engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE {_q(conn, detached)}"))
+        return path
+
+    def _exchange_out_mysql(self, table: str, partition: Partition) -> str:
+        """把分区的数据换入一张空的暂存表，分区本身变为空分区；返回暂存表名"""
+        staging = f"{table}_{partition.name}_archive"
+        with self.engine.begin() as conn:
+            quoted, quoted_staging = _q(conn, table), _q(conn, staging)
+            # 暂存表已存在说明上次归档中断，CREATE 会失败，需要人工确认其中的数据
+            conn.execute(text(f"CREATE TABLE {quoted_staging} LIKE {quoted}"))
+            conn.execute(text(f"ALTER TABLE {quoted_staging} REMOVE PARTITIONING"))
+            conn.execute(text(f"ALTER TABLE {quoted} EXCHANGE PARTITION {partition.name} WITH TABLE {quoted_staging}"))
+        return staging
+
+    def _exchange_back_mysql(self, table: str, partition: Partition, staging: str):
+        """原数据换回分区；换出期间写入分区的数据随之进入暂存表，再插回原表"""
+        with self.engine.begin() as conn:
+            quoted, quoted_staging = _q(conn, table), _q(conn, staging)
+            conn.execute(text(f"ALTER TABLE {quoted} EXCHANGE PARTITION {partition.name} WITH TABLE {quoted_staging}"))
+            conn.execute(text(f"INSERT INTO {quoted} SELECT * FROM {quoted_staging}"))
+            conn.execute(text(f"DROP TABLE {quoted_staging}"))
+
+    def _drop_exchanged_mysql(self, table: str, partition: Partition, staging: str):
+        """删除已归档的暂存表；换出后写入的数据留在分区中等下次归档，分区为空时才删除分区"""
+        with self.engine.connect() as conn:
+            quoted = _q(conn, table)
+            conn.execute(text(f"DROP TABLE {_q(conn, staging)}"))
+            conn.execute(text(f"LOCK TABLES {quoted} WRITE"))
+            try:
+                late = conn.execute(text(f"SELECT COUNT(*) FROM {quoted} PARTITION ({partition.name})")).scalar_one()
+                if late:
+                    logger.warning(f"[partitioning] {table}.{partition.name} 归档期间写入了 {late} 行，保留分区等下次归档")
+                else:
+                    conn.execute(text(f"ALTER TABLE {quoted} DROP PARTITION {partition.name}"))
+            finally:
+                conn.execute(text("UNLOCK TABLES"))
+
+    def _detach_postgres(self, table: str, partition: Partition) -> Tuple[str, str]:
+        """分离子表，之后写入该范围的数据进入默认分区；返回子表名与分区边界（FOR VALUES ...）"""
+        with self.engine.begin() as conn:
+            bound = conn.execute(
+                text("SELECT pg_get_expr(relpartbound, oid) FROM pg_class WHERE relname = :name"),
+                {"name": partition.name},
+            ).scalar_one()
+            conn.execute(text(f"ALTER TABLE {_q(conn, table)} DETACH PARTITION {_q(conn, partition.name)}"))
+        return partition.name, bound
+
+    def _attach_postgres(self, table: str, partition: Partition, bound: str):
+        """重新挂载子表；分离期间进入默认分区的该范围数据先移回子表，否则挂载会失败"""
+        with self.engine.begin() as conn:
+            quoted, child = _q(conn, table), _q(conn, partition.name)
+            default = _q(conn, f"{table}_{DEFAULT_PARTITION}")
+            where = f"{PARTITION_KEY} < {partition.upper_ms}"
+            if partition.month:
+                where = f"{PARTITION_KEY} >= {month_ts_ms(partition.month)} AND {where}"
+            conn.execute(text(f"INSERT INTO {child} SELECT * FROM {default} WHERE {where}"))
+            conn.execute(text(f"DELETE FROM {default} WHERE {where}"))
+            conn.execute(text(f"ALTER TABLE {quoted} ATTACH PARTITION {child} {bound}"))
+
+    @staticmethod
+    def _iter_batches(conn: Connection, source: str, batch_size: int = ARCHIVE_BATCH_SIZE) -> Iterator[List[Dict]]:
+        result = conn.execution_options(stream_results=True).execute(text(f"SELECT * FROM {source}"))
+        while True:
+            rows = result.mappings().fetchmany(batch_size)
+            if not rows:
+                break
+            yield [dict(row) for row in rows]
+
+
+# --- Parquet ---
+
+def _arrow_type(column_type):
+    import pyarrow as pa
+
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, (Float, Numeric)):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column_type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def write_parquet(path: Path, columns: Sequence[Dict], batches: Iterator[List[Dict]],
+                  compression: str = "zstd") -> int:
+    """
+    按批写入压缩的 Parquet 文件，先写临时文件，完成后再改名
+
+    Args:
+        path: 目标文件
+        columns: inspector.get_columns 的结果，用于确定各列的 Arrow 类型
+        batches: 每批为若干行字典
+        compression: 压缩算法
+
+    Returns:
+        写入的行数
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("归档为 Parquet 需要安装 pyarrow：pip install pyarrow") from e
+
+    schema = pa.schema([(c["name"], _arrow_type(c["type"])) for c in columns])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".parquet.tmp")
+    written = 0
+    with pq.ParquetWriter(tmp_path, schema, compression=compression) as writer:
+        for batch in batches:
+            converted = [
+                {name: (str(row.get(name)) if row.get(name) is not None and pa.types.is_string(schema.field(name).type)
+                        else row.get(name)) for name in schema.names}
+                for row in batch
+            ]
+            writer.write_table(pa.Table.from_pylist(converted, schema=schema))
+            written += len(batch)
+    os.replace(tmp_path, path)
+    return written
@@ -3,107 +3,26 @@ Report Agent主类
 整合所有模块，实现完整的报告生成流程
 """
 
-import json
 import os
+import sys
+import time
 from loguru import logger
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable
 
 from .llms import LLMClient
 from .nodes import (
     TemplateSelectionNode,
-    HTMLGenerationNode
+    HTMLGenerationNode,
+    ContentCondensationNode
 )
 from .state import ReportState
 from .utils.config import settings, Settings
+from .utils.pipeline import StagePipeline
 
-
-class FileCountBaseline:
-    """文件数量基准管理器"""
-    
-    def __init__(self):
-        self.baseline_file = 'logs/report_baseline.json'
-        self.baseline_data = self._load_baseline()
-    
-    def _load_baseline(self) -> Dict[str, int]:
-        """加载基准数据"""
-        try:
-            if os.path.exists(self.baseline_file):
-                with open(self.baseline_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception as e:
-            logger.exception(f"加载基准数据失败: {e}")
-        return {}
-    
-    def _save_baseline(self):
-        """保存基准数据"""
-        try:
-            os.makedirs(os.path.dirname(self.baseline_file), exist_ok=True)
-            with open(self.baseline_file, 'w', encoding='utf-8') as f:
-                json.dump(self.baseline_data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.exception(f"保存基准数据失败: {e}")
-    
-    def initialize_baseline(self, directories: Dict[str, str]) -> Dict[str, int]:
-        """初始化文件数量基准"""
-        current_counts = {}
-        
-        for engine, directory in directories.items():
-            if os.path.exists(directory):
-                md_files = [f for f in os.listdir(directory) if f.endswith('.md')]
-                current_counts[engine] = len(md_files)
-            else:
-                current_counts[engine] = 0
-        
-        # 保存基准数据
-        self.baseline_data = current_counts.copy()
-        self._save_baseline()
-        
-        logger.info(f"文件数量基准已初始化: {current_counts}")
-        return current_counts
-    
-    def check_new_files(self, directories: Dict[str, str]) -> Dict[str, Any]:
-        """检查是否有新文件"""
-        current_counts = {}
-        new_files_found = {}
-        all_have_new = True
-        
-        for engine, directory in directories.items():
-            if os.path.exists(directory):
-                md_files = [f for f in os.listdir(directory) if f.endswith('.md')]
-                current_counts[engine] = len(md_files)
-                baseline_count = self.baseline_data.get(engine, 0)
-                
-                if current_counts[engine] > baseline_count:
-                    new_files_found[engine] = current_counts[engine] - baseline_count
-                else:
-                    new_files_found[engine] = 0
-                    all_have_new = False
-            else:
-                current_counts[engine] = 0
-                new_files_found[engine] = 0
-                all_have_new = False
-        
-        return {
-            'ready': all_have_new,
-            'baseline_counts': self.baseline_data,
-            'current_counts': current_counts,
-            'new_files_found': new_files_found,
-            'missing_engines': [engine for engine, count in new_files_found.items() if count == 0]
-        }
-    
-    def get_latest_files(self, directories: Dict[str, str]) -> Dict[str, str]:
-        """获取每个目录的最新文件"""
-        latest_files = {}
-        
-        for engine, directory in directories.items():
-            if os.path.exists(directory):
-                md_files = [f for f in os.listdir(directory) if f.endswith('.md')]
-                if md_files:
-                    latest_file = max(md_files, key=lambda x: os.path.getmtime(os.path.join(directory, x)))
-                    latest_files[engine] = os.path.join(directory, latest_file)
-        
-        return latest_files
+# 导入报告清单工具（位于项目根目录的utils下）
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.report_manifest import ReportManifest
 
 
 class ReportAgent:
@@ -119,8 +38,12 @@ class ReportAgent:
         # 加载配置
         self.config = config or settings
         
-        # 初始化文件基准管理器
-        self.file_baseline = FileCountBaseline()
+        # 初始化报告清单，只认可本次会话开始后完成的引擎报告
+        self.session_started_at = time.time()
+        self.report_manifest = ReportManifest(self.config.REPORT_MANIFEST_FILE)
+        self.report_manifest.subscribe(self._on_report_recorded)
+        self.report_manifest.refresh()
+        self.report_manifest.start_watching()
         
         # 初始化日志
         self._setup_logging()
@@ -131,9 +54,6 @@ class ReportAgent:
         # 初始化节点
         self._initialize_nodes()
         
-        # 初始化文件数量基准
-        self._initialize_file_baseline()
-        
         # 状态
         self.state = ReportState()
         
@@ -152,14 +72,10 @@ class ReportAgent:
         # 创建专用的logger，避免与其他模块冲突
         logger.add(self.config.LOG_FILE, level="INFO")
         
-    def _initialize_file_baseline(self):
-        """初始化文件数量基准"""
-        directories = {
-            'insight': 'insight_engine_streamlit_reports',
-            'media': 'media_engine_streamlit_reports',
-            'query': 'query_engine_streamlit_reports'
-        }
-        self.file_baseline.initialize_baseline(directories)
+    def _on_report_recorded(self, record: Dict[str, Any]):
+        """清单中出现新的引擎报告"""
+        if record.get('ts', 0) >= self.session_started_at:
+            logger.info(f"检测到新的{record.get('engine')}报告: {record.get('path')}")
     
     def _initialize_llm(self) -> LLMClient:
         """初始化LLM客户端"""
@@ -173,12 +89,24 @@ class ReportAgent:
         """初始化处理节点"""
         self.template_selection_node = TemplateSelectionNode(
             self.llm_client,
-            self.config.TEMPLATE_DIR
+            self.config.TEMPLATE_DIR,
+            cache_dir=self.config.CACHE_DIR,
+            local_min_score=self.config.TEMPLATE_LOCAL_MIN_SCORE,
+            local_margin=self.config.TEMPLATE_LOCAL_MARGIN
         )
         self.html_generation_node = HTMLGenerationNode(self.llm_client)
+        self.content_condensation_node = ContentCondensationNode(
+            self.llm_client,
+            cache_dir=self.config.CACHE_DIR,
+            trigger_chars=self.config.CONDENSE_TRIGGER_CHARS,
+            chunk_chars=self.config.CONDENSE_CHUNK_CHARS,
+            max_digest_chars=self.config.CONDENSE_MAX_DIGEST_CHARS,
+            max_workers=self.config.CONDENSE_MAX_WORKERS
+        )
     
     def generate_report(self, query: str, reports: List[Any], forum_logs: str = "", 
-                       custom_template: str = "", save_report: bool = True) -> str:
+                       custom_template: str = "", save_report: bool = True,
+                       on_stage: Optional[Callable[[str, str, Dict[str, Dict[str, Any]]], None]] = None) -> str:
         """
         生成综合报告
         
@@ -188,30 +116,93 @@ class ReportAgent:
             forum_logs: 论坛日志内容
             custom_template: 用户自定义模板（可选）
             save_report: 是否保存报告到文件
+            on_stage: 阶段状态变化回调（可选）
+            
+        Returns:
+            最终HTML报告内容
+        """
+        inputs = {'reports': reports, 'forum_logs': forum_logs}
+        return self._run_pipeline(query, lambda: inputs, custom_template, save_report, on_stage)
+    
+    def generate_report_from_files(self, query: str, file_paths: Dict[str, str], custom_template: str = "",
+                                   save_report: bool = True,
+                                   on_stage: Optional[Callable[[str, str, Dict[str, Dict[str, Any]]], None]] = None) -> str:
+        """
+        从引擎报告文件生成综合报告，文件加载作为流水线的第一个阶段
+        
+        Args:
+            query: 原始查询
+            file_paths: 文件路径字典（query/media/insight/forum）
+            custom_template: 用户自定义模板（可选）
+            save_report: 是否保存报告到文件
+            on_stage: 阶段状态变化回调（可选）
             
         Returns:
             最终HTML报告内容
         """
+        return self._run_pipeline(query, lambda: self.load_input_files(file_paths),
+                                  custom_template, save_report, on_stage)
+    
+    def _run_pipeline(self, query: str, load_inputs: Callable[[], Dict[str, Any]], custom_template: str,
+                      save_report: bool, on_stage: Optional[Callable] = None) -> str:
+        """
+        按阶段依赖执行报告生成流程
+        
+        load_inputs -> select_template ┐
+                    -> condense_inputs ┴-> generate_html -> save_report
+        
+        模板选择与输入压缩都是独立的LLM调用，两者并发执行；
+        使用自定义模板时模板阶段不依赖输入，与文件加载同时开始。
+        """
         start_time = datetime.now()
         
+        # 每次生成使用独立的状态，允许多个任务共享同一个Agent并发执行
+        state = ReportState(query=query)
+        state.mark_processing()
+        self.state = state
+        
         logger.info(f"开始生成报告: {query}")
-        logger.info(f"输入数据 - 报告数量: {len(reports)}, 论坛日志长度: {len(forum_logs)}")
+        
+        def handle_stage(name: str, status: str, timings: Dict[str, Dict[str, Any]]):
+            state.metadata.stage_timings = {stage: dict(info) for stage, info in timings.items()}
+            if on_stage:
+                on_stage(name, status, state.metadata.stage_timings)
+        
+        def load_stage(results: Dict[str, Any]) -> Dict[str, Any]:
+            inputs = load_inputs()
+            logger.info(f"输入数据 - 报告数量: {len(inputs['reports'])}, 论坛日志长度: {len(inputs['forum_logs'])}")
+            return inputs
+        
+        def select_stage(results: Dict[str, Any]) -> Dict[str, Any]:
+            inputs = results.get('load_inputs', {'reports': [], 'forum_logs': ''})
+            return self._select_template(query, inputs['reports'], inputs['forum_logs'], custom_template, state)
+        
+        def condense_stage(results: Dict[str, Any]):
+            inputs = results['load_inputs']
+            return self._condense_inputs(inputs['reports'], inputs['forum_logs'])
+        
+        def html_stage(results: Dict[str, Any]) -> str:
+            reports, forum_logs = results['condense_inputs']
+            return self._generate_html_report(query, reports, forum_logs, results['select_template'], state)
+        
+        pipeline = StagePipeline(name="report-pipeline", max_workers=2, on_stage=handle_stage)
+        pipeline.add_stage('load_inputs', load_stage)
+        pipeline.add_stage('select_template', select_stage,
+                           depends_on=[] if custom_template else ['load_inputs'])
+        pipeline.add_stage('condense_inputs', condense_stage, depends_on=['load_inputs'])
+        pipeline.add_stage('generate_html', html_stage, depends_on=['select_template', 'condense_inputs'])
+        if save_report:
+            pipeline.add_stage('save_report', lambda results: self._save_report(results['generate_html'], state),
+                               depends_on=['generate_html'])
         
         try:
-            # Step 1: 模板选择
-            template_result = self._select_template(query, reports, forum_logs, custom_template)
-            
-            # Step 2: 直接生成HTML报告
-            html_report = self._generate_html_report(query, reports, forum_logs, template_result)
-            
-            # Step 3: 保存报告
-            if save_report:
-                self._save_report(html_report)
+            results = pipeline.run()
+            html_report = results['generate_html']
             
             # 更新生成时间
             end_time = datetime.now()
             generation_time = (end_time - start_time).total_seconds()
-            self.state.metadata.generation_time = generation_time
+            state.metadata.generation_time = generation_time
             
             logger.info(f"报告生成完成，耗时: {generation_time:.2f} 秒")
             
@@ -219,15 +210,34 @@ class ReportAgent:
             
         except Exception as e:
             logger.exception(f"报告生成过程中发生错误: {str(e)}")
+            state.mark_failed(str(e))
             raise e
     
-    def _select_template(self, query: str, reports: List[Any], forum_logs: str, custom_template: str):
+    def _condense_inputs(self, reports: List[Any], forum_logs: str):
+        """压缩输入，压缩关闭或失败时返回原始内容"""
+        if not self.config.CONDENSE_ENABLED:
+            return reports, forum_logs
+        
+        try:
+            condensed = self.content_condensation_node.run({
+                'reports': reports,
+                'forum_logs': forum_logs
+            })
+            return condensed['reports'], condensed['forum_logs']
+        except Exception as e:
+            logger.exception(f"输入压缩失败，使用原始内容: {str(e)}")
+            return reports, forum_logs
+    
+    def _select_template(self, query: str, reports: List[Any], forum_logs: str, custom_template: str,
+                         state: ReportState):
         """选择报告模板"""
         logger.info("选择报告模板...")
         
         # 如果用户提供了自定义模板，直接使用
         if custom_template:
             logger.info("使用用户自定义模板")
+            state.selected_template = 'custom'
+            state.metadata.template_used = 'custom'
             return {
                 'template_name': 'custom',
                 'template_content': custom_template,
@@ -244,7 +254,8 @@ class ReportAgent:
             template_result = self.template_selection_node.run(template_input)
             
             # 更新状态
-            self.state.metadata.template_used = template_result['template_name']
+            state.selected_template = template_result['template_name']
+            state.metadata.template_used = template_result['template_name']
             
             logger.info(f"选择模板: {template_result['template_name']}")
             logger.info(f"选择理由: {template_result['selection_reason']}")
@@ -258,10 +269,12 @@ class ReportAgent:
                 'template_content': self._get_fallback_template_content(),
                 'selection_reason': '模板选择失败，使用默认社会热点事件分析模板'
             }
-            self.state.metadata.template_used = fallback_template['template_name']
+            state.selected_template = fallback_template['template_name']
+            state.metadata.template_used = fallback_template['template_name']
             return fallback_template
     
-    def _generate_html_report(self, query: str, reports: List[Any], forum_logs: str, template_result: Dict[str, Any]) -> str:
+    def _generate_html_report(self, query: str, reports: List[Any], forum_logs: str,
+                              template_result: Dict[str, Any], state: ReportState) -> str:
         """生成HTML报告"""
         logger.info("多轮生成HTML报告...")
         
@@ -288,8 +301,8 @@ class ReportAgent:
         html_content = self.html_generation_node.run(html_input)
         
         # 更新状态
-        self.state.html_content = html_content
-        self.state.mark_completed()
+        state.html_content = html_content
+        state.mark_completed()
         
         logger.info("HTML报告生成完成")
         return html_content
@@ -343,11 +356,11 @@ class ReportAgent:
 *生成时间：{generation_time}*
 """
     
-    def _save_report(self, html_content: str):
+    def _save_report(self, html_content: str, state: ReportState):
         """保存报告到文件"""
         # 生成文件名
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        query_safe = "".join(c for c in self.state.metadata.query if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        query_safe = "".join(c for c in state.metadata.query if c.isalnum() or c in (' ', '-', '_')).rstrip()
         query_safe = query_safe.replace(' ', '_')[:30]
         
         filename = f"final_report_{query_safe}_{timestamp}.html"
@@ -362,7 +375,7 @@ class ReportAgent:
         # 保存状态
         state_filename = f"report_state_{query_safe}_{timestamp}.json"
         state_filepath = os.path.join(self.config.OUTPUT_DIR, state_filename)
-        self.state.save_to_file(state_filepath)
+        state.save_to_file(state_filepath)
         logger.info(f"状态已保存到: {state_filepath}")
     
     def get_progress_summary(self) -> Dict[str, Any]:
@@ -379,67 +392,75 @@ class ReportAgent:
         self.state.save_to_file(filepath)
         logger.info(f"状态已保存到 {filepath}")
     
-    def check_input_files(self, insight_dir: str, media_dir: str, query_dir: str, forum_log_path: str) -> Dict[str, Any]:
+    def check_input_files(self, insight_dir: str, media_dir: str, query_dir: str, forum_log_path: str,
+                          query: Optional[str] = None) -> Dict[str, Any]:
         """
-        检查输入文件是否准备就绪（基于文件数量增加）
+        检查输入文件是否准备就绪（基于报告清单）
         
         Args:
             insight_dir: InsightEngine报告目录
             media_dir: MediaEngine报告目录
             query_dir: QueryEngine报告目录
             forum_log_path: 论坛日志文件路径
+            query: 指定时优先使用该查询对应的报告
             
         Returns:
             检查结果字典
         """
-        # 检查各个报告目录的文件数量变化
         directories = {
             'insight': insight_dir,
             'media': media_dir,
             'query': query_dir
         }
         
-        # 使用文件基准管理器检查新文件
-        check_result = self.file_baseline.check_new_files(directories)
-        
-        # 检查论坛日志
-        forum_ready = os.path.exists(forum_log_path)
-        
-        # 构建返回结果
         result = {
-            'ready': check_result['ready'] and forum_ready,
-            'baseline_counts': check_result['baseline_counts'],
-            'current_counts': check_result['current_counts'],
-            'new_files_found': check_result['new_files_found'],
+            'ready': True,
+            'reports': {},
             'missing_files': [],
             'files_found': [],
             'latest_files': {}
         }
         
-        # 构建详细信息
-        for engine, new_count in check_result['new_files_found'].items():
-            current_count = check_result['current_counts'][engine]
-            baseline_count = check_result['baseline_counts'].get(engine, 0)
-            
-            if new_count > 0:
-                result['files_found'].append(f"{engine}: {current_count}个文件 (新增{new_count}个)")
+        for engine, directory in directories.items():
+            record = self._find_engine_report(engine, directory, query)
+            if record:
+                result['reports'][engine] = record
+                result['latest_files'][engine] = record['path']
+                result['files_found'].append(f"{engine}: {os.path.basename(record['path'])}")
             else:
-                result['missing_files'].append(f"{engine}: {current_count}个文件 (基准{baseline_count}个，无新增)")
+                result['ready'] = False
+                result['missing_files'].append(f"{engine}: 本次会话尚无新报告")
         
         # 检查论坛日志
-        if forum_ready:
+        if os.path.exists(forum_log_path):
+            result['latest_files']['forum'] = forum_log_path
             result['files_found'].append(f"forum: {os.path.basename(forum_log_path)}")
         else:
+            result['ready'] = False
             result['missing_files'].append("forum: 日志文件不存在")
         
-        # 获取最新文件路径（用于实际报告生成）
-        if result['ready']:
-            result['latest_files'] = self.file_baseline.get_latest_files(directories)
-            if forum_ready:
-                result['latest_files']['forum'] = forum_log_path
+        if not result['ready']:
+            result['latest_files'] = {}
         
         return result
     
+    def _find_engine_report(self, engine: str, directory: str, query: Optional[str]) -> Optional[Dict[str, Any]]:
+        """查找本次会话中某引擎最新的报告，优先匹配查询"""
+        candidates = []
+        if query:
+            candidates.append(self.report_manifest.get_latest(engine, query=query, since=self.session_started_at))
+        candidates.append(self.report_manifest.get_latest(engine, since=self.session_started_at))
+        
+        directory_abs = os.path.abspath(directory)
+        for record in candidates:
+            if not record:
+                continue
+            path_abs = os.path.abspath(record['path'])
+            # 只认可引擎输出目录中仍然存在的报告
+            if os.path.dirname(path_abs) == directory_abs and os.path.exists(path_abs):
+                return record
+        return None
+    
     def load_input_files(self, file_paths: Dict[str, str]) -> Dict[str, Any]:
         """
         加载输入文件内容
@@ -4,15 +4,16 @@ Report Engine Flask接口
 """
 
 import os
-import json
-import threading
-import time
-from datetime import datetime
+import uuid
 from flask import Blueprint, request, jsonify, Response
 from typing import Dict, Any
 from loguru import logger
 from .agent import ReportAgent, create_agent
+from .task_queue import ReportTask, ReportTaskQueue, ReportTaskStore
+from .utils.cancellation import raise_if_cancelled
 from .utils.config import settings
+from .utils.template_registry import get_template_registry
+from .utils.text_processing import compute_content_hash
 
 
 # 创建Blueprint
@@ -20,15 +21,21 @@ report_bp = Blueprint('report_engine', __name__)
 
 # 全局变量
 report_agent = None
-current_task = None
-task_lock = threading.Lock()
+task_queue = None
 
 
 def initialize_report_engine():
     """初始化Report Engine"""
-    global report_agent
+    global report_agent, task_queue
     try:
         report_agent = create_agent()
+        if task_queue is None:
+            task_queue = ReportTaskQueue(
+                run_report_generation,
+                ReportTaskStore(settings.TASK_DB_FILE),
+                max_workers=settings.REPORT_MAX_WORKERS
+            )
+            task_queue.start()
         logger.info("Report Engine初始化成功")
         return True
     except Exception as e:
@@ -36,46 +43,8 @@ def initialize_report_engine():
         return False
 
 
-class ReportTask:
-    """报告生成任务"""
-
-    def __init__(self, query: str, task_id: str, custom_template: str = ""):
-        self.task_id = task_id
-        self.query = query
-        self.custom_template = custom_template
-        self.status = "pending"  # pending, running, completed, error
-        self.progress = 0
-        self.result = None
-        self.error_message = ""
-        self.created_at = datetime.now()
-        self.updated_at = datetime.now()
-        self.html_content = ""
-
-    def update_status(self, status: str, progress: int = None, error_message: str = ""):
-        """更新任务状态"""
-        self.status = status
-        if progress is not None:
-            self.progress = progress
-        if error_message:
-            self.error_message = error_message
-        self.updated_at = datetime.now()
-
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典格式"""
-        return {
-            'task_id': self.task_id,
-            'query': self.query,
-            'status': self.status,
-            'progress': self.progress,
-            'error_message': self.error_message,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
-            'has_result': bool(self.html_content)
-        }
-
-
-def check_engines_ready() -> Dict[str, Any]:
-    """检查三个子引擎是否都有新文件"""
+def check_engines_ready(query: str = None) -> Dict[str, Any]:
+    """检查三个子引擎是否都有新报告"""
     directories = {
         'insight': 'insight_engine_streamlit_reports',
         'media': 'media_engine_streamlit_reports',
@@ -94,52 +63,61 @@ def check_engines_ready() -> Dict[str, Any]:
         directories['insight'],
         directories['media'],
         directories['query'],
-        forum_log_path
+        forum_log_path,
+        query=query
     )
 
 
-def run_report_generation(task: ReportTask, query: str, custom_template: str = ""):
-    """在后台线程中运行报告生成"""
-    global current_task
-
-    try:
-        task.update_status("running", 10)
-
-        # 检查输入文件
-        check_result = check_engines_ready()
-        if not check_result['ready']:
-            task.update_status("error", 0, f"输入文件未准备就绪: {check_result.get('missing_files', [])}")
-            return
-
-        task.update_status("running", 30)
-
-        # 加载输入文件
-        content = report_agent.load_input_files(check_result['latest_files'])
-
-        task.update_status("running", 50)
-
-        # 生成报告
-        html_report = report_agent.generate_report(
-            query=query,
-            reports=content['reports'],
-            forum_logs=content['forum_logs'],
-            custom_template=custom_template,
-            save_report=True
-        )
+def compute_dedup_key(query: str, custom_template: str, file_paths: Dict[str, str]) -> str:
+    """根据查询、模板与输入文件内容计算任务去重键"""
+    input_hashes = []
+    for engine in sorted(file_paths):
+        try:
+            with open(file_paths[engine], 'rb') as f:
+                input_hashes.append(f"{engine}:{compute_content_hash(f.read().decode('utf-8', errors='replace'))}")
+        except OSError as e:
+            logger.warning(f"计算输入文件哈希失败 {file_paths[engine]}: {str(e)}")
+            input_hashes.append(f"{engine}:missing")
+    return compute_content_hash(query, custom_template, *input_hashes)
+
+
+# 各阶段完成后累加的进度
+STAGE_PROGRESS = {
+    'load_inputs': 5,
+    'select_template': 15,
+    'condense_inputs': 20,
+    'generate_html': 50,
+    'save_report': 5
+}
+
+
+def run_report_generation(task: ReportTask):
+    """在任务队列的工作线程中运行报告生成"""
+
+    def on_stage(name: str, status: str, timings: Dict[str, Dict[str, Any]]):
+        task.stages = timings
+        completed = sum(STAGE_PROGRESS.get(stage, 0) for stage, info in timings.items()
+                        if info.get('status') == 'completed')
+        task.update_status("running", min(5 + completed, 99))
+
+    # 加载提交任务时确定的输入文件并生成报告
+    html_report = report_agent.generate_report_from_files(
+        query=task.query,
+        file_paths=task.input_files,
+        custom_template=task.custom_template,
+        save_report=True,
+        on_stage=on_stage
+    )
+    raise_if_cancelled()
 
-        task.update_status("running", 90)
+    # 保存结果
+    task.html_content = html_report
+    task.update_status("completed", 100)
 
-        # 保存结果
-        task.html_content = html_report
-        task.update_status("completed", 100)
 
-    except Exception as e:
-        logger.exception(f"报告生成过程中发生错误: {str(e)}")
-        task.update_status("error", 0, str(e))
-        # 只在出错时清理任务
-        with task_lock:
-            if current_task and current_task.task_id == task.task_id:
-                current_task = None
+def _get_task(task_id: str):
+    """从任务队列获取任务"""
+    return task_queue.get(task_id) if task_queue else None
 
 
 @report_bp.route('/status', methods=['GET'])
@@ -147,6 +125,8 @@ def get_status():
     """获取Report Engine状态"""
     try:
         engines_status = check_engines_ready()
+        active_tasks = task_queue.list_active() if task_queue else []
+        running_tasks = [task for task in active_tasks if task.status == "running"]
 
         return jsonify({
             'success': True,
@@ -154,7 +134,9 @@ def get_status():
             'engines_ready': engines_status['ready'],
             'files_found': engines_status.get('files_found', []),
             'missing_files': engines_status.get('missing_files', []),
-            'current_task': current_task.to_dict() if current_task else None
+            'current_task': running_tasks[-1].to_dict() if running_tasks else None,
+            'active_tasks': [task.to_dict() for task in active_tasks],
+            'max_workers': task_queue.max_workers if task_queue else 0
         })
     except Exception as e:
         logger.exception(f"获取Report Engine状态失败: {str(e)}")
@@ -166,40 +148,24 @@ def get_status():
 
 @report_bp.route('/generate', methods=['POST'])
 def generate_report():
-    """开始生成报告"""
-    global current_task
-
+    """提交报告生成任务"""
     try:
-        # 检查是否有任务在运行
-        with task_lock:
-            if current_task and current_task.status == "running":
-                return jsonify({
-                    'success': False,
-                    'error': '已有报告生成任务在运行中',
-                    'current_task': current_task.to_dict()
-                }), 400
-
-            # 如果有已完成的任务，清理它
-            if current_task and current_task.status in ["completed", "error"]:
-                current_task = None
-
         # 获取请求参数
         data = request.get_json() or {}
         query = data.get('query', '智能舆情分析报告')
         custom_template = data.get('custom_template', '')
-
-        # 清空日志文件
-        clear_report_log()
+        priority = int(data.get('priority', 0))
+        force = bool(data.get('force', False))
 
         # 检查Report Engine是否初始化
-        if not report_agent:
+        if not report_agent or not task_queue:
             return jsonify({
                 'success': False,
                 'error': 'Report Engine未初始化'
             }), 500
 
         # 检查输入文件是否准备就绪
-        engines_status = check_engines_ready()
+        engines_status = check_engines_ready(query)
         if not engines_status['ready']:
             return jsonify({
                 'success': False,
@@ -207,25 +173,30 @@ def generate_report():
                 'missing_files': engines_status.get('missing_files', [])
             }), 400
 
-        # 创建新任务
-        task_id = f"report_{int(time.time())}"
-        task = ReportTask(query, task_id, custom_template)
+        # 相同查询、模板与输入的请求复用同一个任务；force时强制重新生成
+        input_files = engines_status['latest_files']
+        dedup_key = "" if force else compute_dedup_key(query, custom_template, input_files)
+
+        task = ReportTask(
+            query,
+            f"report_{uuid.uuid4().hex[:12]}",
+            custom_template,
+            priority=priority,
+            dedup_key=dedup_key,
+            input_files=input_files
+        )
 
-        with task_lock:
-            current_task = task
+        # 没有其他任务运行时才清空日志，避免抹掉并发任务的输出
+        if not task_queue.has_running_tasks():
+            clear_report_log()
 
-        # 在后台线程中运行报告生成
-        thread = threading.Thread(
-            target=run_report_generation,
-            args=(task, query, custom_template),
-            daemon=True
-        )
-        thread.start()
+        task, deduplicated = task_queue.submit(task)
 
         return jsonify({
             'success': True,
-            'task_id': task_id,
-            'message': '报告生成已启动',
+            'task_id': task.task_id,
+            'deduplicated': deduplicated,
+            'message': '已存在相同输入的报告任务' if deduplicated else '报告生成已加入队列',
             'task': task.to_dict()
         })
 
@@ -241,23 +212,16 @@ def generate_report():
 def get_progress(task_id: str):
     """获取报告生成进度"""
     try:
-        if not current_task or current_task.task_id != task_id:
-            # 如果任务不存在，可能是已经完成并被清理了
-            # 返回一个默认的完成状态而不是404
+        task = _get_task(task_id)
+        if not task:
             return jsonify({
-                'success': True,
-                'task': {
-                    'task_id': task_id,
-                    'status': 'completed',
-                    'progress': 100,
-                    'error_message': '',
-                    'has_result': True
-                }
-            })
+                'success': False,
+                'error': '任务不存在'
+            }), 404
 
         return jsonify({
             'success': True,
-            'task': current_task.to_dict()
+            'task': task.to_dict()
         })
 
     except Exception as e:
@@ -272,21 +236,22 @@ def get_progress(task_id: str):
 def get_result(task_id: str):
     """获取报告生成结果"""
     try:
-        if not current_task or current_task.task_id != task_id:
+        task = _get_task(task_id)
+        if not task:
             return jsonify({
                 'success': False,
                 'error': '任务不存在'
             }), 404
 
-        if current_task.status != "completed":
+        if task.status != "completed":
             return jsonify({
                 'success': False,
                 'error': '报告尚未完成',
-                'task': current_task.to_dict()
+                'task': task.to_dict()
             }), 400
 
         return Response(
-            current_task.html_content,
+            task.html_content,
             mimetype='text/html'
         )
 
@@ -302,23 +267,24 @@ def get_result(task_id: str):
 def get_result_json(task_id: str):
     """获取报告生成结果（JSON格式）"""
     try:
-        if not current_task or current_task.task_id != task_id:
+        task = _get_task(task_id)
+        if not task:
             return jsonify({
                 'success': False,
                 'error': '任务不存在'
             }), 404
 
-        if current_task.status != "completed":
+        if task.status != "completed":
             return jsonify({
                 'success': False,
                 'error': '报告尚未完成',
-                'task': current_task.to_dict()
+                'task': task.to_dict()
             }), 400
 
         return jsonify({
             'success': True,
-            'task': current_task.to_dict(),
-            'html_content': current_task.html_content
+            'task': task.to_dict(),
+            'html_content': task.html_content
         })
 
     except Exception as e:
@@ -332,24 +298,17 @@ def get_result_json(task_id: str):
 @report_bp.route('/cancel/<task_id>', methods=['POST'])
 def cancel_task(task_id: str):
     """取消报告生成任务"""
-    global current_task
-
     try:
-        with task_lock:
-            if current_task and current_task.task_id == task_id:
-                if current_task.status == "running":
-                    current_task.update_status("cancelled", 0, "用户取消任务")
-                current_task = None
-
-                return jsonify({
-                    'success': True,
-                    'message': '任务已取消'
-                })
-            else:
-                return jsonify({
-                    'success': False,
-                    'error': '任务不存在或无法取消'
-                }), 404
+        if task_queue and task_queue.cancel(task_id):
+            return jsonify({
+                'success': True,
+                'message': '任务已取消'
+            })
+
+        return jsonify({
+            'success': False,
+            'error': '任务不存在或无法取消'
+        }), 404
 
     except Exception as e:
         logger.exception(f"取消报告生成任务失败: {str(e)}")
@@ -370,24 +329,16 @@ def get_templates():
             }), 500
 
         template_dir = settings.TEMPLATE_DIR
-        templates = []
-
-        if os.path.exists(template_dir):
-            for filename in os.listdir(template_dir):
-                if filename.endswith('.md'):
-                    template_path = os.path.join(template_dir, filename)
-                    try:
-                        with open(template_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-
-                        templates.append({
-                            'name': filename.replace('.md', ''),
-                            'filename': filename,
-                            'description': content.split('\n')[0] if content else '无描述',
-                            'size': len(content)
-                        })
-                    except Exception as e:
-                        logger.exception(f"读取模板失败 {filename}: {str(e)}")
+        templates = [
+            {
+                'name': template['name'],
+                'filename': template['filename'],
+                'description': template['description'],
+                'outline': [section['title'] for section in template['outline']],
+                'size': template['size']
+            }
+            for template in get_template_registry(template_dir).get_templates()
+        ]
 
         return jsonify({
             'success': True,
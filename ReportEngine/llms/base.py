@@ -9,6 +9,8 @@ from loguru import logger
 
 from openai import OpenAI
 
+from ..utils.cancellation import raise_if_cancelled
+
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(os.path.dirname(current_dir))
 utils_dir = os.path.join(project_root, "utils")
@@ -55,6 +57,7 @@ class LLMClient:
 
     @with_retry(LLM_RETRY_CONFIG)
     def invoke(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        raise_if_cancelled()
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
@@ -100,6 +103,7 @@ class LLMClient:
 
         timeout = kwargs.pop("timeout", self.timeout)
 
+        raise_if_cancelled()
         try:
             stream = self.client.chat.completions.create(
                 model=self.model_name,
@@ -108,11 +112,16 @@ class LLMClient:
                 **extra_params,
             )
             
-            for chunk in stream:
-                if chunk.choices and len(chunk.choices) > 0:
-                    delta = chunk.choices[0].delta
-                    if delta and delta.content:
-                        yield delta.content
+            try:
+                for chunk in stream:
+                    # 任务被取消时立即关闭连接，不再等待剩余输出
+                    raise_if_cancelled()
+                    if chunk.choices and len(chunk.choices) > 0:
+                        delta = chunk.choices[0].delta
+                        if delta and delta.content:
+                            yield delta.content
+            finally:
+                stream.close()
         except Exception as e:
             logger.error(f"流式请求失败: {str(e)}")
             raise e
@@ -0,0 +1,298 @@
+"""
+内容压缩节点
+对三个引擎报告与论坛日志进行map-reduce压缩，控制后续提示词长度
+"""
+
+import os
+import re
+import json
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from loguru import logger
+
+from .base_node import BaseNode
+from ..prompts import SYSTEM_PROMPT_CHUNK_SUMMARY, SYSTEM_PROMPT_DIGEST_REDUCE
+from ..utils.text_processing import (
+    compute_content_hash,
+    split_markdown_sections,
+    split_forum_log
+)
+
+
+# 报告的默认来源，顺序与ReportAgent一致：QueryEngine, MediaEngine, InsightEngine
+ENGINE_SOURCES = ['query', 'media', 'insight']
+
+# 各输入源的引用前缀；超出三个引擎的报告命名为 report4、report5...，前缀为 R4-、R5-...
+SOURCE_PREFIXES = {
+    'query': 'Q',
+    'media': 'M',
+    'insight': 'I',
+    'forum': 'F',
+}
+
+# 参与缓存键计算的版本号，修改提示词或切分逻辑后递增以废弃旧缓存
+CACHE_VERSION = "2"
+
+
+class ContentCondensationNode(BaseNode):
+    """内容压缩处理节点"""
+
+    def __init__(self, llm_client, cache_dir: str = "final_reports/.cache",
+                 trigger_chars: int = 60000, chunk_chars: int = 6000,
+                 max_digest_chars: int = 40000, max_workers: int = 4):
+        """
+        初始化内容压缩节点
+
+        Args:
+            llm_client: LLM客户端
+            cache_dir: 摘要缓存目录
+            trigger_chars: 输入总长度超过该值时才压缩
+            chunk_chars: 单块最大字符数
+            max_digest_chars: 压缩后全部输入的总字符上限
+            max_workers: map阶段并发数
+        """
+        super().__init__(llm_client, "ContentCondensationNode")
+        self.cache_dir = os.path.join(cache_dir, "digests")
+        self.trigger_chars = trigger_chars
+        self.chunk_chars = chunk_chars
+        self.max_digest_chars = max_digest_chars
+        self.max_workers = max(1, max_workers)
+        self._memory_cache: Dict[str, Any] = {}
+        self._cache_lock = threading.Lock()
+
+    def run(self, input_data: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        """
+        执行内容压缩
+
+        Args:
+            input_data: 输入数据字典
+                - reports: 子agent的报告列表
+                - sources: 可选，与reports一一对应的来源名（query/media/insight），缺省按位置推断
+                - forum_logs: 论坛日志内容
+
+        Returns:
+            压缩结果字典
+                - reports: 压缩后的报告列表（顺序不变）
+                - forum_logs: 压缩后的论坛日志
+                - condensed: 是否实际进行了压缩
+                - citations: 引用标记到原文章节的映射
+        """
+        reports = [str(report) if report else "" for report in input_data.get('reports', [])]
+        forum_logs = input_data.get('forum_logs', '') or ""
+
+        # 按报告位置确定来源名，输出顺序与数量始终与输入一致
+        report_names = self._report_names(reports, input_data.get('sources'))
+        sources = dict(zip(report_names, reports))
+        sources['forum'] = forum_logs
+
+        total_chars = sum(len(text) for text in sources.values())
+        if total_chars <= self.trigger_chars:
+            logger.info(f"输入总长度 {total_chars} 字符，未超过压缩阈值，跳过压缩")
+            return {'reports': reports, 'forum_logs': forum_logs, 'condensed': False, 'citations': {}}
+
+        logger.info(f"输入总长度 {total_chars} 字符，开始map-reduce压缩...")
+
+        # 按原始长度比例分配预算，短输入原样保留
+        budgets = self._allocate_budgets({name: len(text) for name, text in sources.items()})
+
+        digests: Dict[str, str] = {}
+        citations: Dict[str, str] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # map: 所有输入源的块一起提交，共享并发额度
+            plans = {}
+            for name, text in sources.items():
+                plan = self._plan_source(name, text, budgets[name])
+                if 'digest' in plan:
+                    digests[name] = plan['digest']
+                    citations.update(plan['citations'])
+                    continue
+                # 复制上下文，使工作线程中的LLM调用也能感知任务取消
+                plan['futures'] = [
+                    executor.submit(contextvars.copy_context().run,
+                                    self._summarize_chunk, name, chunk, plan['chunk_budget'])
+                    for chunk in plan['chunks']
+                ]
+                plans[name] = plan
+
+            # reduce: 各输入源的合并同样并行执行
+            reduce_futures = {}
+            for name, plan in plans.items():
+                summaries = [
+                    f"[{tag}] {future.result()}"
+                    for tag, future in zip(plan['citations'].keys(), plan['futures'])
+                ]
+                # 来源索引附在摘要之后，先从预算中为它预留空间
+                plan['legend'], reduce_budget = self._split_legend_budget(plan['citations'], plan['budget'])
+                reduce_futures[name] = executor.submit(contextvars.copy_context().run,
+                                                       self._reduce_summaries, name, summaries, reduce_budget)
+
+            for name, future in reduce_futures.items():
+                plan = plans[name]
+                digest = f"{future.result()}{plan['legend']}"
+                logger.info(f"[{name}] {len(plan['chunks'])} 块，{len(sources[name])} -> {len(digest)} 字符")
+                self._cache_set(plan['cache_key'], {'digest': digest, 'citations': plan['citations']})
+                digests[name] = digest
+                citations.update(plan['citations'])
+
+        condensed_reports = [digests[name] for name in report_names]
+        condensed_chars = sum(len(text) for text in digests.values())
+        logger.info(f"压缩完成: {total_chars} -> {condensed_chars} 字符")
+
+        return {
+            'reports': condensed_reports,
+            'forum_logs': digests['forum'],
+            'condensed': True,
+            'citations': citations,
+        }
+
+    @staticmethod
+    def _report_names(reports: List[str], names: Optional[List[str]] = None) -> List[str]:
+        """
+        每份报告的来源名：优先使用调用方给出的来源，其余按位置取 query/media/insight，
+        第四份及之后为 report4、report5...；重名时加位置后缀，保证一一对应
+        """
+        names = list(names or [])
+        result = []
+        for index in range(len(reports)):
+            name = names[index] if index < len(names) and names[index] else (
+                ENGINE_SOURCES[index] if index < len(ENGINE_SOURCES) else f"report{index + 1}")
+            if name in result or name == 'forum':
+                name = f"report{index + 1}"
+            result.append(name)
+        return result
+
+    @staticmethod
+    def _source_prefix(name: str) -> str:
+        """引用标记前缀"""
+        if name in SOURCE_PREFIXES:
+            return SOURCE_PREFIXES[name]
+        match = re.fullmatch(r"report(\d+)", name)
+        return f"R{match.group(1)}-" if match else f"{name.upper()}-"
+
+    @staticmethod
+    def _split_legend_budget(citations: Dict[str, str], budget: int):
+        """
+        生成来源索引并从预算中扣除，摘要加索引的总长度不超过 budget
+        索引过长时截断索引，至少为摘要保留一半预算
+
+        Returns:
+            (来源索引文本, 摘要可用预算)
+        """
+        legend = "\n".join(f"[{tag}] {title}" for tag, title in citations.items())
+        legend = f"\n\n来源索引：\n{legend}"
+        reduce_budget = max(budget // 2, budget - len(legend))
+        return legend[:budget - reduce_budget], reduce_budget
+
+    def _allocate_budgets(self, lengths: Dict[str, int]) -> Dict[str, int]:
+        """按各输入的长度比例分配摘要预算"""
+        total = sum(lengths.values()) or 1
+        return {
+            name: min(length, max(1000, self.max_digest_chars * length // total))
+            for name, length in lengths.items()
+        }
+
+    def _plan_source(self, name: str, text: str, budget: int) -> Dict[str, Any]:
+        """
+        为单个输入源制定压缩计划
+
+        Returns:
+            无需压缩或命中缓存时包含 digest 与 citations；
+            否则包含 chunks、citations、chunk_budget、budget 与 cache_key
+        """
+        if not text.strip() or len(text) <= budget:
+            return {'digest': text, 'citations': {}}
+
+        cache_key = compute_content_hash(CACHE_VERSION, name, str(budget), str(self.chunk_chars), text)
+        cached = self._cache_get(cache_key)
+        if cached:
+            logger.info(f"[{name}] 命中摘要缓存")
+            return {'digest': cached['digest'], 'citations': cached['citations']}
+
+        prefix = self._source_prefix(name)
+        if name == 'forum':
+            chunks = split_forum_log(text, self.chunk_chars)
+        else:
+            chunks = split_markdown_sections(text, self.chunk_chars)
+
+        return {
+            'chunks': chunks,
+            'citations': {f"{prefix}{index}": chunk['title'] for index, chunk in enumerate(chunks, 1)},
+            'chunk_budget': max(200, budget // max(1, len(chunks))),
+            'budget': budget,
+            'cache_key': cache_key,
+        }
+
+    def _summarize_chunk(self, name: str, chunk: Dict[str, Any], chunk_budget: int) -> str:
+        """摘要单个块，结果按块内容哈希缓存"""
+        cache_key = compute_content_hash(CACHE_VERSION, "chunk", str(chunk_budget), chunk['content'])
+        cached = self._cache_get(cache_key)
+        if cached:
+            return cached['summary']
+
+        user_message = f"来源: {name}\n章节: {chunk['title']}\n字数上限: {chunk_budget}\n\n{chunk['content']}"
+        try:
+            summary = self.llm_client.stream_invoke_to_string(SYSTEM_PROMPT_CHUNK_SUMMARY, user_message).strip()
+        except Exception as e:
+            logger.error(f"[{name}] 块摘要失败，使用原文截断: {str(e)}")
+            return chunk['content'][:chunk_budget]
+
+        if not summary:
+            return chunk['content'][:chunk_budget]
+
+        summary = summary[:chunk_budget * 2]
+        self._cache_set(cache_key, {'summary': summary})
+        return summary
+
+    def _reduce_summaries(self, name: str, summaries: List[str], budget: int) -> str:
+        """合并块摘要，超出预算时调用LLM做reduce"""
+        joined = "\n\n".join(summaries)
+        if len(joined) <= budget:
+            return joined
+
+        user_message = f"来源: {name}\n字数上限: {budget}\n\n{joined}"
+        try:
+            reduced = self.llm_client.stream_invoke_to_string(SYSTEM_PROMPT_DIGEST_REDUCE, user_message).strip()
+        except Exception as e:
+            logger.error(f"[{name}] 摘要合并失败，使用拼接结果: {str(e)}")
+            reduced = ""
+
+        if not reduced:
+            reduced = joined
+        return reduced[:budget]
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存，优先内存"""
+        with self._cache_lock:
+            if key in self._memory_cache:
+                return self._memory_cache[key]
+
+        path = os.path.join(self.cache_dir, f"{key}.json")
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except Exception as e:
+            logger.warning(f"读取摘要缓存失败 {path}: {str(e)}")
+            return None
+
+        with self._cache_lock:
+            self._memory_cache[key] = value
+        return value
+
+    def _cache_set(self, key: str, value: Dict[str, Any]):
+        """写入缓存（先写临时文件再替换，避免并发读到半个文件）"""
+        with self._cache_lock:
+            self._memory_cache[key] = value
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = os.path.join(self.cache_dir, f"{key}.json")
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"写入摘要缓存失败: {str(e)}")
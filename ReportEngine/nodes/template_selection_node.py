@@ -5,26 +5,40 @@
 
 import os
 import json
+import threading
 from typing import Dict, Any, List, Optional
 from loguru import logger
 
 from .base_node import BaseNode
 from ..prompts import SYSTEM_PROMPT_TEMPLATE_SELECTION
+from ..utils.template_registry import get_template_registry
+from ..utils.text_processing import compute_content_hash, extract_markdown_headings
 
 
 class TemplateSelectionNode(BaseNode):
     """模板选择处理节点"""
     
-    def __init__(self, llm_client, template_dir: str = "ReportEngine/report_template"):
+    def __init__(self, llm_client, template_dir: str = "ReportEngine/report_template",
+                 cache_dir: Optional[str] = None, local_min_score: float = 3.0,
+                 local_margin: float = 2.0):
         """
         初始化模板选择节点
         
         Args:
             llm_client: LLM客户端
             template_dir: 模板目录路径
+            cache_dir: 选择结果缓存目录，为空时只在内存中缓存
+            local_min_score: 本地分类直接采用所需的最低得分
+            local_margin: 本地分类直接采用所需的第一名/第二名得分比
         """
         super().__init__(llm_client, "TemplateSelectionNode")
         self.template_dir = template_dir
+        self.registry = get_template_registry(template_dir)
+        self.local_min_score = local_min_score
+        self.local_margin = local_margin
+        self.cache_file = os.path.join(cache_dir, "template_selection.json") if cache_dir else None
+        self._selection_cache = self._load_selection_cache()
+        self._cache_lock = threading.Lock()
         
     def run(self, input_data: Dict[str, Any], **kwargs) -> Dict[str, Any]:
         """
@@ -52,18 +66,118 @@ class TemplateSelectionNode(BaseNode):
             logger.info("未找到预设模板，使用内置默认模板")
             return self._get_fallback_template()
         
+        # 同一查询在模板未变化时直接复用上次的选择
+        cache_key = compute_content_hash(query, self.registry.version)
+        cached_result = self._get_cached_selection(cache_key)
+        if cached_result:
+            return cached_result
+        
+        # 本地分类置信度足够时跳过LLM
+        headings = []
+        for report in reports:
+            headings.extend(extract_markdown_headings(self._get_report_content(report)))
+        ranked = self.registry.classify(query, headings)
+        local_result = self._local_template_selection(ranked)
+        if local_result:
+            self._set_cached_selection(cache_key, local_result)
+            return local_result
+        
         # 使用LLM进行模板选择
         try:
             llm_result = self._llm_template_selection(query, reports, forum_logs, available_templates)
             if llm_result:
+                self._set_cached_selection(cache_key, llm_result)
                 return llm_result
         except Exception as e:
             logger.exception(f"LLM模板选择失败: {str(e)}")
         
+        # LLM失败时优先采用本地分类的第一名
+        if ranked and ranked[0][1] > 0:
+            template, score = ranked[0]
+            logger.info(f"LLM选择失败，采用本地分类结果: {template['name']} (得分 {score:.2f})")
+            return self._build_result(template, f"LLM不可用，按本地关键词匹配选择（得分 {score:.2f}）")
+        
         # 如果LLM选择失败，使用备选方案
         return self._get_fallback_template()
     
-
+    def _local_template_selection(self, ranked: List[Any]) -> Optional[Dict[str, Any]]:
+        """本地分类结果足够确定时直接返回，否则返回None交给LLM"""
+        if not ranked:
+            return None
+        
+        top_template, top_score = ranked[0]
+        second_score = ranked[1][1] if len(ranked) > 1 else 0.0
+        logger.info(f"本地模板分类: {top_template['name']} 得分 {top_score:.2f}，次高 {second_score:.2f}")
+        
+        if top_score < self.local_min_score or top_score < second_score * self.local_margin:
+            return None
+        
+        logger.info(f"本地分类置信度足够，跳过LLM选择: {top_template['name']}")
+        return self._build_result(
+            top_template,
+            f"本地关键词匹配置信度高（得分 {top_score:.2f}，次高 {second_score:.2f}）"
+        )
+    
+    @staticmethod
+    def _build_result(template: Dict[str, Any], reason: str) -> Dict[str, Any]:
+        """构建模板选择结果"""
+        return {
+            'template_name': template['name'],
+            'template_content': template['content'],
+            'selection_reason': reason
+        }
+    
+    @staticmethod
+    def _get_report_content(report: Any) -> str:
+        """获取报告内容，支持不同的数据格式"""
+        if isinstance(report, dict):
+            return report.get('content', str(report))
+        if hasattr(report, 'content'):
+            return report.content
+        return str(report) if report else ""
+    
+    def _load_selection_cache(self) -> Dict[str, Dict[str, str]]:
+        """加载选择结果缓存"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"加载模板选择缓存失败: {str(e)}")
+            return {}
+    
+    def _get_cached_selection(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的选择结果，模板已不存在时视为未命中"""
+        with self._cache_lock:
+            cached = self._selection_cache.get(cache_key)
+        if not cached:
+            return None
+        
+        template = self.registry.get(cached['template_name'])
+        if not template:
+            return None
+        
+        logger.info(f"命中模板选择缓存: {template['name']}")
+        return self._build_result(template, cached['selection_reason'])
+    
+    def _set_cached_selection(self, cache_key: str, result: Dict[str, Any]):
+        """缓存选择结果（只保存模板名与理由，内容从注册表读取）"""
+        with self._cache_lock:
+            self._selection_cache[cache_key] = {
+                'template_name': result['template_name'],
+                'selection_reason': result['selection_reason']
+            }
+            if not self.cache_file:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+                tmp_path = f"{self.cache_file}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._selection_cache, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.cache_file)
+            except Exception as e:
+                logger.warning(f"保存模板选择缓存失败: {str(e)}")
     
     def _llm_template_selection(self, query: str, reports: List[Any], forum_logs: str, 
                               available_templates: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
@@ -79,12 +193,7 @@ class TemplateSelectionNode(BaseNode):
             reports_summary = "\n\n=== 分析引擎报告内容 ===\n"
             for i, report in enumerate(reports, 1):
                 # 获取报告内容，支持不同的数据格式
-                if isinstance(report, dict):
-                    content = report.get('content', str(report))
-                elif hasattr(report, 'content'):
-                    content = report.content
-                else:
-                    content = str(report)
+                content = self._get_report_content(report)
                 
                 # 截断过长的内容，保留前1000个字符
                 if len(content) > 1000:
@@ -135,11 +244,7 @@ class TemplateSelectionNode(BaseNode):
             for template in available_templates:
                 if template['name'] == selected_template_name or selected_template_name in template['name']:
                     logger.info(f"LLM选择模板: {selected_template_name}")
-                    return {
-                        'template_name': template['name'],
-                        'template_content': template['content'],
-                        'selection_reason': result.get('selection_reason', 'LLM智能选择')
-                    }
+                    return self._build_result(template, result.get('selection_reason', 'LLM智能选择'))
             
             logger.error(f"LLM选择的模板不存在: {selected_template_name}")
             return None
@@ -177,62 +282,13 @@ class TemplateSelectionNode(BaseNode):
             for variant in template_name_variants:
                 if variant in response:
                     logger.info(f"在响应中找到模板: {template['name']}")
-                    return {
-                        'template_name': template['name'],
-                        'template_content': template['content'],
-                        'selection_reason': '从文本响应中提取'
-                    }
+                    return self._build_result(template, '从文本响应中提取')
         
         return None
     
     def _get_available_templates(self) -> List[Dict[str, Any]]:
-        """获取可用的模板列表"""
-        templates = []
-        
-        if not os.path.exists(self.template_dir):
-            logger.error(f"模板目录不存在: {self.template_dir}")
-            return templates
-        
-        # 查找所有markdown模板文件
-        for filename in os.listdir(self.template_dir):
-            if filename.endswith('.md'):
-                template_path = os.path.join(self.template_dir, filename)
-                try:
-                    with open(template_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    
-                    template_name = filename.replace('.md', '')
-                    description = self._extract_template_description(template_name)
-                    
-                    templates.append({
-                        'name': template_name,
-                        'path': template_path,
-                        'content': content,
-                        'description': description
-                    })
-                except Exception as e:
-                    logger.exception(f"读取模板文件失败 {filename}: {str(e)}")
-        
-        return templates
-    
-    def _extract_template_description(self, template_name: str) -> str:
-        """根据模板名称生成描述"""
-        if '企业品牌' in template_name:
-            return "适用于企业品牌声誉和形象分析"
-        elif '市场竞争' in template_name:
-            return "适用于市场竞争格局和对手分析"
-        elif '日常' in template_name or '定期' in template_name:
-            return "适用于日常监测和定期汇报"
-        elif '政策' in template_name or '行业' in template_name:
-            return "适用于政策影响和行业动态分析"
-        elif '热点' in template_name or '社会' in template_name:
-            return "适用于社会热点和公共事件分析"
-        elif '突发' in template_name or '危机' in template_name:
-            return "适用于突发事件和危机公关"
-        
-        return "通用报告模板"
-    
-
+        """获取可用的模板列表（由模板注册表缓存，文件变化时自动重新加载）"""
+        return self.registry.get_templates()
     
     def _get_fallback_template(self) -> Dict[str, Any]:
         """获取备用默认模板（空模板，让LLM自行发挥）"""
@@ -6,6 +6,8 @@ Report Engine提示词模块
 from .prompts import (
     SYSTEM_PROMPT_TEMPLATE_SELECTION,
     SYSTEM_PROMPT_HTML_GENERATION,
+    SYSTEM_PROMPT_CHUNK_SUMMARY,
+    SYSTEM_PROMPT_DIGEST_REDUCE,
     output_schema_template_selection,
     input_schema_html_generation
 )
@@ -13,6 +15,8 @@ from .prompts import (
 __all__ = [
     "SYSTEM_PROMPT_TEMPLATE_SELECTION",
     "SYSTEM_PROMPT_HTML_GENERATION", 
+    "SYSTEM_PROMPT_CHUNK_SUMMARY",
+    "SYSTEM_PROMPT_DIGEST_REDUCE",
     "output_schema_template_selection",
     "input_schema_html_generation"
 ]
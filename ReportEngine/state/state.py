@@ -15,6 +15,7 @@ class ReportMetadata:
     query: str = ""                      # 原始查询
     template_used: str = ""              # 使用的模板名称
     generation_time: float = 0.0         # 生成耗时（秒）
+    stage_timings: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # 各阶段耗时
     timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
     
     def to_dict(self) -> Dict[str, Any]:
@@ -23,6 +24,7 @@ class ReportMetadata:
             "query": self.query,
             "template_used": self.template_used,
             "generation_time": self.generation_time,
+            "stage_timings": self.stage_timings,
             "timestamp": self.timestamp
         }
 
@@ -130,6 +132,7 @@ class ReportState:
             metadata_data = data.get("metadata", {})
             state.metadata.template_used = metadata_data.get("template_used", "")
             state.metadata.generation_time = metadata_data.get("generation_time", 0.0)
+            state.metadata.stage_timings = metadata_data.get("stage_timings", {})
             
             return state
             
@@ -0,0 +1,335 @@
+"""
+Report Engine任务队列
+有界工作线程池 + 优先级队列，任务状态与结果持久化到SQLite，
+支持取消正在进行的LLM流式调用，并对相同输入的请求去重
+"""
+
+import os
+import json
+import queue
+import sqlite3
+import itertools
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, List, Tuple
+from loguru import logger
+
+from .utils.cancellation import ReportCancelledError, cancellation_scope
+
+
+# 终止状态：任务不会再被执行
+FINISHED_STATUSES = ("completed", "error", "cancelled")
+# 这些状态的同输入任务可以直接复用，不必重新生成
+REUSABLE_STATUSES = ("pending", "running", "completed")
+
+
+class ReportTask:
+    """报告生成任务"""
+
+    def __init__(self, query: str, task_id: str, custom_template: str = "",
+                 priority: int = 0, dedup_key: str = "",
+                 input_files: Optional[Dict[str, str]] = None):
+        self.task_id = task_id
+        self.query = query
+        self.custom_template = custom_template
+        self.priority = priority
+        self.dedup_key = dedup_key
+        self.input_files = input_files or {}
+        self.status = "pending"  # pending, running, completed, error, cancelled
+        self.progress = 0
+        self.result = None
+        self.error_message = ""
+        self.created_at = datetime.now()
+        self.updated_at = datetime.now()
+        self.html_content = ""
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.cancel_event = threading.Event()
+        self._listener: Optional[Callable[["ReportTask"], None]] = None
+
+    def update_status(self, status: str, progress: int = None, error_message: str = ""):
+        """更新任务状态"""
+        self.status = status
+        if progress is not None:
+            self.progress = progress
+        if error_message:
+            self.error_message = error_message
+        self.updated_at = datetime.now()
+        if self._listener:
+            self._listener(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典格式"""
+        return {
+            'task_id': self.task_id,
+            'query': self.query,
+            'status': self.status,
+            'progress': self.progress,
+            'priority': self.priority,
+            'error_message': self.error_message,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'has_result': bool(self.html_content),
+            'stages': self.stages
+        }
+
+
+class ReportTaskStore:
+    """基于SQLite的任务状态与结果存储"""
+
+    def __init__(self, db_path: str):
+        """
+        初始化任务存储
+
+        Args:
+            db_path: SQLite数据库文件路径
+        """
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS report_tasks (
+                task_id TEXT PRIMARY KEY,
+                dedup_key TEXT,
+                query TEXT,
+                custom_template TEXT,
+                priority INTEGER,
+                input_files TEXT,
+                status TEXT,
+                progress INTEGER,
+                error_message TEXT,
+                created_at TEXT,
+                updated_at TEXT,
+                html_content TEXT,
+                stages TEXT
+            )
+        """)
+        # 旧版本数据库没有阶段耗时列
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(report_tasks)")}
+        if 'stages' not in columns:
+            self._conn.execute("ALTER TABLE report_tasks ADD COLUMN stages TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_report_tasks_dedup ON report_tasks (dedup_key)")
+        self._conn.commit()
+
+    def save(self, task: ReportTask):
+        """写入或更新任务"""
+        with self._lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO report_tasks
+                (task_id, dedup_key, query, custom_template, priority, input_files,
+                 status, progress, error_message, created_at, updated_at, html_content, stages)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                task.task_id, task.dedup_key, task.query, task.custom_template, task.priority,
+                json.dumps(task.input_files, ensure_ascii=False), task.status, task.progress,
+                task.error_message, task.created_at.isoformat(), task.updated_at.isoformat(),
+                task.html_content, json.dumps(task.stages, ensure_ascii=False)
+            ))
+            self._conn.commit()
+
+    def get(self, task_id: str) -> Optional[ReportTask]:
+        """按ID读取任务"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM report_tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return self._row_to_task(row) if row else None
+
+    def find_by_dedup_key(self, dedup_key: str, statuses: tuple) -> Optional[ReportTask]:
+        """查找指定状态下输入相同的最近一个任务"""
+        placeholders = ",".join("?" for _ in statuses)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT * FROM report_tasks WHERE dedup_key = ? AND status IN ({placeholders}) "
+                f"ORDER BY created_at DESC LIMIT 1",
+                (dedup_key, *statuses)
+            ).fetchone()
+        return self._row_to_task(row) if row else None
+
+    def list_by_status(self, statuses: tuple) -> List[ReportTask]:
+        """列出指定状态的任务"""
+        placeholders = ",".join("?" for _ in statuses)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM report_tasks WHERE status IN ({placeholders}) ORDER BY created_at",
+                statuses
+            ).fetchall()
+        return [self._row_to_task(row) for row in rows]
+
+    def list_recent(self, limit: int = 20) -> List[ReportTask]:
+        """列出最近的任务（不加载HTML内容）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task_id, dedup_key, query, custom_template, priority, input_files, status, "
+                "progress, error_message, created_at, updated_at, stages, "
+                "CASE WHEN html_content != '' THEN '1' ELSE '' END AS html_content "
+                "FROM report_tasks ORDER BY created_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [self._row_to_task(row) for row in rows]
+
+    @staticmethod
+    def _row_to_task(row: sqlite3.Row) -> ReportTask:
+        """数据库行转换为任务对象"""
+        task = ReportTask(
+            query=row['query'],
+            task_id=row['task_id'],
+            custom_template=row['custom_template'] or "",
+            priority=row['priority'] or 0,
+            dedup_key=row['dedup_key'] or "",
+            input_files=json.loads(row['input_files'] or "{}")
+        )
+        task.status = row['status']
+        task.progress = row['progress'] or 0
+        task.error_message = row['error_message'] or ""
+        task.created_at = datetime.fromisoformat(row['created_at'])
+        task.updated_at = datetime.fromisoformat(row['updated_at'])
+        task.html_content = row['html_content'] or ""
+        task.stages = json.loads(row['stages'] or "{}")
+        return task
+
+
+class ReportTaskQueue:
+    """报告任务队列"""
+
+    def __init__(self, runner: Callable[[ReportTask], None], store: ReportTaskStore, max_workers: int = 2):
+        """
+        初始化任务队列
+
+        Args:
+            runner: 执行单个任务的函数，任务被取消时应抛出ReportCancelledError
+            store: 任务存储
+            max_workers: 并发执行的任务数上限
+        """
+        self.runner = runner
+        self.store = store
+        self.max_workers = max(1, max_workers)
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._active: Dict[str, ReportTask] = {}
+        self._lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+
+        self._recover_tasks()
+
+    def start(self):
+        """启动工作线程"""
+        with self._lock:
+            if self._workers:
+                return
+            for index in range(self.max_workers):
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"report-worker-{index}",
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+        logger.info(f"报告任务队列已启动，工作线程数: {self.max_workers}")
+
+    def submit(self, task: ReportTask) -> Tuple[ReportTask, bool]:
+        """
+        提交任务
+
+        Returns:
+            (实际对应的任务, 是否复用了已有任务)
+        """
+        with self._lock:
+            if task.dedup_key:
+                existing = self._find_reusable(task.dedup_key)
+                if existing:
+                    logger.info(f"相同输入的任务已存在，复用任务: {existing.task_id}")
+                    return existing, True
+
+            task._listener = self.store.save
+            self._active[task.task_id] = task
+            self.store.save(task)
+            self._enqueue(task)
+
+        logger.info(f"报告任务已入队: {task.task_id} (优先级 {task.priority})")
+        return task, False
+
+    def get(self, task_id: str) -> Optional[ReportTask]:
+        """获取任务，进行中的任务从内存读取，其余从存储读取"""
+        with self._lock:
+            task = self._active.get(task_id)
+        return task or self.store.get(task_id)
+
+    def cancel(self, task_id: str) -> bool:
+        """取消任务；正在运行的任务会在下一个LLM输出块处中断"""
+        with self._lock:
+            task = self._active.get(task_id)
+        if not task or task.status in FINISHED_STATUSES:
+            return False
+
+        task.cancel_event.set()
+        if task.status == "pending":
+            with self._lock:
+                self._active.pop(task_id, None)
+            task.update_status("cancelled", 0, "用户取消任务")
+        logger.info(f"报告任务已请求取消: {task_id}")
+        return True
+
+    def list_active(self) -> List[ReportTask]:
+        """列出排队中与运行中的任务"""
+        with self._lock:
+            return sorted(self._active.values(), key=lambda t: t.created_at)
+
+    def has_running_tasks(self) -> bool:
+        """是否有任务正在运行"""
+        with self._lock:
+            return any(task.status == "running" for task in self._active.values())
+
+    def _find_reusable(self, dedup_key: str) -> Optional[ReportTask]:
+        """查找可复用的同输入任务（调用方持有锁）"""
+        for task in self._active.values():
+            if task.dedup_key == dedup_key and task.status in REUSABLE_STATUSES:
+                return task
+        return self.store.find_by_dedup_key(dedup_key, REUSABLE_STATUSES)
+
+    def _enqueue(self, task: ReportTask):
+        """放入优先级队列：优先级数值越大越先执行，同优先级先到先得"""
+        self._queue.put((-task.priority, next(self._sequence), task.task_id))
+
+    def _recover_tasks(self):
+        """恢复上次进程退出时未完成的任务"""
+        for task in self.store.list_by_status(("running",)):
+            task.update_status("error", 0, "服务重启，任务中断")
+            self.store.save(task)
+
+        pending = self.store.list_by_status(("pending",))
+        for task in pending:
+            task._listener = self.store.save
+            self._active[task.task_id] = task
+            self._enqueue(task)
+        if pending:
+            logger.info(f"恢复了 {len(pending)} 个排队中的报告任务")
+
+    def _worker_loop(self):
+        """工作线程主循环"""
+        while True:
+            _, _, task_id = self._queue.get()
+            with self._lock:
+                task = self._active.get(task_id)
+            if not task or task.status != "pending":
+                continue
+
+            task.update_status("running", 5)
+            try:
+                with cancellation_scope(task.cancel_event):
+                    self.runner(task)
+                if task.status == "running":
+                    task.update_status("completed", 100)
+            except ReportCancelledError:
+                logger.info(f"报告任务已取消: {task_id}")
+                task.update_status("cancelled", 0, "用户取消任务")
+            except Exception as e:
+                logger.exception(f"报告生成过程中发生错误: {str(e)}")
+                task.update_status("error", 0, str(e))
+            finally:
+                with self._lock:
+                    self._active.pop(task_id, None)
@@ -1,8 +1,23 @@
 """
 Report Engine工具模块
-包含配置管理
+包含配置管理、文本处理与模板注册表
 """
 
+from .text_processing import (
+    compute_content_hash,
+    split_markdown_sections,
+    split_forum_log,
+    extract_markdown_headings
+)
+from .template_registry import TemplateRegistry, get_template_registry
+from .pipeline import StagePipeline
 
 __all__ = [
+    "compute_content_hash",
+    "split_markdown_sections",
+    "split_forum_log",
+    "extract_markdown_headings",
+    "TemplateRegistry",
+    "get_template_registry",
+    "StagePipeline",
 ]
@@ -0,0 +1,45 @@
+"""
+报告任务取消机制
+通过上下文变量把任务的取消事件传递到LLM流式调用中
+"""
+
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+
+
+class ReportCancelledError(BaseException):
+    """
+    报告任务被取消
+
+    继承BaseException而非Exception：重试装饰器与各节点的兜底逻辑
+    都只捕获Exception，取消信号需要穿过它们直接回到任务队列。
+    """
+
+
+_cancel_event: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    "report_cancel_event", default=None
+)
+
+
+@contextmanager
+def cancellation_scope(event: threading.Event):
+    """在当前上下文中绑定取消事件"""
+    token = _cancel_event.set(event)
+    try:
+        yield event
+    finally:
+        _cancel_event.reset(token)
+
+
+def is_cancelled() -> bool:
+    """当前上下文的任务是否已被取消"""
+    event = _cancel_event.get()
+    return event is not None and event.is_set()
+
+
+def raise_if_cancelled():
+    """当前上下文的任务已被取消时抛出ReportCancelledError"""
+    if is_cancelled():
+        raise ReportCancelledError("报告任务已取消")
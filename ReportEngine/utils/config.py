@@ -24,6 +24,17 @@ class Settings(BaseSettings):
     LOG_FILE: str = Field("logs/report.log", description="日志输出文件")
     ENABLE_PDF_EXPORT: bool = Field(True, description="是否允许导出PDF")
     CHART_STYLE: str = Field("modern", description="图表样式：modern/classic/")
+    REPORT_MANIFEST_FILE: str = Field("logs/report_manifest.jsonl", description="引擎报告清单文件")
+    CACHE_DIR: str = Field("final_reports/.cache", description="中间结果缓存目录")
+    CONDENSE_ENABLED: bool = Field(True, description="是否在生成前压缩引擎报告与论坛日志")
+    CONDENSE_TRIGGER_CHARS: int = Field(60000, description="输入总长度超过该值时才进行压缩")
+    CONDENSE_CHUNK_CHARS: int = Field(6000, description="map阶段单块最大字符数")
+    CONDENSE_MAX_DIGEST_CHARS: int = Field(40000, description="压缩后全部输入的总字符上限")
+    CONDENSE_MAX_WORKERS: int = Field(4, description="map阶段并发LLM调用数")
+    TEMPLATE_LOCAL_MIN_SCORE: float = Field(3.0, description="本地模板分类直接采用所需的最低得分")
+    TEMPLATE_LOCAL_MARGIN: float = Field(2.0, description="本地模板分类直接采用所需的第一名/第二名得分比")
+    REPORT_MAX_WORKERS: int = Field(2, description="同时生成的报告任务数上限")
+    TASK_DB_FILE: str = Field("final_reports/report_tasks.db", description="报告任务状态与结果的SQLite文件")
 
     class Config:
         env_file = ".env"
@@ -48,6 +59,8 @@ def print_config(config: Settings):
     message += f"日志文件: {config.LOG_FILE}\n"
     message += f"PDF 导出: {config.ENABLE_PDF_EXPORT}\n"
     message += f"图表样式: {config.CHART_STYLE}\n"
+    message += f"并发报告任务数: {config.REPORT_MAX_WORKERS}\n"
+    message += f"输入压缩: {config.CONDENSE_ENABLED} (阈值 {config.CONDENSE_TRIGGER_CHARS} 字符, 上限 {config.CONDENSE_MAX_DIGEST_CHARS} 字符)\n"
     message += f"LLM API Key: {'已配置' if config.REPORT_ENGINE_API_KEY else '未配置'}\n"
     message += "=========================\n"
     logger.info(message)
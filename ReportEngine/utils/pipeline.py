@@ -0,0 +1,108 @@
+"""
+报告生成流水线
+以有向无环图描述各阶段及其依赖，依赖满足的阶段并发执行，并记录每个阶段的耗时
+"""
+
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, List, Callable, Optional
+from loguru import logger
+
+
+class StagePipeline:
+    """阶段流水线"""
+
+    def __init__(self, name: str = "pipeline", max_workers: int = 4,
+                 on_stage: Optional[Callable[[str, str, Dict[str, Dict[str, Any]]], None]] = None):
+        """
+        初始化流水线
+
+        Args:
+            name: 流水线名称，用于日志
+            max_workers: 并发执行的阶段数上限
+            on_stage: 阶段状态变化回调，参数为 (阶段名, 状态, 全部阶段的计时信息)
+        """
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.on_stage = on_stage
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self.timings: Dict[str, Dict[str, Any]] = {}
+
+    def add_stage(self, name: str, func: Callable[[Dict[str, Any]], Any], depends_on: Optional[List[str]] = None):
+        """
+        添加阶段
+
+        Args:
+            name: 阶段名称
+            func: 阶段函数，参数为已完成阶段的结果字典
+            depends_on: 依赖的阶段名称
+        """
+        depends_on = list(depends_on or [])
+        for dependency in depends_on:
+            if dependency not in self._stages:
+                raise ValueError(f"阶段 {name} 依赖的阶段 {dependency} 尚未添加")
+        self._stages[name] = {'func': func, 'depends_on': depends_on}
+        self.timings[name] = {'status': 'pending', 'depends_on': depends_on}
+
+    def run(self) -> Dict[str, Any]:
+        """
+        执行流水线
+
+        Returns:
+            各阶段的结果字典
+
+        Raises:
+            任一阶段抛出的异常；此时尚未开始的阶段不再执行
+        """
+        results: Dict[str, Any] = {}
+        remaining = dict(self._stages)
+        running = {}
+        pipeline_start = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name) as executor:
+            while remaining or running:
+                # 提交所有依赖已满足的阶段
+                for name in [n for n, stage in remaining.items()
+                             if all(dep in results for dep in stage['depends_on'])]:
+                    stage = remaining.pop(name)
+                    self._mark(name, 'running', start=round(time.monotonic() - pipeline_start, 3))
+                    # 复制上下文，使阶段内的LLM调用也能感知任务取消
+                    future = executor.submit(contextvars.copy_context().run,
+                                             self._run_stage, stage['func'], dict(results))
+                    running[future] = name
+
+                if not running:
+                    raise RuntimeError(f"流水线 {self.name} 存在无法满足的依赖: {list(remaining)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    elapsed = time.monotonic() - pipeline_start
+                    duration = round(elapsed - self.timings[name]['start'], 3)
+                    try:
+                        results[name] = future.result()
+                    except BaseException:
+                        self._mark(name, 'failed', duration=duration)
+                        for pending_name in remaining:
+                            self._mark(pending_name, 'skipped')
+                        raise
+                    self._mark(name, 'completed', duration=duration)
+                    logger.info(f"[{self.name}] 阶段 {name} 完成，耗时 {duration:.2f} 秒")
+
+        return results
+
+    @staticmethod
+    def _run_stage(func: Callable[[Dict[str, Any]], Any], results: Dict[str, Any]) -> Any:
+        """执行单个阶段"""
+        return func(results)
+
+    def _mark(self, name: str, status: str, **fields):
+        """更新阶段计时信息并通知回调"""
+        self.timings[name]['status'] = status
+        self.timings[name].update(fields)
+        if self.on_stage:
+            try:
+                self.on_stage(name, status, self.timings)
+            except Exception as e:
+                logger.exception(f"阶段回调失败: {str(e)}")
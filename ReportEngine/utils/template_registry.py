@@ -0,0 +1,225 @@
+"""
+报告模板注册表
+一次性加载并解析模板目录，文件修改时间变化时自动重新加载，
+并提供基于关键词与字符二元组相似度的本地模板分类
+"""
+
+import os
+import re
+import math
+import time
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from loguru import logger
+
+from .text_processing import compute_content_hash
+
+
+# 模板名称片段 -> (描述, 关键词)
+# 关键词命中查询时权重更高，命中报告标题时权重较低
+TEMPLATE_PROFILES = [
+    (('企业品牌',), "适用于企业品牌声誉和形象分析",
+     ['品牌', '声誉', '口碑', '形象', '企业', '公司', '集团', '年度', '半年', '复盘', '美誉度', '商誉']),
+    (('市场竞争',), "适用于市场竞争格局和对手分析",
+     ['竞争', '竞品', '对手', '市场份额', '格局', '对比', '同行', '差异化', '份额', '赛道']),
+    (('日常', '定期'), "适用于日常监测和定期汇报",
+     ['日报', '周报', '月报', '季报', '日常', '定期', '监测', '例行', '本周', '本月', '每日', '追踪']),
+    (('政策', '行业'), "适用于政策影响和行业动态分析",
+     ['政策', '法规', '条例', '监管', '新规', '行业', '产业', '征求意见', '部委', '国务院', '出台', '实施']),
+    (('热点', '社会'), "适用于社会热点和公共事件分析",
+     ['热点', '热议', '网友', '社会', '公共', '现象', '话题', '舆论', '热搜', '流行', '文化', '争议']),
+    (('突发', '危机'), "适用于突发事件和危机公关",
+     ['突发', '危机', '事故', '爆炸', '火灾', '维权', '投诉', '曝光', '丑闻', '道歉', '召回', '通报', '辟谣', '负面']),
+]
+
+_OUTLINE_TOP_PATTERN = re.compile(r'^[-*]\s+\*\*(.+?)\*\*\s*$')
+_OUTLINE_SUB_PATTERN = re.compile(r'^\s+[-*]\s+(.+?)\s*$')
+
+
+def _char_bigrams(text: str) -> set:
+    """提取中英文字符二元组，忽略空白与标点"""
+    chars = [c for c in text.lower() if c.isalnum()]
+    return {a + b for a, b in zip(chars, chars[1:])}
+
+
+class TemplateRegistry:
+    """报告模板注册表"""
+
+    def __init__(self, template_dir: str, check_interval: float = 2.0):
+        """
+        初始化模板注册表
+
+        Args:
+            template_dir: 模板目录路径
+            check_interval: 两次检查文件修改时间的最小间隔（秒）
+        """
+        self.template_dir = template_dir
+        self.check_interval = check_interval
+        self._templates: Dict[str, Dict[str, Any]] = {}
+        self._mtimes: Dict[str, float] = {}
+        self._last_check = 0.0
+        self._version = ""
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        """模板集合的版本号，任一模板增删改后变化"""
+        self._refresh_if_needed()
+        return self._version
+
+    def get_templates(self) -> List[Dict[str, Any]]:
+        """获取全部模板（按名称排序）"""
+        self._refresh_if_needed()
+        with self._lock:
+            return [self._templates[name] for name in sorted(self._templates)]
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """按名称获取模板，支持名称片段匹配"""
+        self._refresh_if_needed()
+        with self._lock:
+            if name in self._templates:
+                return self._templates[name]
+            for template_name, template in self._templates.items():
+                if name and name in template_name:
+                    return template
+        return None
+
+    def classify(self, query: str, headings: Optional[List[str]] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        本地模板分类
+
+        Args:
+            query: 查询内容
+            headings: 各引擎报告中的章节标题
+
+        Returns:
+            (模板, 得分) 列表，按得分从高到低排序
+        """
+        heading_text = " ".join(headings or [])
+        context_bigrams = _char_bigrams(f"{query} {heading_text}")
+
+        ranked = []
+        for template in self.get_templates():
+            score = 0.0
+            for keyword in template['keywords']:
+                if keyword in query:
+                    score += 3.0
+                elif keyword in heading_text:
+                    score += 1.0
+
+            # 字符二元组的集合余弦相似度，作为关键词之外的弱信号
+            template_bigrams = template['bigrams']
+            if context_bigrams and template_bigrams:
+                overlap = len(context_bigrams & template_bigrams)
+                score += 2.0 * overlap / math.sqrt(len(context_bigrams) * len(template_bigrams))
+
+            ranked.append((template, score))
+
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked
+
+    def _refresh_if_needed(self):
+        """按修改时间增量重新加载模板"""
+        now = time.monotonic()
+        with self._lock:
+            if self._last_check and now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+
+            if not os.path.isdir(self.template_dir):
+                if self._templates:
+                    logger.error(f"模板目录不存在: {self.template_dir}")
+                self._templates, self._mtimes, self._version = {}, {}, ""
+                return
+
+            current_mtimes = {}
+            with os.scandir(self.template_dir) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.endswith('.md'):
+                        current_mtimes[entry.name] = entry.stat().st_mtime
+
+            if current_mtimes == self._mtimes:
+                return
+
+            for filename in set(self._mtimes) - set(current_mtimes):
+                self._templates.pop(filename[:-len('.md')], None)
+
+            for filename, mtime in current_mtimes.items():
+                if self._mtimes.get(filename) == mtime:
+                    continue
+                template = self._load_template(filename, mtime)
+                if template:
+                    self._templates[template['name']] = template
+
+            self._mtimes = current_mtimes
+            self._version = compute_content_hash(*[
+                f"{name}:{mtime}" for name, mtime in sorted(current_mtimes.items())
+            ])
+            logger.info(f"模板注册表已加载 {len(self._templates)} 个模板")
+
+    def _load_template(self, filename: str, mtime: float) -> Optional[Dict[str, Any]]:
+        """读取并解析单个模板文件"""
+        template_path = os.path.join(self.template_dir, filename)
+        try:
+            with open(template_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except Exception as e:
+            logger.exception(f"读取模板文件失败 {filename}: {str(e)}")
+            return None
+
+        template_name = filename[:-len('.md')]
+        description, keywords = self._match_profile(template_name)
+        outline = self._parse_outline(content)
+        outline_text = " ".join(
+            [section['title'] for section in outline] +
+            [sub for section in outline for sub in section['subsections']]
+        )
+
+        return {
+            'name': template_name,
+            'filename': filename,
+            'path': template_path,
+            'content': content,
+            'title': content.split('\n')[0].strip('# *') if content else '',
+            'description': description,
+            'outline': outline,
+            'keywords': keywords,
+            'bigrams': _char_bigrams(f"{template_name} {outline_text}"),
+            'size': len(content),
+            'mtime': mtime,
+        }
+
+    @staticmethod
+    def _match_profile(template_name: str) -> Tuple[str, List[str]]:
+        """根据模板名称匹配描述与关键词"""
+        for fragments, description, keywords in TEMPLATE_PROFILES:
+            if any(fragment in template_name for fragment in fragments):
+                return description, keywords
+        return "通用报告模板", []
+
+    @staticmethod
+    def _parse_outline(content: str) -> List[Dict[str, Any]]:
+        """解析模板的章节大纲（一级条目加粗，二级条目缩进）"""
+        outline: List[Dict[str, Any]] = []
+        for line in content.splitlines():
+            top_match = _OUTLINE_TOP_PATTERN.match(line)
+            if top_match:
+                outline.append({'title': top_match.group(1).strip(), 'subsections': []})
+                continue
+            sub_match = _OUTLINE_SUB_PATTERN.match(line)
+            if sub_match and outline:
+                outline[-1]['subsections'].append(sub_match.group(1).strip('* '))
+        return outline
+
+
+_registries: Dict[str, TemplateRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_template_registry(template_dir: str) -> TemplateRegistry:
+    """获取指定目录共享的模板注册表实例"""
+    key = os.path.abspath(template_dir)
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = TemplateRegistry(template_dir)
+        return _registries[key]
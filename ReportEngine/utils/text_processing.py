@@ -0,0 +1,166 @@
+"""
+文本处理工具函数
+用于切分Markdown报告与论坛日志、计算内容哈希等
+"""
+
+import re
+import hashlib
+from typing import Dict, Any, List
+
+
+_HEADING_PATTERN = re.compile(r'^(#{1,3})\s+(.+?)\s*#*\s*$')
+_FORUM_LINE_PATTERN = re.compile(r'^\[(\d{2}:\d{2}:\d{2})\]\s*\[([A-Z_]+)\]')
+
+
+def compute_content_hash(*parts: str) -> str:
+    """
+    计算若干文本片段的稳定哈希
+
+    Args:
+        *parts: 文本片段
+
+    Returns:
+        sha256十六进制摘要
+    """
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update((part or "").encode('utf-8'))
+        # 分隔符，避免 ("ab", "c") 与 ("a", "bc") 冲突
+        hasher.update(b'\x00')
+    return hasher.hexdigest()
+
+
+def _split_oversized(text: str, max_chars: int) -> List[str]:
+    """按段落切分超长文本，单段仍超长时硬切"""
+    pieces = []
+    buffer = ""
+    for paragraph in text.split('\n'):
+        candidate = f"{buffer}\n{paragraph}" if buffer else paragraph
+        if len(candidate) <= max_chars:
+            buffer = candidate
+            continue
+        if buffer:
+            pieces.append(buffer)
+        while len(paragraph) > max_chars:
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        buffer = paragraph
+    if buffer.strip():
+        pieces.append(buffer)
+    return pieces
+
+
+def split_markdown_sections(text: str, max_chars: int) -> List[Dict[str, Any]]:
+    """
+    按标题切分Markdown报告，并把每块控制在max_chars以内
+
+    Args:
+        text: Markdown文本
+        max_chars: 单块最大字符数
+
+    Returns:
+        块列表，每项包含 title（所属章节标题）与 content
+    """
+    sections = []
+    current_title = "前言"
+    current_lines: List[str] = []
+
+    for line in text.splitlines():
+        match = _HEADING_PATTERN.match(line)
+        if match and current_lines:
+            sections.append((current_title, "\n".join(current_lines)))
+            current_lines = []
+        if match:
+            current_title = match.group(2).strip()
+        current_lines.append(line)
+    if current_lines:
+        sections.append((current_title, "\n".join(current_lines)))
+
+    chunks = []
+    for title, content in sections:
+        if not content.strip():
+            continue
+        if len(content) <= max_chars:
+            chunks.append({'title': title, 'content': content})
+            continue
+        pieces = _split_oversized(content, max_chars)
+        for index, piece in enumerate(pieces, 1):
+            chunks.append({'title': f"{title}（{index}/{len(pieces)}）", 'content': piece})
+
+    return _merge_small_chunks(chunks, max_chars)
+
+
+def _merge_small_chunks(chunks: List[Dict[str, Any]], max_chars: int) -> List[Dict[str, Any]]:
+    """合并相邻的小块，减少map阶段的LLM调用次数"""
+    merged: List[Dict[str, Any]] = []
+    for chunk in chunks:
+        if merged and len(merged[-1]['content']) + len(chunk['content']) + 1 <= max_chars:
+            merged[-1]['content'] += "\n" + chunk['content']
+            merged[-1]['title'] += f" / {chunk['title']}"
+        else:
+            merged.append(dict(chunk))
+    return merged
+
+
+def split_forum_log(text: str, max_chars: int) -> List[Dict[str, Any]]:
+    """
+    按时间顺序切分论坛日志，尽量不拆开单条发言
+
+    Args:
+        text: forum.log内容
+        max_chars: 单块最大字符数
+
+    Returns:
+        块列表，每项包含 title（时间范围与发言方）与 content
+    """
+    chunks = []
+    lines: List[str] = []
+    size = 0
+    times: List[str] = []
+    speakers: List[str] = []
+
+    def flush():
+        if not lines:
+            return
+        time_range = f"{times[0]}-{times[-1]}" if times else "未知时间"
+        speaker_text = "/".join(dict.fromkeys(speakers)) or "UNKNOWN"
+        chunks.append({'title': f"论坛 {time_range} [{speaker_text}]", 'content': "\n".join(lines)})
+
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        # 超长发言被拆开时，后续片段沿用该发言的时间与发言方
+        match = _FORUM_LINE_PATTERN.match(line)
+        for piece in _split_oversized(line, max_chars):
+            if lines and size + len(piece) + 1 > max_chars:
+                flush()
+                lines, size, times, speakers = [], 0, [], []
+            lines.append(piece)
+            size += len(piece) + 1
+            if match:
+                times.append(match.group(1))
+                speakers.append(match.group(2))
+    flush()
+
+    return chunks
+
+
+def extract_markdown_headings(text: str, limit: int = 30) -> List[str]:
+    """
+    提取Markdown文本中的章节标题
+
+    Args:
+        text: Markdown文本
+        limit: 最多返回的标题数量
+
+    Returns:
+        标题列表
+    """
+    headings = []
+    for line in text.splitlines():
+        match = _HEADING_PATTERN.match(line)
+        if match:
+            headings.append(match.group(2).strip('* '))
+            if len(headings) >= limit:
+                break
+    return headings
@@ -283,8 +283,10 @@ if generate_btn or (auto_run and keyword):
                         # 步骤2: 生成摘要
                         st.write(f"📊 步骤 2/2: 生成情绪摘要...")
                         
-                        # 调用生成函数
-                        digest_result = run_digest_generation(keyword, hours)
+                        # 调用生成函数，流式显示摘要
+                        preview = st.empty()
+                        digest_result = run_digest_generation(keyword, hours, on_partial=preview.markdown)
+                        preview.empty()
                         
                         # 检查摘要生成结果
                         if digest_result["success"]:
@@ -311,7 +313,9 @@ if generate_btn or (auto_run and keyword):
             # 仅生成摘要（使用已有数据）
             with st.spinner(f"正在分析 '{keyword}' 的情绪..."):
                 try:
-                    result = run_digest_generation(keyword, hours)
+                    preview = st.empty()
+                    result = run_digest_generation(keyword, hours, on_partial=preview.markdown)
+                    preview.empty()
                     
                     if result["success"]:
                         render_digest_result(result, keyword)
@@ -0,0 +1,132 @@
+"""
+测试BroadTopicExtraction数据库批量写入
+
+覆盖：
+1. 新闻按批次executemany写入，按news_id覆盖，当天不再出现的旧新闻被删除
+2. 某一批写入失败时只逐条重试该批，跳过出错的行
+3. 话题分析按topic_id覆盖
+4. 历史标题超过上限时保留最近几天的标题
+"""
+
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, event, text
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "MindSpider"))
+
+from BroadTopicExtraction import database_manager
+from BroadTopicExtraction.database_manager import DatabaseManager
+
+SCHEMA = [
+    """
+    CREATE TABLE daily_news (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        news_id VARCHAR(128) NOT NULL UNIQUE,
+        source_platform VARCHAR(32) NOT NULL,
+        title VARCHAR(500) NOT NULL CHECK (title <> 'bad'),
+        url VARCHAR(512),
+        crawl_date DATE NOT NULL,
+        rank_position INTEGER,
+        add_ts BIGINT NOT NULL,
+        last_modify_ts BIGINT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE daily_topics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        topic_id VARCHAR(64) NOT NULL UNIQUE,
+        topic_name VARCHAR(255) NOT NULL,
+        topic_description TEXT,
+        keywords TEXT,
+        extract_date DATE NOT NULL,
+        add_ts BIGINT NOT NULL,
+        last_modify_ts BIGINT NOT NULL
+    )
+    """,
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mindspider.db'}", future=True)
+
+    # pysqlite 默认不支持 SAVEPOINT，按 SQLAlchemy 文档手动开启事务
+    @event.listens_for(engine, "connect")
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    with engine.begin() as conn:
+        for ddl in SCHEMA:
+            conn.execute(text(ddl))
+    manager = DatabaseManager.__new__(DatabaseManager)
+    manager.engine = engine
+    manager.last_write_stats = {}
+    yield manager
+    engine.dispose()
+
+
+def news(n, prefix="weibo"):
+    return [{"id": f"{prefix}_{i}", "title": f"新闻 {i}", "url": "", "source": prefix, "rank": i} for i in range(n)]
+
+
+def test_save_daily_news_upserts_in_batches(db, monkeypatch):
+    monkeypatch.setattr(database_manager, "BATCH_SIZE", 100)
+    day = date(2026, 1, 1)
+    assert db.save_daily_news(news(250), day) == 250
+    assert db.last_write_stats["rows"] == 250
+    assert db.last_write_stats["rows_per_sec"] > 0
+
+    with db.engine.connect() as conn:
+        first_id = conn.execute(text("SELECT id FROM daily_news WHERE news_id = 'weibo_0_20260101'")).scalar()
+
+    # 重新保存：已有新闻原地更新，不再出现的新闻被删除
+    updated = news(100)
+    updated[0]["title"] = "新标题"
+    # 模拟上一次保存发生在10秒前
+    with db.engine.begin() as conn:
+        conn.execute(text("UPDATE daily_news SET last_modify_ts = last_modify_ts - 10"))
+    assert db.save_daily_news(updated, day) == 100
+
+    rows = db.get_daily_news(day)
+    assert len(rows) == 100
+    assert rows[0]["title"] == "新标题"
+    assert rows[0]["id"] == first_id
+
+
+def test_failed_batch_falls_back_to_rows(db):
+    items = news(10)
+    items[3]["title"] = "bad"
+    assert db.save_daily_news(items, date(2026, 1, 2)) == 9
+    assert len(db.get_daily_news(date(2026, 1, 2))) == 9
+
+
+def test_save_daily_topics_upsert(db):
+    day = date(2026, 1, 3)
+    assert db.save_daily_topics(["a", "b"], "总结1", day)
+    assert db.save_daily_topics(["c"], "总结2", day)
+    with db.engine.connect() as conn:
+        rows = conn.execute(text("SELECT keywords, topic_description FROM daily_topics")).all()
+    assert rows == [('["c"]', "总结2")]
+
+
+def test_recent_news_titles_keep_newest(db):
+    today = date.today()
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO daily_news (news_id, source_platform, title, crawl_date, add_ts, last_modify_ts) "
+            "VALUES (:news_id, 'weibo', :title, :crawl_date, :add_ts, :add_ts)"
+        ), [
+            {"news_id": f"n{days}", "title": f"{days}天前", "crawl_date": today - timedelta(days=days), "add_ts": days}
+            for days in (5, 1, 3, 0, 2)
+        ])
+
+    assert db.get_recent_news_titles(days=30, limit=2) == ["1天前", "2天前"]
@@ -0,0 +1,96 @@
+"""
+测试DailyDigest异步LLM适配
+
+覆盖：
+1. 本地模拟模型异步调用不阻塞事件循环，多个关键词的摘要并发生成
+2. 限速器限制并发数与请求间隔
+3. 请求超时抛出TimeoutError
+4. 流式输出逐段回调，Reduce命中缓存时直接回调完整结果
+"""
+
+import asyncio
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from DailyDigest.llm import LLMRateLimiter, StubLLM
+from DailyDigest.map_reduce import DigestPipeline, SummaryCache
+
+
+@dataclass
+class Post:
+    note_id: int
+    add_ts: int
+
+
+POSTS = [Post(note_id=i, add_ts=1_767_225_600_000 + (i % 3) * 3_600_000) for i in range(30)]
+
+
+def format_posts(posts):
+    return "\n".join(str(p.note_id) for p in posts)
+
+
+def test_keywords_digested_concurrently():
+    llm = StubLLM(latency=0.2, rate_limiter=LLMRateLimiter(max_concurrency=16, requests_per_minute=0))
+    pipeline = DigestPipeline(llm.achat, cache=SummaryCache(None), model_name=llm.model_name)
+
+    async def run():
+        return await asyncio.gather(*(pipeline.run(f"KW{i}", 24, POSTS, format_posts) for i in range(4)))
+
+    start = time.monotonic()
+    results = asyncio.run(run())
+    # 每个关键词 3 次 Map + 1 次 Reduce，串行需要 4 * 4 * 0.2 = 3.2 秒
+    assert time.monotonic() - start < 1.0
+    assert llm.calls == 16
+    assert all('"ticker": "STUB"' in text for text, _ in results)
+
+
+def test_rate_limiter_bounds_concurrency_and_interval():
+    limiter = LLMRateLimiter(max_concurrency=2, requests_per_minute=600)
+    active, peak, starts = 0, 0, []
+
+    async def request():
+        nonlocal active, peak
+        async with limiter:
+            starts.append(time.monotonic())
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.25)
+            active -= 1
+
+    async def run():
+        await asyncio.gather(*(request() for _ in range(6)))
+
+    asyncio.run(run())
+    assert peak == 2
+    # 600 次/分钟 即间隔 0.1 秒
+    assert starts[-1] - starts[0] >= 0.45
+
+
+def test_timeout():
+    llm = StubLLM(latency=1.0, timeout=0.1)
+    with pytest.raises(TimeoutError):
+        asyncio.run(llm.achat("hello"))
+
+
+def test_streaming_partial_output():
+    llm = StubLLM(latency=0, chars_per_second=100_000)
+    pipeline = DigestPipeline(llm.achat, cache=SummaryCache(None), model_name=llm.model_name)
+    partials = []
+
+    text, _ = asyncio.run(pipeline.run("TSLA", 24, POSTS, format_posts, on_partial=partials.append))
+    assert len(partials) > 1
+    assert partials[-1] == text
+    assert all(text.startswith(p) for p in partials)
+
+    # Reduce 命中缓存时直接给出完整结果
+    partials.clear()
+    asyncio.run(pipeline.run("TSLA", 24, POSTS, format_posts, on_partial=partials.append))
+    assert partials == [text]
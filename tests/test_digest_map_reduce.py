@@ -0,0 +1,107 @@
+"""
+测试DailyDigest按时段分块的map-reduce摘要
+
+覆盖：
+1. 帖子按抓取时间分时段、时段内按数量分块，所有帖子都参与总结
+2. 块摘要按帖子ID集合缓存，刷新时只总结新时段，没有新帖子时直接复用结果
+3. 窗口起点对齐到时段边界
+4. 缓存写入磁盘，新实例可以复用
+"""
+
+import asyncio
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from DailyDigest.map_reduce import DigestPipeline, SummaryCache, bucket_floor, split_into_chunks
+
+HOUR_MS = 3_600_000
+BASE = 1_767_225_600_000  # 2026-01-01 00:00 UTC
+
+
+@dataclass
+class Post:
+    note_id: int
+    add_ts: int
+    content: str = ""
+
+
+class FakeLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def __call__(self, prompt):
+        self.prompts.append(prompt)
+        return f"summary {len(self.prompts)}"
+
+    @property
+    def map_calls(self):
+        return [p for p in self.prompts if "时段内的" in p]
+
+
+def format_posts(posts):
+    return "\n".join(f"post {p.note_id}" for p in posts)
+
+
+def make_posts(hour, count, start_id=0):
+    return [Post(note_id=start_id + i, add_ts=BASE + hour * HOUR_MS + i * 1000) for i in range(count)]
+
+
+def test_split_covers_every_post():
+    posts = make_posts(0, 120) + make_posts(1, 5, start_id=500)
+    chunks = split_into_chunks(posts, max_posts=50)
+
+    assert [len(c.posts) for c in chunks] == [50, 50, 20, 5]
+    assert sum(len(c.posts) for c in chunks) == len(posts)
+    assert [c.bucket_start for c in chunks] == [BASE] * 3 + [BASE + HOUR_MS]
+
+
+def test_refresh_only_summarizes_new_bucket(tmp_path):
+    llm = FakeLLM()
+    pipeline = DigestPipeline(llm, cache=SummaryCache(tmp_path), max_posts_per_chunk=50)
+    posts = make_posts(0, 60) + make_posts(1, 10, start_id=100)
+
+    _, stats = asyncio.run(pipeline.run("TSLA", 24, posts, format_posts))
+    assert stats == {"chunks": 3, "cached_chunks": 0, "posts": 70, "cached_reduce": False}
+    assert len(llm.map_calls) == 3
+    # Reduce 的输入包含所有块
+    assert llm.prompts[-1].count("条帖子）") == 3
+
+    # 同样的帖子：Map 与 Reduce 都命中缓存
+    llm.prompts.clear()
+    _, stats = asyncio.run(pipeline.run("TSLA", 24, posts, format_posts))
+    assert llm.prompts == []
+    assert stats["cached_reduce"] is True
+
+    # 新抓取的帖子只落在最新时段，只重新总结这一块
+    posts += make_posts(2, 3, start_id=200)
+    _, stats = asyncio.run(pipeline.run("TSLA", 24, posts, format_posts))
+    assert stats["cached_chunks"] == 3
+    assert len(llm.map_calls) == 1
+    assert "post 200" in llm.map_calls[0]
+
+    # 磁盘缓存可以被新实例复用
+    llm2 = FakeLLM()
+    _, stats = asyncio.run(DigestPipeline(llm2, cache=SummaryCache(tmp_path)).run("TSLA", 24, posts, format_posts))
+    assert llm2.prompts == []
+
+
+def test_cache_key_depends_on_keyword_and_model():
+    llm = FakeLLM()
+    cache = SummaryCache(None)
+    posts = make_posts(0, 3)
+    asyncio.run(DigestPipeline(llm, cache=cache, model_name="a").run("TSLA", 24, posts, format_posts))
+    asyncio.run(DigestPipeline(llm, cache=cache, model_name="a").run("NVDA", 24, posts, format_posts))
+    asyncio.run(DigestPipeline(llm, cache=cache, model_name="b").run("TSLA", 24, posts, format_posts))
+    assert len(llm.map_calls) == 3
+
+
+def test_window_start_aligned_to_bucket():
+    pipeline = DigestPipeline(FakeLLM(), cache=SummaryCache(None))
+    now = BASE + 30 * HOUR_MS + 25 * 60_000
+    start = pipeline.window_start(24, now_ms=now)
+    assert start == bucket_floor(start) == BASE + 6 * HOUR_MS
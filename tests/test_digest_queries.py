@@ -0,0 +1,205 @@
+"""
+测试DailyDigest按关键词读取最近帖子的查询与 (source_keyword, add_ts) 索引迁移
+
+覆盖：
+1. 只查询摘要需要的列，按抓取时间倒序，时间窗口与关键词过滤正确
+2. 点赞数前N在SQL中按整数列 like_num 排序截取，没有点赞数的帖子按 0 计排在最后，不被丢弃
+3. yield_per 流式读取返回全部行
+4. 查询计划命中复合索引
+5. 迁移为已有的表补建索引与归一化列并回填存量数据，重复执行不会重复创建
+6. 回填每批单独提交，中断后重新执行从未回填的行继续，迁移完成后才记录版本号
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+from sqlalchemy import BigInteger, Column, Integer, Text, create_engine, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import declarative_base
+
+# 添加项目根目录与 schema 目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "MindSpider" / "schema"))
+
+import migrations
+from DailyDigest.queries import POST_COLUMNS, count_recent_posts_stmt, fetch_rows, recent_posts_stmt, top_posts_stmt
+
+LegacyBase = declarative_base()
+Base = declarative_base()
+
+
+class LegacyNote(LegacyBase):
+    # 与 MediaCrawler 旧版 WeiboNote 一致的相关列：计数为字符串，没有索引与归一化列，由迁移补建
+    __tablename__ = "weibo_note"
+    id = Column(Integer, primary_key=True)
+    nickname = Column(Text)
+    note_id = Column(BigInteger)
+    content = Column(Text)
+    create_time = Column(BigInteger)
+    create_date_time = Column(Text)
+    liked_count = Column(Text)
+    comments_count = Column(Text)
+    shared_count = Column(Text)
+    note_url = Column(Text)
+    add_ts = Column(BigInteger)
+    source_keyword = Column(Text, default="")
+
+
+class Note(Base):
+    # 迁移之后的表结构
+    __table__ = LegacyNote.__table__.to_metadata(Base.metadata)
+    __table__.append_column(Column("like_num", BigInteger))
+
+
+ROWS = [
+    # note_id, liked_count, add_ts, source_keyword
+    (1, "5", 1000, "TSLA"),
+    (2, "120", 2000, "TSLA"),
+    (3, "", 3000, "TSLA"),
+    (4, "30", 4000, "TSLA"),
+    (5, "999", 500, "TSLA"),  # 窗口之外
+    (6, "999", 5000, "NVDA"),  # 其他关键词
+]
+
+
+def run_query(tmp_path, build):
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'digest.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(LegacyBase.metadata.create_all)
+            await conn.execute(LegacyNote.__table__.insert(), [
+                {"note_id": n, "content": f"post {n}", "liked_count": liked, "comments_count": "0",
+                 "note_url": f"https://example.com/{n}", "add_ts": ts, "source_keyword": kw, "nickname": "x"}
+                for n, liked, ts, kw in ROWS
+            ])
+        # 存量数据的 like_num 由迁移回填，迁移自行分批提交
+        async with engine.connect() as conn:
+            await conn.run_sync(migrations.run_migrations)
+        try:
+            async with AsyncSession(engine) as session:
+                return await build(session)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_recent_posts_projects_columns_newest_first(tmp_path):
+    rows = run_query(tmp_path, lambda s: fetch_rows(s, recent_posts_stmt(Note, "TSLA", 1000), yield_per=2))
+
+    assert [r.note_id for r in rows] == [4, 3, 2, 1]
+    assert tuple(rows[0]._fields) == POST_COLUMNS
+    assert rows[0].content == "post 4"
+
+
+def test_top_posts_sorted_in_sql(tmp_path):
+    async def build(session):
+        return [
+            (await session.execute(top_posts_stmt(Note, "TSLA", 1000, limit=limit))).all()
+            for limit in (3, 4)
+        ]
+
+    # note 3 的点赞数为空字符串，回填后 like_num 为 NULL：排在最后，但仍然返回
+    top3, top4 = run_query(tmp_path, build)
+    assert [r.note_id for r in top3] == [2, 4, 1]
+    assert [r.note_id for r in top4] == [2, 4, 1, 3]
+
+
+def test_count_recent_posts(tmp_path):
+    async def build(session):
+        return (await session.execute(count_recent_posts_stmt(Note, "TSLA", 1000))).scalar_one()
+
+    assert run_query(tmp_path, build) == 4
+
+
+def test_query_plan_uses_index(tmp_path):
+    async def build(session):
+        stmt = recent_posts_stmt(Note, "TSLA", 1000)
+        compiled = stmt.compile(compile_kwargs={"literal_binds": True})
+        return (await session.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))).all()
+
+    plan = " ".join(str(row[-1]) for row in run_query(tmp_path, build))
+    assert "idx_weibo_note_kw_add_ts" in plan
+
+
+def test_migrations_add_indexes_and_backfill_once(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    LegacyBase.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(LegacyNote.__table__.insert(), [
+            {"note_id": 1, "liked_count": "1.2万", "comments_count": "", "shared_count": "7",
+             "create_time": 1_700_000_000, "create_date_time": None},
+            {"note_id": 2, "liked_count": "3", "comments_count": None, "shared_count": None,
+             "create_time": None, "create_date_time": "2025-01-02 03:04:05"},
+        ])
+
+    with engine.connect() as conn:
+        assert migrations.run_migrations(conn) == [1, 2, 3]
+    with engine.connect() as conn:
+        assert migrations.run_migrations(conn) == []
+        assert migrations.applied_versions(conn) == {
+            1: "note_source_keyword_add_ts_index",
+            2: "note_normalized_engagement_columns",
+            3: "comment_publish_ts",
+        }
+        rows = conn.execute(text(
+            "SELECT like_num, comment_num, share_num, publish_ts_ms FROM weibo_note ORDER BY id"
+        )).all()
+
+    assert rows[0] == (12000, None, 7, 1_700_000_000_000)
+    assert rows[1][0] == 3
+    assert rows[1][3] == migrations.engagement.parse_publish_ts_ms("2025-01-02 03:04:05")
+
+    indexes = {i["name"]: i["column_names"] for i in inspect(engine).get_indexes("weibo_note")}
+    assert indexes["idx_weibo_note_kw_add_ts"] == ["source_keyword", "add_ts"]
+    assert indexes["idx_weibo_note_kw_like"] == ["source_keyword", "like_num", "add_ts"]
+    assert indexes["idx_weibo_note_publish_ts"][0] == "publish_ts_ms"
+
+
+def test_backfill_in_batches(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'batches.db'}")
+    LegacyBase.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(LegacyNote.__table__.insert(), [{"note_id": i, "liked_count": str(i)} for i in range(25)])
+        migrations.add_column(conn, "weibo_note", "like_num")
+    with engine.connect() as conn:
+        assert migrations.backfill_normalized_columns(conn, "weibo_note", batch_size=10) == 25
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT SUM(like_num) FROM weibo_note")).scalar() == sum(range(25))
+
+
+def test_interrupted_backfill_resumes(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'resume.db'}")
+    LegacyBase.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(LegacyNote.__table__.insert(), [{"note_id": i, "liked_count": str(i + 1)} for i in range(25)])
+
+    # 第三批回填时中断：前两批已经提交，迁移 2 不记录版本号
+    normalized_values = migrations.engagement.normalized_values
+    seen = []
+
+    def interrupted(table, row):
+        seen.append(row["id"])
+        if len(seen) > 20:
+            raise RuntimeError("interrupted")
+        return normalized_values(table, row)
+
+    monkeypatch.setattr(migrations, "BACKFILL_BATCH_SIZE", 10)
+    monkeypatch.setattr(migrations.engagement, "normalized_values", interrupted)
+    with engine.connect() as conn:
+        try:
+            migrations.run_migrations(conn)
+        except RuntimeError:
+            pass
+    with engine.connect() as conn:
+        assert set(migrations.applied_versions(conn)) == {1}
+        assert conn.execute(text("SELECT COUNT(like_num) FROM weibo_note")).scalar() == 20
+
+    # 重新执行只处理剩下的 5 行
+    monkeypatch.setattr(migrations.engagement, "normalized_values", normalized_values)
+    with engine.connect() as conn:
+        assert migrations.backfill_normalized_columns(conn, "weibo_note") == 5
+        assert migrations.run_migrations(conn) == [2, 3]
+        assert conn.execute(text("SELECT SUM(like_num) FROM weibo_note")).scalar() == sum(range(1, 26))
@@ -0,0 +1,94 @@
+"""
+测试BroadTopicExtraction本地关键词提取引擎
+
+覆盖：
+1. 不同平台的近似重复标题合并为一个事件
+2. 多条标题中重复出现的相邻词组合成短语，历史语料中少见的新词得分更高
+3. LLM不可用时直接使用本地候选关键词，提示词只包含去重后的事件
+4. 标题中没有实词时返回空的候选列表
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "MindSpider"))
+
+from BroadTopicExtraction.keyword_engine import LocalKeywordExtractor
+from BroadTopicExtraction.topic_extractor import TopicExtractor
+
+NEWS = [
+    {"title": "华为发布会今晚举行 新款手机亮相", "source": "weibo", "rank": 1},
+    {"title": "华为发布会：新款手机正式亮相", "source": "zhihu", "rank": 2},
+    {"title": "#华为发布会# 新款手机亮相", "source": "douyin", "rank": 4},
+    {"title": "央行宣布降准0.5个百分点", "source": "cls-hot", "rank": 1},
+    {"title": "台风登陆广东 多地停课", "source": "toutiao", "rank": 2},
+    {"title": "国足世预赛客场告负", "source": "tieba", "rank": 3},
+]
+
+
+def test_near_duplicate_headlines_clustered():
+    clusters = LocalKeywordExtractor().cluster_headlines(NEWS)
+    assert len(clusters) == 4
+    assert clusters[0].sources == {"weibo", "zhihu", "douyin"}
+    assert clusters[0].size == 3
+
+
+def test_phrases_and_corpus_idf():
+    extractor = LocalKeywordExtractor()
+    extractor.extract(NEWS)  # 预热jieba词典
+
+    start = time.perf_counter()
+    candidates, _ = extractor.extract(NEWS, top_k=20)
+    assert time.perf_counter() - start < 0.5
+
+    keywords = [c.keyword for c in candidates]
+    assert "华为发布会" in keywords
+    assert keywords.index("华为") < keywords.index("台风")
+
+    # 历史上天天出现的词IDF很低，今天新出现的词排名上升
+    history = ["台风登陆福建", "台风预警升级", "华为手机销量", "华为新品", "华为门店"] * 20
+    assert extractor.build_idf(history) == 100
+    keywords = [c.keyword for c in extractor.extract(NEWS, top_k=20)[0]]
+    assert keywords.index("客场") < keywords.index("华为")
+
+
+def test_titles_without_content_words():
+    news = [{"title": "123 456", "source": "weibo", "rank": 1}, {"title": "！！！", "source": "zhihu", "rank": 2}]
+    candidates, clusters = LocalKeywordExtractor().extract(news)
+    assert candidates == []
+    assert len(clusters) == 2
+
+
+class FailingCompletions:
+    def __init__(self):
+        self.prompts = []
+
+    def create(self, **kwargs):
+        self.prompts.append(kwargs["messages"][-1]["content"])
+        raise RuntimeError("LLM unavailable")
+
+
+class FakeClient:
+    def __init__(self):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = FailingCompletions()
+
+
+def test_extract_falls_back_to_local_keywords():
+    extractor = TopicExtractor.__new__(TopicExtractor)
+    extractor.client = FakeClient()
+    extractor.model = "test"
+    extractor.local_extractor = LocalKeywordExtractor()
+
+    keywords, summary = extractor.extract_keywords_and_summary(NEWS, max_keywords=5)
+
+    assert len(keywords) == 5
+    assert "华为发布会" in keywords or "华为" in keywords
+    assert "6 条热点新闻" in summary
+    prompt = extractor.client.chat.completions.prompts[0]
+    assert "4条今日热点新闻" in prompt
+    assert "3条相似报道" in prompt
+    assert "候选关键词" in prompt
@@ -0,0 +1,165 @@
+"""
+测试DeepSentimentCrawling关键词调度器
+
+覆盖：
+1. 新颖度与热度：新出现、排名靠前的关键词得分更高
+2. 历史产出：每次请求新增内容多的关键词在该平台优先，刚爬过的关键词降权
+3. 预算分配：产出高的平台分到更多关键词，每个平台保留最低配额
+4. 调度记录写入crawling_tasks并参与之后的请求次数统计
+"""
+
+import json
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "MindSpider" / "DeepSentimentCrawling"))
+
+from keyword_scheduler import KeywordScheduler, KeywordSignal
+
+TODAY = date(2026, 3, 10)
+HOUR_MS = 3_600_000
+
+SCHEMA = [
+    """
+    CREATE TABLE daily_topics (
+        topic_id VARCHAR(64) PRIMARY KEY,
+        keywords TEXT,
+        extract_date DATE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE crawling_tasks (
+        task_id VARCHAR(64) PRIMARY KEY,
+        topic_id VARCHAR(64) NOT NULL,
+        platform VARCHAR(32) NOT NULL,
+        search_keywords TEXT NOT NULL,
+        task_status VARCHAR(16),
+        start_time BIGINT,
+        end_time BIGINT,
+        total_crawled INTEGER,
+        success_count INTEGER,
+        error_count INTEGER,
+        error_message TEXT,
+        scheduled_date DATE NOT NULL,
+        add_ts BIGINT NOT NULL,
+        last_modify_ts BIGINT NOT NULL
+    )
+    """,
+    "CREATE TABLE xhs_note (note_id VARCHAR(64), source_keyword TEXT, add_ts BIGINT)",
+    "CREATE TABLE xhs_note_comment (comment_id VARCHAR(64), note_id VARCHAR(64), add_ts BIGINT)",
+    "CREATE TABLE douyin_aweme (aweme_id VARCHAR(64), source_keyword TEXT, add_ts BIGINT)",
+    "CREATE TABLE douyin_aweme_comment (comment_id VARCHAR(64), aweme_id VARCHAR(64), add_ts BIGINT)",
+]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'mindspider.db'}", future=True)
+    with engine.begin() as conn:
+        for ddl in SCHEMA:
+            conn.execute(text(ddl))
+    yield engine
+    engine.dispose()
+
+
+def add_topics(engine, day, keywords):
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO daily_topics VALUES (:id, :keywords, :day)"),
+            {"id": f"summary_{day:%Y%m%d}", "keywords": json.dumps(keywords, ensure_ascii=False), "day": day},
+        )
+
+
+def add_crawl(engine, platform, keyword, notes, hours_ago, comments_per_note=0):
+    """模拟一次爬取：一条调度记录，以及带 source_keyword 的内容和评论"""
+    table, comment_table, id_column = {
+        "xhs": ("xhs_note", "xhs_note_comment", "note_id"),
+        "dy": ("douyin_aweme", "douyin_aweme_comment", "aweme_id"),
+    }[platform]
+    ts = int(time.time() * 1000) - int(hours_ago * HOUR_MS)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO crawling_tasks (task_id, topic_id, platform, search_keywords, start_time, "
+                 "scheduled_date, add_ts, last_modify_ts) VALUES (:id, 't', :platform, :kw, :ts, :day, :ts, :ts)"),
+            {"id": f"{platform}_{keyword}_{ts}", "platform": platform,
+             "kw": json.dumps([keyword], ensure_ascii=False), "ts": ts, "day": TODAY - timedelta(days=1)},
+        )
+        for i in range(notes):
+            note_id = f"{platform}_{keyword}_{ts}_{i}"
+            conn.execute(text(f"INSERT INTO {table} VALUES (:id, :kw, :ts)"), {"id": note_id, "kw": keyword, "ts": ts})
+            for j in range(comments_per_note):
+                conn.execute(text(f"INSERT INTO {comment_table} ({id_column}, comment_id, add_ts) "
+                                  f"VALUES (:id, :cid, :ts)"), {"id": note_id, "cid": f"{note_id}_{j}", "ts": ts})
+
+
+def test_keyword_signals_novelty_and_trend(engine):
+    add_topics(engine, TODAY - timedelta(days=2), ["老话题", "旧闻"])
+    add_topics(engine, TODAY - timedelta(days=1), ["老话题"])
+    add_topics(engine, TODAY, ["新事件", "老话题"])
+
+    signals = {s.keyword: s for s in KeywordScheduler(engine).keyword_signals(TODAY)}
+
+    assert signals["新事件"].novelty == 1
+    assert abs(signals["老话题"].novelty - 1 / 3) < 1e-9
+    assert signals["新事件"].trend > signals["老话题"].trend > signals["旧闻"].trend
+    assert signals["新事件"].relevance > signals["老话题"].relevance
+
+
+def test_yield_and_recency_ordering(engine):
+    add_crawl(engine, "xhs", "高产出", notes=40, hours_ago=48, comments_per_note=2)
+    add_crawl(engine, "xhs", "低产出", notes=1, hours_ago=48)
+    add_crawl(engine, "xhs", "刚爬过", notes=40, hours_ago=0.5)
+    scheduler = KeywordScheduler(engine)
+    signals = [KeywordSignal(k, novelty=1.0, trend=0.5) for k in ["低产出", "刚爬过", "高产出", "没爬过"]]
+
+    yields = scheduler.load_yields(["xhs"], TODAY)["xhs"]
+    assert yields["高产出"].requests == 1
+    assert yields["高产出"].items == 120
+
+    ranked = scheduler.score(signals, "xhs", yields)
+    order = [item.keyword for item in ranked]
+    assert order[0] == "高产出"
+    # 没爬过的关键词按平台平均产出估计，排在低产出之前
+    assert order.index("没爬过") < order.index("低产出")
+    # 刚爬过的关键词即使历史产出高也靠后
+    assert order[-1] == "刚爬过"
+
+
+def test_budget_moves_to_productive_platform(engine):
+    keywords = [f"词{i}" for i in range(8)]
+    for keyword in keywords:
+        add_crawl(engine, "xhs", keyword, notes=30, hours_ago=48)
+        add_crawl(engine, "dy", keyword, notes=1, hours_ago=48)
+    scheduler = KeywordScheduler(engine)
+    signals = [KeywordSignal(k, novelty=1.0, trend=1 - i / 8) for i, k in enumerate(keywords)]
+
+    plan = scheduler.plan(["xhs", "dy"], TODAY, max_keywords_per_platform=4, signals=signals)
+
+    assert sum(len(items) for items in plan.values()) == 8
+    assert len(plan["xhs"]) > len(plan["dy"]) >= 1
+    assert [item.keyword for item in plan["xhs"]][:2] == ["词0", "词1"]
+
+
+def test_record_plan_counts_as_request(engine):
+    add_topics(engine, TODAY, ["新事件"])
+    scheduler = KeywordScheduler(engine)
+
+    task_ids = scheduler.record_plan({"xhs": ["新事件"], "dy": []}, TODAY)
+    assert list(task_ids) == ["xhs"]
+    scheduler.record_result(task_ids["xhs"], {"success": True, "notes_count": 5, "comments_count": 7})
+
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT task_status, total_crawled, success_count FROM crawling_tasks")).one()
+    assert tuple(row) == ("completed", 12, 5)
+
+    stats = scheduler.load_yields(["xhs"], TODAY)["xhs"]["新事件"]
+    assert stats.requests == 1
+    # 刚调度过的关键词在冷却期内降权
+    assert scheduler.score(scheduler.keyword_signals(TODAY), "xhs", {"新事件": stats})[0].recency < 0.2
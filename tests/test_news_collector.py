@@ -0,0 +1,105 @@
+"""
+测试BroadTopicExtraction新闻源并发获取
+
+覆盖：
+1. 所有新闻源并发请求，总耗时接近最慢的单个源，结果按传入顺序返回
+2. 单个新闻源超时不影响其他源
+3. 缓存有效期内不重复下载，过期后发送ETag条件请求并复用304响应
+"""
+
+import asyncio
+import json
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+import httpx
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "MindSpider"))
+
+from BroadTopicExtraction import get_today_news
+from BroadTopicExtraction.get_today_news import NewsCollector
+
+
+class FakeNewsApi:
+    """模拟newsnow接口：每个源返回2条新闻，delays指定各源的响应延迟"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.requests = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        source = request.url.params["id"]
+        self.requests.append((source, request.headers.get("If-None-Match")))
+        await asyncio.sleep(self.delays.get(source, 0.2))
+        etag = f'"{source}-v1"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        items = [{"id": f"{source}{i}", "title": f"{source} 新闻 {i}", "url": ""} for i in range(2)]
+        return httpx.Response(200, json={"items": items}, headers={"ETag": etag})
+
+
+@pytest.fixture
+def make_collector(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_today_news, "DatabaseManager", lambda: None)
+
+    def factory(api, **kwargs):
+        transport = httpx.MockTransport(api)
+        monkeypatch.setattr(get_today_news.httpx, "AsyncClient", partial(httpx.AsyncClient, transport=transport))
+        kwargs.setdefault("cache_dir", tmp_path / "cache")
+        return NewsCollector(**kwargs)
+
+    return factory
+
+
+def test_sources_fetched_concurrently(make_collector):
+    sources = ["weibo", "zhihu", "toutiao", "douyin", "tieba", "xueqiu"]
+    api = FakeNewsApi({"zhihu": 0.6})
+    collector = make_collector(api, max_concurrency=6)
+
+    start = time.monotonic()
+    results = asyncio.run(collector.get_popular_news(sources))
+    elapsed = time.monotonic() - start
+
+    # 串行需要 0.2 * 5 + 0.6 = 1.6 秒，并发后接近最慢的 zhihu
+    assert elapsed < 1.0
+    assert [r["source"] for r in results] == sources
+    assert all(r["status"] == "success" for r in results)
+    assert collector._process_news_results(results)["total_news"] == 12
+
+
+def test_slow_source_times_out(make_collector):
+    api = FakeNewsApi({"zhihu": 5})
+    collector = make_collector(api, source_timeout=0.5, cache_dir=None)
+
+    start = time.monotonic()
+    results = asyncio.run(collector.get_popular_news(["weibo", "zhihu"]))
+
+    assert time.monotonic() - start < 2
+    assert [r["status"] for r in results] == ["success", "timeout"]
+
+
+def test_disk_cache_and_conditional_request(make_collector, tmp_path):
+    api = FakeNewsApi({})
+    collector = make_collector(api, cache_ttl=60)
+
+    asyncio.run(collector.get_popular_news(["weibo"]))
+    # 有效期内重复运行不再请求
+    results = asyncio.run(collector.get_popular_news(["weibo"]))
+    assert len(api.requests) == 1
+    assert results[0]["cached"] is True
+
+    # 缓存过期后带上ETag，304时沿用缓存内容
+    cache_file = next((tmp_path / "cache").glob("weibo_*.json"))
+    entry = json.loads(cache_file.read_text(encoding="utf-8"))
+    entry["fetched_at"] -= 120
+    cache_file.write_text(json.dumps(entry), encoding="utf-8")
+
+    results = asyncio.run(collector.get_popular_news(["weibo"]))
+    assert api.requests[-1] == ("weibo", '"weibo-v1"')
+    assert results[0]["status"] == "success"
+    assert len(results[0]["data"]["items"]) == 2
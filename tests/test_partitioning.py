@@ -0,0 +1,366 @@
+"""
+测试内容表/评论表按月分区与归档
+
+覆盖：
+1. 月份换算与分区边界（月初毫秒时间戳）
+2. 转换时分区月份的规划：最早数据所在月到未来几个月，历史过长时截断到 p_old
+3. MySQL PARTITION BY RANGE 子句与 PostgreSQL 月分区 DDL
+4. 从分区名解析月份，过期分区的判断
+5. 迁移为评论表补充并回填 publish_ts_ms
+6. 分区数据写入压缩的 Parquet 文件（需要 pyarrow）
+7. 记录执行的 DDL：归档先把分区移出在线表（DETACH / EXCHANGE）再计数导出，失败时放回；
+   PostgreSQL/MySQL 转换的语句顺序，分区键缺失时按当前时间计
+8. 归档任务为每张分区表补建未来的分区
+"""
+
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import BigInteger, Column, Integer, Text, create_engine, inspect, text
+from sqlalchemy.dialects import mysql, postgresql
+from sqlalchemy.orm import declarative_base
+
+# 添加 schema 目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "MindSpider" / "schema"))
+
+import migrations
+import partitioning
+from partitioning import (
+    Partition,
+    PartitionManager,
+    add_months,
+    month_range,
+    month_ts_ms,
+    mysql_partition_clause,
+    plan_months,
+    postgres_partition_ddl,
+)
+
+Base = declarative_base()
+
+
+class RecordingConnection:
+    """记录执行的 SQL，按关键字返回预设的标量结果"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.dialect = engine.dialect
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.engine.statements.append(sql)
+        value = next((v for k, v in self.engine.scalars.items() if k in sql), None)
+        return _Result(value)
+
+    def execution_options(self, **kwargs):
+        return self
+
+
+class _Result:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+    def scalar_one(self):
+        return self.value
+
+
+class RecordingEngine:
+    def __init__(self, dialect, scalars=None):
+        self.dialect = dialect
+        self.statements = []
+        self.scalars = scalars or {}
+
+    @contextmanager
+    def begin(self):
+        yield RecordingConnection(self)
+
+    connect = begin
+
+    def index_of(self, fragment):
+        return next(i for i, sql in enumerate(self.statements) if fragment in sql)
+
+
+class FakeInspector:
+    def __init__(self, indexes=(), foreign_keys=()):
+        self.indexes = list(indexes)
+        self.foreign_keys = list(foreign_keys)
+
+    def has_table(self, table):
+        return True
+
+    def get_columns(self, table):
+        return [{"name": "id", "type": Integer()}, {"name": "publish_ts_ms", "type": BigInteger()}]
+
+    def get_indexes(self, table):
+        return self.indexes
+
+    def get_foreign_keys(self, table):
+        return self.foreign_keys
+
+
+@pytest.fixture
+def fake_inspector(monkeypatch):
+    inspector = FakeInspector()
+    monkeypatch.setattr(partitioning, "inspect", lambda conn: inspector)
+    monkeypatch.setattr(migrations, "inspect", lambda conn: inspector)
+    return inspector
+
+
+class LegacyComment(Base):
+    # 迁移前的 weibo_note_comment：没有 publish_ts_ms
+    __tablename__ = "weibo_note_comment"
+    id = Column(Integer, primary_key=True)
+    comment_id = Column(BigInteger)
+    content = Column(Text)
+    create_time = Column(BigInteger)
+    create_date_time = Column(Text)
+    add_ts = Column(BigInteger)
+
+
+def test_month_helpers():
+    assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+    assert month_range(date(2025, 11, 15), date(2026, 1, 3)) == [date(2025, 11, 1), date(2025, 12, 1), date(2026, 1, 1)]
+    assert month_ts_ms(date(2025, 3, 1)) == int(datetime(2025, 3, 1).timestamp() * 1000)
+
+
+def test_plan_months():
+    today = date(2025, 6, 20)
+    # 空表：本月到未来 3 个月
+    assert plan_months(None, today) == month_range(date(2025, 6, 1), date(2025, 9, 1))
+    # 最早数据在 2025-04
+    april = int(datetime(2025, 4, 10).timestamp() * 1000)
+    assert plan_months(april, today)[0] == date(2025, 4, 1)
+    # 历史过长时只为最近 max_history_months 个月单独建分区
+    old = int(datetime(2015, 1, 1).timestamp() * 1000)
+    assert plan_months(old, today, max_history_months=2)[0] == date(2025, 4, 1)
+
+
+def test_mysql_partition_clause():
+    clause = mysql_partition_clause([date(2025, 5, 1), date(2025, 6, 1)])
+    assert clause.startswith("PARTITION BY RANGE (publish_ts_ms)")
+    assert f"PARTITION p_old VALUES LESS THAN ({month_ts_ms(date(2025, 5, 1))})" in clause
+    assert f"PARTITION p202505 VALUES LESS THAN ({month_ts_ms(date(2025, 6, 1))})" in clause
+    assert f"PARTITION p202506 VALUES LESS THAN ({month_ts_ms(date(2025, 7, 1))})" in clause
+    assert clause.rstrip(")").endswith("PARTITION p_max VALUES LESS THAN MAXVALUE\n")
+
+
+def test_postgres_partition_ddl():
+    ddl = postgres_partition_ddl("xhs_note", date(2025, 12, 1))
+    assert ddl == (
+        'CREATE TABLE IF NOT EXISTS "xhs_note_p202512" PARTITION OF "xhs_note" '
+        f"FOR VALUES FROM ({month_ts_ms(date(2025, 12, 1))}) TO ({month_ts_ms(date(2026, 1, 1))})"
+    )
+
+
+def test_partition_month_and_expired():
+    partitions = [
+        Partition("p_old", month_ts_ms(date(2024, 1, 1))),
+        Partition("weibo_note_p202401", month_ts_ms(date(2024, 2, 1))),
+        Partition("p202402", month_ts_ms(date(2024, 3, 1))),
+        Partition("p_max", None),
+    ]
+    assert [p.month for p in partitions] == [None, date(2024, 1, 1), date(2024, 2, 1), None]
+
+    class Manager(PartitionManager):
+        def __init__(self):
+            pass
+
+        def list_partitions(self, conn, table):
+            return partitions
+
+    # 2024-02 的分区跨越 cutoff，保留
+    expired = Manager().expired_partitions(None, "weibo_note", date(2024, 2, 15))
+    assert [p.name for p in expired] == ["p_old", "weibo_note_p202401"]
+
+
+def test_partitioned_tables_cover_contents_and_comments():
+    assert "weibo_note" in partitioning.PARTITIONED_TABLES
+    assert "weibo_note_comment" in partitioning.PARTITIONED_TABLES
+    assert "tieba_comment" in partitioning.PARTITIONED_TABLES
+
+
+def test_sqlite_not_supported():
+    with pytest.raises(ValueError):
+        PartitionManager(create_engine("sqlite://"))
+
+
+def test_comment_publish_ts_migration(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'comments.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(LegacyComment.__table__.insert(), [
+            {"comment_id": 1, "create_time": 1_700_000_000, "create_date_time": None},
+            {"comment_id": 2, "create_time": None, "create_date_time": "2025-01-02 03:04:05"},
+        ])
+    with engine.connect() as conn:
+        migrations.run_migrations(conn)
+        rows = conn.execute(text("SELECT publish_ts_ms FROM weibo_note_comment ORDER BY id")).scalars().all()
+
+    assert rows == [1_700_000_000_000, migrations.engagement.parse_publish_ts_ms("2025-01-02 03:04:05")]
+    indexes = {i["name"]: i["column_names"] for i in inspect(engine).get_indexes("weibo_note_comment")}
+    assert indexes["idx_weibo_note_comment_publish_ts"] == ["publish_ts_ms"]
+
+
+def test_write_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    columns = [
+        {"name": "id", "type": Integer()},
+        {"name": "content", "type": Text()},
+        {"name": "publish_ts_ms", "type": BigInteger()},
+    ]
+    batches = iter([
+        [{"id": 1, "content": "a", "publish_ts_ms": 1}, {"id": 2, "content": None, "publish_ts_ms": 2}],
+        [{"id": 3, "content": 3, "publish_ts_ms": 3}],
+    ])
+    path = tmp_path / "weibo_note" / "weibo_note_p202401.parquet"
+
+    assert partitioning.write_parquet(path, columns, batches) == 3
+    table = pq.read_table(path)
+    assert table.column("content").to_pylist() == ["a", None, "3"]
+    assert not path.with_suffix(".parquet.tmp").exists()
+
+
+def test_archive_mysql_exchanges_partition_out_first(tmp_path, monkeypatch, fake_inspector):
+    engine = RecordingEngine(mysql.dialect(), {
+        "COUNT(*) FROM weibo_note_p202401_archive": 3,
+        "COUNT(*) FROM weibo_note PARTITION": 0,
+    })
+    manager = PartitionManager(engine, archive_dir=tmp_path)
+    partition = Partition("p202401", 0)
+
+    monkeypatch.setattr(partitioning, "write_parquet", lambda path, columns, batches: 3)
+    path = manager.archive_partition("weibo_note", partition)
+    assert path == tmp_path / "weibo_note" / "weibo_note_p202401.parquet"
+    # 先换出到暂存表，再从暂存表计数导出，最后删除暂存表与已空的分区
+    order = [
+        engine.index_of("CREATE TABLE weibo_note_p202401_archive LIKE weibo_note"),
+        engine.index_of("EXCHANGE PARTITION p202401 WITH TABLE weibo_note_p202401_archive"),
+        engine.index_of("SELECT COUNT(*) FROM weibo_note_p202401_archive"),
+        engine.index_of("DROP TABLE weibo_note_p202401_archive"),
+        engine.index_of("LOCK TABLES weibo_note WRITE"),
+        engine.index_of("DROP PARTITION p202401"),
+    ]
+    assert order == sorted(order)
+
+    # 换出期间分区中又写入了数据：保留分区
+    engine.statements.clear()
+    engine.scalars["COUNT(*) FROM weibo_note PARTITION"] = 2
+    manager.archive_partition("weibo_note", partition)
+    assert not any("DROP PARTITION" in sql for sql in engine.statements)
+
+    # 写入的行数与计数不一致：换回原表，期间写入的数据插回，不删除分区
+    engine.statements.clear()
+    monkeypatch.setattr(partitioning, "write_parquet", lambda path, columns, batches: 2)
+    with pytest.raises(RuntimeError):
+        manager.archive_partition("weibo_note", partition)
+    exchanges = [i for i, sql in enumerate(engine.statements) if "EXCHANGE PARTITION" in sql]
+    assert len(exchanges) == 2
+    assert exchanges[1] < engine.index_of("INSERT INTO weibo_note SELECT * FROM weibo_note_p202401_archive")
+    assert not any("DROP PARTITION" in sql for sql in engine.statements)
+
+
+def test_archive_postgres_detaches_partition_first(tmp_path, monkeypatch, fake_inspector):
+    bound = f"FOR VALUES FROM ({month_ts_ms(date(2024, 1, 1))}) TO ({month_ts_ms(date(2024, 2, 1))})"
+    engine = RecordingEngine(postgresql.dialect(), {"pg_get_expr": bound, "COUNT(*)": 3})
+    manager = PartitionManager(engine, archive_dir=tmp_path)
+    partition = Partition("weibo_note_p202401", month_ts_ms(date(2024, 2, 1)))
+
+    monkeypatch.setattr(partitioning, "write_parquet", lambda path, columns, batches: 3)
+    assert manager.archive_partition("weibo_note", partition).name == "weibo_note_p202401.parquet"
+    order = [
+        engine.index_of("DETACH PARTITION weibo_note_p202401"),
+        engine.index_of("SELECT COUNT(*) FROM weibo_note_p202401"),
+        engine.index_of("DROP TABLE weibo_note_p202401"),
+    ]
+    assert order == sorted(order)
+
+    # 导出失败：分离期间进入默认分区的数据移回子表后重新挂载，不删除
+    engine.statements.clear()
+
+    def fail(path, columns, batches):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(partitioning, "write_parquet", fail)
+    with pytest.raises(OSError):
+        manager.archive_partition("weibo_note", partition)
+    order = [
+        engine.index_of("INSERT INTO weibo_note_p202401 SELECT * FROM weibo_note_p_default"),
+        engine.index_of(f"ALTER TABLE weibo_note ATTACH PARTITION weibo_note_p202401 {bound}"),
+    ]
+    assert order == sorted(order)
+    assert not any(sql.startswith("DROP") for sql in engine.statements)
+
+
+def test_convert_postgres_statement_order(fake_inspector):
+    fake_inspector.indexes = [{"name": "idx_weibo_note_note_id", "column_names": ["note_id"], "unique": True}]
+    engine = RecordingEngine(postgresql.dialect(), {"pg_get_serial_sequence": "public.weibo_note_id_seq"})
+    with engine.begin() as conn:
+        PartitionManager(engine)._convert_postgres(conn, "weibo_note", [date(2025, 5, 1), date(2025, 6, 1)])
+
+    order = [
+        engine.index_of('ALTER TABLE weibo_note RENAME TO weibo_note_unpartitioned'),
+        engine.index_of("CREATE TABLE weibo_note (LIKE weibo_note_unpartitioned"),
+        engine.index_of("INSERT INTO weibo_note SELECT * FROM weibo_note_unpartitioned"),
+        engine.index_of("ALTER SEQUENCE public.weibo_note_id_seq OWNED BY weibo_note.id"),
+        engine.index_of("DROP TABLE weibo_note_unpartitioned"),
+        engine.index_of("CREATE INDEX IF NOT EXISTS idx_weibo_note_note_id"),
+    ]
+    assert order == sorted(order)
+    # 默认值为当前时间，不是会落入 p_old 的 0
+    assert "SET DEFAULT (EXTRACT(EPOCH FROM now()) * 1000)::bigint" in engine.statements[order[1] + 1]
+    assert engine.index_of(postgres_partition_ddl("weibo_note", date(2025, 6, 1))) < order[2]
+
+
+def test_convert_mysql_statement_order(fake_inspector):
+    fake_inspector.indexes = [{"name": "idx_weibo_note_note_id", "column_names": ["note_id"], "unique": True}]
+    fake_inspector.foreign_keys = [{"name": "fk_weibo_note_user"}]
+    engine = RecordingEngine(mysql.dialect())
+    months = [date(2025, 5, 1), date(2025, 6, 1)]
+    with engine.begin() as conn:
+        PartitionManager(engine)._convert_mysql(conn, "weibo_note", months)
+
+    order = [
+        engine.index_of("DROP FOREIGN KEY fk_weibo_note_user"),
+        engine.index_of("DROP INDEX idx_weibo_note_note_id"),
+        engine.index_of("MODIFY publish_ts_ms BIGINT NOT NULL DEFAULT (UNIX_TIMESTAMP() * 1000)"),
+        engine.index_of("DROP PRIMARY KEY, ADD PRIMARY KEY (id, publish_ts_ms)"),
+        engine.index_of(mysql_partition_clause(months)),
+    ]
+    assert order == sorted(order)
+
+
+def test_fill_missing_keys_uses_current_time(fake_inspector):
+    engine = RecordingEngine(mysql.dialect())
+    with engine.begin() as conn:
+        PartitionManager(engine)._fill_missing_keys(conn, "weibo_note")
+    assert "SET publish_ts_ms = COALESCE(NULLIF(add_ts, 0), (UNIX_TIMESTAMP() * 1000))" in engine.statements[0]
+
+
+def test_archive_expired_extends_future_partitions(fake_inspector):
+    extended = []
+
+    class Manager(PartitionManager):
+        def list_partitions(self, conn, table):
+            return [Partition("p202401", month_ts_ms(date(2024, 2, 1))), Partition("p_max", None)]
+
+        def ensure_future_partitions(self, conn, table, today=None, months_ahead=3):
+            extended.append(table)
+            return []
+
+    manager = Manager(RecordingEngine(mysql.dialect()), tables=["weibo_note", "weibo_note_comment"])
+    assert manager.archive_expired(date(2025, 1, 1), dry_run=True) == {
+        "weibo_note": ["p202401"], "weibo_note_comment": ["p202401"],
+    }
+    assert extended == []
+
+    manager.archive_partition = lambda table, partition: None
+    manager.archive_expired(date(2025, 1, 1), dry_run=False)
+    assert extended == ["weibo_note", "weibo_note_comment"]
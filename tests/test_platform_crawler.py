@@ -0,0 +1,96 @@
+"""
+测试DeepSentimentCrawling多平台并发爬取调度
+
+覆盖：
+1. 各平台爬虫进程并发运行，配置通过环境变量独立传入
+2. 实时解析爬虫输出中的统计信息
+3. 超时终止进程与失败重试
+"""
+
+import json
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / "MindSpider" / "DeepSentimentCrawling"))
+
+from platform_crawler import MEDIACRAWLER_CONFIG_ENV, PlatformCrawler
+
+
+# 模拟 MediaCrawler/main.py：按传入的平台配置决定行为
+FAKE_MAIN = textwrap.dedent(f"""
+    import json, os, sys, time
+    run_config = json.loads(os.environ["{MEDIACRAWLER_CONFIG_ENV}"])
+    platform = run_config["PLATFORM"]
+    with open(f"{{platform}}.config.json", "w", encoding="utf-8") as f:
+        json.dump({{"config": run_config, "argv": sys.argv[1:]}}, f, ensure_ascii=False)
+    if platform == "dy":
+        time.sleep(30)
+    if platform == "ks" and not os.path.exists("ks.failed"):
+        open("ks.failed", "w").close()
+        print("2026-01-01 12:00:00 ERROR 请求异常")
+        sys.exit(1)
+    time.sleep(1)
+    print("2026-01-01 12:00:00 INFO 共爬取 {{}} 条内容".format(run_config["CRAWLER_MAX_NOTES_COUNT"]))
+    print("2026-01-01 12:00:01 INFO 共爬取 12 条评论")
+""")
+
+
+@pytest.fixture
+def crawler(tmp_path, monkeypatch):
+    (tmp_path / "main.py").write_text(FAKE_MAIN, encoding="utf-8")
+    crawler = PlatformCrawler(max_workers=4, timeout=10, max_retries=1, retry_delay=0)
+    crawler.mediacrawler_path = tmp_path
+    monkeypatch.setattr(crawler, "configure_mediacrawler_db", lambda: True)
+    return crawler
+
+
+def test_run_crawler_passes_isolated_config(crawler, tmp_path):
+    result = crawler.run_crawler("xhs", ["科技", "AI"], max_notes=7)
+
+    assert result["success"] is True
+    assert result["notes_count"] == 7
+    assert result["comments_count"] == 12
+    assert result["attempts"] == 1
+
+    recorded = json.loads((tmp_path / "xhs.config.json").read_text(encoding="utf-8"))
+    assert recorded["config"]["KEYWORDS"] == "科技,AI"
+    assert recorded["config"]["CRAWLER_MAX_NOTES_COUNT"] == 7
+    assert recorded["argv"][recorded["argv"].index("--keywords") + 1] == "科技,AI"
+    assert crawler.get_crawl_statistics()["platforms_crawled"] == ["xhs"]
+
+
+def test_multi_platform_runs_concurrently(crawler, tmp_path):
+    start = time.monotonic()
+    stats = crawler.run_multi_platform_crawl_by_keywords(["科技"], ["xhs", "bili", "wb", "zhihu"], max_notes_per_keyword=5)
+    elapsed = time.monotonic() - start
+
+    assert stats["successful_tasks"] == 4
+    assert stats["total_notes"] == 20
+    # 每个平台约1秒，串行至少4秒
+    assert elapsed < 3
+    ports = {json.loads((tmp_path / f"{p}.config.json").read_text())["config"]["CDP_DEBUG_PORT"]
+             for p in ["xhs", "bili", "wb", "zhihu"]}
+    assert len(ports) == 4
+
+
+def test_timeout_and_retry(crawler):
+    crawler.timeout = 2
+    stats = crawler.run_multi_platform_crawl_by_keywords(["科技"], ["dy", "ks"])
+
+    dy = stats["keyword_results"]["科技"]["dy"]
+    assert dy["success"] is False
+    assert dy["error"] == "爬取超时"
+    assert dy["attempts"] == 2
+
+    ks = stats["keyword_results"]["科技"]["ks"]
+    assert ks["success"] is True
+    assert ks["attempts"] == 2
+    assert stats["successful_tasks"] == 1
+    assert stats["failed_tasks"] == 1
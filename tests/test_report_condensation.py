@@ -0,0 +1,128 @@
+"""
+测试ReportEngine输入压缩（map-reduce）相关逻辑
+
+覆盖：
+1. Markdown报告与论坛日志的切分
+2. 低于阈值时不调用LLM
+3. 压缩结果按内容哈希缓存，重复运行不再调用LLM
+4. 超过三份或少于三份报告时按位置对应，不丢失、不错位
+5. 摘要加来源索引不超过预算
+"""
+
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ReportEngine.nodes.content_condensation_node import ContentCondensationNode
+from ReportEngine.utils.text_processing import split_markdown_sections, split_forum_log
+
+
+class FakeLLMClient:
+    """记录调用次数的假LLM客户端"""
+
+    def __init__(self, reply="要点摘要"):
+        self.calls = 0
+        self.reply = reply
+        self._lock = threading.Lock()
+
+    def stream_invoke_to_string(self, system_prompt, user_prompt, **kwargs):
+        with self._lock:
+            self.calls += 1
+        return self.reply
+
+
+def _make_report(sections: int, section_chars: int) -> str:
+    parts = ["# 测试报告"]
+    for i in range(sections):
+        parts.append(f"## 第{i}节")
+        parts.append("内容" * (section_chars // 2))
+    return "\n".join(parts)
+
+
+class TestReportCondensation:
+    """测试ContentCondensationNode"""
+
+    def setup_method(self):
+        """每个测试方法前的初始化"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.llm = FakeLLMClient()
+
+    def _make_node(self, **kwargs):
+        params = dict(cache_dir=self.cache_dir, trigger_chars=2000, chunk_chars=500,
+                      max_digest_chars=1500, max_workers=2)
+        params.update(kwargs)
+        return ContentCondensationNode(self.llm, **params)
+
+    def test_split_markdown_sections_keeps_titles(self):
+        """测试按标题切分且每块不超过上限"""
+        chunks = split_markdown_sections(_make_report(3, 400), 500)
+        assert all(len(chunk['content']) <= 500 for chunk in chunks)
+        assert any('第1节' in chunk['title'] for chunk in chunks)
+
+    def test_split_forum_log_time_range(self):
+        """测试论坛日志切分保留时间范围与发言方"""
+        log = "\n".join(f"[12:00:0{i}] [QUERY] 发言{i}" for i in range(5))
+        chunks = split_forum_log(log, 1000)
+        assert len(chunks) == 1
+        assert chunks[0]['title'] == "论坛 12:00:00-12:00:04 [QUERY]"
+
+    def test_below_threshold_passthrough(self):
+        """测试输入较短时原样返回且不调用LLM"""
+        node = self._make_node()
+        result = node.run({'reports': ["短报告", "", "短报告"], 'forum_logs': "[12:00:00] [QUERY] 你好"})
+        assert result['condensed'] is False
+        assert result['reports'] == ["短报告", "", "短报告"]
+        assert self.llm.calls == 0
+
+    def test_condense_adds_citations_and_bounds_size(self):
+        """测试压缩后带引用标记且总长度受控"""
+        report = _make_report(10, 400)
+        node = self._make_node()
+        result = node.run({'reports': [report, report, report], 'forum_logs': ""})
+        assert result['condensed'] is True
+        assert self.llm.calls > 0
+        assert "[Q1]" in result['reports'][0]
+        assert "[M1]" in result['reports'][1]
+        assert "Q1" in result['citations']
+        assert sum(len(r) for r in result['reports']) < len(report) * 3
+
+    def test_digest_cached_by_content_hash(self):
+        """测试相同输入的第二次运行命中缓存"""
+        report = _make_report(10, 400)
+        first = self._make_node().run({'reports': [report, report, report], 'forum_logs': ""})
+        calls = self.llm.calls
+        # 新实例只能依靠磁盘缓存
+        second = self._make_node().run({'reports': [report, report, report], 'forum_logs': ""})
+        assert self.llm.calls == calls
+        assert first == second
+
+    def test_reports_keyed_by_position(self):
+        """测试第四份报告不被丢弃，两份报告时各自保持原位"""
+        report = _make_report(10, 400)
+        result = self._make_node().run({'reports': [report] * 4, 'forum_logs': ""})
+        assert len(result['reports']) == 4
+        assert "[R4-1]" in result['reports'][3]
+        assert "R4-1" in result['citations']
+
+        result = self._make_node().run({'reports': [report, "短报告"], 'sources': ['query', 'insight'],
+                                        'forum_logs': report})
+        assert len(result['reports']) == 2
+        assert "[Q1]" in result['reports'][0]
+        assert result['reports'][1] == "短报告"
+        assert "[F1]" in result['forum_logs']
+
+    def test_digest_with_legend_within_budget(self):
+        """测试LLM输出过长时，摘要截断后加上来源索引仍不超过预算"""
+        self.llm = FakeLLMClient(reply="长" * 5000)
+        node = self._make_node()
+        report = _make_report(10, 400)
+        result = node.run({'reports': [report, report, report], 'forum_logs': ""})
+        budgets = node._allocate_budgets({'query': len(report), 'media': len(report),
+                                          'insight': len(report), 'forum': 0})
+        assert "来源索引" in result['reports'][0]
+        assert len(result['reports'][0]) <= budgets['query']
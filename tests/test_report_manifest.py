@@ -0,0 +1,77 @@
+"""
+测试utils/report_manifest.py中的报告清单
+
+覆盖：
+1. 记录追加与增量读取
+2. 按引擎、查询、时间过滤的最新报告查找
+3. 写了一半的记录与清单被截断时的处理
+"""
+
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.report_manifest import ReportManifest, record_report
+
+
+class TestReportManifest:
+    """测试ReportManifest"""
+
+    def setup_method(self):
+        """每个测试方法前的初始化"""
+        self.manifest_path = os.path.join(tempfile.mkdtemp(), "manifest.jsonl")
+        self.manifest = ReportManifest(self.manifest_path)
+
+    def test_missing_manifest(self):
+        """测试清单不存在时返回空"""
+        assert self.manifest.refresh() == []
+        assert self.manifest.get_latest("query") is None
+
+    def test_incremental_refresh_and_subscribe(self):
+        """测试只读取新增记录并通知订阅者"""
+        received = []
+        self.manifest.subscribe(received.append)
+
+        record_report("query", "武汉大学", "a.md", "内容A", manifest_path=self.manifest_path)
+        assert len(self.manifest.refresh()) == 1
+        assert self.manifest.refresh() == []
+
+        record_report("media", "武汉大学", "b.md", "内容B", manifest_path=self.manifest_path)
+        assert [r['engine'] for r in self.manifest.refresh()] == ["media"]
+        assert [r['path'] for r in received] == ["a.md", "b.md"]
+
+    def test_latest_by_query_and_since(self):
+        """测试按查询与时间查找最新报告"""
+        record_report("query", "武汉大学", "old.md", "旧", manifest_path=self.manifest_path)
+        session_start = time.time()
+        record_report("query", "  武汉大学 ", "new.md", "新", manifest_path=self.manifest_path)
+        record_report("query", "其他话题", "other.md", "其他", manifest_path=self.manifest_path)
+
+        assert self.manifest.get_latest("query")['path'] == "other.md"
+        assert self.manifest.get_latest("query", query="武汉大学")['path'] == "new.md"
+        assert self.manifest.get_latest("query", query="武汉大学", since=session_start)['path'] == "new.md"
+        assert self.manifest.get_latest("media") is None
+        assert self.manifest.get_latest("query", since=time.time() + 10) is None
+
+    def test_partial_line_and_truncation(self):
+        """测试不完整记录延后解析，清单截断后重新建立索引"""
+        record_report("query", "q", "a.md", "A", manifest_path=self.manifest_path)
+        with open(self.manifest_path, 'a', encoding='utf-8') as f:
+            f.write('{"engine": "media", "query_key": "q", "path": "b.md", "ts": 1')
+        assert len(self.manifest.refresh()) == 1
+
+        with open(self.manifest_path, 'a', encoding='utf-8') as f:
+            f.write('.0}\n')
+        assert [r['path'] for r in self.manifest.refresh()] == ["b.md"]
+
+        open(self.manifest_path, 'w').close()
+        record_report("insight", "q", "c.md", "C", manifest_path=self.manifest_path)
+        self.manifest.refresh()
+        assert self.manifest.get_latest("query") is None
+        assert self.manifest.get_latest("insight")['path'] == "c.md"
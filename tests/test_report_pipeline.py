@@ -0,0 +1,121 @@
+"""
+测试ReportEngine阶段流水线
+
+覆盖：
+1. 无依赖关系的阶段并发执行，依赖阶段等待上游完成
+2. 每个阶段的耗时与状态记录
+3. 阶段失败或任务取消时跳过后续阶段
+4. 阶段耗时随任务持久化
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ReportEngine.utils.pipeline import StagePipeline
+from ReportEngine.utils.cancellation import ReportCancelledError, cancellation_scope, raise_if_cancelled
+from ReportEngine.task_queue import ReportTask, ReportTaskStore
+
+
+def _sleep_stage(seconds: float, value):
+    def stage(results):
+        time.sleep(seconds)
+        return value
+    return stage
+
+
+def test_independent_stages_run_concurrently():
+    pipeline = StagePipeline(max_workers=2)
+    pipeline.add_stage('load', lambda results: 'inputs')
+    pipeline.add_stage('select', _sleep_stage(0.3, 'template'), depends_on=['load'])
+    pipeline.add_stage('condense', _sleep_stage(0.3, 'digest'), depends_on=['load'])
+    pipeline.add_stage('html', lambda results: results['select'] + '+' + results['condense'],
+                       depends_on=['select', 'condense'])
+
+    start = time.monotonic()
+    results = pipeline.run()
+    elapsed = time.monotonic() - start
+
+    assert results['html'] == 'template+digest'
+    assert elapsed < 0.55
+    assert all(info['status'] == 'completed' for info in pipeline.timings.values())
+    assert pipeline.timings['select']['duration'] >= 0.3
+    assert pipeline.timings['html']['start'] >= pipeline.timings['condense']['duration']
+
+
+def test_stage_callback_reports_each_transition():
+    events = []
+    pipeline = StagePipeline(on_stage=lambda name, status, timings: events.append((name, status)))
+    pipeline.add_stage('a', lambda results: 1)
+    pipeline.add_stage('b', lambda results: results['a'] + 1, depends_on=['a'])
+
+    assert pipeline.run()['b'] == 2
+    assert events == [('a', 'running'), ('a', 'completed'), ('b', 'running'), ('b', 'completed')]
+
+
+def test_failed_stage_skips_downstream():
+    def fail(results):
+        raise ValueError("boom")
+
+    pipeline = StagePipeline()
+    pipeline.add_stage('a', fail)
+    pipeline.add_stage('b', lambda results: 1, depends_on=['a'])
+
+    with pytest.raises(ValueError):
+        pipeline.run()
+    assert pipeline.timings['a']['status'] == 'failed'
+    assert pipeline.timings['b']['status'] == 'skipped'
+
+
+def test_unknown_dependency_rejected():
+    pipeline = StagePipeline()
+    with pytest.raises(ValueError):
+        pipeline.add_stage('b', lambda results: 1, depends_on=['a'])
+
+
+def test_cancellation_reaches_stage_threads():
+    event = threading.Event()
+    started = threading.Event()
+
+    def long_stage(results):
+        started.set()
+        for _ in range(500):
+            raise_if_cancelled()
+            time.sleep(0.01)
+        return "done"
+
+    def cancel_soon():
+        started.wait(2)
+        event.set()
+
+    pipeline = StagePipeline()
+    pipeline.add_stage('long', long_stage)
+    pipeline.add_stage('after', lambda results: 1, depends_on=['long'])
+
+    threading.Thread(target=cancel_soon, daemon=True).start()
+    with cancellation_scope(event):
+        with pytest.raises(ReportCancelledError):
+            pipeline.run()
+    assert pipeline.timings['after']['status'] == 'skipped'
+
+
+def test_stage_timings_persisted_with_task():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ReportTaskStore(os.path.join(tmp, "tasks.db"))
+        task = ReportTask(query="q", task_id="t1")
+        task.stages = {'load_inputs': {'status': 'completed', 'start': 0.0, 'duration': 0.01}}
+        store.save(task)
+
+        loaded = store.get("t1")
+        assert loaded.stages == task.stages
+        assert loaded.to_dict()['stages']['load_inputs']['status'] == 'completed'
+        assert store.list_recent()[0].stages == task.stages
@@ -0,0 +1,140 @@
+"""
+测试ReportEngine报告任务队列
+
+覆盖：
+1. 按优先级执行与相同输入去重
+2. 取消排队中与运行中的任务（包括中断LLM流式输出）
+3. 任务状态与结果持久化到SQLite，重启后恢复排队任务
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ReportEngine.llms.base import LLMClient
+from ReportEngine.task_queue import ReportTask, ReportTaskQueue, ReportTaskStore
+from ReportEngine.utils.cancellation import ReportCancelledError, cancellation_scope, raise_if_cancelled
+
+
+def _wait_for(predicate, timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class FakeStream:
+    """无限输出的假流式响应"""
+
+    def __init__(self):
+        self.closed = False
+
+    def __iter__(self):
+        while True:
+            delta = SimpleNamespace(content="块")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    def close(self):
+        self.closed = True
+
+
+class TestReportTaskQueue:
+    """测试ReportTaskQueue"""
+
+    def setup_method(self):
+        """每个测试方法前的初始化"""
+        self.db_path = os.path.join(tempfile.mkdtemp(), "tasks.db")
+        self.store = ReportTaskStore(self.db_path)
+        self.executed = []
+
+    def _runner(self, task):
+        self.executed.append(task.task_id)
+        for _ in range(20):
+            time.sleep(0.005)
+            raise_if_cancelled()
+        task.html_content = f"<html>{task.query}</html>"
+
+    def test_priority_order_and_dedup(self):
+        """测试高优先级先执行，相同输入复用已有任务"""
+        task_queue = ReportTaskQueue(self._runner, self.store, max_workers=1)
+        for i in range(3):
+            task_queue.submit(ReportTask(f"查询{i}", f"t{i}", priority=i, dedup_key=f"k{i}"))
+
+        existing, deduplicated = task_queue.submit(ReportTask("查询1", "t-dup", dedup_key="k1"))
+        assert deduplicated is True
+        assert existing.task_id == "t1"
+
+        task_queue.start()
+        assert _wait_for(lambda: len(self.executed) == 3 and not task_queue.list_active())
+        assert self.executed == ["t2", "t1", "t0"]
+        assert self.store.get("t0").html_content == "<html>查询0</html>"
+        assert self.store.get("t-dup") is None
+
+    def test_cancel_pending_and_running(self):
+        """测试取消排队中与运行中的任务"""
+        started = threading.Event()
+
+        def slow_runner(task):
+            started.set()
+            while True:
+                time.sleep(0.005)
+                raise_if_cancelled()
+
+        task_queue = ReportTaskQueue(slow_runner, self.store, max_workers=1)
+        task_queue.submit(ReportTask("运行中", "running", priority=1))
+        task_queue.submit(ReportTask("排队中", "pending"))
+        task_queue.start()
+        assert started.wait(2)
+
+        assert task_queue.cancel("pending") is True
+        assert task_queue.cancel("running") is True
+        assert _wait_for(lambda: self.store.get("running").status == "cancelled")
+        assert self.store.get("pending").status == "cancelled"
+
+    def test_recover_pending_after_restart(self):
+        """测试重启后恢复排队任务，中断的运行中任务标记为错误"""
+        pending = ReportTask("排队中", "pending")
+        running = ReportTask("运行中", "running")
+        running.status = "running"
+        self.store.save(pending)
+        self.store.save(running)
+
+        task_queue = ReportTaskQueue(self._runner, ReportTaskStore(self.db_path), max_workers=1)
+        assert self.store.get("running").status == "error"
+        task_queue.start()
+        assert _wait_for(lambda: self.store.get("pending").status == "completed")
+
+    def test_cancel_interrupts_llm_stream(self):
+        """测试取消事件中断LLM流式输出并关闭连接"""
+        stream = FakeStream()
+        # 绕过__init__，避免构造真实的OpenAI客户端
+        client = LLMClient.__new__(LLMClient)
+        client.model_name = "test"
+        client.timeout = 10.0
+        client.client = SimpleNamespace(chat=SimpleNamespace(
+            completions=SimpleNamespace(create=lambda **kwargs: stream)
+        ))
+
+        event = threading.Event()
+        received = []
+        try:
+            with cancellation_scope(event):
+                for chunk in client.stream_invoke("system", "user"):
+                    received.append(chunk)
+                    if len(received) == 3:
+                        event.set()
+            raise AssertionError("取消后流式输出应当中断")
+        except ReportCancelledError:
+            pass
+        assert len(received) == 3
+        assert stream.closed is True
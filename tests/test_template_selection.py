@@ -0,0 +1,91 @@
+"""
+测试ReportEngine模板注册表与模板选择缓存
+
+覆盖：
+1. 模板大纲与描述的预解析
+2. 文件修改后自动重新加载
+3. 本地分类置信度高时跳过LLM，结果按查询缓存
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from ReportEngine.nodes.template_selection_node import TemplateSelectionNode
+from ReportEngine.utils.template_registry import TemplateRegistry
+
+TEMPLATE_DIR = project_root / "ReportEngine" / "report_template"
+
+
+class FakeLLMClient:
+    """返回固定模板名的假LLM客户端"""
+
+    def __init__(self, template_name: str):
+        self.calls = 0
+        self.template_name = template_name
+
+    def stream_invoke_to_string(self, system_prompt, user_prompt, **kwargs):
+        self.calls += 1
+        return f'{{"template_name": "{self.template_name}", "selection_reason": "测试"}}'
+
+
+class TestTemplateSelection:
+    """测试TemplateRegistry与TemplateSelectionNode"""
+
+    def setup_method(self):
+        """每个测试方法前复制一份模板目录"""
+        self.work_dir = tempfile.mkdtemp()
+        self.template_dir = os.path.join(self.work_dir, "templates")
+        shutil.copytree(TEMPLATE_DIR, self.template_dir)
+        self.cache_dir = os.path.join(self.work_dir, "cache")
+
+    def teardown_method(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_registry_parses_outline(self):
+        """测试模板描述与章节大纲被预先解析"""
+        registry = TemplateRegistry(self.template_dir)
+        templates = registry.get_templates()
+        assert len(templates) == 6
+        brand = registry.get("企业品牌声誉分析报告模板")
+        assert brand['description'] == "适用于企业品牌声誉和形象分析"
+        assert brand['outline'][0]['title'].startswith("1.0")
+        assert brand['outline'][0]['subsections']
+
+    def test_registry_reloads_on_mtime_change(self):
+        """测试新增模板后注册表自动重新加载"""
+        registry = TemplateRegistry(self.template_dir, check_interval=0)
+        version = registry.version
+        with open(os.path.join(self.template_dir, "自定义模板.md"), 'w', encoding='utf-8') as f:
+            f.write("### **自定义模板**\n- **1.0 概述**\n  - 1.1 背景\n")
+        assert registry.get("自定义模板") is not None
+        assert registry.version != version
+
+    def test_local_classifier_skips_llm(self):
+        """测试关键词明确时不调用LLM"""
+        llm = FakeLLMClient("社会公共热点事件分析报告模板")
+        node = TemplateSelectionNode(llm, self.template_dir, cache_dir=self.cache_dir)
+        result = node.run({'query': "某化工厂爆炸事故危机应对", 'reports': [], 'forum_logs': ""})
+        assert result['template_name'] == "突发事件与危机公关舆情报告模板"
+        assert llm.calls == 0
+
+    def test_ambiguous_query_uses_llm_and_caches(self):
+        """测试模糊查询调用LLM，且同一查询第二次命中缓存"""
+        llm = FakeLLMClient("社会公共热点事件分析报告模板")
+        node = TemplateSelectionNode(llm, self.template_dir, cache_dir=self.cache_dir)
+        first = node.run({'query': "武汉大学", 'reports': ["# 武汉大学"], 'forum_logs': ""})
+        assert llm.calls == 1
+        assert first['template_name'] == "社会公共热点事件分析报告模板"
+
+        # 新节点实例依靠磁盘缓存
+        node = TemplateSelectionNode(llm, self.template_dir, cache_dir=self.cache_dir)
+        second = node.run({'query': "武汉大学", 'reports': [], 'forum_logs': ""})
+        assert llm.calls == 1
+        assert second['template_name'] == first['template_name']
+        assert second['template_content'] == first['template_content']
@@ -0,0 +1,207 @@
+"""
+引擎报告清单
+QueryEngine、MediaEngine、InsightEngine保存报告时追加一条记录，
+ReportEngine增量读取清单判断报告是否就绪，无需扫描报告目录
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Callable, Tuple
+from loguru import logger
+
+DEFAULT_MANIFEST_PATH = "logs/report_manifest.jsonl"
+
+
+def normalize_query(query: str) -> str:
+    """规范化查询，作为清单索引键"""
+    return " ".join((query or "").split()).lower()
+
+
+def record_report(engine: str, query: str, path: str, content: str,
+                  session_id: str = "", manifest_path: str = DEFAULT_MANIFEST_PATH) -> Dict[str, Any]:
+    """
+    向清单追加一条报告记录
+
+    三个引擎运行在不同进程中，记录以单次write追加到O_APPEND打开的文件，
+    各进程的记录不会互相覆盖或交错。
+
+    Args:
+        engine: 引擎名称（query/media/insight）
+        query: 报告对应的查询
+        path: 报告文件路径
+        content: 报告内容，用于计算内容哈希
+        session_id: 可选的会话标识
+        manifest_path: 清单文件路径
+
+    Returns:
+        写入的记录
+    """
+    record = {
+        'engine': engine,
+        'query': query,
+        'query_key': normalize_query(query),
+        'session_id': session_id,
+        'path': path,
+        'content_hash': hashlib.sha256(content.encode('utf-8')).hexdigest(),
+        'size': len(content),
+        'completed_at': datetime.now().isoformat(),
+        'ts': time.time(),
+    }
+
+    manifest_dir = os.path.dirname(manifest_path)
+    if manifest_dir:
+        os.makedirs(manifest_dir, exist_ok=True)
+
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+    fd = os.open(manifest_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+    logger.info(f"报告已登记到清单: {engine} -> {path}")
+    return record
+
+
+class ReportManifest:
+    """报告清单的增量读取与索引"""
+
+    def __init__(self, manifest_path: str = DEFAULT_MANIFEST_PATH):
+        """
+        初始化清单索引
+
+        Args:
+            manifest_path: 清单文件路径
+        """
+        self.manifest_path = manifest_path
+        self._offset = 0
+        self._inode = None
+        self._pending = b""
+        self._latest_by_engine: Dict[str, Dict[str, Any]] = {}
+        self._latest_by_query: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._latest_by_session: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._lock = threading.Lock()
+        self._watch_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """订阅新记录，回调在读取到新记录时调用"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def refresh(self) -> List[Dict[str, Any]]:
+        """
+        读取自上次以来新增的记录
+
+        只stat一次清单文件，没有新内容时不做任何读取。
+
+        Returns:
+            新增的记录列表
+        """
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return []
+
+        with self._lock:
+            # 清单被删除重建或截断时从头读取
+            if stat.st_ino != self._inode or stat.st_size < self._offset:
+                self._reset_index()
+                self._inode = stat.st_ino
+            if stat.st_size == self._offset:
+                return []
+
+            with open(self.manifest_path, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read()
+            self._offset += len(data)
+
+            data = self._pending + data
+            lines = data.split(b"\n")
+            # 最后一段不以换行结尾时可能是写了一半的记录，留到下次再解析
+            self._pending = lines.pop()
+
+            records = []
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                    logger.warning(f"跳过无法解析的清单记录: {str(e)}")
+                    continue
+                self._index(record)
+                records.append(record)
+            subscribers = list(self._subscribers)
+
+        for record in records:
+            for callback in subscribers:
+                try:
+                    callback(record)
+                except Exception as e:
+                    logger.exception(f"清单订阅回调失败: {str(e)}")
+        return records
+
+    def get_latest(self, engine: str, query: Optional[str] = None, session_id: Optional[str] = None,
+                   since: float = 0.0) -> Optional[Dict[str, Any]]:
+        """
+        获取某个引擎最新的报告记录
+
+        Args:
+            engine: 引擎名称
+            query: 指定时只返回该查询的报告
+            session_id: 指定时只返回该会话的报告（优先于query）
+            since: 只返回该时间戳之后完成的报告
+
+        Returns:
+            报告记录，不存在时返回None
+        """
+        self.refresh()
+        with self._lock:
+            if session_id:
+                record = self._latest_by_session.get((session_id, engine))
+            elif query is not None:
+                record = self._latest_by_query.get((normalize_query(query), engine))
+            else:
+                record = self._latest_by_engine.get(engine)
+        if record and record['ts'] >= since:
+            return record
+        return None
+
+    def start_watching(self, interval: float = 1.0):
+        """启动后台线程定期检查清单，向订阅者推送新记录"""
+        if self._watch_thread and self._watch_thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def watch():
+            while not self._stop_event.wait(interval):
+                self.refresh()
+
+        self._watch_thread = threading.Thread(target=watch, name="report-manifest-watcher", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        """停止后台检查线程"""
+        self._stop_event.set()
+
+    def _index(self, record: Dict[str, Any]):
+        """更新内存索引（调用方持有锁）"""
+        engine = record.get('engine', '')
+        self._latest_by_engine[engine] = record
+        self._latest_by_query[(record.get('query_key', ''), engine)] = record
+        if record.get('session_id'):
+            self._latest_by_session[(record['session_id'], engine)] = record
+
+    def _reset_index(self):
+        """清空索引（调用方持有锁）"""
+        self._offset = 0
+        self._pending = b""
+        self._latest_by_engine.clear()
+        self._latest_by_query.clear()
+        self._latest_by_session.clear()